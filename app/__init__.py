@@ -99,6 +99,254 @@ def clean_dismissed_notifications(dry_run):
         )
 
 
+@db_maintenance.command()
+@click.option('--batch-size', default=1000, show_default=True,
+              help='Number of competencies updated per batch.')
+@with_appcontext
+def rebuild_competency_recycling(batch_size):
+    """Recomputes the materialized recycling dates of every competency."""
+    # pylint: disable=import-outside-toplevel
+    from app.models import rebuild_competency_recycling_dates
+    updated = rebuild_competency_recycling_dates(batch_size=batch_size)
+    click.echo(f"Rebuilt recycling dates for {updated} competencies.")
+
+
+@db_maintenance.command()
+@click.option('--batch-size', default=500, show_default=True,
+              help='Number of users updated per batch.')
+@click.option('--all', 'rehash', is_flag=True,
+              help='Hash every API key again, after API_KEY_HMAC_SECRET changed.')
+@with_appcontext
+def backfill_api_key_hashes(batch_size, rehash):
+    """Stores the indexed HMAC of existing API keys."""
+    # pylint: disable=import-outside-toplevel
+    from app.models import backfill_api_key_hashes as backfill
+    updated = backfill(batch_size=batch_size, rehash=rehash)
+    click.echo(f"Backfilled API key hashes for {updated} users.")
+
+
+@click.group('booklets')
+def booklets_cli():
+    """Skills booklet commands."""
+    pass  # pylint: disable=unnecessary-pass
+
+
+@booklets_cli.command('export')
+@click.option('--team', 'team_name', help='Export the members of this team.')
+@click.option('--species', 'species_name', help='Export the users competent for this species.')
+@click.option('--workers', type=int, default=None,
+              help='Rendering processes (defaults to BOOKLET_EXPORT_WORKERS or the CPU count).')
+@click.argument('output', type=click.Path(dir_okay=False, writable=True))
+@with_appcontext
+def export_booklets(team_name, species_name, workers, output):
+    """Writes the booklets of a team, a species or every approved user to one ZIP."""
+    # pylint: disable=import-outside-toplevel
+    from app.booklets import booklet_export_user_ids, write_booklet_archive
+    from app.models import Species, Team
+    team_id = species_id = None
+    if team_name:
+        team = Team.query.filter_by(name=team_name).first()
+        if team is None:
+            raise click.BadParameter(f"No team named '{team_name}'.", param_hint='--team')
+        team_id = team.id
+    elif species_name:
+        species = Species.query.filter_by(name=species_name).first()
+        if species is None:
+            raise click.BadParameter(f"No species named '{species_name}'.", param_hint='--species')
+        species_id = species.id
+    user_ids = booklet_export_user_ids(team_id=team_id, species_id=species_id)
+    with open(output, 'wb') as fileobj:
+        write_booklet_archive(user_ids, fileobj, max_workers=workers)
+    click.echo(f"Exported {len(user_ids)} booklets to {output}.")
+
+
+@click.group('certificates')
+def certificates_cli():
+    """Competency certificate commands."""
+    pass  # pylint: disable=unnecessary-pass
+
+
+@certificates_cli.command('render')
+@click.option('--all', 'rerender', is_flag=True,
+              help='Render every certificate again, not only the missing ones.')
+@click.option('--workers', type=int, default=None,
+              help='Rendering processes (defaults to CERTIFICATE_RENDER_WORKERS or the CPU count).')
+@with_appcontext
+def render_certificates(rerender, workers):
+    """Pre-renders the competency certificates into the certificate store."""
+    # pylint: disable=import-outside-toplevel
+    from app.certificates import prerender_certificates
+    processed, rendered = prerender_certificates(rerender=rerender, max_workers=workers)
+    click.echo(f"Rendered {rendered} certificates for {processed} competencies.")
+
+
+@click.group('planner')
+def planner_cli():
+    """Training session planning commands."""
+    pass  # pylint: disable=unnecessary-pass
+
+
+@planner_cli.command('propose')
+@click.option('--limit', default=20, show_default=True, help='Number of drafts shown.')
+@with_appcontext
+def propose_sessions(limit):
+    """Prints the best ranked session drafts for the pending training requests."""
+    # pylint: disable=import-outside-toplevel
+    from app.session_planner import plan_sessions
+    drafts = plan_sessions()
+    for draft in drafts[:limit]:
+        date = draft.proposed_date.strftime('%Y-%m-%d') if draft.proposed_date else '-'
+        click.echo(f"{draft.score:6.2f}  {draft.species_name or '-'}  {date}  {draft.title}  "
+                   f"({len(draft.attendees)} attendees, {len(draft.tutors)} tutors, "
+                   f"{draft.coverage:.0%} covered)")
+    click.echo(f"{len(drafts)} drafts for the pending training requests.")
+
+
+@planner_cli.command('benchmark')
+@click.option('--requests', 'request_count', default=5000, show_default=True,
+              help='Number of synthetic pending requests.')
+@click.option('--skills', 'skill_count', default=200, show_default=True)
+@click.option('--species', 'species_count', default=12, show_default=True)
+@click.option('--tutors', 'tutor_count', default=100, show_default=True)
+@click.option('--seed', default=0, show_default=True, help='Seed of the synthetic data.')
+@click.option('--repeat', default=3, show_default=True, help='Runs; the median is reported.')
+@with_appcontext
+def benchmark_planner(request_count, skill_count, species_count, tutor_count, seed, repeat):
+    """Times the planner on seeded synthetic requests and tutors."""
+    # pylint: disable=import-outside-toplevel
+    from app.session_planner import benchmark_planner as run_benchmark
+    result = run_benchmark(request_count, skill_count, species_count, tutor_count, seed, repeat,
+                           *(current_app.config[key] for key in (
+                               'PLANNER_MAX_ATTENDEES', 'PLANNER_MIN_SIMILARITY',
+                               'PLANNER_DATE_WINDOW_DAYS')))
+    click.echo(f"{result['requests']} requests -> {result['drafts']} drafts: "
+               f"clustering {result['clustering_seconds'] * 1000:.1f} ms, "
+               f"tutor matching {result['matching_seconds'] * 1000:.1f} ms")
+
+
+@click.group('outbox')
+def outbox_cli():
+    """Mail outbox commands."""
+    pass  # pylint: disable=unnecessary-pass
+
+
+@outbox_cli.command('deliver')
+@click.option('--loop', 'interval', type=float, default=None,
+              help='Keep delivering, polling the outbox every INTERVAL seconds.')
+@with_appcontext
+def deliver_outbox(interval):
+    """Delivers the due messages of the mail outbox."""
+    # pylint: disable=import-outside-toplevel
+    import time
+    from app.mail_outbox import deliver_pending
+    while True:
+        sent, claimed = deliver_pending()
+        if claimed or interval is None:
+            click.echo(f"Sent {sent} of {claimed} due messages.")
+        if interval is None:
+            return
+        time.sleep(interval)
+
+
+@outbox_cli.command('status')
+@with_appcontext
+def outbox_status():
+    """Shows the number of outbox messages by status."""
+    # pylint: disable=import-outside-toplevel
+    from app.mail_outbox import outbox_counts
+    from app.models import OutboxMessageStatus
+    counts = outbox_counts()
+    for status in OutboxMessageStatus:
+        click.echo(f"{status.value}: {counts.get(status, 0)}")
+
+
+@outbox_cli.command('debug-server')
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', default=8025, show_default=True)
+def outbox_debug_server(host, port):
+    """Runs a local SMTP server printing the messages it receives."""
+    # pylint: disable=import-outside-toplevel
+    from app.mail_outbox import DebuggingSMTPServer
+
+    def show(sender, recipients, message):
+        click.echo(f"From {sender} to {', '.join(recipients)}: {message['Subject']}")
+
+    server = DebuggingSMTPServer(host, port, on_message=show)
+    click.echo(f"Debugging SMTP server listening on {host}:{server.port} (set MAIL_SERVER and "
+               "MAIL_PORT accordingly); Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+
+@click.group('bootstrap')
+def bootstrap_cli():
+    """Database bootstrap commands."""
+    pass  # pylint: disable=unnecessary-pass
+
+
+@bootstrap_cli.command('run')
+@click.option('--force', is_flag=True,
+              help='Reconcile even when the database matches the current fingerprint.')
+@with_appcontext
+def run_bootstrap_command(force):
+    """Creates missing tables, default roles, permissions and the first admin."""
+    # pylint: disable=import-outside-toplevel
+    from app.db_bootstrap import run_bootstrap
+    result = run_bootstrap(force=force)
+    if not result.applied:
+        click.echo(f"Database already bootstrapped ({result.fingerprint}).")
+        return
+    click.echo(f"Database bootstrapped ({result.fingerprint}): "
+               f"{'tables created, ' if result.tables_created else ''}"
+               f"{result.changes} role and permission changes, "
+               f"{result.recycling_dates} competency recycling dates and "
+               f"{result.api_key_hashes} API key hashes filled"
+               f"{', admin user created' if result.admin_created else ''}.")
+
+
+@bootstrap_cli.command('status')
+@with_appcontext
+def bootstrap_status():
+    """Compares the applied bootstrap fingerprint with the current code."""
+    # pylint: disable=import-outside-toplevel
+    from app.db_bootstrap import applied_fingerprint, bootstrap_fingerprint
+    expected, applied = bootstrap_fingerprint(), applied_fingerprint()
+    if applied == expected:
+        click.echo(f"Up to date ({expected}).")
+    else:
+        click.echo(f"Out of date: applied {applied or 'never'}, current {expected}. "
+                   "Run `flask bootstrap run`.")
+
+
+@click.group('diagnostics')
+def diagnostics_cli():
+    """Start-up and performance diagnostics."""
+    pass  # pylint: disable=unnecessary-pass
+
+
+@diagnostics_cli.command('imports')
+@click.option('--limit', default=15, show_default=True, help='Entries listed per ranking.')
+def import_profile(limit):
+    """Profiles the imports of a worker start (python -X importtime)."""
+    # pylint: disable=import-outside-toplevel
+    from app.import_profile import profile_imports, summarize_imports
+    try:
+        summary = summarize_imports(profile_imports(), limit=limit)
+    except RuntimeError as e:
+        raise click.ClickException(f"Creating the app failed:\n{e}")
+    click.echo(f"{summary['modules']} modules imported in {summary['total_ms']} ms.")
+    click.echo("\nPackages by own import time:")
+    for package, ms in summary['packages']:
+        click.echo(f"{ms:10.1f} ms  {package}")
+    click.echo("\nModules by cumulative import time:")
+    for module, ms in summary['slowest']:
+        click.echo(f"{ms:10.1f} ms  {module}")
+
 def get_locale():
     """Get the best matching language for the user."""
     if 'language' in session:
@@ -148,6 +396,10 @@ def create_app(config_class=Config):
     except OSError:
         pass
 
+    if not app.config.get('API_KEY_HMAC_SECRET') and not (app.debug or app.testing):
+        app.logger.warning("API_KEY_HMAC_SECRET is not set: API key hashes depend on "
+                           "SECRET_KEY, and rotating it disables every API key.")
+
     db.init_app(app)
     migrate.init_app(app, db)
     login.init_app(app)
@@ -157,11 +409,17 @@ def create_app(config_class=Config):
     bootstrap.init_app(app)
     limiter.init_app(app)
 
+    # pylint: disable=import-outside-toplevel
+    from app.metrics import init_metrics
+    from app.performance import init_performance
+    init_performance(app)
+    init_metrics(app)
+
     # Import models after db is initialized to avoid circular imports
     # pylint: disable=import-outside-toplevel
-    from app.models import User, UserDismissedNotification, Skill, Role, Permission, \
+    from app.models import User, UserDismissedNotification, Skill, Permission, \
         ContinuousTrainingEvent, UserContinuousTraining, ContinuousTrainingType, \
-        UserContinuousTrainingStatus, InitialRegulatoryTrainingLevel, init_roles_and_permissions
+        UserContinuousTrainingStatus, InitialRegulatoryTrainingLevel
 
     @app.context_processor
     def inject_api_key():
@@ -209,6 +467,12 @@ def create_app(config_class=Config):
     app.register_blueprint(dashboard_bp, url_prefix='/dashboard')
 
     app.cli.add_command(db_maintenance)
+    app.cli.add_command(booklets_cli)
+    app.cli.add_command(certificates_cli)
+    app.cli.add_command(planner_cli)
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(bootstrap_cli)
+    app.cli.add_command(diagnostics_cli)
 
     # Centralized Error Handlers
     @app.errorhandler(404)
@@ -239,32 +503,17 @@ def create_app(config_class=Config):
         print(f"DEBUG: Flashed messages: {session.get('_flashes')}")
         return redirect(url_for('root.index'))
 
-    with app.app_context():
+    if app.config.get('BOOTSTRAP_ON_START', True):
         # pylint: disable=import-outside-toplevel
-        from sqlalchemy import inspect
-        inspector = inspect(db.engine)
-        if not inspector.has_table("user"):
-            db.create_all()
-            print("Database tables created.")
-            # pylint: disable=import-outside-toplevel
-            # init_roles_and_permissions is already imported above
-            init_roles_and_permissions()
-            print("Roles and permissions initialized.")
-        else:
-            # pylint: disable=import-outside-toplevel
-            # Role and init_roles_and_permissions are already imported above
-            if not Role.query.filter_by(name='Admin').first():
-                print("Admin role not found. Initializing roles and permissions.")
-                init_roles_and_permissions()
-                print("Roles and permissions initialized.")
-
-        if User.query.first() is None:
-            admin_email = os.environ.get('ADMIN_EMAIL')
-            admin_password = os.environ.get('ADMIN_PASSWORD')
-            if admin_email and admin_password:
-                User.create_admin_user(admin_email, admin_password)
-                print("Admin user created.")
-            else:
-                print("Admin user not created. ADMIN_EMAIL and ADMIN_PASSWORD not set.")
+        from sqlalchemy.exc import SQLAlchemyError
+        from app.db_bootstrap import run_bootstrap
+        with app.app_context():
+            try:
+                run_bootstrap()
+            except SQLAlchemyError as e:
+                # Typically a database not migrated yet: `flask db upgrade` must
+                # still start, and `flask bootstrap run` follows it
+                db.session.rollback()
+                app.logger.error(f"Database bootstrap failed: {e}")
 
     return app
\ No newline at end of file
@@ -172,6 +172,10 @@ class ImportForm(FlaskForm):
                                    default=False)
     submit = SubmitField('Import')
 
+class SkillImportForm(ImportForm):
+    """Form for importing skills from Excel files, with an optional dry run."""
+    dry_run = BooleanField('Dry run (report the changes without saving them)', default=False)
+
 class AddUserToTeamForm(FlaskForm):
     """Form for adding users to a team."""
     users = QuerySelectMultipleField('Select Users', query_factory=get_users,
@@ -10,14 +10,12 @@ from collections import defaultdict
 from datetime import datetime, timezone, timedelta
 
 # Third-party imports
-import openpyxl
 from flask import (
     render_template, redirect, url_for, flash, request, current_app,
-    send_file, jsonify, abort
+    send_file, jsonify, abort, session as flask_session, Response, stream_with_context
 )
 from flask_login import login_required, current_user
-from openpyxl.comments import Comment
-from openpyxl.worksheet.datavalidation import DataValidation
+from markupsafe import Markup
 from sqlalchemy import func, case, distinct
 from werkzeug.utils import secure_filename
 from flask_babel import lazy_gettext as _
@@ -26,13 +24,20 @@ from flask_babel import lazy_gettext as _
 from app import db
 from app.admin import bp
 from app.admin.forms import (
-    UserForm, TeamForm, SpeciesForm, SkillForm, TrainingPathForm, ImportForm,
+    UserForm, TeamForm, SpeciesForm, SkillForm, TrainingPathForm, ImportForm, SkillImportForm,
     AddUserToTeamForm, RoleForm, ContinuousTrainingEventForm,
     BatchValidateUserContinuousTrainingForm, ValidateUserContinuousTrainingEntryForm,
     AdminInitialRegulatoryTrainingForm
 )
+from app.booklets import booklet_export_user_ids, stream_booklet_archive
+from app.compliance import compute_continuous_training_compliance
 from app.decorators import permission_required
 from app.email import send_email
+from app.exports import export_response, iter_batches
+from app.imports import (
+    SKILL_IMPORT_COLUMNS, USER_IMPORT_COLUMNS, import_report_path, import_skills, import_users,
+    read_rows, save_import_report, summarize
+)
 from app.models import (
     User, Team, Species, Skill, TrainingPath, TrainingPathSkill, ExternalTraining,
     TrainingRequest, TrainingRequestStatus, ExternalTrainingStatus, Competency,
@@ -43,6 +48,10 @@ from app.models import (
     training_session_skills_covered, training_request_skills_requested, skill_species_association,
     skill_practice_event_skills
 )
+from app.performance import get_monitor
+from app.request_board import get_request_board
+from app.session_planner import plan_sessions
+from app.spreadsheets import Comment, DataValidation, Workbook
 from app.training.forms import TrainingSessionForm
 
 @bp.route('/continuous_training_events')
@@ -509,11 +518,12 @@ def index():
     users_needing_recycling_set = set() # Keep this to pass to the template if needed
     
     recycling_map = defaultdict(set)
-    for comp in Competency.query.options(db.joinedload(Competency.skill)).all():
-        if comp.needs_recycling:
-            recycling_map[comp.user_id].add(comp.skill_id)
-            recycling_needed_count += 1
-            users_needing_recycling_set.add(comp.user)
+    expired_competencies = Competency.query.options(db.joinedload(Competency.user))\
+        .filter(Competency.needs_recycling).all()
+    for comp in expired_competencies:
+        recycling_map[comp.user_id].add(comp.skill_id)
+        recycling_needed_count += 1
+        users_needing_recycling_set.add(comp.user)
 
     users_needing_recycling = list(users_needing_recycling_set)
     
@@ -1238,7 +1248,7 @@ def manage_skills():
     skills_query = db.session.query(
         Skill,
         func.count(distinct(Competency.user_id)).label('user_count'),
-        func.count(distinct(case((Competency.needs_recycling == True, Competency.user_id),
+        func.count(distinct(case((Competency.needs_recycling, Competency.user_id),
                                 else_=None))).label('recycling_count'),
         func.count(distinct(tutor_skill_association.c.user_id)).label('tutor_count')
     ).outerjoin(Competency, Skill.id == Competency.skill_id) \
@@ -1251,7 +1261,7 @@ def manage_skills():
 
     needs_recycling = request.args.get('needs_recycling', 'false').lower() == 'true'
     if needs_recycling:
-        skills_query = skills_query.having(func.count(distinct(case(((Competency.needs_recycling == True),
+        skills_query = skills_query.having(func.count(distinct(case((Competency.needs_recycling,
                                                                     Competency.user_id), else_=None))) > 0)
 
     skills_data = skills_query.order_by(Skill.name).all()
@@ -1613,71 +1623,18 @@ def import_export_users():
             filename = secure_filename(file.filename)
             
             if filename.endswith('.xlsx'):
-                workbook = openpyxl.load_workbook(file)
-                sheet = workbook.active
-                
-                users_imported = 0
-                users_updated = 0
-                for row_idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True)): # Skip header
-                    try:
-                        # Assuming Excel columns: full_name, email, password, is_admin, is_team_lead, team_name
-                        full_name, email, password, is_admin_str, is_team_lead_str, team_name = row
-                        
-                        user = User.query.filter_by(email=email).first()
-                        if user is None:
-                            is_admin = str(is_admin_str).lower() == 'true'
-                            is_team_lead = str(is_team_lead_str).lower() == 'true'
-                            
-                            user = User(full_name=full_name, email=email, is_admin=is_admin)
-                            user.set_password(password)
-                            
-                            if team_name:
-                                team = Team.query.filter_by(name=team_name).first()
-                                if not team:
-                                    team = Team(name=team_name)
-                                    db.session.add(team)
-                                
-                                user.teams.append(team)
-                                if is_team_lead:
-                                    user.teams_as_lead.append(team)
-                            
-                            db.session.add(user)
-                            users_imported += 1
-                        elif form.update_existing.data:
-                            user.full_name = full_name
-                            user.is_admin = str(is_admin_str).lower() == 'true'
-                            if password:
-                                user.set_password(password)
-                            
-                            is_team_lead = str(is_team_lead_str).lower() == 'true'
-                            
-                            # Clear existing teams and leadership roles
-                            user.teams.clear()
-                            user.teams_as_lead.clear()
-
-                            if team_name:
-                                team = Team.query.filter_by(name=team_name).first()
-                                if not team:
-                                    team = Team(name=team_name)
-                                    db.session.add(team)
-                                
-                                user.teams.append(team)
-                                if is_team_lead:
-                                    user.teams_as_lead.append(team)
-                            
-                            # Generate API key if missing for updated user
-                            if user.api_key is None:
-                                user.generate_api_key()
-
-                            users_updated += 1
-
-                    except Exception as e:
-                        flash("Error importing row", 'danger')
-                        db.session.rollback()
-                        continue
-                db.session.commit()
-                flash(f"{users_imported} users imported, {users_updated} users updated "
-                      f"successfully from Excel!", 'success')
+                rows = read_rows(file, len(USER_IMPORT_COLUMNS))
+                results = import_users(rows, update_existing=form.update_existing.data)
+                counts = summarize(results)
+                report_id = save_import_report(results, USER_IMPORT_COLUMNS,
+                                               hidden_columns=(USER_IMPORT_COLUMNS.index('password'),))
+                _remember_import_report(report_id)
+                flash(Markup(
+                    f"{counts['created']} users imported, {counts['updated']} users updated, "
+                    f"{counts['skipped']} skipped and {counts['error']} rejected from Excel. "
+                    f"<a href=\"{url_for('admin.download_import_report', report_id=report_id)}\">"
+                    f"Download the import report</a>."),
+                    'danger' if counts['error'] else 'success')
             else:
                 flash('Unsupported file format. Please upload an XLSX file.', 'danger')
             
@@ -1693,38 +1650,73 @@ def import_export_users():
 
 
 
+def _remember_import_report(report_id):
+    """Records in the session that the current user may download ``report_id``."""
+    # Only the most recent reports are kept to bound the session cookie size
+    flask_session['import_reports'] = (flask_session.get('import_reports', []) + [report_id])[-20:]
+
+@bp.route('/import_reports/<report_id>')
+@login_required
+def download_import_report(report_id):
+    """Downloads the per-row result workbook of an import run by the current user."""
+    path = import_report_path(report_id)
+    if path is None or report_id not in flask_session.get('import_reports', []):
+        abort(404)
+    return send_file(path, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                     as_attachment=True, download_name=f'import_report_{report_id[:8]}.xlsx')
+
 @bp.route('/export_users_xlsx')
 @login_required
 @permission_required('user_manage')
 def export_users_xlsx():
-    """Exports all user data to an Excel file."""
-    users = User.query.all()
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = "Users"
-
-    # Write header
-    sheet.append(['full_name', 'email', '', 'is_admin', 'is_team_lead', 'team_name'])
-
-    # Write data
-    for user in users:
-        sheet.append([user.full_name, user.email, '', user.is_admin,
-                      bool(user.teams_as_lead), user.teams[0].name if user.teams else ''])
-    
-    output = io.BytesIO()
-    workbook.save(output)
-    output.seek(0)
-
-    return send_file(output, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                     as_attachment=True,
-                     download_name=f'users_export_{datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")}.xlsx')
+    """Exports all user data to an Excel file (or CSV with ?format=csv)."""
+    def rows():
+        query = User.query.options(db.selectinload(User.teams), db.selectinload(User.teams_as_lead))
+        for batch in iter_batches(query, User.id):
+            for user in batch:
+                yield [user.full_name, user.email, '', user.is_admin,
+                       bool(user.teams_as_lead), user.teams[0].name if user.teams else '']
+
+    return export_response(request.args.get('format'),
+                           f'users_export_{datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")}',
+                           "Users", ['full_name', 'email', '', 'is_admin', 'is_team_lead', 'team_name'],
+                           rows())
+
+@bp.route('/export_booklets')
+@login_required
+@permission_required('view_any_booklet')
+def export_booklets():
+    """Streams one ZIP holding the booklets of a team or a species.
+
+    The booklets are rendered in the request, without a process pool, so the
+    export is capped to BOOKLET_WEB_EXPORT_MAX_USERS users; institute-wide
+    exports are left to `flask booklets export`.
+    """
+    team_id = request.args.get('team_id', type=int)
+    species_id = request.args.get('species_id', type=int)
+    if team_id is not None:
+        scope = secure_filename(Team.query.get_or_404(team_id).name)
+    elif species_id is not None:
+        scope = secure_filename(Species.query.get_or_404(species_id).name)
+    else:
+        abort(400)
+    user_ids = booklet_export_user_ids(team_id=team_id, species_id=species_id)
+    max_users = current_app.config.get('BOOKLET_WEB_EXPORT_MAX_USERS')
+    if max_users and len(user_ids) > max_users:
+        flash(f'{len(user_ids)} booklets exceed the limit of {max_users} per download. '
+              'Use `flask booklets export` instead.', 'warning')
+        return redirect(request.referrer or url_for('admin.index'))
+    filename = f'booklets_{scope}_{datetime.now(timezone.utc).strftime("%Y-%m-%d")}.zip'
+    return Response(stream_with_context(stream_booklet_archive(user_ids, max_workers=1)),
+                    mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
 
 @bp.route('/download_user_import_template_xlsx')
 @login_required
 @permission_required('user_manage')
 def download_user_import_template_xlsx():
     """Downloads an Excel template for importing user data."""
-    workbook = openpyxl.Workbook()
+    workbook = Workbook()
     sheet = workbook.active
     sheet.title = "User Import Template"
 
@@ -1755,87 +1747,63 @@ def download_user_import_template_xlsx():
 @login_required
 @permission_required('user_manage')
 def export_user_summary():
-    """Exports a detailed summary of all users to an Excel file."""
-    try:
-        users = User.query.options(
-            db.joinedload(User.teams),
-            db.joinedload(User.initial_regulatory_trainings)
-        ).all()
-        
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        sheet.title = "User Summary"
-
-        current_year = datetime.now(timezone.utc).year
-        headers = [
-            "User ID", "Full Name", "Email", "Team(s)", "Account Status", "Study Level",
-            "Initial Training Name", "Initial Training Completion Date",
-            "Compliance", "Live Training Hours", "Required Live Training Hours", "Live Training Compliance", "Total Continuous Training Hours (Last 6 Years)"
-        ]
-        for i in range(6):
-            headers.append(f"Continuous Training Hours ({current_year - i})")
-
-        sheet.append(headers)
-
-        for user in users:
-            # Personal Info
-            user_id = user.id
-            full_name = user.full_name
-            email = user.email
-            teams = ", ".join([team.name for team in user.teams]) if user.teams else "N/A"
-            account_status = "Active" if user.is_approved else "Pending"
-            study_level = user.study_level if user.study_level else "N/A"
-
-            # Initial Training
-            initial_trainings_names = []
-            initial_trainings_dates = []
-            for it in user.initial_regulatory_trainings:
-                initial_trainings_names.append(it.level.value)
-                initial_trainings_dates.append(it.training_date.strftime("%Y-%m-%d"))
-            
-            it_name = ", ".join(initial_trainings_names) if initial_trainings_names else "N/A"
-            it_completion_date = ", ".join(initial_trainings_dates) if initial_trainings_dates else "N/A"
-            
-            # Compliance
-            compliance_status = ""
-            if not user.is_continuous_training_compliant:
-                compliance_status = "WARNING"
-            elif not user.is_live_training_compliant:
-                compliance_status = "OK except live hours"
-            else:
-                compliance_status = "OK"
-
-            # Live Training Data
-            live_hours_str = f"{user.live_continuous_training_hours_6_years:.2f}"
-            required_live_hours_str = f"{user.required_live_training_hours:.2f}"
-            live_training_compliant_str = "Yes" if user.is_live_training_compliant else "No"
-
-            total_continuous_training_6_years = user.get_total_continuous_training_hours_last_six_years()
-
-            row_data = [
-                user_id, full_name, email, teams, account_status, study_level,
-                it_name, it_completion_date,
-                compliance_status, live_hours_str, required_live_hours_str, live_training_compliant_str, total_continuous_training_6_years
-            ]
-
-            # Continuous Training Annual Hours
-            for i in range(6):
-                year = current_year - i
-                hours = user.get_continuous_training_hours_for_year(year)
-                row_data.append(hours)
-
-            sheet.append(row_data)
-
-        output = io.BytesIO()
-        workbook.save(output)
-        output.seek(0)
-
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'user_summary_export_{datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")}.xlsx'
+    """Exports a detailed summary of all users to an Excel file (or CSV with ?format=csv)."""
+    current_year = datetime.now(timezone.utc).year
+    headers = [
+        "User ID", "Full Name", "Email", "Team(s)", "Account Status", "Study Level",
+        "Initial Training Name", "Initial Training Completion Date",
+        "Compliance", "Live Training Hours", "Required Live Training Hours", "Live Training Compliance", "Total Continuous Training Hours (Last 6 Years)"
+    ]
+    for i in range(6):
+        headers.append(f"Continuous Training Hours ({current_year - i})")
+
+    def rows():
+        query = User.query.options(
+            db.selectinload(User.teams),
+            db.selectinload(User.initial_regulatory_trainings)
         )
+
+        for batch in iter_batches(query, User.id):
+            compliance_by_user = compute_continuous_training_compliance([user.id for user in batch])
+            for user in batch:
+                # Personal Info
+                teams = ", ".join([team.name for team in user.teams]) if user.teams else "N/A"
+                account_status = "Active" if user.is_approved else "Pending"
+                study_level = user.study_level if user.study_level else "N/A"
+
+                # Initial Training
+                initial_trainings_names = []
+                initial_trainings_dates = []
+                for it in user.initial_regulatory_trainings:
+                    initial_trainings_names.append(it.level.value)
+                    initial_trainings_dates.append(it.training_date.strftime("%Y-%m-%d"))
+
+                it_name = ", ".join(initial_trainings_names) if initial_trainings_names else "N/A"
+                it_completion_date = ", ".join(initial_trainings_dates) if initial_trainings_dates else "N/A"
+
+                # Compliance and live training data
+                compliance = compliance_by_user[user.id]
+                live_hours_str = f"{compliance.live_hours:.2f}"
+                required_live_hours_str = f"{compliance.required_live_hours:.2f}"
+                live_training_compliant_str = "Yes" if compliance.is_live_compliant else "No"
+
+                row_data = [
+                    user.id, user.full_name, user.email, teams, account_status, study_level,
+                    it_name, it_completion_date,
+                    compliance.status_label, live_hours_str, required_live_hours_str,
+                    live_training_compliant_str, compliance.calendar_hours
+                ]
+
+                # Continuous Training Annual Hours
+                for i in range(6):
+                    row_data.append(compliance.hours_by_year.get(current_year - i, 0.0))
+
+                yield row_data
+
+    try:
+        return export_response(request.args.get('format'),
+                               f'user_summary_export_{datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")}',
+                               "User Summary", headers, rows())
     except Exception as e:
         current_app.logger.error(f"Failed to export user summary: {e}")
         traceback.print_exc()
@@ -1848,88 +1816,27 @@ def export_user_summary():
 @permission_required('skill_manage')
 def import_export_skills():
     """Handles importing and exporting skill data via Excel files."""
-    form = ImportForm()
+    form = SkillImportForm()
     if form.validate_on_submit():
         if form.import_file.data:
             file = form.import_file.data
             filename = secure_filename(file.filename)
             
             if filename.endswith('.xlsx'):
-                workbook = openpyxl.load_workbook(file)
-                sheet = workbook.active
-                
-                skills_imported = 0
-                skills_updated = 0
-                for row_idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True)): # Skip header
-                    try:
-                        # Assuming Excel columns: name, description, validity_period_months, complexity, reference_urls_text, training_videos_urls_text, potential_external_tutors_text, species_names
-                        name, description, validity_period_months_str, complexity_str, \
-                            reference_urls_text, training_videos_urls_text, \
-                            potential_external_tutors_text, species_names_str = row                        
-                        skill = Skill.query.filter_by(name=name).first()
-                        
-                        if skill is None:
-                            validity_period_months = int(validity_period_months_str) if validity_period_months_str else None
-                            complexity = Complexity(complexity_str) if complexity_str else Complexity.SIMPLE
-                            
-                            skill = Skill(
-                                name=name,
-                                description=description,
-                                validity_period_months=validity_period_months,
-                                complexity=complexity,
-                                reference_urls_text=reference_urls_text,
-                                training_videos_urls_text=training_videos_urls_text,
-                                potential_external_tutors_text=potential_external_tutors_text
-                            )
-                            db.session.add(skill)
-                            # The flush is needed to get the skill.id before adding species and tutors
-                            db.session.flush()
-
-                            if species_names_str:
-                                species_names = [s.strip() for s in str(species_names_str).split(',')]
-                                for species_name in species_names:
-                                    species_obj = Species.query.filter_by(name=species_name).first()
-                                    if species_obj:
-                                        skill.species.append(species_obj)
-                                    else:
-                                        flash(f"Species '{species_name}' not found for skill '{name}'. "\
-                                              f"It will be skipped.", 'warning')
-                            skills_imported += 1
-                        elif form.update_existing.data:
-                            # Update existing skill
-                            skill.description = description
-                            skill.validity_period_months = int(validity_period_months_str) if validity_period_months_str else None
-                            skill.complexity = Complexity(complexity_str) if complexity_str else Complexity.SIMPLE
-                            skill.reference_urls_text = reference_urls_text
-                            skill.training_videos_urls_text = training_videos_urls_text
-                            skill.potential_external_tutors_text = potential_external_tutors_text
-
-                            # Handle species (clear and re-add for updates)
-                            skill.species.clear()
-                            if species_names_str:
-                                species_names = [s.strip() for s in str(species_names_str).split(',')]
-                                for species_name in species_names:
-                                    species_obj = Species.query.filter_by(name=species_name).first()
-                                    if species_obj:
-                                        skill.species.append(species_obj)
-                                    else:
-                                        flash(f"Species '{species_name}' not found for skill '{name}'. "\
-                                              f"It will be skipped.", 'warning')
-                            
-
-                            skills_updated += 1
-                        else:
-                            flash(f"Skill '{name}' already exists and 'Update existing' was not checked. "
-                                  f"Skipping.", 'info')
-                            continue
-
-                    except Exception as e:
-                        flash(f"Error importing row {row_idx+1}: {row} - {e}", 'danger')
-                        db.session.rollback()
-                        continue
-                db.session.commit()
-                flash((f"{skills_imported} skills imported and {skills_updated} skills updated "
-                       f"successfully from Excel!"), 'success')
+                rows = read_rows(file, len(SKILL_IMPORT_COLUMNS))
+                results, new_species = import_skills(rows, update_existing=form.update_existing.data,
+                                                     dry_run=form.dry_run.data)
+                counts = summarize(results)
+                report_id = save_import_report(results, SKILL_IMPORT_COLUMNS)
+                _remember_import_report(report_id)
+                prefix = "Dry run: nothing was saved. " if form.dry_run.data else ""
+                flash(Markup(
+                    f"{prefix}{counts['created']} skills imported, {counts['updated']} skills updated, "
+                    f"{counts['unchanged']} unchanged, {counts['skipped']} skipped and "
+                    f"{counts['error']} rejected, {len(new_species)} new species. "
+                    f"<a href=\"{url_for('admin.download_import_report', report_id=report_id)}\">"
+                    f"Download the import report</a>."),
+                    'danger' if counts['error'] else 'success')
             else:
                 flash('Unsupported file format. Please upload an XLSX file.', 'danger')
             
@@ -1953,7 +1860,7 @@ def download_skill_import_template_for_skills_xlsx():
     species_names = [s.name for s in Species.query.all()]
 
 
-    workbook = openpyxl.Workbook()
+    workbook = Workbook()
     sheet = workbook.active
     headers = [
         'name', 'description', 'validity_period_months', 'complexity',
@@ -1969,7 +1876,7 @@ def download_skill_import_template_for_skills_xlsx():
     sheet.add_data_validation(dv_complexity)
 
     # Add a comment to guide users for multi-select fields
-    sheet['H1'].comment = openpyxl.comments.Comment("For multiple species, separate names with commas "
+    sheet['H1'].comment = Comment("For multiple species, separate names with commas "
                                                    "(e.g., 'Species A, Species B')", "Admin")
 
     output = io.BytesIO()
@@ -1984,65 +1891,42 @@ def download_skill_import_template_for_skills_xlsx():
 @login_required
 @permission_required('skill_manage')
 def export_skills_xlsx():
-    """Exports all skill data to an Excel file."""
-    skills = Skill.query.all()
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = "Skills"
-
+    """Exports all skill data to an Excel file (or CSV with ?format=csv)."""
     headers = [
         'name', 'description', 'validity_period_months', 'complexity',
         'reference_urls_text', 'training_videos_urls_text',
         'potential_external_tutors_text', 'species_names'
     ]
-    sheet.append(headers)
 
-    # Get data for dropdowns (same as import template)
+    # Create data validation for 'complexity' (same as import template)
     complexity_values = [c.name for c in Complexity]
-    species_names_list = [s.name for s in Species.query.all()]
-
-
-    # Create data validation for 'complexity'
     dv_complexity = DataValidation(type="list", formula1='"' + ','.join(complexity_values) + '"',
                                    allow_blank=True)
     dv_complexity.add('D2:D1048576') # Apply to column D (Complexity) from row 2 onwards
-    sheet.add_data_validation(dv_complexity)
-
-    # Create data validation for 'species_names'
-    # if species_names_list:
-    #     dv_species = DataValidation(type="list", formula1='"' + ','.join(species_names_list) + '"', allow_blank=True)
-    #     dv_species.add('H2:H1048576') # Apply to column H (species_names) from row 2 onwards
-    #     sheet.add_data_validation(dv_species)
-    
-
 
     # Add comments to guide users for multi-select fields
-    sheet['H1'].comment = Comment("For multiple species, separate names with commas "
-                                 "(e.g., 'Species A, Species B')", "Admin")
-
-
-    # Write data
-    for skill in skills:
-        species_names = ', '.join([s.name for s in skill.species])
-
-        sheet.append([
-            skill.name,
-            skill.description,
-            skill.validity_period_months,
-            skill.complexity.value,
-            skill.reference_urls_text,
-            skill.training_videos_urls_text,
-            skill.potential_external_tutors_text,
-            species_names
-        ])
-    
-    output = io.BytesIO()
-    workbook.save(output)
-    output.seek(0)
-
-    return send_file(output, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                     as_attachment=True,
-                     download_name=f'skills_export_{datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")}.xlsx')
+    species_comment = Comment("For multiple species, separate names with commas "
+                              "(e.g., 'Species A, Species B')", "Admin")
+
+    def rows():
+        query = Skill.query.options(db.selectinload(Skill.species))
+        for batch in iter_batches(query, Skill.id):
+            for skill in batch:
+                yield [
+                    skill.name,
+                    skill.description,
+                    skill.validity_period_months,
+                    skill.complexity.value,
+                    skill.reference_urls_text,
+                    skill.training_videos_urls_text,
+                    skill.potential_external_tutors_text,
+                    ', '.join([s.name for s in skill.species])
+                ]
+
+    return export_response(request.args.get('format'),
+                           f'skills_export_{datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")}',
+                           "Skills", headers, rows(),
+                           data_validations=[dv_complexity], header_comments={7: species_comment})
 
 
 @bp.route('/training_sessions/create', methods=['GET', 'POST'])
@@ -2578,36 +2462,45 @@ def reject_external_training(training_id):
 @permission_required('training_request_manage')
 def list_training_requests():
     """Displays a list of pending training requests, grouped by species."""
-    pending_training_requests = TrainingRequest.query.options(
-        db.joinedload(TrainingRequest.requester),
-        db.joinedload(TrainingRequest.skills_requested).joinedload(Skill.species),
-        db.joinedload(TrainingRequest.species_requested)
-    ).filter_by(status=TrainingRequestStatus.PENDING).all()
+    return render_template('admin/list_training_requests.html',
+                           title='Pending Training Requests',
+                           species_groups=get_request_board())
 
-    requests_by_species = defaultdict(list)
-    
-    class MockSpecies:
-        id = 0
-        name = "Sans Espèce Spécifiée"
 
-    for req in pending_training_requests:
-        # A request can be associated with multiple species through its skills.
-        # We add the request to each associated species group.
-        associated_species = req.associated_species
-        if not associated_species:
-            # If no species is associated (e.g. skill has no species), group it under a special key
-            if not any(isinstance(k, MockSpecies) for k in requests_by_species.keys()):
-                requests_by_species[MockSpecies()] = []
-            requests_by_species[next(k for k in requests_by_species if isinstance(k, MockSpecies))].append(req)
-        else:
-            for species in associated_species:
-                # To avoid using the species object itself as a key, which can be tricky,
-                # we can use species.id and pass a dictionary of species objects separately.
-                requests_by_species[species].append(req)
+@bp.route('/training_requests/plan')
+@login_required
+@permission_required('training_session_manage')
+def plan_training_sessions():
+    """Proposes ranked training sessions clustering the pending training requests."""
+    return render_template('admin/plan_training_sessions.html',
+                           title='Proposed Training Sessions',
+                           drafts=plan_sessions())
+
+
+def _performance_summary():
+    monitor = get_monitor()
+    if monitor is None:
+        abort(404)
+    return monitor.summary()
+
+
+@bp.route('/performance')
+@login_required
+@permission_required('admin_access')
+def performance():
+    """Shows per-endpoint request, query and render time percentiles and recent slow queries."""
+    return render_template('admin/performance.html', title='Performance',
+                           summary=_performance_summary())
+
+
+@bp.route('/performance.json')
+@login_required
+@permission_required('admin_access')
+def performance_json():
+    """Returns the performance summary of this worker as JSON."""
+    return jsonify(_performance_summary())
+
 
-    return render_template('admin/list_training_requests.html',
-                           title='Pending Training Requests',
-                           requests_by_species=requests_by_species)
 # Reports (Placeholder)
 @bp.route('/tutor_less_skills_report')
 @login_required
@@ -2627,34 +2520,35 @@ def tutor_less_skills_report():
 def recycling_report():
     """Generates a report of users whose competencies need recycling."""
     report_data = defaultdict(lambda: defaultdict(list))
-    all_users = User.query.options(db.joinedload(User.competencies)
-                                  .joinedload(Competency.skill)
-                                  .joinedload(Skill.species)).all()
+    expired_competencies = Competency.query.options(
+        db.joinedload(Competency.user),
+        db.selectinload(Competency.species),
+        db.joinedload(Competency.skill).selectinload(Skill.species)
+    ).filter(Competency.needs_recycling).all()
 
     class MockSpecies:
         id = 0
         name = "Sans Espèce Spécifiée"
 
-    for user in all_users:
-        for comp in user.competencies:
-            if comp.needs_recycling:
-                # This competency is expired.
-                # A competency can be for multiple species.
-                if comp.species:
-                    for species in comp.species:
-                        if user not in report_data[species][comp.skill]:
-                            report_data[species][comp.skill].append(user)
-                else:
-                    # If competency has no species, check the skill's species
-                    if comp.skill.species:
-                        for species in comp.skill.species:
-                            if user not in report_data[species][comp.skill]:
-                                report_data[species][comp.skill].append(user)
-                    else:
-                        if None not in report_data:
-                            report_data[None] = defaultdict(list)
-                        if user not in report_data[None][comp.skill]:
-                            report_data[None][comp.skill].append(user)
+    for comp in expired_competencies:
+        user = comp.user
+        # This competency is expired.
+        # A competency can be for multiple species.
+        if comp.species:
+            for species in comp.species:
+                if user not in report_data[species][comp.skill]:
+                    report_data[species][comp.skill].append(user)
+        else:
+            # If competency has no species, check the skill's species
+            if comp.skill.species:
+                for species in comp.skill.species:
+                    if user not in report_data[species][comp.skill]:
+                        report_data[species][comp.skill].append(user)
+            else:
+                if None not in report_data:
+                    report_data[None] = defaultdict(list)
+                if user not in report_data[None][comp.skill]:
+                    report_data[None][comp.skill].append(user)
 
     # Create a mock species for the 'None' key if it exists
     if None in report_data:
@@ -2669,18 +2563,20 @@ def recycling_report():
 def continuous_training_compliance_report():
     """Generates a report on continuous training compliance for all users."""
     users = User.query.all()
+    compliance_by_user = compute_continuous_training_compliance()
     report_data = []
     for user in users:
+        compliance = compliance_by_user[user.id]
         report_data.append({
             'user': user,
-            'total_hours': user.total_continuous_training_hours_6_years,
-            'live_hours': user.live_continuous_training_hours_6_years,
-            'online_hours': user.online_continuous_training_hours_6_years,
-            'required_hours': user.required_continuous_training_hours,
-            'is_compliant': user.is_continuous_training_compliant,
-            'required_live_training_hours': user.required_live_training_hours,
-            'is_live_training_compliant': user.is_live_training_compliant,
-            'is_at_risk_next_year': user.is_at_risk_next_year
+            'total_hours': compliance.total_hours,
+            'live_hours': compliance.live_hours,
+            'online_hours': compliance.online_hours,
+            'required_hours': compliance.required_hours,
+            'is_compliant': compliance.is_compliant,
+            'required_live_training_hours': compliance.required_live_hours,
+            'is_live_training_compliant': compliance.is_live_compliant,
+            'is_at_risk_next_year': compliance.is_at_risk_next_year
         })
     return render_template('admin/continuous_training_compliance_report.html',
                            title='Rapport de Conformité Formation Continue',
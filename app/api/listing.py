@@ -0,0 +1,139 @@
+"""
+Shared list framework for the REST API collection endpoints.
+
+List endpoints page through their table by primary key (keyset pagination
+with ``?limit=`` and the opaque ``?cursor=`` returned in the ``Link`` and
+``X-Next-Cursor`` headers), can return a subset of fields
+(``?fields=id,name``), eager-load only the relationships the requested fields
+need, and answer ``If-None-Match`` with 304 when the page is unchanged. The
+body stays a plain JSON list, and without ``limit`` or ``cursor`` the whole
+collection is returned as before.
+"""
+import base64
+import binascii
+import hashlib
+import json
+from functools import reduce
+from urllib.parse import urlencode
+
+from flask import current_app, request
+from flask_restx import marshal
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import load_only
+
+from app.api import api
+from app.api.load_plans import load_options
+
+# Page size used when a cursor is given without a limit
+DEFAULT_PAGE_SIZE = 100
+# Largest page a client can request
+DEFAULT_MAX_PAGE_SIZE = 1000
+
+LIST_PARAMS = {
+    'limit': {'description': 'Page size; enables keyset pagination', 'type': 'integer'},
+    'cursor': {'description': 'Opaque cursor from the X-Next-Cursor header of the previous page',
+               'type': 'string'},
+    'fields': {'description': 'Comma-separated list of fields to return', 'type': 'string'},
+}
+
+
+def list_doc(model):
+    """
+    Documents a list endpoint returning ``model`` items and the list parameters.
+    """
+    decorators = (api.doc(params=LIST_PARAMS), api.response(200, 'Success', [model]))
+    return lambda f: reduce(lambda func, decorator: decorator(func), decorators, f)
+
+
+def encode_cursor(key):
+    """
+    Returns the opaque cursor pointing after ``key``.
+    """
+    return base64.urlsafe_b64encode(str(key).encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns the key encoded in ``cursor``, aborting with 400 when it is invalid.
+    """
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii'))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        api.abort(400, "Invalid cursor")
+    return None
+
+
+def requested_fields(model):
+    """
+    Returns the fields of ``model`` selected with ``?fields=`` (all by default).
+    """
+    raw = request.args.get('fields', '')
+    names = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    if not names:
+        return dict(model)
+    unknown = [name for name in names if name not in model]
+    if unknown:
+        api.abort(400, f"Unknown fields: {', '.join(unknown)}")
+    return {name: model[name] for name in names}
+
+
+def _page_size():
+    max_size = current_app.config.get('API_MAX_PAGE_SIZE') or DEFAULT_MAX_PAGE_SIZE
+    limit = request.args.get('limit')
+    if limit is None:
+        return min(current_app.config.get('API_PAGE_SIZE') or DEFAULT_PAGE_SIZE, max_size)
+    try:
+        limit = int(limit)
+    except ValueError:
+        api.abort(400, "limit must be an integer")
+    return min(max(limit, 1), max_size)
+
+
+def list_response(query, model):
+    """
+    Marshals the rows of ``query`` with ``model`` into a conditional JSON response.
+
+    Only the relationships of the requested fields are eager-loaded, following
+    the model's load plan. When specific fields are requested, scalar columns
+    that are not needed are not loaded either.
+    """
+    selected = requested_fields(model)
+    entity = query.column_descriptions[0]['entity']
+    key_column = sa_inspect(entity).primary_key[0]
+
+    options = load_options(model, selected)
+    if 'fields' in request.args:
+        columns = sa_inspect(entity).column_attrs
+        attributes = {field.attribute if isinstance(field.attribute, str) else name
+                      for name, field in selected.items()}
+        options.append(load_only(*(getattr(entity, column.key) for column in columns
+                                   if column.key in attributes or column.key == key_column.key)))
+    if options:
+        query = query.options(*options)
+    query = query.order_by(None).order_by(key_column)
+
+    paginated = 'limit' in request.args or 'cursor' in request.args
+    next_cursor = None
+    if request.args.get('cursor'):
+        query = query.filter(key_column > decode_cursor(request.args['cursor']))
+    if paginated:
+        page_size = _page_size()
+        items = query.limit(page_size + 1).all()
+        if len(items) > page_size:
+            items = items[:page_size]
+            next_cursor = encode_cursor(getattr(items[-1], key_column.key))
+    else:
+        items = query.all()
+
+    body = json.dumps(marshal(items, selected), separators=(',', ':'))
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(hashlib.sha1(body.encode('utf-8')).hexdigest(), weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    if next_cursor is not None:
+        args = request.args.to_dict()
+        args.update(cursor=next_cursor, limit=str(page_size))
+        next_url = f'{request.base_url}?{urlencode(args)}'
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response.make_conditional(request)
@@ -0,0 +1,62 @@
+"""
+Declarative eager-loading plans for the API models.
+
+Each ``api.model`` whose fields read relationships registers the
+relationship path behind every such field. Before marshalling, endpoints turn
+the plan into ``selectinload`` options so a list costs one query per
+relationship instead of one per row. Fields nesting another API model
+(``fields.Nested`` or a list of them) chain that model's plan under the
+relationship.
+"""
+from flask_restx import fields
+from sqlalchemy.orm import selectinload
+
+# API model name -> {field name: relationship attribute or tuple of attributes}
+_load_plans = {}
+
+
+def register_load_plan(model, **paths):
+    """
+    Declares the relationship path loaded by each field of ``model``.
+    """
+    _load_plans[model.name] = paths
+
+
+def _nested_model(field):
+    if isinstance(field, fields.List):
+        field = field.container
+    if isinstance(field, fields.Nested):
+        return field.nested
+    return None
+
+
+def load_options(model, field_names=None):
+    """
+    Returns the loader options needed to marshal ``field_names`` of ``model``
+    (every field by default).
+    """
+    plan = _load_plans.get(model.name, {})
+    options = []
+    for name in field_names if field_names is not None else model:
+        path = plan.get(name)
+        if path is None:
+            continue
+        attributes = path if isinstance(path, tuple) else (path,)
+        option = selectinload(attributes[0])
+        for attribute in attributes[1:]:
+            option = option.selectinload(attribute)
+        nested = _nested_model(model[name])
+        if nested is not None:
+            nested_options = load_options(nested)
+            if nested_options:
+                option = option.options(*nested_options)
+        options.append(option)
+    return options
+
+
+def with_load_plan(query, model, field_names=None):
+    """
+    Applies the load plan of ``model`` to ``query``.
+    """
+    options = load_options(model, field_names)
+    return query.options(*options) if options else query
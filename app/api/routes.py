@@ -1,15 +1,22 @@
-from flask import jsonify, request, current_app, url_for
+from flask import jsonify, request, current_app
 from flask_restx import Resource, fields
 from flask_login import login_required, current_user
 from app.api import api
+from app.api.listing import list_doc, list_response
+from app.api.load_plans import register_load_plan, with_load_plan
 from app import db
-from app.models import User, Team, Species, Skill, TrainingPath, TrainingSession, Competency, SkillPracticeEvent, TrainingRequest, ExternalTraining, Complexity, TrainingRequestStatus, ExternalTrainingStatus, TrainingSessionTutorSkill, UserContinuousTraining, UserContinuousTrainingStatus, ContinuousTrainingEvent, ContinuousTrainingEventStatus, UserDismissedNotification
+from app.models import User, Team, Species, Skill, TrainingPath, TrainingPathSkill, TrainingSession, Competency, SkillPracticeEvent, TrainingRequest, ExternalTraining, Complexity, TrainingRequestStatus, ExternalTrainingStatus, TrainingSessionTutorSkill, UserDismissedNotification
 from sqlalchemy import func
+from sqlalchemy.orm import with_parent
 from werkzeug.security import generate_password_hash
 from functools import wraps # Import wraps
 import secrets # Import secrets
+import json
 from datetime import datetime, timedelta, timezone # Import datetime
 from app.decorators import permission_required # Import permission_required
+from app.notifications import get_notification_summary
+from app.competency_check import check_competencies
+from app.imports import ImportRowResult, import_practice_records, summarize
 
 # API Models for marshalling
 
@@ -115,6 +122,18 @@ external_training_model = api.model('ExternalTraining', {
     'skills_claimed_ids': fields.List(fields.Integer, description='List of claimed skill IDs', attribute=lambda x: [s.skill_id for s in x.skill_claims]),
 })
 
+# Relationships read by each API model, eager-loaded before marshalling
+register_load_plan(skill_model, species_ids=Skill.species, tutor_ids=Skill.tutors)
+register_load_plan(team_model, members=Team.members, team_leads=Team.team_leads)
+register_load_plan(user_model, teams=User.teams, teams_as_lead=User.teams_as_lead)
+register_load_plan(training_path_model,
+                   skill_ids=(TrainingPath.skills_association, TrainingPathSkill.skill),
+                   assigned_user_ids=TrainingPath.assigned_users)
+register_load_plan(training_session_model, attendee_ids=TrainingSession.attendees,
+                   skills_covered_ids=TrainingSession.skills_covered)
+register_load_plan(training_request_model, skills_requested_ids=TrainingRequest.skills_requested)
+register_load_plan(external_training_model, skills_claimed_ids=ExternalTraining.skill_claims)
+
 skill_ids_payload = api.model('SkillIdsPayload', {
     'skill_ids': fields.List(fields.Integer, required=True, description='List of skill IDs')
 })
@@ -134,16 +153,27 @@ declare_practice_payload = api.model('DeclarePracticePayload', {
 # Public API models
 check_competency_payload = api.model('CheckCompetencyPayload', {
     'emails': fields.List(fields.String, required=True, description='List of user emails'),
-    'skill_ids': fields.List(fields.Integer, required=True, description='List of skill IDs')
+    'skill_ids': fields.List(fields.Integer, required=True, description='List of skill IDs'),
+    'as_of': fields.String(description='Date (YYYY-MM-DD) the competencies must be valid on, '
+                                       'today by default')
 })
 
 declare_practice_public_payload = api.model('DeclarePracticePublicPayload', {
     'email': fields.String(required=True, description='User email'),
     'skill_ids': fields.List(fields.Integer, required=True, description='List of skill IDs'),
     'date': fields.String(required=True, description='Practice date in YYYY-MM-DD'),
-    'source': fields.String(required=True, description='Source of the practice')
+    'source': fields.String(required=True, description='Source of the practice'),
+    'idempotency_key': fields.String(description='Client key identifying the practice; retries '
+                                                 'with the same key are ignored')
+})
+
+declare_practice_batch_payload = api.model('DeclarePracticeBatchPayload', {
+    'records': fields.List(fields.Nested(declare_practice_public_payload), required=True,
+                           description='Practice records')
 })
 
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
 
 # API Key Authentication
 def token_required(f):
@@ -155,12 +185,7 @@ def token_required(f):
             current_app.logger.warning(f"API Key missing for API access from IP: {request.remote_addr}.")
             api.abort(401, "API Key is missing")
 
-        users_with_keys = User.query.filter(User.api_key.isnot(None)).all()
-        found_user = None
-        for user in users_with_keys:
-            if secrets.compare_digest(user.api_key, api_key):
-                found_user = user
-                break
+        found_user = User.find_by_api_key(api_key)
 
         if not found_user:
             current_app.logger.warning(f"Invalid API Key provided from IP: {request.remote_addr}. No active user found for key: {api_key[:5]}...")
@@ -197,21 +222,20 @@ ns_users = api.namespace('users', description='User operations')
 
 @ns_users.route('/search')
 class UserSearch(Resource):
-    @api.marshal_list_with(user_model)
+    @list_doc(user_model)
     @api.doc(security='apikey')
     @token_required
     @permission_required('user_manage') # Assuming user_manage for searching all users
     def get(self):
         """Search for users by full name or email"""
         query = request.args.get('q', '')
+        users = User.query
         if query:
-            users = User.query.filter(
+            users = users.filter(
                 (User.full_name.ilike(f'%{query}%')) | 
                 (User.email.ilike(f'%{query}%'))
-            ).all()
-        else:
-            users = User.query.all() # Return all users if no query
-        return users
+            )
+        return list_response(users, user_model)
 ns_teams = api.namespace('teams', description='Team operations')
 ns_species = api.namespace('species', description='Species operations')
 ns_skills = api.namespace('skills', description='Skill operations')
@@ -236,13 +260,13 @@ class TestResource(Resource):
 # User Endpoints
 @ns_users.route('/')
 class UserList(Resource):
-    @api.marshal_list_with(user_model)
+    @list_doc(user_model)
     @api.doc(security='apikey')
     @token_required
     @permission_required('user_manage')
     def get(self):
         """List all users"""
-        return User.query.all()
+        return list_response(User.query, user_model)
 
     @api.expect(user_model)
     @api.marshal_with(user_model, code=201)
@@ -321,11 +345,9 @@ class UserAvailableSkills(Resource):
         from flask import g
         user = g.current_user
 
-        available_skills = []
-        for competency in user.competencies:
-            if not competency.needs_recycling:
-                available_skills.append(competency.skill)
-        return available_skills
+        return with_load_plan(Skill.query.join(Competency, Competency.skill_id == Skill.id).filter(
+            Competency.user_id == user.id, ~Competency.needs_recycling
+        ).distinct(), skill_model).all()
 
 @ns_users.route('/declare_practice')
 class UserDeclarePractice(Resource):
@@ -362,13 +384,13 @@ class UserDeclarePractice(Resource):
 # Team Endpoints
 @ns_teams.route('/')
 class TeamList(Resource):
-    @api.marshal_list_with(team_model)
+    @list_doc(team_model)
     @api.doc(security='apikey')
     @token_required
     @permission_required('team_manage') # Assuming team_manage for listing all teams
     def get(self):
         """List all teams"""
-        return Team.query.all()
+        return list_response(Team.query, team_model)
 
     @api.expect(team_model)
     @api.marshal_with(team_model, code=201)
@@ -426,13 +448,13 @@ class TeamResource(Resource):
 # Species Endpoints
 @ns_species.route('/')
 class SpeciesList(Resource):
-    @api.marshal_list_with(species_model)
+    @list_doc(species_model)
     @api.doc(security='apikey')
     @token_required
     @permission_required('species_manage')
     def get(self):
         """List all species"""
-        return Species.query.all()
+        return list_response(Species.query, species_model)
 
     @api.expect(species_model)
     @api.marshal_with(species_model, code=201)
@@ -457,7 +479,7 @@ class SpeciesSkills(Resource):
     def get(self, id):
         """Retrieve skills for a species by ID"""
         species = Species.query.get_or_404(id)
-        return species.skills
+        return with_load_plan(Skill.query.filter(with_parent(species, Species.skills)), skill_model).all()
 
 @ns_species.route('/<int:id>/filtered_skills')
 @api.response(404, 'Species not found')
@@ -470,7 +492,7 @@ class SpeciesFilteredSkills(Resource):
     def get(self, id):
         """Retrieve skills for a species by ID"""
         species = Species.query.get_or_404(id)
-        return species.skills
+        return with_load_plan(Skill.query.filter(with_parent(species, Species.skills)), skill_model).all()
 
 @ns_species.route('/<int:id>')
 @api.response(404, 'Species not found')
@@ -511,13 +533,13 @@ class SpeciesResource(Resource):
 # Training Path Endpoints
 @ns_training_paths.route('/')
 class TrainingPathList(Resource):
-    @api.marshal_list_with(training_path_model)
+    @list_doc(training_path_model)
     @api.doc(security='apikey')
     @token_required
     @permission_required('training_path_manage')
     def get(self):
         """List all training paths"""
-        return TrainingPath.query.all()
+        return list_response(TrainingPath.query, training_path_model)
 
     @api.expect(training_path_model)
     @api.marshal_with(training_path_model, code=201)
@@ -597,13 +619,13 @@ class TrainingSessionTutorSkillMapping(Resource):
 
 @ns_training_sessions.route('/')
 class TrainingSessionList(Resource):
-    @api.marshal_list_with(training_session_model)
+    @list_doc(training_session_model)
     @api.doc(security='apikey')
     @token_required
     @permission_required('training_session_manage')
     def get(self):
         """List all training sessions"""
-        return TrainingSession.query.all()
+        return list_response(TrainingSession.query, training_session_model)
 
     @api.expect(training_session_model)
     @api.marshal_with(training_session_model, code=201)
@@ -686,13 +708,13 @@ class TrainingSessionResource(Resource):
 # Competency Endpoints
 @ns_competencies.route('/')
 class CompetencyList(Resource):
-    @api.marshal_list_with(competency_model)
+    @list_doc(competency_model)
     @api.doc(security='apikey')
     @token_required
     @permission_required('competency_manage') # Assuming competency_manage for listing all competencies
     def get(self):
         """List all competencies"""
-        return Competency.query.all()
+        return list_response(Competency.query, competency_model)
 
     @api.expect(competency_model)
     @api.marshal_with(competency_model, code=201)
@@ -771,13 +793,13 @@ class CompetencyResource(Resource):
 # Skill Practice Event Endpoints
 @ns_skill_practice_events.route('/')
 class SkillPracticeEventList(Resource):
-    @api.marshal_list_with(skill_practice_event_model)
+    @list_doc(skill_practice_event_model)
     @api.doc(security='apikey')
     @token_required
     @permission_required('skill_practice_manage') # Assuming skill_practice_manage for listing all events
     def get(self):
         """List all skill practice events"""
-        return SkillPracticeEvent.query.all()
+        return list_response(SkillPracticeEvent.query, skill_practice_event_model)
 
     @api.expect(skill_practice_event_model)
     @api.marshal_with(skill_practice_event_model, code=201)
@@ -842,13 +864,13 @@ class SkillPracticeEventResource(Resource):
 # Training Request Endpoints
 @ns_training_requests.route('/')
 class TrainingRequestList(Resource):
-    @api.marshal_list_with(training_request_model)
+    @list_doc(training_request_model)
     @api.doc(security='apikey')
     @token_required
     @permission_required('training_request_manage')
     def get(self):
         """List all training requests"""
-        return TrainingRequest.query.all()
+        return list_response(TrainingRequest.query, training_request_model)
 
     @api.expect(training_request_model)
     @api.marshal_with(training_request_model, code=201)
@@ -915,13 +937,13 @@ class TrainingRequestResource(Resource):
 # External Training Endpoints
 @ns_external_trainings.route('/')
 class ExternalTrainingList(Resource):
-    @api.marshal_list_with(external_training_model)
+    @list_doc(external_training_model)
     @api.doc(security='apikey')
     @token_required
     @permission_required('external_training_validate') # Assuming external_training_validate for listing all external trainings
     def get(self):
         """List all external trainings"""
-        return ExternalTraining.query.all()
+        return list_response(ExternalTraining.query, external_training_model)
 
     @api.expect(external_training_model)
     @api.marshal_with(external_training_model, code=201)
@@ -996,13 +1018,13 @@ class ExternalTrainingResource(Resource):
 # Skill Endpoints
 @ns_skills.route('/')
 class SkillListResource(Resource):
-    @api.marshal_list_with(skill_model)
+    @list_doc(skill_model)
     @api.doc(security='apikey')
     @token_required
     @permission_required('skill_manage')
     def get(self):
         """List all skills"""
-        return Skill.query.all()
+        return list_response(Skill.query, skill_model)
 
     @api.expect(skill_model)
     @api.marshal_with(skill_model, code=201)
@@ -1259,10 +1281,12 @@ class TutorSkills(Resource):
         from flask import g
         if g.current_user.id == id:
             tutor = User.query.get_or_404(id)
-            return tutor.tutored_skills
+            return with_load_plan(Skill.query.filter(with_parent(tutor, User.tutored_skills)),
+                                  skill_model).all()
         # Otherwise, require permission
         tutor = User.query.get_or_404(id)
-        return tutor.tutored_skills
+        return with_load_plan(Skill.query.filter(with_parent(tutor, User.tutored_skills)),
+                              skill_model).all()
 
 @ns_tutors.route('/<int:id>/check_validity')
 @api.response(404, 'Tutor not found')
@@ -1302,166 +1326,10 @@ class NotificationSummary(Resource):
     @api.doc(security='apikey', description='Retrieve a summary of pending actions for the authenticated user.')
     @token_required
     def get(self):
-            from flask import g
-            notifications = []
-            total_count = 0
-
-            # Get dismissed notifications for the current user
-            dismissed_notifications = {d.notification_type for d in g.current_user.dismissed_notifications}
-
-            current_app.logger.debug(f"NotificationSummary for user {g.current_user.id}: is_admin={g.current_user.is_admin}, roles={[r.name for r in g.current_user.roles]}, can_user_manage={g.current_user.can('user_manage')}, dismissed_notifications={dismissed_notifications}")
-            # Admin-focused notifications
-            if g.current_user.can('user_manage') and 'user_approvals' not in dismissed_notifications:
-                pending_user_approvals_count = User.query.filter_by(is_approved=False).count()
-                if pending_user_approvals_count > 0:
-                    notifications.append({
-                        'type': 'user_approvals',
-                        'title': 'New User Approvals',
-                        'count': pending_user_approvals_count,
-                        'url': url_for('admin.pending_users')
-                    })
-                    total_count += pending_user_approvals_count
-
-            if g.current_user.can('training_request_manage') and 'training_requests' not in dismissed_notifications:
-                pending_requests_count = TrainingRequest.query.filter_by(status=TrainingRequestStatus.PENDING).count()
-                if pending_requests_count > 0:
-                    notifications.append({
-                        'type': 'training_requests',
-                        'title': 'Pending Training Requests',
-                        'count': pending_requests_count,
-                        'url': url_for('admin.list_training_requests')
-                    })
-                    total_count += pending_requests_count
-
-            if g.current_user.can('external_training_validate') and 'external_trainings' not in dismissed_notifications:
-                pending_external_trainings_count = ExternalTraining.query.filter_by(status=ExternalTrainingStatus.PENDING).count()
-                if pending_external_trainings_count > 0:
-                    notifications.append({
-                        'type': 'external_trainings',
-                        'title': 'Pending External Training Validations',
-                        'count': pending_external_trainings_count,
-                        'url': url_for('admin.validate_external_trainings')
-                    })
-                    total_count += pending_external_trainings_count
-
-            if g.current_user.can('continuous_training_validate') and 'continuous_training_validations' not in dismissed_notifications:
-                pending_continuous_training_validations_count = UserContinuousTraining.query.filter_by(status=UserContinuousTrainingStatus.PENDING).count()
-                if pending_continuous_training_validations_count > 0:
-                    notifications.append({
-                        'type': 'continuous_training_validations',
-                        'title': 'Pending Continuous Training Validations',
-                        'count': pending_continuous_training_validations_count,
-                        'url': url_for('admin.validate_continuous_trainings')
-                    })
-                    total_count += pending_continuous_training_validations_count
-    
-            if g.current_user.can('continuous_training_manage') and 'continuous_event_requests' not in dismissed_notifications:
-                pending_continuous_event_requests_count = ContinuousTrainingEvent.query.filter_by(status=ContinuousTrainingEventStatus.PENDING).count()
-                if pending_continuous_event_requests_count > 0:
-                    notifications.append({
-                        'type': 'continuous_event_requests',
-                        'title': 'Pending Continuous Event Requests',
-                        'count': pending_continuous_event_requests_count,
-                        'url': url_for('admin.manage_continuous_training_events', status='PENDING')
-                    })
-                    total_count += pending_continuous_event_requests_count
-    
-            if g.current_user.can('skill_manage') and 'proposed_skills' not in dismissed_notifications:
-                proposed_skills_count = TrainingRequest.query.filter_by(status=TrainingRequestStatus.PROPOSED_SKILL).count()
-                if proposed_skills_count > 0:
-                    notifications.append({
-                        'type': 'proposed_skills',
-                        'title': 'Proposed Skills',
-                        'count': proposed_skills_count,
-                        'url': url_for('admin.proposed_skills')
-                    })
-                    total_count += proposed_skills_count
-    
-            if g.current_user.can('skill_manage') and 'skills_without_tutors' not in dismissed_notifications:
-                skills_without_tutors_count = Skill.query.filter(~Skill.tutors.any()).count()
-                if skills_without_tutors_count > 0:
-                    notifications.append({
-                        'type': 'skills_without_tutors',
-                        'title': 'Skills Without Tutors',
-                        'count': skills_without_tutors_count,
-                        'url': url_for('admin.tutor_less_skills_report')
-                    })
-                    total_count += skills_without_tutors_count
-    
-            if g.current_user.can('training_session_manage') and 'sessions_to_finalize' not in dismissed_notifications:
-                sessions_to_be_finalized_count = TrainingSession.query.filter(
-                    TrainingSession.start_time < datetime.now(timezone.utc),
-                    TrainingSession.status != 'Realized'
-                ).count()
-                if sessions_to_be_finalized_count > 0:
-                    notifications.append({
-                        'type': 'sessions_to_finalize',
-                        'title': 'Sessions to Finalize',
-                        'count': sessions_to_be_finalized_count,
-                        'url': url_for('admin.manage_training_sessions', filter='to_be_finalized')
-                    })
-                    total_count += sessions_to_be_finalized_count
-    
-            # User-focused notifications
-            if g.current_user.is_authenticated:
-                # Skills needing recycling
-                if 'skills_needing_recycling' not in dismissed_notifications:
-                    skills_needing_recycling_count = 0
-                    for comp in g.current_user.competencies:
-                        if comp.needs_recycling:
-                            skills_needing_recycling_count += 1
-                
-                    if skills_needing_recycling_count > 0:
-                        url = url_for('dashboard.dashboard_home')
-                        if g.current_user.can('view_reports'):
-                            url = url_for('admin.recycling_report')
-                        
-                        notifications.append({
-                            'type': 'skills_needing_recycling',
-                            'title': 'Skills Needing Recycling',
-                            'count': skills_needing_recycling_count,
-                            'url': url
-                        })
-                        total_count += skills_needing_recycling_count
-                
-                # Upcoming training sessions
-                if 'upcoming_sessions' not in dismissed_notifications:
-                    now = datetime.now(timezone.utc)
-                    upcoming_training_sessions_count = TrainingSession.query.join(TrainingSession.attendees).filter(User.id == g.current_user.id, TrainingSession.start_time > now).count()
-                    if upcoming_training_sessions_count > 0:
-                        notifications.append({
-                            'type': 'upcoming_sessions',
-                            'title': 'Upcoming Training Sessions',
-                            'count': upcoming_training_sessions_count,
-                            'url': url_for('dashboard.dashboard_home') # Or a dedicated page for upcoming sessions
-                        })
-                        total_count += upcoming_training_sessions_count
-                
-                # Pending training requests by user
-                if 'user_pending_training_requests' not in dismissed_notifications:
-                    user_pending_training_requests_count = TrainingRequest.query.filter_by(requester_id=g.current_user.id, status=TrainingRequestStatus.PENDING).count()
-                    if user_pending_training_requests_count > 0:
-                        notifications.append({
-                            'type': 'user_pending_training_requests',
-                            'title': 'Your Pending Training Requests',
-                            'count': user_pending_training_requests_count,
-                            'url': url_for('dashboard.dashboard_home') # Or a dedicated page for user's requests
-                        })
-                        total_count += user_pending_training_requests_count
-                
-                # Pending external trainings by user
-                if 'user_pending_external_trainings' not in dismissed_notifications:
-                    user_pending_external_trainings_count = g.current_user.external_trainings.filter_by(status=ExternalTrainingStatus.PENDING).count()
-                    if user_pending_external_trainings_count > 0:
-                        notifications.append({
-                            'type': 'user_pending_external_trainings',
-                            'title': 'Your Pending External Trainings',
-                            'count': user_pending_external_trainings_count,
-                            'url': url_for('dashboard.dashboard_home') # Or a dedicated page for user's external trainings
-                        })
-                        total_count += user_pending_external_trainings_count
-    
-            return jsonify({'total_count': total_count, 'notifications': notifications})
+        """Retrieve a summary of pending actions for the authenticated user"""
+        from flask import g
+        return jsonify(get_notification_summary(g.current_user))
+
 @api.route('/notifications/dismiss')
 class NotificationDismiss(Resource):
     @api.doc(security='apikey', description='Dismiss a notification for the authenticated user.')
@@ -1502,11 +1370,11 @@ class NotificationDismiss(Resource):
 # Public Endpoints for Inter-App Communication
 @ns_public.route('/skills')
 class PublicSkills(Resource):
-    @api.marshal_list_with(skill_model)
+    @list_doc(skill_model)
     @service_token_required
     def get(self):
         """List all skills for inter-app communication"""
-        return Skill.query.all()
+        return list_response(Skill.query, skill_model)
 
 @ns_public.route('/check_competency')
 class PublicCheckCompetency(Resource):
@@ -1515,60 +1383,70 @@ class PublicCheckCompetency(Resource):
     def post(self):
         """Check competency for users and skills"""
         data = api.payload
-        emails = data['emails']
-        skill_ids = data['skill_ids']
-
-        result = {}
-        for email in emails:
-            user = User.query.filter_by(email=email).first()
-            if not user:
-                result[email] = {'valid': False, 'details': ['User not found']}
-                continue
-
-            valid = True
-            details = []
-            for skill_id in skill_ids:
-                competency = Competency.query.filter_by(user_id=user.id, skill_id=skill_id).first()
-                if not competency or competency.needs_recycling:
-                    valid = False
-                    skill = Skill.query.get(skill_id)
-                    details.append(f'Not competent in {skill.name if skill else "Unknown skill"}')
-
-            result[email] = {'valid': valid, 'details': details}
-
-        return result
+        as_of = None
+        if data.get('as_of'):
+            try:
+                as_of = datetime.combine(datetime.strptime(data['as_of'], '%Y-%m-%d').date(),
+                                         datetime.max.time(), tzinfo=timezone.utc)
+            except ValueError:
+                api.abort(400, "Invalid as_of date, expected YYYY-MM-DD")
+        return check_competencies(data['emails'], data['skill_ids'], as_of=as_of)
 
 @ns_public.route('/declare_practice')
 class PublicDeclarePractice(Resource):
     @api.expect(declare_practice_public_payload)
+    @api.doc(description='Returns 201 when the practice is recorded and 200 with status '
+                         '"unchanged" when it was already ingested (same idempotency key).')
     @service_token_required
     def post(self):
         """Declare practice for a user"""
         data = api.payload
-        email = data['email']
-        skill_ids = data['skill_ids']
-        date = datetime.strptime(data['date'], '%Y-%m-%d').date()
-        source = data['source']
-
-        user = User.query.filter_by(email=email).first()
-        if not user:
-            api.abort(404, "User not found")
-
-        practice_date = datetime.combine(date, datetime.min.time(), tzinfo=timezone.utc)
-
-        for skill_id in skill_ids:
-            skill = Skill.query.get(skill_id)
-            if skill:
-                practice_event = SkillPracticeEvent(
-                    user=user,
-                    practice_date=practice_date,
-                    notes=f'Practice declared from {source}'
-                )
-                practice_event.skills.append(skill)
-                db.session.add(practice_event)
-
-        db.session.commit()
-        return {'message': 'Practice declared successfully'}, 201
+        result = import_practice_records([{
+            'email': data['email'], 'skill_ids': data['skill_ids'], 'date': data['date'],
+            'source': data['source'], 'idempotency_key': data.get('idempotency_key')
+        }])[0]
+        if result.status == ImportRowResult.ERROR:
+            if result.reason == ImportRowResult.USER_NOT_FOUND:
+                api.abort(404, "User not found")
+            api.abort(400, result.message)
+        if result.status == ImportRowResult.UNCHANGED:
+            return {'message': 'Practice already declared', 'status': result.status}, 200
+        return {'message': 'Practice declared successfully', 'status': result.status}, 201
+
+@ns_public.route('/declare_practice/batch')
+class PublicDeclarePracticeBatch(Resource):
+    @api.expect(declare_practice_batch_payload)
+    @api.doc(description='Declare many practices at once, as a JSON list, a {"records": [...]} '
+                         'object or NDJSON (application/x-ndjson). Records already ingested '
+                         '(same idempotency key) are reported as unchanged.')
+    @service_token_required
+    def post(self):
+        """Declare practices for many users in one request"""
+        if request.mimetype in NDJSON_MIMETYPES:
+            records = []
+            for line_number, line in enumerate(request.get_data(as_text=True).splitlines(), 1):
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    api.abort(400, f"Invalid JSON on line {line_number}")
+        else:
+            data = request.get_json(silent=True)
+            records = data.get('records') if isinstance(data, dict) else data
+            if not isinstance(records, list):
+                api.abort(400, "Expected a list of records")
+
+        max_records = current_app.config.get('PRACTICE_BATCH_MAX_RECORDS')
+        if max_records and len(records) > max_records:
+            api.abort(413, f"At most {max_records} records per request")
+
+        results = import_practice_records(records)
+        return {
+            'summary': summarize(results),
+            'results': [{'record': result.row_number, 'status': result.status,
+                         'message': result.message} for result in results]
+        }, 200
 
 @ns_public.route('/user_calendar')
 class PublicUserCalendar(Resource):
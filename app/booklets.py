@@ -0,0 +1,796 @@
+"""
+Skills booklet and certificate rendering, with a background job queue and a
+content-addressed artifact cache.
+
+A user's training records are collected into a plain snapshot with a handful
+of eager-loaded queries. The snapshot drives the PDF rendering, which issues
+no further queries, and its SHA-256 digest keys the finished ZIP on disk:
+repeat downloads are served from the cache until one of the records changes.
+Jobs are stored in the ``BookletJob`` table and run by a small thread pool in
+the process that queued them.
+"""
+import functools
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+from flask import current_app
+from flask_babel import force_locale, get_locale, lazy_gettext as _
+
+from app import db
+from app.models import (
+    BookletJob, BookletJobStatus, Competency, ContinuousTrainingEvent, ExternalTraining,
+    ExternalTrainingStatus, Skill, User, UserContinuousTraining, UserContinuousTrainingStatus,
+    _as_utc, competency_species_association, skill_species_association, user_team_membership
+)
+from app.pdf import FPDF, fpdf_class
+
+# Bump when the booklet layout changes, to invalidate every cached archive
+BOOKLET_FORMAT_VERSION = 1
+# Bump when the certificate layout changes, to invalidate every stored certificate
+CERTIFICATE_FORMAT_VERSION = 1
+# Cached archives not rewritten for this long (in seconds) are deleted
+BOOKLET_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+# Users prefetched (and rendered) together by bulk exports
+BOOKLET_EXPORT_BATCH_SIZE = 50
+
+# Translated once per snapshot so rendering needs no request or locale
+BOOKLET_LABELS = {
+    'footer': _('Skills Booklet of %(user_name)s - %(generation_date)s'),
+    'SKILLS BOOKLET': _('SKILLS BOOKLET'),
+    'User Information': _('User Information'),
+    'Full Name': _('Full Name'),
+    'Initial Training: Diplomas': _('Initial Training: Diplomas'),
+    'Diploma': _('Diploma'),
+    'Establishment': _('Establishment'),
+    'Country': _('Country'),
+    'Date of Success': _('Date of Success'),
+    'Level of Study': _('Level of Study'),
+    'Remarks': _('Remarks'),
+    'Specific training in animal experimentation': _('Specific training in animal experimentation'),
+    'Level': _('Level'),
+    'Module': _('Module'),
+    'Species': _('Species'),
+    'Approval No.': _('Approval No.'),
+    'Trainer': _('Trainer'),
+    'Date': _('Date'),
+    'days': _('days'),
+    'Continuous Training': _('Continuous Training'),
+    'Training Name': _('Training Name'),
+    'Thematic': _('Thematic'),
+    'Type': _('Type'),
+    'Location': _('Location'),
+    'Duration (d)': _('Duration (d)'),
+    'Technical Skills': _('Technical Skills'),
+    'Skill Type': _('Skill Type'),
+    'Skill': _('Skill'),
+    'Status': _('Status'),
+    'Training Type': _('Training Type'),
+    'Tutor': _('Tutor'),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+@functools.cache
+def _pdf_class():
+    """
+    Returns the booklet document class, built when fpdf is first loaded.
+    """
+    class PDF(fpdf_class()):
+        """
+        Booklet document with a "name - date - page" footer.
+        """
+        def __init__(self, orientation='P', unit='mm', format='A4', user_name='',  # pylint: disable=redefined-builtin
+                     footer_template='%(user_name)s - %(generation_date)s'):
+            super().__init__(orientation, unit, format)
+            self.user_name = user_name
+            self.footer_template = footer_template
+
+        def footer(self):
+            self.set_y(-15)
+            self.set_font('Helvetica', 'I', 8)
+            generation_date = datetime.now(timezone.utc).strftime("%d/%m/%Y")
+            footer_text = self.footer_template % {'user_name': self.user_name,
+                                                  'generation_date': generation_date}
+            self.cell(0, 10, footer_text, 0, 0, 'L')
+            self.cell(0, 10, f'{self.page_no()}/{{nb}}', 0, 0, 'R')
+
+    return PDF
+
+
+def _attachment(path):
+    """
+    Describes an uploaded file by path, size and modification time, or returns
+    None when it is missing (so replacing a file changes the content hash).
+    """
+    if not path:
+        return None
+    full_path = os.path.join(current_app.root_path, 'static', path)
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        return None
+    return {'path': path, 'full_path': full_path, 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def _competency_data(comp):
+    return {
+        'id': comp.id,
+        'user_full_name': comp.user.full_name,
+        'skill_name': comp.skill.name,
+        'level': comp.level,
+        'evaluation_date': comp.evaluation_date,
+        'species': [s.name for s in comp.species],
+        'evaluator_name': comp.evaluator.full_name if comp.evaluator else None,
+        'external_evaluator_name': comp.external_evaluator_name,
+    }
+
+
+def collect_booklet_data_bulk(user_ids):
+    """
+    Returns ``{user_id: snapshot}`` of everything printed in the users' booklets.
+
+    Loads the users, their competencies (with skill, species and evaluator),
+    initial trainings, approved continuous trainings (with event) and approved
+    external trainings in a handful of eager-loaded queries, whatever the
+    number of users.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    users = User.query.options(
+        db.selectinload(User.competencies).options(
+            db.joinedload(Competency.skill), db.selectinload(Competency.species),
+            db.joinedload(Competency.evaluator)),
+        db.selectinload(User.initial_regulatory_trainings),
+    ).filter(User.id.in_(user_ids)).all()
+
+    continuous_by_user = {user_id: [] for user_id in user_ids}
+    for ct in UserContinuousTraining.query.join(ContinuousTrainingEvent).options(
+        db.contains_eager(UserContinuousTraining.event)
+    ).filter(
+        UserContinuousTraining.user_id.in_(user_ids),
+        UserContinuousTraining.status == UserContinuousTrainingStatus.APPROVED
+    ).order_by(ContinuousTrainingEvent.event_date.desc(), UserContinuousTraining.id):
+        continuous_by_user[ct.user_id].append(ct)
+    external_by_user = {user_id: [] for user_id in user_ids}
+    for et in ExternalTraining.query.filter(
+        ExternalTraining.user_id.in_(user_ids),
+        ExternalTraining.status == ExternalTrainingStatus.APPROVED
+    ).order_by(ExternalTraining.id):
+        external_by_user[et.user_id].append(et)
+
+    labels = {key: str(label) for key, label in BOOKLET_LABELS.items()}
+    snapshots = {}
+    for user in users:
+        snapshots[user.id] = {
+            'labels': labels,
+            'user': {'id': user.id, 'full_name': user.full_name, 'study_level': user.study_level},
+            'initial_trainings': [{
+                'level': training.level.value if training.level else None,
+                'training_type': training.training_type,
+                'training_date': training.training_date,
+                'attachment': _attachment(training.attachment_path),
+            } for training in sorted(user.initial_regulatory_trainings, key=lambda t: t.id)],
+            'continuous_trainings': [{
+                'title': ct.event.title,
+                'training_type': ct.event.training_type.value,
+                'location': ct.event.location,
+                'event_date': ct.event.event_date,
+                'validated_hours': ct.validated_hours,
+                'attachment': _attachment(ct.attendance_attachment_path),
+                'event_attachment': _attachment(ct.event.attachment_path),
+            } for ct in continuous_by_user[user.id]],
+            'external_trainings': [{'attachment': _attachment(et.attachment_path)}
+                                   for et in external_by_user[user.id]],
+            'competencies': [_competency_data(comp)
+                             for comp in sorted(user.competencies, key=lambda c: c.id)],
+        }
+    return snapshots
+
+
+def collect_booklet_data(user_id):
+    """
+    Returns the plain-data snapshot of everything printed in a user's booklet,
+    or None if the user does not exist.
+    """
+    return collect_booklet_data_bulk([user_id]).get(user_id)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return _as_utc(value).isoformat()
+    return str(value)
+
+
+def booklet_content_hash(data):
+    """
+    Returns the SHA-256 digest identifying a booklet snapshot.
+    """
+    payload = json.dumps({'version': BOOKLET_FORMAT_VERSION, 'data': data}, sort_keys=True,
+                         default=_json_default)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def certificate_content_hash(comp):
+    """
+    Returns the SHA-256 digest identifying the content of a certificate snapshot.
+    """
+    content = {key: value for key, value in comp.items() if key != 'id'}
+    payload = json.dumps({'version': CERTIFICATE_FORMAT_VERSION, 'data': content},
+                         sort_keys=True, default=_json_default)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def render_booklet_pdf(data):
+    """
+    Renders the booklet PDF of a snapshot and returns its bytes.
+    """
+    labels = data['labels']
+    user = data['user']
+
+    pdf = _pdf_class()(user_name=user['full_name'], footer_template=labels['footer'])
+    pdf.alias_nb_pages()
+    pdf.add_page()
+    pdf.set_font('Helvetica', 'B', 16)
+
+    # --- Header ---
+    pdf.cell(0, 10, labels['SKILLS BOOKLET'], 0, 1, 'C')
+    pdf.ln(10)
+
+    # --- User Info ---
+    pdf.set_font('Helvetica', 'B', 12)
+    pdf.cell(0, 10, labels['User Information'], 0, 1, 'L')
+    pdf.set_font('Helvetica', '', 10)
+
+    # Basic user info table
+    with pdf.table(col_widths=(40, 150)) as table:
+        row = table.row()
+        row.cell(labels["Full Name"])
+        row.cell(user['full_name'])
+    pdf.ln(10)
+
+    # --- Initial Training: Diplomas ---
+    pdf.set_font('Helvetica', 'B', 12)
+    pdf.cell(0, 10, labels['Initial Training: Diplomas'], 0, 1, 'L')
+    pdf.set_font('Helvetica', '', 12)
+    with pdf.table(col_widths=(40, 40, 30, 30, 30, 20)) as table:
+        headings = table.row()
+        for heading in ("Diploma", "Establishment", "Country", "Date of Success",
+                        "Level of Study", "Remarks"):
+            headings.cell(labels[heading])
+
+        row = table.row()
+        row.cell(user['study_level'] or "N/A")
+        row.cell("N/A")
+        row.cell("N/A")
+        row.cell("N/A")
+        row.cell("N/A")
+        row.cell("")
+
+    pdf.ln(10)
+
+    # --- Specific training in animal experimentation ---
+    pdf.set_font('Helvetica', 'B', 12)
+    pdf.cell(0, 10, labels["Specific training in animal experimentation"], 0, 1, 'L')
+    pdf.set_font('Helvetica', '', 12)
+    with pdf.table(col_widths=(35, 40, 20, 25, 30, 20, 20, 15)) as table:
+        headings = table.row()
+        for heading in ("Level", "Module", "Species", "Approval No.", "Establishment", "Trainer",
+                        "Date", "days"):
+            headings.cell(labels[heading])
+
+        for training in data['initial_trainings']:
+            row = table.row()
+            row.cell(training['level'] or "N/A")
+            row.cell(training['training_type'])
+            row.cell("N/A")
+            row.cell("N/A")
+            row.cell("N/A")
+            row.cell("N/A")
+            row.cell(training['training_date'].strftime("%d/%m/%Y")
+                     if training['training_date'] else "N/A")
+            row.cell("N/A")
+    pdf.ln(10)
+
+    # --- Continuous Training ---
+    pdf.set_font('Helvetica', 'B', 12)
+    pdf.cell(0, 10, labels['Continuous Training'], 0, 1, 'L')
+    pdf.set_font('Helvetica', '', 12)
+    with pdf.table(col_widths=(50, 40, 30, 30, 20, 20)) as table:
+        headings = table.row()
+        for heading in ("Training Name", "Thematic", "Type", "Location", "Date", "Duration (d)"):
+            headings.cell(labels[heading])
+        for ct in data['continuous_trainings']:
+            row = table.row()
+            row.cell(ct['title'])
+            row.cell("N/A")
+            row.cell(ct['training_type'])
+            row.cell(ct['location'] or "N/A")
+            row.cell(ct['event_date'].strftime("%d/%m/%Y"))
+            # Assuming 7h/day
+            row.cell(str(round(ct['validated_hours'] / 7, 2)) if ct['validated_hours'] else "N/A")
+    pdf.ln(10)
+
+    # --- Technical Skills ---
+    pdf.set_font('Helvetica', 'B', 12)
+    pdf.cell(0, 10, labels['Technical Skills'], 0, 1, 'L')
+    pdf.set_font('Helvetica', '', 12)
+    with pdf.table(col_widths=(40, 50, 20, 25, 25, 30, 20)) as table:
+        headings = table.row()
+        for heading in ("Skill Type", "Skill", "Status", "Date", "Species", "Training Type",
+                        "Tutor"):
+            headings.cell(labels[heading])
+
+        for comp in data['competencies']:
+            row = table.row()
+            row.cell("N/A")
+            row.cell(comp['skill_name'])
+            row.cell(comp['level'] or "N/A")
+            row.cell(comp['evaluation_date'].strftime("%d/%m/%Y"))
+            row.cell(", ".join(comp['species']) if comp['species'] else "N/A")
+            row.cell("N/A")
+            row.cell(comp['evaluator_name'] or comp['external_evaluator_name'] or "N/A")
+
+    return bytes(pdf.output())
+
+
+def certificate_data(competency):
+    """
+    Returns the plain-data snapshot of a competency certificate.
+    """
+    return _competency_data(competency)
+
+
+def render_certificate_pdf(comp):
+    """
+    Renders a competency certificate from its snapshot and returns its bytes.
+    """
+    pdf = FPDF(orientation='L', unit='mm', format='A4') # Landscape A4
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=False, margin=0)
+
+    # Colors
+    blue = (0, 123, 255)
+    dark_gray = (52, 58, 64)
+    green = (40, 167, 69)
+    yellow = (255, 193, 7)
+    light_gray = (108, 117, 125)
+
+    # Border
+    pdf.set_draw_color(*blue)
+    pdf.set_line_width(3)
+    pdf.rect(5, 5, 287, 200) # A4 landscape is 297x210 mm, inner border
+
+    # Certificate Header
+    pdf.set_font('Times', 'B', 36)
+    pdf.set_text_color(*blue)
+    pdf.ln(20) # Move down
+    pdf.cell(0, 15, 'CERTIFICATE OF COMPETENCY', 0, 1, 'C')
+
+    # Subheader
+    pdf.set_font('Times', '', 20)
+    pdf.set_text_color(*dark_gray)
+    pdf.ln(10)
+    pdf.cell(0, 10, 'This certifies that', 0, 1, 'C')
+
+    # Recipient Name
+    pdf.set_font('Times', 'B', 30)
+    pdf.set_text_color(*green)
+    pdf.ln(5)
+    pdf.cell(0, 15, comp['user_full_name'], 0, 1, 'C')
+
+    # Skill Introduction
+    pdf.set_font('Times', '', 18)
+    pdf.set_text_color(*dark_gray)
+    pdf.ln(10)
+    pdf.multi_cell(0, 10, 'has successfully demonstrated competency in the skill of', 0, 'C')
+
+    # Skill Name
+    pdf.set_font('Times', 'B', 26)
+    pdf.set_text_color(*yellow)
+    pdf.ln(5)
+    pdf.cell(0, 15, comp['skill_name'], 0, 1, 'C')
+
+    # Species (if any)
+    if comp['species']:
+        species_names = ", ".join(comp['species'])
+        pdf.set_font('Times', '', 14)
+        pdf.set_text_color(*light_gray)
+        pdf.ln(5)
+        pdf.multi_cell(0, 8, f'Associated Species: {species_names}', 0, 'C')
+
+    # Competency Level
+    pdf.set_font('Times', '', 18)
+    pdf.set_text_color(*dark_gray)
+    pdf.ln(5)
+    pdf.multi_cell(0, 10, f'at a {comp["level"]} level.', 0, 'C')
+
+    # Awarded Date and Evaluator
+    pdf.set_font('Times', '', 14)
+    pdf.set_text_color(*light_gray)
+    pdf.ln(5)
+    pdf.cell(0, 8, f'Awarded on: {comp["evaluation_date"].strftime("%B %d, %Y")}', 0, 1, 'C')
+    evaluator_name = comp['external_evaluator_name'] or comp['evaluator_name'] or "N/A"
+    pdf.cell(0, 8, f'Evaluated by: {evaluator_name}', 0, 1, 'C')
+
+    return bytes(pdf.output())
+
+
+def certificate_filename(comp):
+    """
+    Returns the download name of a competency certificate.
+    """
+    return (f"certificate_{comp['user_full_name'].replace(' ', '_')}_"
+            f"{comp['skill_name'].replace(' ', '_')}.pdf")
+
+
+def render_certificate_buffer(competency):
+    """
+    Returns a ``BytesIO`` holding the certificate PDF of ``competency``.
+    """
+    return io.BytesIO(render_certificate_pdf(certificate_data(competency)))
+
+
+def _stored_certificate(comp, certificate_folder):
+    """
+    Returns the bytes of the stored certificate of a snapshot, or None.
+    """
+    if certificate_folder is None:
+        return None
+    path = os.path.join(certificate_folder, f'{certificate_content_hash(comp)}.pdf')
+    try:
+        with open(path, 'rb') as certificate_file:
+            return certificate_file.read()
+    except OSError:
+        return None
+
+
+def render_booklet_files(data, certificate_folder=None):
+    """
+    Renders the PDFs of a snapshot: the booklet, then one certificate per competency.
+
+    Certificates already stored in ``certificate_folder`` are read rather than
+    rendered again. Returns ``(archive name, bytes or None, error or None)``
+    tuples. Uses no application state, so it can run in a worker process.
+    """
+    user_name = data['user']['full_name'].replace(' ', '_')
+    files = [(f"booklet_{user_name}.pdf", render_booklet_pdf(data), None)]
+    for comp in data['competencies']:
+        arcname = f"Skills_Certificates/{certificate_filename(comp)}"
+        try:
+            files.append((arcname, _stored_certificate(comp, certificate_folder)
+                          or render_certificate_pdf(comp), None))
+        except Exception as e:  # pylint: disable=broad-except
+            files.append((arcname, None, f"Error generating certificate for competency {comp['id']}: {e}"))
+    return files
+
+
+def _attachment_files(data):
+    """
+    Yields ``(path on disk, archive name)`` for the uploaded files of a snapshot.
+    """
+    for training in data['initial_trainings']:
+        if training['attachment']:
+            yield (training['attachment']['full_path'],
+                   f"Initial_Training/{training['training_type']}_"
+                   f"{os.path.basename(training['attachment']['path'])}")
+    for ct in data['continuous_trainings']:
+        if ct['attachment']:
+            yield (ct['attachment']['full_path'],
+                   f"Continuous_Training/{os.path.basename(ct['attachment']['path'])}")
+        if ct['event_attachment']: # Event-level attachment
+            yield (ct['event_attachment']['full_path'],
+                   f"Continuous_Training/Event_Attachments/"
+                   f"{os.path.basename(ct['event_attachment']['path'])}")
+    for ext_training in data['external_trainings']:
+        if ext_training['attachment']:
+            yield (ext_training['attachment']['full_path'],
+                   f"External_Training/{os.path.basename(ext_training['attachment']['path'])}")
+
+
+def _add_booklet(zf, data, files, prefix=''):
+    """
+    Adds a user's rendered PDFs and uploaded attachments to an open archive.
+    """
+    booklet, certificates = files[0], files[1:]
+    zf.writestr(prefix + booklet[0], booklet[1])
+    for path, arcname in _attachment_files(data):
+        zf.write(path, prefix + arcname)
+    for arcname, content, error in certificates:
+        if error:
+            current_app.logger.error(error)
+        else:
+            zf.writestr(prefix + arcname, content)
+
+
+def write_booklet_zip(data, fileobj):
+    """
+    Writes the booklet ZIP of a snapshot (booklet PDF, uploaded attachments and
+    one certificate per competency) to ``fileobj``.
+    """
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as zf:
+        _add_booklet(zf, data, render_booklet_files(data, certificate_folder()))
+
+
+def certificate_folder():
+    """
+    Returns the folder holding the stored certificates, named by content hash.
+    """
+    return current_app.config.get('CERTIFICATE_FOLDER') or \
+        os.path.join(current_app.instance_path, 'certificates')
+
+
+def _cache_folder():
+    return current_app.config.get('BOOKLET_CACHE_FOLDER') or \
+        os.path.join(current_app.instance_path, 'booklets')
+
+
+def artifact_path(content_hash):
+    """
+    Returns the path of the cached booklet ZIP for ``content_hash``.
+    """
+    return os.path.join(_cache_folder(), f'{content_hash}.zip')
+
+
+def build_booklet_artifact(data, content_hash=None):
+    """
+    Builds the booklet ZIP of a snapshot into the cache, unless already cached.
+
+    The archive is written to a temporary file and atomically moved into place,
+    so concurrent builds of the same content are harmless. Returns its path.
+    """
+    path = artifact_path(content_hash or booklet_content_hash(data))
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    cutoff = time.time() - BOOKLET_CACHE_MAX_AGE
+    for name in os.listdir(folder):
+        old_path = os.path.join(folder, name)
+        if name.endswith('.zip') and os.path.getmtime(old_path) < cutoff:
+            os.remove(old_path)
+
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            write_booklet_zip(data, tmp_file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+def _get_executor():
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get('BOOKLET_WORKERS') or 2,
+                thread_name_prefix='booklet')
+        return _executor
+
+
+def _run_in_app_context(app, job_id):
+    with app.app_context():
+        run_booklet_job(job_id)
+
+
+def enqueue_booklet_job(user, requested_by):
+    """
+    Returns a job building ``user``'s booklet, queueing one if needed.
+
+    The latest job for the same records is reused when it is unfinished or
+    its archive is still cached, rather than queueing a duplicate.
+    """
+    locale = get_locale()
+    data = collect_booklet_data(user.id)
+    content_hash = booklet_content_hash(data)
+
+    job = BookletJob.query.filter(
+        BookletJob.user_id == user.id, BookletJob.content_hash == content_hash,
+        BookletJob.status != BookletJobStatus.FAILED
+    ).order_by(BookletJob.created_at.desc()).first()
+    if job is not None:
+        status = refresh_job_status(job)
+        if status in (BookletJobStatus.PENDING, BookletJobStatus.RUNNING) or \
+                (status == BookletJobStatus.DONE and os.path.exists(artifact_path(content_hash))):
+            return job
+
+    job = BookletJob(id=uuid.uuid4().hex, user_id=user.id, requested_by_id=requested_by.id,
+                     locale=str(locale) if locale else None, content_hash=content_hash)
+    if os.path.exists(artifact_path(content_hash)):
+        job.status = BookletJobStatus.DONE
+        job.finished_at = datetime.now(timezone.utc)
+    db.session.add(job)
+    db.session.commit()
+
+    if job.status == BookletJobStatus.PENDING:
+        if current_app.config.get('BOOKLET_WORKERS') == 0:
+            run_booklet_job(job.id)
+        else:
+            _get_executor().submit(_run_in_app_context, current_app._get_current_object(),  # pylint: disable=W0212
+                                   job.id)
+    return job
+
+
+def run_booklet_job(job_id):
+    """
+    Builds the booklet of a pending job into the cache and records the outcome.
+    """
+    job = db.session.get(BookletJob, job_id)
+    if job is None or job.status != BookletJobStatus.PENDING:
+        return
+    job.status = BookletJobStatus.RUNNING
+    job.started_at = datetime.now(timezone.utc)
+    db.session.commit()
+
+    try:
+        with force_locale(job.locale) if job.locale else nullcontext():
+            # Collected again: records may have changed since the job was queued
+            data = collect_booklet_data(job.user_id)
+            content_hash = booklet_content_hash(data)
+            build_booklet_artifact(data, content_hash)
+        job.content_hash = content_hash
+        job.status = BookletJobStatus.DONE
+    except Exception as e:  # pylint: disable=broad-except
+        current_app.logger.error(f"Booklet job {job_id} failed: {e}")
+        db.session.rollback()
+        job = db.session.get(BookletJob, job_id)
+        job.status = BookletJobStatus.FAILED
+        job.error = str(e)
+    job.finished_at = datetime.now(timezone.utc)
+    db.session.commit()
+
+
+def refresh_job_status(job):
+    """
+    Returns the status of ``job``, settling unfinished jobs first.
+
+    A job whose archive was cached meanwhile (by another job) is marked DONE;
+    one unfinished after ``BOOKLET_JOB_TIMEOUT`` seconds, for instance because
+    its worker process exited, is marked FAILED so it can be requested again.
+    """
+    if job.status not in (BookletJobStatus.PENDING, BookletJobStatus.RUNNING):
+        return job.status
+    if os.path.exists(artifact_path(job.content_hash)):
+        job.status = BookletJobStatus.DONE
+    else:
+        age = datetime.now(timezone.utc) - _as_utc(job.created_at)
+        if age.total_seconds() > current_app.config.get('BOOKLET_JOB_TIMEOUT', 600):
+            job.status = BookletJobStatus.FAILED
+            job.error = "The booklet generation timed out."
+    if job.status not in (BookletJobStatus.PENDING, BookletJobStatus.RUNNING):
+        job.finished_at = datetime.now(timezone.utc)
+        db.session.commit()
+    return job.status
+
+
+def booklet_export_user_ids(team_id=None, species_id=None):
+    """
+    Returns the ids of the users included in a bulk booklet export, by name.
+
+    Selects the members of a team, the users holding a competency for a
+    species (on the competency or through its skill), or every approved user.
+    """
+    query = db.session.query(User.id)
+    if team_id is not None:
+        query = query.join(user_team_membership, user_team_membership.c.user_id == User.id) \
+            .filter(user_team_membership.c.team_id == team_id)
+    elif species_id is not None:
+        by_competency = db.session.query(Competency.user_id).join(
+            competency_species_association,
+            competency_species_association.c.competency_id == Competency.id
+        ).filter(competency_species_association.c.species_id == species_id)
+        by_skill = db.session.query(Competency.user_id).join(Skill).join(
+            skill_species_association, skill_species_association.c.skill_id == Skill.id
+        ).filter(skill_species_association.c.species_id == species_id)
+        query = query.filter(User.id.in_(by_competency.union(by_skill)))
+    else:
+        query = query.filter(User.is_approved.is_(True))
+    return [user_id for (user_id,) in query.order_by(User.full_name, User.id)]
+
+
+class _StreamBuffer:
+    """
+    Write-only file object collecting what ``zipfile`` writes until it is taken.
+    """
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _render_batches(user_ids, executor, batch_size):
+    """
+    Yields ``(snapshot, rendered files)`` per user, prefetching a batch at a time.
+    """
+    for start in range(0, len(user_ids), batch_size):
+        batch_ids = user_ids[start:start + batch_size]
+        snapshots = collect_booklet_data_bulk(batch_ids)
+        batch = [snapshots[user_id] for user_id in batch_ids if user_id in snapshots]
+        render = functools.partial(render_booklet_files, certificate_folder=certificate_folder())
+        if executor is None:
+            rendered = map(render, batch)
+        else:
+            rendered = executor.map(render, batch)
+        yield from zip(batch, rendered)
+
+
+def _write_booklet_archive(user_ids, fileobj, max_workers=None, batch_size=None):
+    """
+    Writes one folder per user into a ZIP on ``fileobj``, yielding after each user.
+
+    PDFs are rendered in a process pool (``max_workers`` processes, in-process
+    when 1 or less), one prefetched batch of users at a time, so only a batch
+    of rendered files is held in memory.
+    """
+    batch_size = batch_size or current_app.config.get('BOOKLET_EXPORT_BATCH_SIZE',
+                                                      BOOKLET_EXPORT_BATCH_SIZE)
+    if max_workers is None:
+        max_workers = current_app.config.get('BOOKLET_EXPORT_WORKERS') or os.cpu_count() or 1
+    executor = None
+    if max_workers > 1 and len(user_ids) > 1:
+        try:
+            executor = ProcessPoolExecutor(max_workers=max_workers,
+                                           mp_context=multiprocessing.get_context('spawn'))
+        except OSError as e:
+            current_app.logger.warning(f"Parallel booklet rendering unavailable: {e}")
+    try:
+        with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for data, files in _render_batches(user_ids, executor, batch_size):
+                user = data['user']
+                _add_booklet(zf, data, files,
+                             prefix=f"{user['full_name'].replace(' ', '_')}_{user['id']}/")
+                yield
+    except BrokenProcessPool as e:
+        current_app.logger.error(f"Booklet export aborted, a rendering process died: {e}")
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    yield
+
+
+def write_booklet_archive(user_ids, fileobj, max_workers=None, batch_size=None):
+    """
+    Writes the booklets of ``user_ids`` into a single ZIP on ``fileobj``.
+    """
+    for _step in _write_booklet_archive(user_ids, fileobj, max_workers, batch_size):
+        pass
+
+
+def stream_booklet_archive(user_ids, max_workers=None, batch_size=None):
+    """
+    Yields the bytes of a ZIP holding the booklets of ``user_ids`` as it is built.
+    """
+    buffer = _StreamBuffer()
+    for _step in _write_booklet_archive(user_ids, buffer, max_workers, batch_size):
+        chunk = buffer.take()
+        if chunk:
+            yield chunk
@@ -0,0 +1,103 @@
+"""
+Small in-process caching helpers.
+
+``LRUCache`` is a thread-safe, size-bounded (and optionally time-bounded)
+mapping shared by every request of a worker process. ``request_cache`` returns
+a dictionary that only lives for the current application context, so values
+are computed at most once per request. Named caches are listed by
+``named_caches`` so their hit ratios can be reported.
+"""
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from flask import g, has_app_context
+
+_named_caches = weakref.WeakValueDictionary()
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with an optional time-to-live.
+
+    A ``name`` registers the cache in ``named_caches``.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, name=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if name is not None:
+            _named_caches[name] = self
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for ``key``, or ``default`` if missing or expired.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Stores ``value`` under ``key``, evicting the least recently used entry if full.
+
+        ``ttl`` overrides the cache-wide time-to-live for this entry.
+        """
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """
+        Removes ``key`` from the cache and returns its value.
+        """
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry is not None else default
+
+    def clear(self):
+        """
+        Removes every entry from the cache.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def named_caches():
+    """
+    Returns {name: cache} for the named caches of this process.
+    """
+    return dict(_named_caches)
+
+
+def request_cache(name):
+    """
+    Returns a per-request dictionary for ``name``, or None outside an app context.
+    """
+    if not has_app_context():
+        return None
+    caches = g.setdefault('_request_caches', {})
+    return caches.setdefault(name, {})
@@ -0,0 +1,27 @@
+"""
+iCalendar facade over ics, imported on first use.
+
+ics (and arrow, which it depends on) is only needed to attach invitations to
+session reminders.
+"""
+import functools
+
+
+@functools.cache
+def _ics():
+    import ics  # pylint: disable=import-outside-toplevel
+    return ics
+
+
+def Calendar(*args, **kwargs):  # pylint: disable=invalid-name
+    """
+    Returns a new iCalendar calendar.
+    """
+    return _ics().Calendar(*args, **kwargs)
+
+
+def Event(*args, **kwargs):  # pylint: disable=invalid-name
+    """
+    Returns a new iCalendar event.
+    """
+    return _ics().Event(*args, **kwargs)
@@ -0,0 +1,222 @@
+"""
+Competency certificate rendering service with a content-addressed store.
+
+A certificate is rendered once per distinct content: the PDF is stored in
+``CERTIFICATE_FOLDER`` under the SHA-256 digest of its snapshot, and the file
+name is recorded in ``Competency.certificate_path``. Creating a competency or
+changing what its certificate prints (level, evaluation date, species,
+evaluator) renders it in a small thread pool after the commit. Downloads
+check the recorded name against the current snapshot, so a certificate whose
+user or skill was renamed meanwhile is rendered again on demand rather than
+served stale. ``prerender_certificates`` (``flask certificates render``)
+renders every missing certificate in worker processes.
+"""
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from app import db
+from app.booklets import (
+    certificate_content_hash, certificate_data, certificate_folder, render_certificate_pdf
+)
+from app.models import Competency
+
+# Competencies loaded (and rendered) together
+CERTIFICATE_BATCH_SIZE = 200
+
+# Attributes printed on a certificate
+CERTIFICATE_ATTRIBUTES = ('user_id', 'skill_id', 'level', 'evaluation_date', 'species',
+                          'evaluator_id', 'evaluator', 'external_evaluator_name')
+
+_CERTIFICATE_NAME = re.compile(r'^[0-9a-f]{64}\.pdf$')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def certificate_name(data):
+    """
+    Returns the stored file name of a certificate snapshot.
+    """
+    return f'{certificate_content_hash(data)}.pdf'
+
+
+def certificate_file(name):
+    """
+    Returns the path of a stored certificate, or None for a name the store
+    never produces.
+    """
+    if not name or not _CERTIFICATE_NAME.match(name):
+        return None
+    return os.path.join(certificate_folder(), name)
+
+
+def _write_certificate(name, content):
+    """
+    Atomically writes a rendered certificate into the store.
+    """
+    folder = certificate_folder()
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(content)
+        os.replace(tmp_path, os.path.join(folder, name))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def store_certificate(data, force=False):
+    """
+    Renders the certificate of a snapshot into the store unless it is already
+    there (or ``force`` is set). Returns its file name.
+    """
+    name = certificate_name(data)
+    if force or not os.path.exists(certificate_file(name)):
+        _write_certificate(name, render_certificate_pdf(data))
+    return name
+
+
+def ensure_certificate(competency):
+    """
+    Returns ``(path, name)`` of the stored certificate of ``competency``,
+    rendering it first when its content changed or it was never stored.
+    """
+    data = certificate_data(competency)
+    name = certificate_name(data)
+    path = certificate_file(name)
+    if competency.certificate_path != name or not os.path.exists(path):
+        store_certificate(data)
+        if competency.certificate_path != name:
+            competency.certificate_path = name
+            db.session.commit()
+    return path, name
+
+
+def _load_competencies(competency_ids):
+    return Competency.query.options(
+        db.joinedload(Competency.user), db.joinedload(Competency.skill),
+        db.selectinload(Competency.species), db.joinedload(Competency.evaluator)
+    ).filter(Competency.id.in_(competency_ids)).all()
+
+
+def render_competency_certificates(competency_ids, force=False, executor=None):
+    """
+    Renders and records the certificates of ``competency_ids``, a batch at a
+    time. PDFs not stored yet (all of them with ``force``) are rendered with
+    ``executor`` when given. Returns the number of certificates rendered.
+    """
+    competency_ids = list(competency_ids)
+    rendered = 0
+    for start in range(0, len(competency_ids), CERTIFICATE_BATCH_SIZE):
+        competencies = _load_competencies(competency_ids[start:start + CERTIFICATE_BATCH_SIZE])
+        to_render = {}
+        for competency in competencies:
+            data = certificate_data(competency)
+            name = certificate_name(data)
+            if force or not os.path.exists(certificate_file(name)):
+                to_render.setdefault(name, data)
+            if competency.certificate_path != name:
+                competency.certificate_path = name
+        names = list(to_render)
+        pdfs = (executor.map(render_certificate_pdf, to_render.values()) if executor is not None
+                else map(render_certificate_pdf, to_render.values()))
+        for name, content in zip(names, pdfs):
+            _write_certificate(name, content)
+        rendered += len(names)
+        db.session.commit()
+    return rendered
+
+
+def prerender_certificates(rerender=False, max_workers=None):
+    """
+    Renders the certificates of every competency whose certificate is not
+    recorded yet (of every competency with ``rerender``) in worker processes.
+
+    Returns (competencies processed, certificates rendered).
+    """
+    query = db.session.query(Competency.id)
+    if not rerender:
+        query = query.filter(Competency.certificate_path.is_(None))
+    competency_ids = [competency_id for competency_id, in query.order_by(Competency.id)]
+    if max_workers is None:
+        max_workers = current_app.config.get('CERTIFICATE_RENDER_WORKERS') or os.cpu_count() or 1
+    executor = None
+    if max_workers > 1 and len(competency_ids) > 1:
+        try:
+            executor = ProcessPoolExecutor(max_workers=max_workers,
+                                           mp_context=multiprocessing.get_context('spawn'))
+        except OSError as e:
+            current_app.logger.warning(f"Parallel certificate rendering unavailable: {e}")
+    try:
+        rendered = render_competency_certificates(competency_ids, force=rerender,
+                                                  executor=executor)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return len(competency_ids), rendered
+
+
+def _get_executor():
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get('CERTIFICATE_WORKERS') or 2,
+                thread_name_prefix='certificate')
+        return _executor
+
+
+def _render_in_app_context(app, competency_ids):
+    with app.app_context():
+        try:
+            render_competency_certificates(competency_ids)
+        except Exception as e:  # pylint: disable=broad-except
+            # Rendered again on the next download
+            current_app.logger.error(f"Certificate rendering failed: {e}")
+
+
+def _prints_changed(competency):
+    state = sa_inspect(competency)
+    return any(state.attrs[name].history.has_changes() for name in CERTIFICATE_ATTRIBUTES)
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_changed_certificates(session, flush_context, instances):  # pylint: disable=unused-argument
+    """
+    Remembers the competencies whose certificate content changes in this flush.
+    """
+    changed = [obj for obj in session.new if isinstance(obj, Competency)]
+    with session.no_autoflush:
+        changed.extend(obj for obj in session.dirty
+                       if isinstance(obj, Competency) and _prints_changed(obj))
+    if changed:
+        session.info.setdefault('changed_certificates', set()).update(changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _render_changed_certificates(session):
+    """
+    Renders the changed certificates in the background once committed.
+    """
+    changed = session.info.pop('changed_certificates', None)
+    if not changed or not has_app_context() or not current_app.config.get('CERTIFICATE_WORKERS'):
+        return
+    competency_ids = [sa_inspect(obj).identity[0] for obj in changed
+                      if sa_inspect(obj).identity is not None]
+    if competency_ids:
+        _get_executor().submit(_render_in_app_context,
+                               current_app._get_current_object(), competency_ids)  # pylint: disable=W0212
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_certificates(session):
+    session.info.pop('changed_certificates', None)
@@ -0,0 +1,120 @@
+"""
+Vectorized competency checks for the public inter-app API.
+
+Evaluates an emails x skills matrix with a fixed number of queries: one IN
+query resolving the emails, one for the requested skills, and one grouped
+query returning, per (user, skill), the latest evaluation and practice dates
+up to the reference date. Validity is then computed in memory.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import and_, func
+
+from app import db
+from app.models import (
+    Competency, Skill, SkillPracticeEvent, User, _as_utc, chunked, skill_practice_event_skills
+)
+
+# Per-skill reasons
+REASON_VALID = 'valid'
+REASON_NOT_COMPETENT = 'not_competent'
+REASON_RECYCLING_DUE = 'recycling_due'
+REASON_UNKNOWN_SKILL = 'unknown_skill'
+REASON_USER_NOT_FOUND = 'user_not_found'
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _latest_validations(user_ids, skill_ids, as_of):
+    """
+    Returns {(user_id, skill_id): latest evaluation or practice date <= as_of}
+    with one grouped query per chunk of users.
+    """
+    practice = db.session.query(
+        SkillPracticeEvent.user_id.label('user_id'),
+        skill_practice_event_skills.c.skill_id.label('skill_id'),
+        SkillPracticeEvent.practice_date.label('practice_date')
+    ).join(
+        skill_practice_event_skills,
+        skill_practice_event_skills.c.skill_practice_event_id == SkillPracticeEvent.id
+    ).filter(SkillPracticeEvent.practice_date <= as_of).subquery()
+
+    latest = {}
+    for chunk in chunked(user_ids):
+        rows = db.session.query(
+            Competency.user_id, Competency.skill_id,
+            func.max(Competency.evaluation_date), func.max(practice.c.practice_date)
+        ).outerjoin(practice, and_(
+            practice.c.user_id == Competency.user_id,
+            practice.c.skill_id == Competency.skill_id
+        )).filter(
+            Competency.user_id.in_(chunk),
+            Competency.skill_id.in_(skill_ids),
+            Competency.evaluation_date <= as_of
+        ).group_by(Competency.user_id, Competency.skill_id)
+        for user_id, skill_id, evaluated, practiced in rows:
+            latest[(user_id, skill_id)] = max(date for date in (_as_utc(evaluated),
+                                                                _as_utc(practiced)) if date)
+    return latest
+
+
+def check_competencies(emails, skill_ids, as_of=None):
+    """
+    Checks whether each user of ``emails`` is competent in every skill of
+    ``skill_ids`` at ``as_of`` (now by default).
+
+    Returns {email: {'valid', 'details', 'skills'}} where ``details`` lists
+    human-readable failures and ``skills`` holds one entry per skill with its
+    reason, last validation and recycling due date.
+    """
+    as_of = _as_utc(as_of) or datetime.now(timezone.utc)
+    emails = list(dict.fromkeys(emails))
+    skill_ids = list(dict.fromkeys(skill_ids))
+
+    user_ids = {}
+    for chunk in chunked(emails):
+        user_ids.update(db.session.query(User.email, User.id).filter(User.email.in_(chunk)))
+    skills = {skill_id: (name, validity_period_months)
+              for skill_id, name, validity_period_months in db.session.query(
+                  Skill.id, Skill.name, Skill.validity_period_months
+              ).filter(Skill.id.in_(skill_ids))} if skill_ids else {}
+    latest = _latest_validations(set(user_ids.values()), list(skills), as_of) \
+        if user_ids and skills else {}
+
+    results = {}
+    for email in emails:
+        user_id = user_ids.get(email)
+        if user_id is None:
+            results[email] = {'valid': False, 'reason': REASON_USER_NOT_FOUND,
+                              'details': ['User not found'], 'skills': []}
+            continue
+
+        details = []
+        skill_results = []
+        for skill_id in skill_ids:
+            name, validity_period_months = skills.get(skill_id, (None, None))
+            last_validated_at = latest.get((user_id, skill_id))
+            recycling_due_at = None
+            if name is None:
+                reason = REASON_UNKNOWN_SKILL
+            elif last_validated_at is None:
+                reason = REASON_NOT_COMPETENT
+            else:
+                recycling_due_at, _ = Competency.compute_recycling_dates(
+                    last_validated_at, validity_period_months)
+                reason = REASON_RECYCLING_DUE \
+                    if recycling_due_at is not None and recycling_due_at < as_of else REASON_VALID
+            if reason != REASON_VALID:
+                details.append(f'Not competent in {name or "Unknown skill"}')
+            skill_results.append({
+                'skill_id': skill_id,
+                'skill_name': name,
+                'valid': reason == REASON_VALID,
+                'reason': reason,
+                'last_validated_at': _isoformat(last_validated_at),
+                'recycling_due_at': _isoformat(recycling_due_at),
+            })
+        results[email] = {'valid': not details, 'details': details, 'skills': skill_results}
+    return results
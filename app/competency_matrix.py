@@ -0,0 +1,221 @@
+"""
+Set-based team competency matrix.
+
+Builds the (member, skill) matrix shown to team leads from three grouped
+queries, whatever the number of members and skills: the members'
+competencies, their approved external training claims, and the latest
+practice dates of competencies whose recycling dates are not materialized
+yet. The matrix is sparse: only cells with data are stored and only skills
+with at least one cell are listed.
+
+Built matrices are kept as read-only snapshots keyed by the member set and a
+cache version bumped whenever one of the underlying models is written.
+"""
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app import db
+from app.cache import LRUCache
+from app.models import (
+    Competency, ExternalTraining, ExternalTrainingSkillClaim, ExternalTrainingStatus, Skill,
+    SkillPracticeEvent, _as_utc, bump_cache_version, chunked, get_cache_version,
+    skill_practice_event_skills
+)
+
+COMPETENCY_MATRIX_CACHE = 'competency_matrix'
+
+# Snapshots keyed by (cache version, member ids)
+_matrix_cache = LRUCache(maxsize=64, ttl=300, name='competency_matrix')
+
+
+class MatrixCell:
+    """
+    Competency status of one member for one skill.
+
+    ``source`` is 'competency' for an internal competency and 'external' for
+    an approved external training claim without competency.
+    """
+    __slots__ = ('source', 'competency_id', 'level', 'latest_practice_date',
+                 'recycling_due_date')
+
+    def __init__(self, source, competency_id=None, level=None, latest_practice_date=None,
+                 recycling_due_date=None):
+        self.source = source
+        self.competency_id = competency_id
+        self.level = level
+        self.latest_practice_date = latest_practice_date
+        self.recycling_due_date = recycling_due_date
+
+    @property
+    def is_competency(self):
+        """
+        Returns True when the cell is backed by an internal competency.
+        """
+        return self.source == 'competency'
+
+    @property
+    def needs_recycling(self):
+        """
+        Checks if the recycling due date has passed.
+        """
+        return self.recycling_due_date is not None and \
+            datetime.now(timezone.utc) > self.recycling_due_date
+
+    def __repr__(self):
+        return f'<MatrixCell {self.source} level:{self.level}>'
+
+
+class CompetencyMatrix:
+    """
+    Read-only sparse competency matrix for a set of members.
+
+    ``skills`` lists (skill id, skill name) pairs of the skills with data,
+    ordered by name, and ``cells`` maps (member id, skill id) to a ``MatrixCell``.
+    """
+    __slots__ = ('member_ids', 'skills', 'cells', 'built_at')
+
+    def __init__(self, member_ids, skills, cells, built_at):
+        self.member_ids = member_ids
+        self.skills = skills
+        self.cells = cells
+        self.built_at = built_at
+
+    def cell(self, member_id, skill_id):
+        """
+        Returns the cell of a member for a skill, or None when there is no data.
+        """
+        return self.cells.get((member_id, skill_id))
+
+    def skills_for(self, member_ids):
+        """
+        Returns the skills with data for at least one of ``member_ids``.
+        """
+        member_ids = set(member_ids)
+        skill_ids = {skill_id for member_id, skill_id in self.cells if member_id in member_ids}
+        return [skill for skill in self.skills if skill[0] in skill_ids]
+
+    def __repr__(self):
+        return f'<CompetencyMatrix members:{len(self.member_ids)} cells:{len(self.cells)}>'
+
+
+def build_competency_matrix(member_ids):
+    """
+    Builds the ``CompetencyMatrix`` of ``member_ids`` with three grouped queries
+    (plus one for the names of the skills with data).
+    """
+    member_ids = tuple(sorted(set(member_ids)))
+    cells = {}
+    unmaterialized = {}
+
+    competency_rows = []
+    claim_rows = []
+    for chunk in chunked(member_ids):
+        competency_rows.extend(db.session.query(
+            Competency.id, Competency.user_id, Competency.skill_id, Competency.level,
+            Competency.evaluation_date, Competency.last_validated_at,
+            Competency.recycling_due_at
+        ).filter(Competency.user_id.in_(chunk)).order_by(Competency.id))
+        claim_rows.extend(db.session.query(
+            ExternalTraining.user_id, ExternalTrainingSkillClaim.skill_id,
+            func.max(ExternalTrainingSkillClaim.level),
+            func.max(ExternalTrainingSkillClaim.practice_date)
+        ).join(
+            ExternalTraining, ExternalTrainingSkillClaim.external_training_id == ExternalTraining.id
+        ).filter(
+            ExternalTraining.user_id.in_(chunk),
+            ExternalTraining.status == ExternalTrainingStatus.APPROVED
+        ).group_by(ExternalTraining.user_id, ExternalTrainingSkillClaim.skill_id))
+
+    for competency_id, user_id, skill_id, level, evaluation_date, last_validated_at, \
+            recycling_due_at in competency_rows:
+        if (user_id, skill_id) in cells:
+            continue
+        cell = MatrixCell('competency', competency_id, level,
+                          _as_utc(last_validated_at or evaluation_date), _as_utc(recycling_due_at))
+        cells[(user_id, skill_id)] = cell
+        if last_validated_at is None:
+            unmaterialized[(user_id, skill_id)] = cell
+
+    for user_id, skill_id, level, practice_date in claim_rows:
+        if (user_id, skill_id) not in cells:
+            cells[(user_id, skill_id)] = MatrixCell('external', level=level,
+                                                    latest_practice_date=_as_utc(practice_date))
+
+    if unmaterialized:
+        # Competencies written before recycling dates were materialized
+        for chunk in chunked({user_id for user_id, _ in unmaterialized}):
+            rows = db.session.query(
+                SkillPracticeEvent.user_id, skill_practice_event_skills.c.skill_id,
+                func.max(SkillPracticeEvent.practice_date)
+            ).join(
+                skill_practice_event_skills,
+                skill_practice_event_skills.c.skill_practice_event_id == SkillPracticeEvent.id
+            ).filter(
+                SkillPracticeEvent.user_id.in_(chunk),
+                skill_practice_event_skills.c.skill_id.in_({s for _, s in unmaterialized})
+            ).group_by(SkillPracticeEvent.user_id, skill_practice_event_skills.c.skill_id)
+            for user_id, skill_id, latest in rows:
+                cell = unmaterialized.get((user_id, skill_id))
+                latest = _as_utc(latest)
+                if cell is not None and latest is not None and \
+                        (cell.latest_practice_date is None or latest > cell.latest_practice_date):
+                    cell.latest_practice_date = latest
+
+    skills = []
+    validity_by_skill = {}
+    for chunk in chunked({skill_id for _, skill_id in cells}):
+        for skill_id, name, validity_period_months in db.session.query(
+                Skill.id, Skill.name, Skill.validity_period_months).filter(Skill.id.in_(chunk)):
+            skills.append((skill_id, name))
+            validity_by_skill[skill_id] = validity_period_months
+    skills.sort(key=lambda skill: (skill[1].lower(), skill[0]))
+
+    for (_, skill_id), cell in cells.items():
+        validity_period_months = validity_by_skill.get(skill_id)
+        if not validity_period_months:
+            cell.recycling_due_date = None
+        elif cell.recycling_due_date is None and cell.latest_practice_date is not None:
+            cell.recycling_due_date, _ = Competency.compute_recycling_dates(
+                cell.latest_practice_date, validity_period_months)
+
+    return CompetencyMatrix(member_ids, skills, cells, datetime.now(timezone.utc))
+
+
+def get_competency_matrix(member_ids):
+    """
+    Returns the snapshot of the ``CompetencyMatrix`` of ``member_ids``, built
+    on a cache miss.
+    """
+    member_ids = tuple(sorted(set(member_ids)))
+    key = (get_cache_version(COMPETENCY_MATRIX_CACHE), member_ids)
+    matrix = _matrix_cache.get(key)
+    if matrix is None:
+        matrix = build_competency_matrix(member_ids)
+        _matrix_cache.set(key, matrix, ttl=current_app.config.get('COMPETENCY_MATRIX_TTL'))
+    return matrix
+
+
+def invalidate_competency_matrices(session=None):
+    """
+    Invalidates the competency matrix snapshots in every process.
+    """
+    bump_cache_version(COMPETENCY_MATRIX_CACHE, session)
+    _matrix_cache.clear()
+
+
+@event.listens_for(Session, 'before_flush')
+def _invalidate_competency_matrices(session, flush_context, instances):  # pylint: disable=unused-argument
+    """
+    Invalidates the matrix snapshots when a model they are built from is written.
+    """
+    watched = (Competency, ExternalTraining, ExternalTrainingSkillClaim, SkillPracticeEvent,
+               Skill)
+    with session.no_autoflush:
+        if any(isinstance(obj, watched) for obj in session.new) or \
+                any(isinstance(obj, watched) for obj in session.deleted) or \
+                any(isinstance(obj, watched) and session.is_modified(obj)
+                    for obj in session.dirty):
+            invalidate_competency_matrices(session)
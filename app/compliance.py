@@ -0,0 +1,193 @@
+"""
+Set-based continuous training compliance engine.
+
+Computes, for any number of users at once, the windowed continuous training
+totals, per-type totals, per-year breakdown and at-risk flag that the
+``User`` properties compute one query at a time. Everything is derived from a
+single grouped aggregate over ``UserContinuousTraining`` joined to
+``ContinuousTrainingEvent``.
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import case, func
+
+from app import db
+from app.models import (
+    User, UserContinuousTraining, UserContinuousTrainingStatus, ContinuousTrainingEvent,
+    ContinuousTrainingType, chunked
+)
+
+# Window used by User.is_at_risk_next_year.
+AT_RISK_WINDOW_YEARS = 5
+AT_RISK_MIN_DAYS = 2.5
+
+
+class ContinuousTrainingCompliance:
+    """
+    Compact, read-only continuous training summary for a single user.
+    """
+    __slots__ = ('user_id', 'total_hours', 'live_hours', 'online_hours',
+                 'hours_last_5_years', 'calendar_hours', 'hours_by_year')
+
+    def __init__(self, user_id, total_hours=0.0, live_hours=0.0, online_hours=0.0,
+                 hours_last_5_years=0.0, calendar_hours=0.0, hours_by_year=None):
+        self.user_id = user_id
+        self.total_hours = total_hours
+        self.live_hours = live_hours
+        self.online_hours = online_hours
+        self.hours_last_5_years = hours_last_5_years
+        self.calendar_hours = calendar_hours
+        self.hours_by_year = hours_by_year or {}
+
+    @property
+    def required_hours(self):
+        """
+        Returns the total required continuous training hours.
+        """
+        return User.CONTINUOUS_TRAINING_DAYS_REQUIRED * User.HOURS_PER_DAY
+
+    @property
+    def required_live_hours(self):
+        """
+        Returns the required number of live continuous training hours.
+        """
+        return self.required_hours * User.MIN_LIVE_TRAINING_PERCENTAGE
+
+    @property
+    def is_compliant(self):
+        """
+        Checks if the user is compliant with continuous training requirements.
+        """
+        return self.total_hours >= self.required_hours
+
+    @property
+    def is_live_compliant(self):
+        """
+        Checks if the user is compliant with the live training hours requirement.
+        """
+        return self.live_hours >= self.required_live_hours
+
+    @property
+    def is_at_risk_next_year(self):
+        """
+        Checks if the user is at risk of non-compliance for continuous training next year.
+        """
+        return self.hours_last_5_years < (AT_RISK_MIN_DAYS * User.HOURS_PER_DAY)
+
+    @property
+    def status_label(self):
+        """
+        Returns the compliance label used in exports.
+        """
+        if not self.is_compliant:
+            return "WARNING"
+        if not self.is_live_compliant:
+            return "OK except live hours"
+        return "OK"
+
+    def as_summary(self):
+        """
+        Returns the dictionary layout used by the team and report templates.
+        """
+        return {
+            'total_hours_6_years': self.total_hours,
+            'live_hours_6_years': self.live_hours,
+            'online_hours_6_years': self.online_hours,
+            'required_hours': self.required_hours,
+            'is_compliant': self.is_compliant,
+            'required_live_training_hours': self.required_live_hours,
+            'is_live_training_compliant': self.is_live_compliant,
+            'is_at_risk_next_year': self.is_at_risk_next_year,
+        }
+
+    def __repr__(self):
+        return f'<ContinuousTrainingCompliance user:{self.user_id} total:{self.total_hours:.2f}>'
+
+
+def _windowed_sum(hours, event_date, start_date, end_date, extra_condition=None):
+    """
+    Builds a SUM(CASE ...) expression restricted to [start_date, end_date).
+    """
+    conditions = [event_date >= start_date]
+    if end_date is not None:
+        conditions.append(event_date < end_date)
+    if extra_condition is not None:
+        conditions.append(extra_condition)
+    return func.coalesce(func.sum(case((db.and_(*conditions), hours), else_=0.0)), 0.0)
+
+
+def compute_continuous_training_compliance(user_ids=None, now=None):
+    """
+    Computes continuous training compliance for many users with one grouped query.
+
+    ``user_ids`` restricts the computation to the given users (all users when
+    ``None``). Returns a dict mapping every requested user id to a
+    ``ContinuousTrainingCompliance``; users without approved attendances get a
+    zeroed result.
+    """
+    now = now or datetime.now(timezone.utc)
+    window = User.CONTINUOUS_TRAINING_YEARS_WINDOW
+    six_years_ago = now - timedelta(days=window * 365.25)
+    at_risk_start = now - timedelta(days=AT_RISK_WINDOW_YEARS * 365.25)
+    years = list(range(now.year - window + 1, now.year + 1))
+    year_starts = [datetime(year, 1, 1, tzinfo=timezone.utc) for year in years]
+    year_ends = year_starts[1:] + [datetime(now.year + 1, 1, 1, tzinfo=timezone.utc)]
+    calendar_start = max(year_starts[0], six_years_ago)
+
+    hours = UserContinuousTraining.validated_hours.cast(db.Float)
+    event_date = ContinuousTrainingEvent.event_date
+    columns = [
+        UserContinuousTraining.user_id,
+        _windowed_sum(hours, event_date, six_years_ago, now),
+        _windowed_sum(hours, event_date, six_years_ago, now,
+                      ContinuousTrainingEvent.training_type == ContinuousTrainingType.PRESENTIAL),
+        _windowed_sum(hours, event_date, six_years_ago, now,
+                      ContinuousTrainingEvent.training_type == ContinuousTrainingType.ONLINE),
+        _windowed_sum(hours, event_date, at_risk_start, now),
+        _windowed_sum(hours, event_date, calendar_start, now),
+    ]
+    columns.extend(_windowed_sum(hours, event_date, start, end)
+                   for start, end in zip(year_starts, year_ends))
+
+    base_query = db.session.query(*columns).join(
+        ContinuousTrainingEvent, UserContinuousTraining.event_id == ContinuousTrainingEvent.id
+    ).filter(
+        UserContinuousTraining.status == UserContinuousTrainingStatus.APPROVED,
+        event_date >= min(six_years_ago, year_starts[0])
+    ).group_by(UserContinuousTraining.user_id)
+
+    if user_ids is None:
+        rows = base_query.all()
+        results = {user_id: ContinuousTrainingCompliance(user_id)
+                   for (user_id,) in db.session.query(User.id)}
+    else:
+        user_ids = list(dict.fromkeys(user_ids))
+        results = {user_id: ContinuousTrainingCompliance(user_id) for user_id in user_ids}
+        rows = []
+        for chunk in chunked(user_ids):
+            rows.extend(base_query.filter(UserContinuousTraining.user_id.in_(chunk)).all())
+
+    for row in rows:
+        user_id, total, live, online, last_5_years, calendar_total = row[:6]
+        results[user_id] = ContinuousTrainingCompliance(
+            user_id,
+            total_hours=float(total),
+            live_hours=float(live),
+            online_hours=float(online),
+            hours_last_5_years=float(last_5_years),
+            calendar_hours=float(calendar_total),
+            hours_by_year={year: float(value) for year, value in zip(years, row[6:])},
+        )
+
+    for result in results.values():
+        if not result.hours_by_year:
+            result.hours_by_year = {year: 0.0 for year in years}
+    return results
+
+
+def get_continuous_training_compliance(user, now=None):
+    """
+    Returns the ``ContinuousTrainingCompliance`` for a single user.
+    """
+    user_id = user if isinstance(user, int) else user.id
+    return compute_continuous_training_compliance([user_id], now=now)[user_id]
@@ -1,19 +1,20 @@
 from flask_babel import lazy_gettext as _
 import os
-import io
 import json
 from flask import render_template, flash, redirect, url_for, current_app, request, send_file, abort, jsonify
 from flask_login import login_required, current_user, logout_user
 from werkzeug.utils import secure_filename
 from sqlalchemy import func, extract, case
 import traceback # Import traceback
-from fpdf import FPDF
-from fpdf.html import HTMLMixin
-from fpdf.fonts import FontFace
-import zipfile
 from app import db
+from app.booklets import (
+    artifact_path, certificate_data, certificate_filename, enqueue_booklet_job, refresh_job_status
+)
+from app.certificates import ensure_certificate
+from app.compliance import get_continuous_training_compliance
 from app.decorators import permission_required
 from app.email import send_email
+from app.notifications import get_notification_summary
 from app.dashboard import bp
 from app.models import (
     User, TrainingRequest, TrainingRequestStatus, ExternalTraining, ExternalTrainingStatus,
@@ -21,7 +22,7 @@ from app.models import (
     ContinuousTrainingEventStatus, Skill, ContinuousTrainingType, Competency, Role, Permission,
     InitialRegulatoryTraining, InitialRegulatoryTrainingLevel, SkillPracticeEvent, Species,
     UserDismissedNotification, tutor_skill_association, TrainingSession, ExternalTrainingSkillClaim,
-    training_session_attendees
+    training_session_attendees, BookletJob, BookletJobStatus, _as_utc
 )
 from app.profile.forms import (
     RequestContinuousTrainingEventForm, SubmitContinuousTrainingAttendanceForm, EditProfileForm,
@@ -30,290 +31,8 @@ from app.profile.forms import (
 from collections import defaultdict
 from datetime import datetime, timezone
 
-class PDF(FPDF):
-    def __init__(self, orientation='P', unit='mm', format='A4', user_name=''):
-        super().__init__(orientation, unit, format)
-        self.user_name = user_name
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Helvetica', 'I', 8)
-        generation_date = datetime.now(timezone.utc).strftime("%d/%m/%Y")
-        footer_text = _('Skills Booklet of %(user_name)s - %(generation_date)s', user_name=self.user_name, generation_date=generation_date)
-        self.cell(0, 10, footer_text, 0, 0, 'L')
-        self.cell(0, 10, f'{self.page_no()}/{{nb}}', 0, 0, 'R')
-
-def _generate_booklet_pdf(user):
-    # --- Data Fetching ---
-    competencies = user.competencies
-    initial_trainings = user.initial_regulatory_trainings
-    continuous_trainings = user.continuous_trainings_attended.join(ContinuousTrainingEvent).filter(
-        UserContinuousTraining.status == UserContinuousTrainingStatus.APPROVED
-    ).order_by(ContinuousTrainingEvent.event_date.desc()).all()
-
-    # --- PDF Generation ---
-    pdf = PDF(user_name=user.full_name)
-    pdf.alias_nb_pages()
-    pdf.add_page()
-    pdf.set_font('Helvetica', 'B', 16)
-    
-    # --- Header ---
-    pdf.cell(0, 10, _('SKILLS BOOKLET'), 0, 1, 'C')
-    pdf.ln(10)
-
-    # --- User Info ---
-    pdf.set_font('Helvetica', 'B', 12)
-    pdf.cell(0, 10, _('User Information'), 0, 1, 'L')
-    pdf.set_font('Helvetica', '', 10)
-    
-    # Basic user info table
-    with pdf.table(col_widths=(40, 150)) as table:
-        row = table.row()
-        row.cell(_("Full Name"))
-        row.cell(user.full_name)
-    pdf.ln(10)
-
-    # --- Initial Training: Diplomas ---
-    pdf.set_font('Helvetica', 'B', 12)
-    pdf.cell(0, 10, _('Initial Training: Diplomas'), 0, 1, 'L')
-    pdf.set_font('Helvetica', '', 12)
-    with pdf.table(col_widths=(40, 40, 30, 30, 30, 20)) as table:
-        headings = table.row()
-        for heading in (_("Diploma"), _("Establishment"), _("Country"), _("Date of Success"), _("Level of Study"), _("Remarks")):
-            headings.cell(heading)
-        
-        row = table.row()
-        row.cell(user.study_level or "N/A")
-        row.cell("N/A")
-        row.cell("N/A")
-        row.cell("N/A")
-        row.cell("N/A")
-        row.cell("")
-
-    pdf.ln(10)
-
-    # --- Specific training in animal experimentation ---
-    pdf.set_font('Helvetica', 'B', 12)
-    pdf.cell(0, 10, _("Specific training in animal experimentation"), 0, 1, 'L')
-    pdf.set_font('Helvetica', '', 12)
-    with pdf.table(col_widths=(35, 40, 20, 25, 30, 20, 20, 15)) as table:
-        headings = table.row()
-        for heading in (_("Level"), _("Module"), _("Species"), _("Approval No."), _("Establishment"), _("Trainer"), _("Date"), _("days")):
-            headings.cell(heading)
-        
-        for training in initial_trainings:
-            row = table.row()
-            row.cell(training.level.value if training.level else "N/A")
-            row.cell(training.training_type)
-            row.cell("N/A")
-            row.cell("N/A")
-            row.cell("N/A")
-            row.cell("N/A")
-            row.cell(training.training_date.strftime("%d/%m/%Y") if training.training_date else "N/A")
-            row.cell("N/A")
-    pdf.ln(10)
-
-    # --- Continuous Training ---
-    pdf.set_font('Helvetica', 'B', 12)
-    pdf.cell(0, 10, _('Continuous Training'), 0, 1, 'L')
-    pdf.set_font('Helvetica', '', 12)
-    with pdf.table(col_widths=(50, 40, 30, 30, 20, 20)) as table:
-        headings = table.row()
-        for heading in (_("Training Name"), _("Thematic"), _("Type"), _("Location"), _("Date"), _("Duration (d)")):
-            headings.cell(heading)
-        for ct in continuous_trainings:
-            row = table.row()
-            row.cell(ct.event.title)
-            row.cell("N/A")
-            row.cell(ct.event.training_type.value)
-            row.cell(ct.event.location or "N/A")
-            row.cell(ct.event.event_date.strftime("%d/%m/%Y"))
-            row.cell(str(round(ct.validated_hours / 7, 2)) if ct.validated_hours else "N/A") # Assuming 7h/day
-    pdf.ln(10)
-
-    # --- Technical Skills ---
-    pdf.set_font('Helvetica', 'B', 12)
-    pdf.cell(0, 10, _('Technical Skills'), 0, 1, 'L')
-    pdf.set_font('Helvetica', '', 12)
-    with pdf.table(col_widths=(40, 50, 20, 25, 25, 30, 20)) as table:
-        headings = table.row()
-        for heading in (_("Skill Type"), _("Skill"), _("Status"), _("Date"), _("Species"), _("Training Type"), _("Tutor")):
-            headings.cell(heading)
-
-        for comp in competencies:
-            row = table.row()
-            row.cell("N/A")
-            row.cell(comp.skill.name)
-            row.cell(comp.level or "N/A")
-            row.cell(comp.evaluation_date.strftime("%d/%m/%Y"))
-            row.cell(", ".join([s.name for s in comp.species]) if comp.species else "N/A")
-            row.cell("N/A")
-            row.cell(comp.evaluator.full_name if comp.evaluator else (comp.external_evaluator_name or "N/A"))
-
-    pdf_output = pdf.output()
-    pdf_buffer = io.BytesIO(pdf_output)
-    pdf_buffer.seek(0)
-    return pdf_buffer
-
 def get_notification_summary_for_user(user):
-    notifications = []
-    total_count = 0
-
-    # Get dismissed notifications for the current user
-    dismissed_notifications = {d.notification_type for d in user.dismissed_notifications}
-
-    # Admin-focused notifications
-    if user.can('user_manage') and 'user_approvals' not in dismissed_notifications:
-        pending_user_approvals_count = User.query.filter_by(is_approved=False).count()
-        if pending_user_approvals_count > 0:
-            notifications.append({
-                'type': 'user_approvals',
-                'title': 'New User Approvals',
-                'count': pending_user_approvals_count,
-                'url': url_for('admin.pending_users')
-            })
-            total_count += pending_user_approvals_count
-
-    if user.can('training_request_manage') and 'training_requests' not in dismissed_notifications:
-        pending_requests_count = TrainingRequest.query.filter_by(status=TrainingRequestStatus.PENDING).count()
-        if pending_requests_count > 0:
-            notifications.append({
-                'type': 'training_requests',
-                'title': 'Pending Training Requests',
-                'count': pending_requests_count,
-                'url': url_for('admin.list_training_requests')
-            })
-            total_count += pending_requests_count
-
-    if user.can('external_training_validate') and 'external_trainings' not in dismissed_notifications:
-        pending_external_trainings_count = ExternalTraining.query.filter_by(status=ExternalTrainingStatus.PENDING).count()
-        if pending_external_trainings_count > 0:
-            notifications.append({
-                'type': 'external_trainings',
-                'title': 'Pending External Training Validations',
-                'count': pending_external_trainings_count,
-                'url': url_for('admin.validate_external_trainings')
-            })
-            total_count += pending_external_trainings_count
-
-    if user.can('continuous_training_validate') and 'continuous_training_validations' not in dismissed_notifications:
-        pending_continuous_training_validations_count = UserContinuousTraining.query.filter_by(status=UserContinuousTrainingStatus.PENDING).count()
-        if pending_continuous_training_validations_count > 0:
-            notifications.append({
-                'type': 'continuous_training_validations',
-                'title': 'Pending Continuous Training Validations',
-                'count': pending_continuous_training_validations_count,
-                'url': url_for('admin.validate_continuous_trainings')
-            })
-            total_count += pending_continuous_training_validations_count
-
-    if user.can('continuous_training_manage') and 'continuous_event_requests' not in dismissed_notifications:
-        pending_continuous_event_requests_count = ContinuousTrainingEvent.query.filter_by(status=ContinuousTrainingEventStatus.PENDING).count()
-        if pending_continuous_event_requests_count > 0:
-            notifications.append({
-                'type': 'continuous_event_requests',
-                'title': 'Pending Continuous Event Requests',
-                'count': pending_continuous_event_requests_count,
-                'url': url_for('admin.manage_continuous_training_events', status='PENDING')
-            })
-            total_count += pending_continuous_event_requests_count
-
-    if user.can('skill_manage') and 'proposed_skills' not in dismissed_notifications:
-        proposed_skills_count = TrainingRequest.query.filter_by(status=TrainingRequestStatus.PROPOSED_SKILL).count()
-        if proposed_skills_count > 0:
-            notifications.append({
-                'type': 'proposed_skills',
-                'title': 'Proposed Skills',
-                'count': proposed_skills_count,
-                'url': url_for('admin.proposed_skills')
-            })
-            total_count += proposed_skills_count
-
-    if user.can('skill_manage') and 'skills_without_tutors' not in dismissed_notifications:
-        skills_without_tutors_count = Skill.query.filter(~Skill.tutors.any()).count()
-        if skills_without_tutors_count > 0:
-            notifications.append({
-                'type': 'skills_without_tutors',
-                'title': 'Skills Without Tutors',
-                'count': skills_without_tutors_count,
-                'url': url_for('admin.tutor_less_skills_report')
-            })
-            total_count += skills_without_tutors_count
-
-    if user.can('training_session_manage') and 'sessions_to_finalize' not in dismissed_notifications:
-        sessions_to_be_finalized_count = TrainingSession.query.filter(
-            TrainingSession.start_time < datetime.now(timezone.utc),
-            TrainingSession.status != 'Realized'
-        ).count()
-        if sessions_to_be_finalized_count > 0:
-            notifications.append({
-                'type': 'sessions_to_finalize',
-                'title': 'Sessions to Finalize',
-                'count': sessions_to_be_finalized_count,
-                'url': url_for('admin.manage_training_sessions', filter='to_be_finalized')
-            })
-            total_count += sessions_to_be_finalized_count
-
-    # User-focused notifications
-    if user.is_authenticated:
-        # Skills needing recycling
-        if 'skills_needing_recycling' not in dismissed_notifications:
-            skills_needing_recycling_count = 0
-            for comp in user.competencies:
-                if comp.needs_recycling:
-                    skills_needing_recycling_count += 1
-
-            if skills_needing_recycling_count > 0:
-                url = url_for('dashboard.dashboard_home')
-                if user.can('view_reports'):
-                    url = url_for('admin.recycling_report')
-                
-                notifications.append({
-                    'type': 'skills_needing_recycling',
-                    'title': 'Skills Needing Recycling',
-                    'count': skills_needing_recycling_count,
-                    'url': url
-                })
-                total_count += skills_needing_recycling_count
-
-        # Upcoming training sessions
-        if 'upcoming_sessions' not in dismissed_notifications:
-            now = datetime.now(timezone.utc)
-            upcoming_training_sessions_count = TrainingSession.query.join(TrainingSession.attendees).filter(User.id == user.id, TrainingSession.start_time > now).count()
-            if upcoming_training_sessions_count > 0:
-                notifications.append({
-                    'type': 'upcoming_sessions',
-                    'title': 'Upcoming Training Sessions',
-                    'count': upcoming_training_sessions_count,
-                    'url': url_for('dashboard.dashboard_home') # Or a dedicated page for upcoming sessions
-                })
-                total_count += upcoming_training_sessions_count
-
-        # Pending training requests by user
-        if 'user_pending_training_requests' not in dismissed_notifications:
-            user_pending_training_requests_count = TrainingRequest.query.filter_by(requester_id=user.id, status=TrainingRequestStatus.PENDING).count()
-            if user_pending_training_requests_count > 0:
-                notifications.append({
-                    'type': 'user_pending_training_requests',
-                    'title': 'Your Pending Training Requests',
-                    'count': user_pending_training_requests_count,
-                    'url': url_for('dashboard.dashboard_home') # Or a dedicated page for user's requests
-                })
-                total_count += user_pending_training_requests_count
-
-        # Pending external trainings by user
-        if 'user_pending_external_trainings' not in dismissed_notifications:
-            user_pending_external_trainings_count = user.external_trainings.filter_by(status=ExternalTrainingStatus.PENDING).count()
-            if user_pending_external_trainings_count > 0:
-                notifications.append({
-                    'type': 'user_pending_external_trainings',
-                    'title': 'Your Pending External Trainings',
-                    'count': user_pending_external_trainings_count,
-                    'url': url_for('dashboard.dashboard_home') # Or a dedicated page for user's external trainings
-                })
-                total_count += user_pending_external_trainings_count
-
-    return {'total_count': total_count, 'notifications': notifications}
+    return get_notification_summary(user)
 
 @bp.route('/user_profile/<username>')
 @login_required
@@ -418,23 +137,24 @@ def dashboard_home():
 
     # Get upcoming and completed training sessions for the user (from dashboard.user_profile)
     now = datetime.now(timezone.utc)
-    upcoming_training_sessions_by_user = [sess for sess in user.attended_training_sessions if sess.start_time > now]
-    completed_training_sessions_by_user = [sess for sess in user.attended_training_sessions if sess.start_time <= now]
+    upcoming_training_sessions_by_user = [sess for sess in user.attended_training_sessions if _as_utc(sess.start_time) > now]
+    completed_training_sessions_by_user = [sess for sess in user.attended_training_sessions if _as_utc(sess.start_time) <= now]
 
     # Get initial regulatory training
     initial_regulatory_trainings = user.initial_regulatory_trainings
 
     # Get continuous training data (from dashboard.user_profile)
     continuous_trainings_attended = user.continuous_trainings_attended.join(ContinuousTrainingEvent).filter(UserContinuousTraining.status == UserContinuousTrainingStatus.APPROVED).order_by(ContinuousTrainingEvent.event_date.desc()).all()
-    total_continuous_training_hours_6_years = user.total_continuous_training_hours_6_years
-    live_continuous_training_hours_6_years = user.live_continuous_training_hours_6_years
-    online_continuous_training_hours_6_years = user.online_continuous_training_hours_6_years
-    required_continuous_training_hours = user.required_continuous_training_hours
-    is_continuous_training_compliant = user.is_continuous_training_compliant
-    is_live_training_compliant = user.is_live_training_compliant
-    required_live_training_hours = user.required_live_training_hours
-    is_at_risk_next_year = user.is_at_risk_next_year
-    continuous_training_summary_by_year = user.continuous_training_summary_by_year
+    compliance = get_continuous_training_compliance(user)
+    total_continuous_training_hours_6_years = compliance.total_hours
+    live_continuous_training_hours_6_years = compliance.live_hours
+    online_continuous_training_hours_6_years = compliance.online_hours
+    required_continuous_training_hours = compliance.required_hours
+    is_continuous_training_compliant = compliance.is_compliant
+    is_live_training_compliant = compliance.is_live_compliant
+    required_live_training_hours = compliance.required_live_hours
+    is_at_risk_next_year = compliance.is_at_risk_next_year
+    continuous_training_summary_by_year = compliance.hours_by_year
 
     # Existing dashboard counts (ensure they are still correct or remove if redundant)
     user_pending_training_requests_count = len(pending_training_requests_by_user)
@@ -446,12 +166,8 @@ def dashboard_home():
         .order_by(TrainingSession.start_time.asc()) \
         .first()
     user_skills_needing_recycling_count = Competency.query \
-        .join(Skill) \
-        .filter(\
-            Competency.user_id == current_user.id,\
-            Skill.validity_period_months.isnot(None),\
-            func.DATETIME(func.JULIANDAY(Competency.evaluation_date) + (Skill.validity_period_months * 30.44)) < datetime.now(timezone.utc)\
-        ).count()
+        .filter(Competency.user_id == current_user.id, Competency.needs_recycling) \
+        .count()
 
     # Get notification summary for dashboard tabs
     notification_summary = get_notification_summary_for_user(current_user)
@@ -1168,87 +884,6 @@ def search_continuous_training_events():
         })
     return jsonify({'results': results})
 
-def _generate_certificate_pdf_buffer(competency_id):
-    comp = Competency.query.get_or_404(competency_id)
-
-    pdf = FPDF(orientation='L', unit='mm', format='A4') # Landscape A4
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=False, margin=0)
-
-    # Colors
-    blue = (0, 123, 255)
-    dark_gray = (52, 58, 64)
-    green = (40, 167, 69)
-    yellow = (255, 193, 7)
-    light_gray = (108, 117, 125)
-
-    # Border
-    pdf.set_draw_color(*blue)
-    pdf.set_line_width(3)
-    pdf.rect(5, 5, 287, 200) # A4 landscape is 297x210 mm, inner border
-
-    # Certificate Header
-    pdf.set_font('Times', 'B', 36)
-    pdf.set_text_color(*blue)
-    pdf.ln(20) # Move down
-    pdf.cell(0, 15, 'CERTIFICATE OF COMPETENCY', 0, 1, 'C')
-
-    # Subheader
-    pdf.set_font('Times', '', 20)
-    pdf.set_text_color(*dark_gray)
-    pdf.ln(10)
-    pdf.cell(0, 10, 'This certifies that', 0, 1, 'C')
-
-    # Recipient Name
-    pdf.set_font('Times', 'B', 30)
-    pdf.set_text_color(*green)
-    pdf.ln(5)
-    pdf.cell(0, 15, comp.user.full_name, 0, 1, 'C')
-
-    # Skill Introduction
-    pdf.set_font('Times', '', 18)
-    pdf.set_text_color(*dark_gray)
-    pdf.ln(10)
-    pdf.multi_cell(0, 10, 'has successfully demonstrated competency in the skill of', 0, 'C')
-
-    # Skill Name
-    pdf.set_font('Times', 'B', 26)
-    pdf.set_text_color(*yellow)
-    pdf.ln(5)
-    pdf.cell(0, 15, comp.skill.name, 0, 1, 'C')
-
-    # Species (if any)
-    if comp.species:
-        species_names = ", ".join([s.name for s in comp.species])
-        pdf.set_font('Times', '', 14)
-        pdf.set_text_color(*light_gray)
-        pdf.ln(5)
-        pdf.multi_cell(0, 8, f'Associated Species: {species_names}', 0, 'C')
-
-    # Competency Level
-    pdf.set_font('Times', '', 18)
-    pdf.set_text_color(*dark_gray)
-    pdf.ln(5)
-    pdf.multi_cell(0, 10, f'at a {comp.level} level.', 0, 'C')
-
-    # Awarded Date and Evaluator
-    pdf.set_font('Times', '', 14)
-    pdf.set_text_color(*light_gray)
-    pdf.ln(5)
-    pdf.cell(0, 8, f'Awarded on: {comp.evaluation_date.strftime("%B %d, %Y")}', 0, 1, 'C')
-    evaluator_name = "N/A"
-    if comp.external_evaluator_name:
-        evaluator_name = comp.external_evaluator_name
-    elif comp.evaluator:
-        evaluator_name = comp.evaluator.full_name
-    pdf.cell(0, 8, f'Evaluated by: {evaluator_name}', 0, 1, 'C')
-
-    pdf_output = pdf.output()
-    pdf_buffer = io.BytesIO(pdf_output)
-    pdf_buffer.seek(0)
-    return pdf_buffer
-
-
 @bp.route('/competency/<int:competency_id>/certificate.pdf')
 @login_required
 def generate_certificate(competency_id):
@@ -1256,11 +891,14 @@ def generate_certificate(competency_id):
     if comp.user_id != current_user.id and not current_user.can('view_any_certificate'):
         abort(403)
 
-    pdf_buffer = _generate_certificate_pdf_buffer(competency_id)
-    
-    return send_file(pdf_buffer, as_attachment=True,
-                     download_name=f"certificate_{comp.user.full_name.replace(' ', '_')}_{comp.skill.name.replace(' ', '_')}.pdf",
-                     mimetype='application/pdf')
+    # Rendered once per content; unchanged certificates answer 304 to conditional requests
+    path, name = ensure_certificate(comp)
+    response = send_file(path, as_attachment=True,
+                         download_name=certificate_filename(certificate_data(comp)),
+                         mimetype='application/pdf', etag=name[:-len('.pdf')], conditional=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 
 @bp.route('/<int:user_id>/booklet.zip')
@@ -1269,66 +907,59 @@ def generate_user_booklet_zip(user_id):
     if user_id != current_user.id and not current_user.can('view_any_booklet'):
         abort(403)
     user = User.query.get_or_404(user_id)
-    
-    # --- Data Fetching ---
-    competencies = user.competencies
-    initial_trainings = user.initial_regulatory_trainings
-    continuous_trainings = user.continuous_trainings_attended.join(ContinuousTrainingEvent).filter(
-        UserContinuousTraining.status == UserContinuousTrainingStatus.APPROVED
-    ).order_by(ContinuousTrainingEvent.event_date.desc()).all()
-    external_trainings = user.external_trainings.filter_by(status=ExternalTrainingStatus.APPROVED).all()
-
-    # --- PDF Generation (captured in BytesIO) ---
-    pdf_buffer = _generate_booklet_pdf(user)
-
-    # --- ZIP File Creation ---
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        # Add the generated PDF booklet
-        zf.writestr(f"booklet_{user.full_name.replace(' ', '_')}.pdf", pdf_buffer.read())
-
-        # Add Initial Regulatory Training attachments
-        for training in initial_trainings:
-            if training.attachment_path:
-                attachment_full_path = os.path.join(current_app.root_path, 'static', training.attachment_path)
-                if os.path.exists(attachment_full_path):
-                    zf.write(attachment_full_path, f"Initial_Training/{training.training_type}_{os.path.basename(training.attachment_path)}")
-
-        # Add Continuous Training attachments
-        for ct in continuous_trainings:
-            if ct.attendance_attachment_path:
-                attachment_full_path = os.path.join(current_app.root_path, 'static', ct.attendance_attachment_path)
-                if os.path.exists(attachment_full_path):
-                    zf.write(attachment_full_path, f"Continuous_Training/{os.path.basename(ct.attendance_attachment_path)}")
-            if ct.event.attachment_path: # Event-level attachment
-                attachment_full_path = os.path.join(current_app.root_path, 'static', ct.event.attachment_path)
-                if os.path.exists(attachment_full_path):
-                    zf.write(attachment_full_path, f"Continuous_Training/Event_Attachments/{os.path.basename(ct.event.attachment_path)}")
-
-        # Add External Training attachments
-        for ext_training in external_trainings:
-            if ext_training.attachment_path:
-                attachment_full_path = os.path.join(current_app.root_path, 'static', ext_training.attachment_path)
-                if os.path.exists(attachment_full_path):
-                    zf.write(attachment_full_path, f"External_Training/{os.path.basename(ext_training.attachment_path)}")
-
-        # Add Competency Certificates (if any)
-        for comp in competencies:
-            try:
-                certificate_pdf_buffer = _generate_certificate_pdf_buffer(comp.id)
-                if certificate_pdf_buffer:
-                    zf.writestr(f"Skills_Certificates/certificate_{comp.user.full_name.replace(' ', '_')}_{comp.skill.name.replace(' ', '_')}.pdf", certificate_pdf_buffer.read())
-            except Exception as e:
-                current_app.logger.error(f"Error generating certificate for competency {comp.id}: {e}")
-
-
-    zip_buffer.seek(0)
-    generation_date_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    return send_file(zip_buffer, as_attachment=True,
-                     download_name=f"booklet_{user.full_name.replace(' ', '_')}_{generation_date_str}.zip",
+
+    # Served straight from the cache when the records are unchanged, otherwise
+    # built in the background while the page polls the job status
+    job = enqueue_booklet_job(user, current_user)
+    if job.status == BookletJobStatus.DONE:
+        return _send_booklet(job)
+    return render_template('dashboard/booklet_job.html', title='Booklet', job=job, user=user,
+                           status_url=url_for('dashboard.booklet_job_status', job_id=job.id))
+
+
+def _get_booklet_job_or_404(job_id):
+    job = BookletJob.query.get_or_404(job_id)
+    if current_user.id not in (job.user_id, job.requested_by_id) and \
+            not current_user.can('view_any_booklet'):
+        abort(404)
+    return job
+
+
+def _send_booklet(job):
+    path = artifact_path(job.content_hash)
+    if not os.path.exists(path):
+        # Evicted from the cache: build it again
+        return redirect(url_for('dashboard.generate_user_booklet_zip', user_id=job.user_id))
+    generation_date_str = (job.finished_at or datetime.now(timezone.utc)).strftime("%Y-%m-%d")
+    return send_file(path, as_attachment=True,
+                     download_name=f"booklet_{job.user.full_name.replace(' ', '_')}_{generation_date_str}.zip",
                      mimetype='application/zip')
 
 
+@bp.route('/booklet_jobs/<job_id>')
+@login_required
+def booklet_job_status(job_id):
+    job = _get_booklet_job_or_404(job_id)
+    status = refresh_job_status(job)
+    return jsonify({
+        'id': job.id,
+        'user_id': job.user_id,
+        'status': status.name,
+        'error': job.error,
+        'download_url': url_for('dashboard.download_booklet_job', job_id=job.id)
+                        if status == BookletJobStatus.DONE else None,
+    })
+
+
+@bp.route('/booklet_jobs/<job_id>/download')
+@login_required
+def download_booklet_job(job_id):
+    job = _get_booklet_job_or_404(job_id)
+    if refresh_job_status(job) != BookletJobStatus.DONE:
+        abort(404)
+    return _send_booklet(job)
+
+
 @bp.route('/training_requests/delete/<int:request_id>', methods=['POST'])
 @login_required
 def delete_training_request(request_id):
@@ -0,0 +1,183 @@
+"""
+Idempotent database bootstrap.
+
+Bootstrapping creates the tables of an empty database, reconciles the default
+roles and permissions (``DEFAULT_PERMISSIONS`` and ``DEFAULT_ROLES`` of
+app.models), fills the derived columns that migrations add empty (competency
+recycling dates, API key hashes) and creates the first admin from ADMIN_EMAIL
+and ADMIN_PASSWORD, in one transaction. It then records its fingerprint, a digest of the model
+schema and of the default roles and permissions, in the ``bootstrap`` row of
+CacheVersion. A worker whose code matches the recorded fingerprint skips the
+whole thing with a single primary key lookup.
+
+Workers starting together with new code serialize on a database advisory lock
+(PostgreSQL and MySQL/MariaDB; SQLite serializes writers itself), and those
+that waited find the fingerprint applied once they get the lock. With
+``BOOTSTRAP_ON_START`` off, workers do not even look the fingerprint up and
+``flask bootstrap run`` is left to the deployment.
+"""
+import hashlib
+import json
+import time
+import zlib
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.models import (
+    CacheVersion, DEFAULT_PERMISSIONS, DEFAULT_ROLES, User, backfill_api_key_hashes,
+    init_roles_and_permissions, rebuild_competency_recycling_dates
+)
+
+BOOTSTRAP_VERSION = 'bootstrap'
+LOCK_NAME = 'training_manager.bootstrap'
+
+# Seconds between two attempts to take the PostgreSQL advisory lock
+_LOCK_POLL_INTERVAL = 0.2
+
+
+class BootstrapResult:
+    """
+    Outcome of a bootstrap run.
+    """
+    __slots__ = ('fingerprint', 'applied', 'tables_created', 'changes', 'recycling_dates',
+                 'api_key_hashes', 'admin_created')
+
+    def __init__(self, fingerprint, applied=False, tables_created=False, changes=0,
+                 admin_created=False):
+        self.fingerprint = fingerprint
+        self.applied = applied
+        self.tables_created = tables_created
+        self.changes = changes
+        self.recycling_dates = 0
+        self.api_key_hashes = 0
+        self.admin_created = admin_created
+
+
+def bootstrap_fingerprint():
+    """
+    Returns the fingerprint of the schema and default data of this code.
+    """
+    tables = {table.name: sorted(column.name for column in table.columns)
+              for table in db.metadata.sorted_tables}
+    payload = json.dumps({'tables': tables, 'permissions': DEFAULT_PERMISSIONS,
+                          'roles': DEFAULT_ROLES}, sort_keys=True)
+    # CacheVersion.version holds 32 characters
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def applied_fingerprint():
+    """
+    Returns the fingerprint of the last applied bootstrap, or None when the
+    database was never bootstrapped (or has no tables yet).
+    """
+    try:
+        return db.session.query(CacheVersion.version).filter_by(name=BOOTSTRAP_VERSION).scalar()
+    except SQLAlchemyError:
+        db.session.rollback()
+        return None
+
+
+@contextmanager
+def advisory_lock(name, timeout=60):
+    """
+    Holds a database-wide advisory lock named ``name`` inside the block, on a
+    connection of its own so that commits in the block do not release it.
+
+    Raises TimeoutError when the lock is not acquired within ``timeout``
+    seconds. A no-op on SQLite.
+    """
+    dialect = db.engine.dialect.name
+    if dialect not in ('postgresql', 'mysql', 'mariadb'):
+        yield
+        return
+    with db.engine.connect() as connection:
+        if dialect == 'postgresql':
+            key = zlib.crc32(name.encode('utf-8'))
+            deadline = time.monotonic() + timeout
+            while not connection.execute(text('SELECT pg_try_advisory_lock(:key)'),
+                                         {'key': key}).scalar():
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Advisory lock {name} not acquired in {timeout}s")
+                time.sleep(_LOCK_POLL_INTERVAL)
+            release = text('SELECT pg_advisory_unlock(:key)'), {'key': key}
+        else:
+            if connection.execute(text('SELECT GET_LOCK(:name, :timeout)'),
+                                  {'name': name, 'timeout': timeout}).scalar() != 1:
+                raise TimeoutError(f"Advisory lock {name} not acquired in {timeout}s")
+            release = text('SELECT RELEASE_LOCK(:name)'), {'name': name}
+        connection.commit()
+        try:
+            yield
+        finally:
+            connection.execute(*release)
+            connection.commit()
+
+
+def _create_first_admin():
+    email = current_app.config.get('ADMIN_EMAIL')
+    password = current_app.config.get('ADMIN_PASSWORD')
+    if db.session.query(User.id).first() is not None:
+        return False
+    if not email or not password:
+        current_app.logger.warning(
+            "Admin user not created. ADMIN_EMAIL and ADMIN_PASSWORD not set.")
+        return False
+    User.create_admin_user(email, password, commit=False)
+    return True
+
+
+def _record_fingerprint(fingerprint):
+    cache_version = db.session.get(CacheVersion, BOOTSTRAP_VERSION)
+    if cache_version is None:
+        db.session.add(CacheVersion(name=BOOTSTRAP_VERSION, version=fingerprint))
+    else:
+        cache_version.version = fingerprint
+
+
+def run_bootstrap(force=False):
+    """
+    Bootstraps the database unless it already matches this code (or ``force``
+    is set). Returns a BootstrapResult.
+
+    Ends the current transaction of the session.
+    """
+    fingerprint = bootstrap_fingerprint()
+    if not force and applied_fingerprint() == fingerprint:
+        return BootstrapResult(fingerprint)
+
+    with advisory_lock(LOCK_NAME, timeout=current_app.config.get('BOOTSTRAP_LOCK_TIMEOUT') or 60):
+        # A new transaction, which sees the fingerprint committed by a worker
+        # that held the lock before us
+        db.session.rollback()
+        if not force and applied_fingerprint() == fingerprint:
+            return BootstrapResult(fingerprint)
+
+        result = BootstrapResult(fingerprint, applied=True)
+        try:
+            if not inspect(db.engine).has_table(User.__tablename__):
+                # Databases with tables are left to the migrations
+                db.create_all()
+                result.tables_created = True
+            result.changes = init_roles_and_permissions(commit=False)
+            # Rows written before these columns existed, which the SQL filters
+            # on recycling dates and the API key lookup would otherwise miss
+            result.recycling_dates = rebuild_competency_recycling_dates(missing_only=True,
+                                                                        commit=False)
+            result.api_key_hashes = backfill_api_key_hashes(commit=False)
+            result.admin_created = _create_first_admin()
+            _record_fingerprint(fingerprint)
+            db.session.commit()
+        except BaseException:
+            db.session.rollback()
+            raise
+
+    current_app.logger.info(
+        f"Database bootstrapped ({fingerprint}): tables created: {result.tables_created}, "
+        f"role and permission changes: {result.changes}, recycling dates filled: "
+        f"{result.recycling_dates}, API key hashes filled: {result.api_key_hashes}, "
+        f"admin created: {result.admin_created}")
+    return result
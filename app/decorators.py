@@ -91,7 +91,7 @@ def token_required(f):
         if not token:
             return jsonify({'message': 'Token is missing!'}), 401
 
-        user = User.query.filter_by(api_key=token).first()
+        user = User.find_by_api_key(token)
 
         if not user:
             return jsonify({'message': 'Token is invalid!'}), 401
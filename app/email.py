@@ -1,29 +1,35 @@
 """
-This module provides functions for sending emails asynchronously.
+This module provides functions for sending emails through the mail outbox.
 """
-import threading
 from flask import current_app, render_template
-from flask_mail import Message
-from app import mail
+from markupsafe import escape
+from werkzeug.utils import secure_filename
 
+from app import db
+from app.calendars import Calendar, Event
+from app.mail_outbox import dispatch, queue_attachment, queue_message
 
-def send_async_email(app, msg):
+# Stands for the recipient's name in templates rendered once for many recipients
+RECIPIENT_NAME_PLACEHOLDER = '\x1arecipient_name\x1a'
+
+
+class _Recipient:
     """
-    Sends an email asynchronously within the Flask application context.
+    Template stand-in for a user, rendering as the recipient name placeholder.
     """
-    with app.app_context():
-        mail.send(msg)
+    full_name = RECIPIENT_NAME_PLACEHOLDER
 
 
 def send_email(subject, sender, recipients, text_body, html_body):
     """
-    Composes and sends an email using Flask-Mail.
+    Queues an email in the outbox and starts its delivery.
+
+    The message is committed before delivery starts, so it survives a failing
+    SMTP server or an exiting worker.
     """
-    msg = Message(subject, sender=sender, recipients=recipients)
-    msg.body = text_body
-    msg.html = html_body
-    # This is a common and accepted pattern in Flask to get the actual app object.
-    threading.Thread(target=send_async_email, args=(current_app._get_current_object(), msg)).start()  # pylint: disable=W0212
+    queue_message(subject, sender, recipients, text_body, html_body)
+    db.session.commit()
+    dispatch()
 
 def send_password_reset_email(user):
     token = user.get_reset_password_token()
@@ -34,3 +40,52 @@ def send_password_reset_email(user):
                                          user=user, token=token),
                html_body=render_template('email/reset_password.html',
                                          user=user, token=token))
+
+
+def session_calendar(session):
+    """
+    Returns the iCalendar invitation of a training session.
+    """
+    calendar = Calendar()
+    event = Event()
+    event.name = session.title
+    event.begin = session.start_time
+    event.end = session.end_time
+    event.location = session.location
+    event.description = f"Training Session for {', '.join([s.name for s in session.skills_covered])}"
+    calendar.events.add(event)
+    return calendar.serialize()
+
+
+def send_session_reminders(session):
+    """
+    Queues a reminder with the calendar invitation for every attendee of a
+    training session and starts their delivery.
+
+    The invitation is stored once and shared by every message, and both
+    templates are rendered once, the recipient name being filled in per
+    attendee. Returns the number of queued messages.
+    """
+    attachment = queue_attachment(
+        secure_filename(f"{session.title}_{session.start_time.strftime('%Y%m%d%H%M')}.ics"),
+        'text/calendar', session_calendar(session))
+    text_body = render_template('email/training_session_reminder.txt', user=_Recipient,
+                                session=session)
+    html_body = render_template('email/training_session_reminder.html', user=_Recipient,
+                                session=session)
+    subject = f"Training Session Reminder: {session.title}"
+    sender = (current_app.config['ADMINS'] or [current_app.config['MAIL_USERNAME']])[0]
+
+    count = 0
+    for attendee in session.attendees:
+        if not attendee.email:
+            continue
+        queue_message(subject, sender, [attendee.email],
+                      text_body.replace(RECIPIENT_NAME_PLACEHOLDER, attendee.full_name or ''),
+                      html_body.replace(RECIPIENT_NAME_PLACEHOLDER,
+                                        str(escape(attendee.full_name or ''))),
+                      attachment=attachment)
+        count += 1
+    db.session.commit()
+    dispatch()
+    return count
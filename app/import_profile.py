@@ -0,0 +1,89 @@
+"""
+Import-time profile of the application start-up.
+
+``profile_imports`` creates the app in a fresh interpreter run with
+``python -X importtime`` and parses its report; ``summarize_imports`` ranks
+packages by the time spent importing their own modules and modules by their
+cumulative import time (their own plus that of the imports they trigger).
+``flask diagnostics imports`` prints the summary, to spot a dependency that
+slipped back into the start-up path of the workers.
+"""
+import os
+import subprocess
+import sys
+
+# Statement profiled by default: what a worker imports before serving
+CREATE_APP_STATEMENT = 'from app import create_app; create_app()'
+
+_IMPORTTIME_PREFIX = 'import time:'
+
+
+class ImportTiming:
+    """
+    One module of an ``-X importtime`` report, times in microseconds.
+    """
+    __slots__ = ('module', 'self_us', 'cumulative_us', 'depth')
+
+    def __init__(self, module, self_us, cumulative_us, depth):
+        self.module = module
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+
+def parse_importtime(lines):
+    """
+    Returns the ImportTiming of every module in ``-X importtime`` output lines,
+    skipping the header and any line the interpreter did not write.
+    """
+    timings = []
+    for line in lines:
+        if not line.startswith(_IMPORTTIME_PREFIX):
+            continue
+        fields = line[len(_IMPORTTIME_PREFIX):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        module = name.lstrip()
+        timings.append(ImportTiming(module, int(fields[0]), int(fields[1]),
+                                    (len(name) - len(module) - 1) // 2))
+    return timings
+
+
+def summarize_imports(timings, limit=15):
+    """
+    Returns {'total_ms', 'modules', 'packages': [(package, ms)],
+    'slowest': [(module, cumulative ms)]}, ``limit`` entries per list.
+    """
+    packages = {}
+    for timing in timings:
+        package = timing.module.split('.')[0]
+        packages[package] = packages.get(package, 0) + timing.self_us
+    slowest = sorted(timings, key=lambda timing: timing.cumulative_us, reverse=True)
+    return {
+        'total_ms': round(sum(timing.self_us for timing in timings) / 1000, 1),
+        'modules': len(timings),
+        'packages': [(package, round(us / 1000, 1)) for package, us in
+                     sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]],
+        'slowest': [(timing.module, round(timing.cumulative_us / 1000, 1))
+                    for timing in slowest[:limit]],
+    }
+
+
+def profile_imports(statement=CREATE_APP_STATEMENT, cwd=None):
+    """
+    Runs ``statement`` in a fresh interpreter with ``-X importtime`` and
+    returns its ImportTiming list.
+
+    The app is created without bootstrapping the database or writing metrics.
+    Raises RuntimeError when the statement fails.
+    """
+    env = dict(os.environ, BOOTSTRAP_ON_START='False', METRICS_ENABLED='False')
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                               capture_output=True, text=True, env=env, check=False,
+                               cwd=cwd or os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if completed.returncode:
+        errors = [line for line in completed.stderr.splitlines()
+                  if not line.startswith(_IMPORTTIME_PREFIX)]
+        raise RuntimeError('\n'.join(errors[-20:]) or f'exit status {completed.returncode}')
+    return parse_importtime(completed.stderr.splitlines())
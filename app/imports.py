@@ -0,0 +1,735 @@
+"""
+Bulk, set-based import engines for the admin spreadsheets and for practice
+declarations pushed by external systems.
+
+Existing records are pre-loaded with one query per lookup table, password
+hashing is spread over a process pool and rows are written with bulk
+statements in chunks. Each chunk is committed on its own; when a chunk fails
+it is replayed row by row so that only the offending rows are rejected and
+earlier good rows are kept. Every input row gets an ``ImportRowResult`` which
+is written back to a downloadable result workbook.
+"""
+import hashlib
+import multiprocessing
+import os
+import re
+import secrets
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.competency_matrix import invalidate_competency_matrices
+from app.models import (
+    Competency, Complexity, Skill, SkillPracticeEvent, Species, Team, User,
+    refresh_competency_recycling_dates, skill_practice_event_skills, skill_species_association,
+    user_team_leadership, user_team_membership
+)
+from app.notifications import invalidate_global_counters
+from app.request_board import invalidate_request_board
+from app.spreadsheets import Workbook, load_workbook
+
+# Rows written (and committed) per bulk statement
+IMPORT_CHUNK_SIZE = 500
+# Below this many passwords, hashing in-process is faster than starting a pool
+PARALLEL_HASH_THRESHOLD = 32
+# Result workbooks older than this (in seconds) are deleted when a new one is saved
+IMPORT_REPORT_MAX_AGE = 24 * 60 * 60
+
+USER_IMPORT_COLUMNS = ['full_name', 'email', 'password', 'is_admin', 'is_team_lead', 'team_name']
+SKILL_IMPORT_COLUMNS = [
+    'name', 'description', 'validity_period_months', 'complexity', 'reference_urls_text',
+    'training_videos_urls_text', 'potential_external_tutors_text', 'species_names'
+]
+# Skill columns written by the skill import, in SKILL_IMPORT_COLUMNS order
+SKILL_FIELDS = SKILL_IMPORT_COLUMNS[1:-1]
+RESULT_COLUMNS = ['row', 'status', 'message']
+
+_REPORT_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ImportRowResult:
+    """
+    Outcome of importing a single spreadsheet row.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    UNCHANGED = 'unchanged'
+    SKIPPED = 'skipped'
+    ERROR = 'error'
+
+    # Reason codes of rejected rows callers branch on
+    INVALID = 'invalid'
+    USER_NOT_FOUND = 'user_not_found'
+
+    __slots__ = ('row_number', 'values', 'status', 'message', 'reason')
+
+    def __init__(self, row_number, values, status=None, message=''):
+        self.row_number = row_number
+        self.values = values
+        self.status = status
+        self.message = message
+        self.reason = None
+
+    def fail(self, message, reason=INVALID):
+        """
+        Marks the row as rejected with ``message`` and a ``reason`` code.
+        """
+        self.status = self.ERROR
+        self.message = message
+        self.reason = reason
+
+    def __repr__(self):
+        return f'<ImportRowResult row:{self.row_number} {self.status}>'
+
+
+def read_rows(fileobj, width):
+    """
+    Returns ``(row_number, values)`` for every non-empty data row of the active sheet.
+
+    ``values`` is padded or truncated to ``width`` cells.
+    """
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = []
+        for row_number, row in enumerate(workbook.active.iter_rows(min_row=2, values_only=True),
+                                         start=2):
+            if not row or all(value in (None, '') for value in row):
+                continue
+            values = tuple(row[:width])
+            rows.append((row_number, values + (None,) * (width - len(values))))
+        return rows
+    finally:
+        workbook.close()
+
+
+def summarize(results):
+    """
+    Returns a dict mapping each status to its number of rows.
+    """
+    counts = {status: 0 for status in (ImportRowResult.CREATED, ImportRowResult.UPDATED,
+                                       ImportRowResult.UNCHANGED, ImportRowResult.SKIPPED,
+                                       ImportRowResult.ERROR)}
+    for result in results:
+        counts[result.status] += 1
+    return counts
+
+
+def _clean(value):
+    return '' if value is None else str(value).strip()
+
+
+def _is_true(value):
+    return str(value).strip().lower() == 'true'
+
+
+def _text(value):
+    return None if value is None or str(value).strip() == '' else str(value)
+
+
+def _too_long(column, value):
+    return column.type.length is not None and len(value) > column.type.length
+
+
+def hash_passwords(passwords, max_workers=None):
+    """
+    Hashes ``passwords`` with ``generate_password_hash``, in parallel for large batches.
+
+    Hashing is CPU bound, so a process pool (spawned, not forked, to keep the
+    parent's database connections out of the workers) is used once there are
+    enough passwords to amortize its start-up. Falls back to hashing serially
+    if the pool cannot be started.
+    """
+    passwords = list(passwords)
+    max_workers = max_workers or current_app.config.get('IMPORT_HASH_WORKERS') or os.cpu_count() or 1
+    if len(passwords) < PARALLEL_HASH_THRESHOLD or max_workers <= 1:
+        return [generate_password_hash(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (max_workers * 4))
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            return list(executor.map(generate_password_hash, passwords, chunksize=chunksize))
+    except (OSError, BrokenProcessPool) as e:
+        current_app.logger.warning(f"Parallel password hashing unavailable, hashing serially: {e}")
+        return [generate_password_hash(password) for password in passwords]
+
+
+def _write_in_chunks(items, write_chunk, chunk_size, on_error=None):
+    """
+    Writes ``items`` with ``write_chunk`` and commits each chunk separately.
+
+    A chunk that fails is rolled back and replayed one item at a time, so a bad
+    row is reported on its own result without losing the other rows. An item
+    that still fails is passed with the error to ``on_error``, when given, and
+    marked as a database error unless it returns True. Returns the items that
+    were committed.
+    """
+    written = []
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        try:
+            write_chunk(chunk)
+            db.session.commit()
+            written.extend(chunk)
+            continue
+        except SQLAlchemyError:
+            db.session.rollback()
+        for item in chunk:
+            try:
+                write_chunk([item])
+                db.session.commit()
+                written.append(item)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                if on_error is None or not on_error(item, e):
+                    item['result'].fail(f"Database error: {getattr(e, 'orig', e)}")
+    return written
+
+
+def _new_api_key_columns():
+    api_key = secrets.token_hex(32)
+    return {'api_key': api_key, 'api_key_hash': User.hash_api_key(api_key)}
+
+
+def _write_user_chunk(items):
+    """
+    Inserts or updates the users of ``items`` and rewrites their team memberships.
+
+    Missing teams are created in the chunk's transaction, so a chunk that
+    fails leaves no team behind.
+    """
+    team_ids = _resolve_team_ids(sorted({item['team_name'] for item in items
+                                         if item['team_name']}))
+    for item in items:
+        item['team_id'] = team_ids.get(item['team_name'])
+    new_items = [item for item in items if item['user_id'] is None]
+    existing_items = [item for item in items if item['user_id'] is not None]
+    user_ids = {item['email']: item['user_id'] for item in existing_items}
+
+    if new_items:
+        db.session.execute(insert(User), [
+            {'full_name': item['full_name'], 'email': item['email'],
+             'password_hash': item['password_hash'], 'is_admin': item['is_admin'],
+             **_new_api_key_columns()}
+            for item in new_items
+        ])
+        user_ids.update(db.session.execute(
+            select(User.email, User.id).where(User.email.in_([item['email'] for item in new_items]))
+        ).all())
+
+    if existing_items:
+        mappings = []
+        for item in existing_items:
+            mapping = {'id': item['user_id'], 'full_name': item['full_name'],
+                       'is_admin': item['is_admin']}
+            if item['password_hash']:
+                mapping['password_hash'] = item['password_hash']
+            if item['needs_api_key']:
+                mapping.update(_new_api_key_columns())
+            mappings.append(mapping)
+        db.session.execute(update(User), mappings)
+        existing_ids = [item['user_id'] for item in existing_items]
+        db.session.execute(delete(user_team_membership)
+                           .where(user_team_membership.c.user_id.in_(existing_ids)))
+        db.session.execute(delete(user_team_leadership)
+                           .where(user_team_leadership.c.user_id.in_(existing_ids)))
+
+    memberships = [{'user_id': user_ids[item['email']], 'team_id': item['team_id']}
+                   for item in items if item['team_id'] is not None]
+    if memberships:
+        db.session.execute(insert(user_team_membership), memberships)
+    leaderships = [{'user_id': user_ids[item['email']], 'team_id': item['team_id']}
+                   for item in items if item['team_id'] is not None and item['is_team_lead']]
+    if leaderships:
+        db.session.execute(insert(user_team_leadership), leaderships)
+
+
+def _resolve_team_ids(names):
+    """
+    Returns a dict mapping each team name to its id, creating missing teams in bulk.
+
+    New teams are not committed: they belong to the caller's transaction.
+    """
+    if not names:
+        return {}
+    team_ids = dict(db.session.execute(select(Team.name, Team.id).where(Team.name.in_(names))).all())
+    missing = [name for name in names if name not in team_ids]
+    if missing:
+        db.session.execute(insert(Team), [{'name': name} for name in missing])
+        team_ids.update(db.session.execute(
+            select(Team.name, Team.id).where(Team.name.in_(missing))).all())
+    return team_ids
+
+
+def import_users(rows, update_existing=False, chunk_size=None):
+    """
+    Imports users from ``(row_number, values)`` rows laid out as ``USER_IMPORT_COLUMNS``.
+
+    New users are created (password required); existing users, matched by
+    email, are updated when ``update_existing`` is set and skipped otherwise.
+    Updating a user replaces their team memberships with the row's team.
+    Returns one ``ImportRowResult`` per row, in input order.
+    """
+    chunk_size = chunk_size or current_app.config.get('IMPORT_CHUNK_SIZE', IMPORT_CHUNK_SIZE)
+    results = []
+    candidates = []
+    first_row_by_email = {}
+
+    for row_number, values in rows:
+        result = ImportRowResult(row_number, values)
+        results.append(result)
+        full_name, email, password, is_admin, is_team_lead, team_name = \
+            (_clean(value) for value in values)
+        if not email or '@' not in email:
+            result.fail("Missing or invalid email.")
+        elif email in first_row_by_email:
+            result.fail(f"Duplicate email (already on row {first_row_by_email[email]}).")
+        elif not full_name:
+            result.fail("Missing full name.")
+        elif _too_long(User.email, email) or _too_long(User.full_name, full_name):
+            result.fail("Full name or email is too long.")
+        elif team_name and _too_long(Team.name, team_name):
+            result.fail("Team name is too long.")
+        else:
+            first_row_by_email[email] = row_number
+            candidates.append({
+                'result': result, 'full_name': full_name, 'email': email, 'password': password,
+                'is_admin': _is_true(is_admin), 'is_team_lead': _is_true(is_team_lead),
+                'team_name': team_name or None, 'user_id': None, 'needs_api_key': False,
+            })
+
+    # One query for every user already in the database
+    existing = {}
+    emails = [item['email'] for item in candidates]
+    for start in range(0, len(emails), chunk_size):
+        existing.update((email, (user_id, api_key is None)) for email, user_id, api_key in
+                        db.session.execute(select(User.email, User.id, User.api_key)
+                                           .where(User.email.in_(emails[start:start + chunk_size]))))
+
+    pending = []
+    for item in candidates:
+        if item['email'] in existing:
+            if not update_existing:
+                item['result'].status = ImportRowResult.SKIPPED
+                item['result'].message = "User already exists."
+                continue
+            item['user_id'], item['needs_api_key'] = existing[item['email']]
+        elif not item['password']:
+            item['result'].fail("Password is required for new users.")
+            continue
+        pending.append(item)
+
+    to_hash = [item for item in pending if item['password']]
+    for item, password_hash in zip(to_hash, hash_passwords(item['password'] for item in to_hash)):
+        item['password_hash'] = password_hash
+    for item in pending:
+        item.setdefault('password_hash', None)
+
+    written = _write_in_chunks(pending, _write_user_chunk, chunk_size)
+    for item in written:
+        if item['user_id'] is None:
+            item['result'].status = ImportRowResult.CREATED
+        else:
+            item['result'].status = ImportRowResult.UPDATED
+    if written:
+        # Bulk statements bypass the flush listeners
+        invalidate_global_counters()
+        db.session.commit()
+    return results
+
+
+def _parse_complexity(value):
+    """
+    Returns the ``Complexity`` named or labelled ``value`` (SIMPLE when blank).
+    """
+    value = _clean(value)
+    if not value:
+        return Complexity.SIMPLE
+    for complexity in Complexity:
+        # Translated (lazy) labels are matched through their name only
+        if value.upper() == complexity.name or \
+                (isinstance(complexity.value, str) and value == complexity.value):
+            return complexity
+    raise ValueError(f"Unknown complexity '{value}'.")
+
+
+def _resolve_species_ids(names, dry_run=False):
+    """
+    Returns ``(species ids by name, names of the species to create)``.
+
+    Missing species are created in one statement unless ``dry_run`` is set.
+    They are not committed: they belong to the caller's transaction.
+    """
+    if not names:
+        return {}, []
+    species_ids = dict(db.session.execute(
+        select(Species.name, Species.id).where(Species.name.in_(names))).all())
+    missing = [name for name in names if name not in species_ids]
+    if missing and not dry_run:
+        db.session.execute(insert(Species), [{'name': name} for name in missing])
+        species_ids.update(db.session.execute(
+            select(Species.name, Species.id).where(Species.name.in_(missing))).all())
+    return species_ids, missing
+
+
+def _write_skill_chunk(items):
+    """
+    Inserts or updates the skills of ``items`` and rewrites their species links.
+
+    Missing species are created in the chunk's transaction, so a chunk that
+    fails leaves no species behind.
+    """
+    relinked_items = [item for item in items if item['skill_id'] is None or item['species_changed']]
+    species_ids, _ = _resolve_species_ids(sorted({species_name for item in relinked_items
+                                                  for species_name in item['species_names']}))
+    new_items = [item for item in items if item['skill_id'] is None]
+    existing_items = [item for item in items if item['skill_id'] is not None]
+    skill_ids = {item['name']: item['skill_id'] for item in existing_items}
+
+    if new_items:
+        db.session.execute(insert(Skill), [{'name': item['name'], **item['fields']}
+                                           for item in new_items])
+        skill_ids.update(db.session.execute(
+            select(Skill.name, Skill.id).where(Skill.name.in_([item['name'] for item in new_items]))
+        ).all())
+
+    changed_fields = [item for item in existing_items if item['changed_fields']]
+    if changed_fields:
+        db.session.execute(update(Skill), [{'id': item['skill_id'], **item['fields']}
+                                           for item in changed_fields])
+    relinked = [item['skill_id'] for item in existing_items if item['species_changed']]
+    if relinked:
+        db.session.execute(delete(skill_species_association)
+                           .where(skill_species_association.c.skill_id.in_(relinked)))
+
+    links = [{'skill_id': skill_ids[item['name']], 'species_id': species_ids[species_name]}
+             for item in relinked_items for species_name in item['species_names']]
+    if links:
+        db.session.execute(insert(skill_species_association), links)
+
+    # Bulk statements bypass the flush listener keeping recycling dates in sync
+    revalidated = [item['skill_id'] for item in existing_items
+                   if 'validity_period_months' in item['changed_fields']]
+    if revalidated:
+        refresh_competency_recycling_dates(
+            db.session, Competency.query.filter(Competency.skill_id.in_(revalidated)).all())
+
+
+def import_skills(rows, update_existing=False, dry_run=False, chunk_size=None):
+    """
+    Imports skills from ``(row_number, values)`` rows laid out as ``SKILL_IMPORT_COLUMNS``.
+
+    Skills are matched by name; existing skills are updated when
+    ``update_existing`` is set (rows identical to the database are reported as
+    unchanged and not written) and skipped otherwise. Unknown species are
+    created. With ``dry_run`` nothing is written: the results describe what
+    the import would do. Returns ``(results, names of the new species)``.
+    """
+    chunk_size = chunk_size or current_app.config.get('IMPORT_CHUNK_SIZE', IMPORT_CHUNK_SIZE)
+    results = []
+    candidates = []
+    first_row_by_name = {}
+
+    for row_number, values in rows:
+        result = ImportRowResult(row_number, values)
+        results.append(result)
+        name = _clean(values[0])
+        species_names = list(dict.fromkeys(
+            species_name for species_name in (part.strip() for part in _clean(values[7]).split(','))
+            if species_name))
+        if not name:
+            result.fail("Missing skill name.")
+            continue
+        if name in first_row_by_name:
+            result.fail(f"Duplicate skill name (already on row {first_row_by_name[name]}).")
+            continue
+        if _too_long(Skill.name, name) or any(_too_long(Species.name, species_name)
+                                              for species_name in species_names):
+            result.fail("Skill or species name is too long.")
+            continue
+        try:
+            validity = _clean(values[2])
+            fields = dict(zip(SKILL_FIELDS, (
+                _text(values[1]),
+                int(float(validity)) if validity else None,
+                _parse_complexity(values[3]),
+                _text(values[4]), _text(values[5]), _text(values[6]),
+            )))
+        except ValueError as e:
+            result.fail(str(e) if 'complexity' in str(e) else "Invalid validity period.")
+            continue
+        first_row_by_name[name] = row_number
+        candidates.append({'result': result, 'name': name, 'fields': fields,
+                           'species_names': species_names, 'skill_id': None,
+                           'changed_fields': [], 'species_changed': False})
+
+    # One query for the matching skills, one for their current species
+    existing = {}
+    names = [item['name'] for item in candidates]
+    for start in range(0, len(names), chunk_size):
+        for row in db.session.execute(
+                select(Skill.id, Skill.name, *(getattr(Skill, field) for field in SKILL_FIELDS))
+                .where(Skill.name.in_(names[start:start + chunk_size]))):
+            existing[row.name] = row
+    current_species = {}
+    existing_ids = [row.id for row in existing.values()]
+    for start in range(0, len(existing_ids), chunk_size):
+        for skill_id, species_name in db.session.execute(
+                select(skill_species_association.c.skill_id, Species.name)
+                .join(Species, Species.id == skill_species_association.c.species_id)
+                .where(skill_species_association.c.skill_id.in_(existing_ids[start:start + chunk_size]))):
+            current_species.setdefault(skill_id, set()).add(species_name)
+
+    pending = []
+    for item in candidates:
+        row = existing.get(item['name'])
+        if row is None:
+            pending.append(item)
+            continue
+        if not update_existing:
+            item['result'].status = ImportRowResult.SKIPPED
+            item['result'].message = "Skill already exists."
+            continue
+        item['skill_id'] = row.id
+        item['changed_fields'] = [field for field in SKILL_FIELDS
+                                  if getattr(row, field) != item['fields'][field]]
+        item['species_changed'] = set(item['species_names']) != current_species.get(row.id, set())
+        if item['changed_fields'] or item['species_changed']:
+            pending.append(item)
+        else:
+            item['result'].status = ImportRowResult.UNCHANGED
+
+    _, missing_species = _resolve_species_ids(
+        sorted({species_name for item in pending for species_name in item['species_names']}),
+        dry_run=True)
+
+    written = pending if dry_run else _write_in_chunks(pending, _write_skill_chunk, chunk_size)
+    # Species of rejected rows only were rolled back with their chunk
+    new_species = [species_name for species_name in missing_species
+                   if any(species_name in item['species_names'] for item in written)]
+    for item in written:
+        changes = item['changed_fields'] + (['species'] if item['species_changed'] else [])
+        created_species = [species_name for species_name in item['species_names']
+                           if species_name in new_species]
+        messages = []
+        if changes:
+            messages.append(f"Changed: {', '.join(changes)}.")
+        if created_species:
+            messages.append(f"New species: {', '.join(created_species)}.")
+        item['result'].status = ImportRowResult.CREATED if item['skill_id'] is None \
+            else ImportRowResult.UPDATED
+        item['result'].message = ' '.join(messages)
+    if written and not dry_run:
+        # Bulk statements bypass the flush listeners of the cached views
+        invalidate_global_counters()
+        invalidate_request_board()
+        invalidate_competency_matrices()
+        db.session.commit()
+    return results, new_species
+
+
+def practice_idempotency_key(user_id, skill_ids, practice_date, source, client_key=None):
+    """
+    Returns the idempotency key of a practice record.
+
+    A key supplied by the client is namespaced by source; otherwise the key is
+    derived from the record content, so the same practice delivered twice
+    maps to the same event.
+    """
+    if client_key:
+        material = f'client|{source}|{client_key}'
+    else:
+        material = f"record|{user_id}|{practice_date.isoformat()}|{source}|" \
+            f"{','.join(str(skill_id) for skill_id in sorted(skill_ids))}"
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def _write_practice_chunk(items):
+    """
+    Inserts the practice events of ``items`` and links them to their skills.
+    """
+    db.session.execute(insert(SkillPracticeEvent), [
+        {'user_id': item['user_id'], 'practice_date': item['practice_date'],
+         'notes': f"Practice declared from {item['source']}",
+         'idempotency_key': item['key']}
+        for item in items])
+    event_ids = dict(db.session.execute(
+        select(SkillPracticeEvent.idempotency_key, SkillPracticeEvent.id)
+        .where(SkillPracticeEvent.idempotency_key.in_([item['key'] for item in items]))
+    ).all())
+    db.session.execute(insert(skill_practice_event_skills), [
+        {'skill_practice_event_id': event_ids[item['key']], 'skill_id': skill_id}
+        for item in items for skill_id in item['skill_ids']])
+
+    # Bulk statements bypass the flush listener keeping recycling dates in sync
+    pairs = {(item['user_id'], skill_id) for item in items for skill_id in item['skill_ids']}
+    refresh_competency_recycling_dates(db.session, [
+        competency for competency in Competency.query.filter(
+            Competency.user_id.in_({user_id for user_id, _ in pairs}),
+            Competency.skill_id.in_({skill_id for _, skill_id in pairs}))
+        if (competency.user_id, competency.skill_id) in pairs])
+
+
+def _practice_already_ingested(item, error):
+    """
+    Reports a record as unchanged when its insert lost a race with a concurrent
+    delivery of the same idempotency key.
+    """
+    if not isinstance(error, IntegrityError) or db.session.execute(
+            select(SkillPracticeEvent.id).where(SkillPracticeEvent.idempotency_key == item['key'])
+    ).first() is None:
+        return False
+    item['result'].status = ImportRowResult.UNCHANGED
+    item['result'].message = "Already ingested."
+    return True
+
+
+def import_practice_records(records, chunk_size=None):
+    """
+    Ingests practice declarations from external systems.
+
+    Each record is a mapping with ``email``, ``skill_ids``, ``date``
+    (YYYY-MM-DD), ``source`` and an optional ``idempotency_key``. Users and
+    skills are resolved with one query per chunk, records already ingested
+    (same idempotency key) are reported as unchanged, and new events are
+    inserted in committed chunks. Returns one ``ImportRowResult`` per record,
+    numbered from 1.
+    """
+    chunk_size = chunk_size or current_app.config.get('IMPORT_CHUNK_SIZE', IMPORT_CHUNK_SIZE)
+    results = []
+    candidates = []
+    for index, record in enumerate(records, start=1):
+        result = ImportRowResult(index, record)
+        results.append(result)
+        if not isinstance(record, dict):
+            result.fail("Record must be an object.")
+            continue
+        email = _clean(record.get('email'))
+        source = _clean(record.get('source'))
+        skill_ids = record.get('skill_ids')
+        if not email or not source:
+            result.fail("Missing email or source.")
+            continue
+        if not isinstance(skill_ids, list) or not skill_ids or \
+                not all(isinstance(skill_id, int) for skill_id in skill_ids):
+            result.fail("skill_ids must be a non-empty list of integers.")
+            continue
+        try:
+            practice_date = datetime.combine(
+                datetime.strptime(_clean(record.get('date')), '%Y-%m-%d').date(),
+                datetime.min.time(), tzinfo=timezone.utc)
+        except ValueError:
+            result.fail("Invalid date, expected YYYY-MM-DD.")
+            continue
+        candidates.append({'result': result, 'email': email, 'source': source,
+                           'skill_ids': sorted(set(skill_ids)), 'practice_date': practice_date,
+                           'client_key': _clean(record.get('idempotency_key'))})
+
+    user_ids = {}
+    emails = sorted({item['email'] for item in candidates})
+    for start in range(0, len(emails), chunk_size):
+        user_ids.update(db.session.execute(
+            select(User.email, User.id).where(User.email.in_(emails[start:start + chunk_size]))
+        ).all())
+    known_skill_ids = set()
+    requested_skill_ids = sorted({skill_id for item in candidates for skill_id in item['skill_ids']})
+    for start in range(0, len(requested_skill_ids), chunk_size):
+        known_skill_ids.update(db.session.execute(
+            select(Skill.id).where(Skill.id.in_(requested_skill_ids[start:start + chunk_size]))
+        ).scalars())
+
+    keyed = []
+    first_record_by_key = {}
+    for item in candidates:
+        result = item['result']
+        item['user_id'] = user_ids.get(item['email'])
+        if item['user_id'] is None:
+            result.fail("User not found.", ImportRowResult.USER_NOT_FOUND)
+            continue
+        unknown = [skill_id for skill_id in item['skill_ids'] if skill_id not in known_skill_ids]
+        if len(unknown) == len(item['skill_ids']):
+            result.fail("No known skill ids.")
+            continue
+        if unknown:
+            item['skill_ids'] = [skill_id for skill_id in item['skill_ids']
+                                 if skill_id in known_skill_ids]
+            result.message = f"Ignored unknown skill ids: {', '.join(map(str, unknown))}."
+        item['key'] = practice_idempotency_key(item['user_id'], item['skill_ids'],
+                                               item['practice_date'], item['source'],
+                                               item['client_key'])
+        if item['key'] in first_record_by_key:
+            result.status = ImportRowResult.UNCHANGED
+            result.message = f"Duplicate of record {first_record_by_key[item['key']]}."
+            continue
+        first_record_by_key[item['key']] = result.row_number
+        keyed.append(item)
+
+    existing_keys = set()
+    keys = [item['key'] for item in keyed]
+    for start in range(0, len(keys), chunk_size):
+        existing_keys.update(db.session.execute(
+            select(SkillPracticeEvent.idempotency_key)
+            .where(SkillPracticeEvent.idempotency_key.in_(keys[start:start + chunk_size]))
+        ).scalars())
+    pending = []
+    for item in keyed:
+        if item['key'] in existing_keys:
+            item['result'].status = ImportRowResult.UNCHANGED
+            item['result'].message = "Already ingested."
+        else:
+            pending.append(item)
+
+    for item in _write_in_chunks(pending, _write_practice_chunk, chunk_size,
+                                 on_error=_practice_already_ingested):
+        item['result'].status = ImportRowResult.CREATED
+    return results
+
+
+def _report_folder():
+    return current_app.config.get('IMPORT_REPORT_FOLDER') or \
+        os.path.join(current_app.instance_path, 'import_reports')
+
+
+def save_import_report(results, headers, hidden_columns=()):
+    """
+    Writes ``results`` to a result workbook and returns its report id.
+
+    Each row repeats the imported values (``hidden_columns`` indexes, such as
+    passwords, are blanked out) followed by the row number, status and message.
+    """
+    folder = _report_folder()
+    os.makedirs(folder, exist_ok=True)
+    cutoff = time.time() - IMPORT_REPORT_MAX_AGE
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title="Import Results")
+    sheet.append(list(headers) + RESULT_COLUMNS)
+    for result in results:
+        values = ['' if index in hidden_columns else value
+                  for index, value in enumerate(result.values)]
+        sheet.append(values + [result.row_number, result.status, result.message])
+
+    report_id = uuid.uuid4().hex
+    workbook.save(os.path.join(folder, f'{report_id}.xlsx'))
+    return report_id
+
+
+def import_report_path(report_id):
+    """
+    Returns the path of a saved result workbook, or None if it does not exist.
+    """
+    if not _REPORT_ID_RE.match(report_id or ''):
+        return None
+    path = os.path.join(_report_folder(), f'{report_id}.xlsx')
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,359 @@
+"""
+Persistent mail outbox with pooled SMTP delivery.
+
+Emails are stored as ``OutboxMessage`` rows in the transaction that queues
+them, so a request never waits on the SMTP server and no message is lost when
+a worker exits. They are delivered by a small thread pool in the process that
+queued them (inline when ``MAIL_OUTBOX_WORKERS`` is 0) or by
+``flask outbox deliver``. A delivery run claims a batch of due messages,
+sends them over a single SMTP connection and reschedules failures with
+exponential backoff until ``MAIL_OUTBOX_MAX_ATTEMPTS`` is reached. Attachments
+shared by many messages, such as a session's calendar invitation, are stored
+once as an ``OutboxAttachment``.
+
+``DebuggingSMTPServer`` is a local SMTP sink recording what it receives, to
+stand in for a real server in tests and development.
+"""
+import email
+import json
+import socketserver
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import selectinload
+
+from app import db, mail
+from app.models import OutboxAttachment, OutboxMessage, OutboxMessageStatus, _as_utc
+
+# Longest delay between two delivery attempts, in seconds
+MAX_RETRY_DELAY = 6 * 60 * 60
+
+_executor = None
+_executor_lock = threading.Lock()
+# Delivery runs submitted to the pool and not started yet
+_queued_runs = 0
+_retry_timer = None
+
+
+def queue_attachment(filename, content_type, data):
+    """
+    Stores an attachment to be shared by several queued messages.
+    """
+    attachment = OutboxAttachment(filename=filename, content_type=content_type,
+                                  data=data.encode('utf-8') if isinstance(data, str) else data)
+    db.session.add(attachment)
+    return attachment
+
+
+def queue_message(subject, sender, recipients, text_body, html_body, attachment=None):
+    """
+    Adds a message to the outbox in the current transaction.
+
+    The message is delivered once the transaction is committed and
+    ``dispatch`` is called.
+    """
+    message = OutboxMessage(subject=subject, sender=sender, recipients=json.dumps(list(recipients)),
+                            text_body=text_body, html_body=html_body, attachment=attachment)
+    db.session.add(message)
+    return message
+
+
+def _get_executor():
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get('MAIL_OUTBOX_WORKERS') or 2,
+                thread_name_prefix='mail-outbox')
+        return _executor
+
+
+def _run_in_app_context(app):
+    global _queued_runs  # pylint: disable=global-statement
+    with _executor_lock:
+        _queued_runs -= 1
+    with app.app_context():
+        deliver_pending()
+        _schedule_retry(app)
+
+
+def dispatch():
+    """
+    Starts delivering the committed messages of the outbox.
+
+    Delivers inline when ``MAIL_OUTBOX_WORKERS`` is 0, otherwise submits a
+    delivery run to the pool unless enough runs are already waiting for it.
+    """
+    global _queued_runs  # pylint: disable=global-statement
+    workers = current_app.config.get('MAIL_OUTBOX_WORKERS')
+    if workers == 0:
+        deliver_pending()
+        return
+    executor = _get_executor()
+    with _executor_lock:
+        if _queued_runs >= (workers or 2):
+            return
+        _queued_runs += 1
+    executor.submit(_run_in_app_context, current_app._get_current_object())  # pylint: disable=W0212
+
+
+def _schedule_retry(app):
+    """
+    Schedules a delivery run for the earliest pending retry, if any.
+    """
+    global _retry_timer  # pylint: disable=global-statement
+    next_attempt_at = db.session.query(func.min(OutboxMessage.next_attempt_at)).filter(
+        OutboxMessage.status == OutboxMessageStatus.PENDING).scalar()
+    if next_attempt_at is None:
+        return
+    delay = max((_as_utc(next_attempt_at) - datetime.now(timezone.utc)).total_seconds(), 1)
+    with _executor_lock:
+        if _retry_timer is not None and _retry_timer.is_alive():
+            return
+
+        def run():
+            with app.app_context():
+                dispatch()
+
+        _retry_timer = threading.Timer(delay, run)
+        _retry_timer.daemon = True
+        _retry_timer.start()
+
+
+def retry_delay(attempts):
+    """
+    Returns the delay before the next attempt after ``attempts`` failures.
+    """
+    base = current_app.config.get('MAIL_OUTBOX_RETRY_DELAY') or 60
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), MAX_RETRY_DELAY))
+
+
+def claim_batch(batch_size=None):
+    """
+    Claims up to ``batch_size`` due messages for this delivery run.
+
+    Messages stuck in a claimed batch for longer than ``MAIL_OUTBOX_LEASE``
+    seconds, for instance because their worker exited, are claimable again.
+    The claim is a single conditional UPDATE, so concurrent runs never send
+    the same message twice.
+    """
+    config = current_app.config
+    batch_size = batch_size or config.get('MAIL_OUTBOX_BATCH_SIZE') or 100
+    now = datetime.now(timezone.utc)
+    due = or_(
+        and_(OutboxMessage.status == OutboxMessageStatus.PENDING,
+             OutboxMessage.next_attempt_at <= now),
+        and_(OutboxMessage.status == OutboxMessageStatus.SENDING,
+             OutboxMessage.claimed_at < now - timedelta(seconds=config.get('MAIL_OUTBOX_LEASE')
+                                                        or 600))
+    )
+    ids = [message_id for message_id, in db.session.query(OutboxMessage.id).filter(due)
+           .order_by(OutboxMessage.next_attempt_at, OutboxMessage.id).limit(batch_size)]
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    db.session.query(OutboxMessage).filter(OutboxMessage.id.in_(ids), due).update(
+        {'status': OutboxMessageStatus.SENDING, 'claim_token': token, 'claimed_at': now},
+        synchronize_session=False)
+    db.session.commit()
+    return OutboxMessage.query.options(selectinload(OutboxMessage.attachment)) \
+        .filter_by(claim_token=token).order_by(OutboxMessage.id).all()
+
+
+def _mail_message(message):
+    msg = Message(message.subject, sender=message.sender, recipients=json.loads(message.recipients))
+    msg.body = message.text_body
+    msg.html = message.html_body
+    if message.attachment is not None:
+        msg.attach(message.attachment.filename, message.attachment.content_type,
+                   message.attachment.data)
+    return msg
+
+
+def _record_failure(message, error):
+    message.attempts += 1
+    message.last_error = str(error)
+    message.claim_token = None
+    if message.attempts >= (current_app.config.get('MAIL_OUTBOX_MAX_ATTEMPTS') or 5):
+        message.status = OutboxMessageStatus.FAILED
+        current_app.logger.error(f"Giving up on outbox message {message.id}: {error}")
+    else:
+        message.status = OutboxMessageStatus.PENDING
+        message.next_attempt_at = datetime.now(timezone.utc) + retry_delay(message.attempts)
+
+
+def _connected(connection):
+    try:
+        return connection.host.noop()[0] == 250
+    except Exception:  # pylint: disable=broad-except
+        return False
+
+
+def deliver_batch(messages):
+    """
+    Sends claimed messages over one SMTP connection and records the outcomes.
+
+    A message refused by the server is retried on its own; when the connection
+    itself fails, every message not sent yet is retried. Returns the number of
+    messages sent.
+    """
+    sent = index = 0
+    try:
+        with mail.connect() as connection:
+            for index, message in enumerate(messages):
+                try:
+                    connection.send(_mail_message(message))
+                except Exception as e:  # pylint: disable=broad-except
+                    if connection.host is not None and not _connected(connection):
+                        raise
+                    _record_failure(message, e)
+                    continue
+                message.status = OutboxMessageStatus.SENT
+                message.sent_at = datetime.now(timezone.utc)
+                message.claim_token = None
+                sent += 1
+            index = len(messages)
+    except Exception as e:  # pylint: disable=broad-except
+        current_app.logger.warning(f"SMTP delivery failed: {e}")
+        for message in messages[index:]:
+            _record_failure(message, e)
+    db.session.commit()
+    return sent
+
+
+def deliver_pending(max_batches=None):
+    """
+    Delivers the due messages of the outbox, one batch per SMTP connection.
+
+    Returns (messages sent, messages claimed).
+    """
+    sent = claimed = batches = 0
+    while max_batches is None or batches < max_batches:
+        messages = claim_batch()
+        if not messages:
+            break
+        claimed += len(messages)
+        sent += deliver_batch(messages)
+        batches += 1
+    return sent, claimed
+
+
+def outbox_counts():
+    """
+    Returns {status: number of messages} for the outbox.
+    """
+    return {status: count for status, count in db.session.query(
+        OutboxMessage.status, func.count(OutboxMessage.id)).group_by(OutboxMessage.status)}
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """
+    Speaks just enough SMTP for smtplib and records each message received.
+    """
+
+    def _reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode('ascii'))
+
+    def handle(self):
+        self._reply('220 localhost debugging SMTP server')
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').rstrip('\r\n')
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('HELO', 'EHLO'):
+                self._reply('250 localhost')
+            elif verb == 'MAIL':
+                sender, recipients = command.split(':', 1)[1].strip(), []
+                self._reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[1].strip())
+                self._reply('250 OK')
+            elif verb == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                for data_line in iter(self.rfile.readline, b''):
+                    if data_line in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                self.server.record(sender, recipients, b''.join(lines))
+                self._reply('250 OK')
+            elif verb in ('RSET', 'NOOP'):
+                if verb == 'RSET':
+                    sender, recipients = None, []
+                self._reply('250 OK')
+            elif verb == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+
+class DebuggingSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Local SMTP server keeping the messages it receives in ``messages``, as
+    parsed ``email.message.Message`` objects, and counting connections.
+
+    Binds an ephemeral port by default; use it as a context manager or call
+    ``start`` and ``stop``.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, on_message=None):
+        super().__init__((host, port), _SMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.on_message = on_message
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self):
+        """
+        Returns the port the server listens on.
+        """
+        return self.server_address[1]
+
+    def verify_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        return True
+
+    def record(self, sender, recipients, data):
+        """
+        Stores a received message.
+        """
+        message = email.message_from_bytes(data)
+        with self._lock:
+            self.messages.append(message)
+        if self.on_message is not None:
+            self.on_message(sender, recipients, message)
+
+    def start(self):
+        """
+        Serves in a background thread.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops serving and closes the socket.
+        """
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
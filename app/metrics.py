@@ -0,0 +1,313 @@
+"""
+Prometheus metrics aggregated over the worker processes of the app.
+
+Each process counts requests (by blueprint, endpoint, method and status), keeps
+request latency histograms (by blueprint and endpoint) and counts database pool
+checkouts. At most every ``METRICS_FLUSH_INTERVAL`` seconds it writes them, with
+its pool and cache statistics, to its own JSON file in ``METRICS_DIR``. Files
+are replaced atomically, so ``collect_metrics`` merges the files of every
+gunicorn worker without locking. Counters and histograms are summed, including
+those of exited workers so totals never go backwards; gauges are summed over
+live processes only. The mail outbox depth is queried at scrape time.
+``render_metrics`` formats the result in the Prometheus text exposition format.
+
+Like ``PROMETHEUS_MULTIPROC_DIR`` for prometheus_client, the directory should
+be emptied before the application server starts.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, request, request_finished, request_started
+from sqlalchemy import event
+
+from app import db
+from app.cache import named_caches
+from app.mail_outbox import outbox_counts
+from app.models import OutboxMessageStatus
+
+METRIC_PREFIX = 'training_manager'
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Exported metrics: name -> (type, help)
+METRICS = {
+    'http_requests_total': ('counter', 'HTTP requests served.'),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency in seconds.'),
+    'db_pool_checkouts_total': ('counter', 'Connections checked out of the database pool.'),
+    'db_pool_size': ('gauge', 'Connections kept open by the database pool.'),
+    'db_pool_checked_out': ('gauge', 'Database connections in use.'),
+    'db_pool_overflow': ('gauge', 'Database connections opened beyond the pool size.'),
+    'cache_hits_total': ('counter', 'Cache lookups served from the cache.'),
+    'cache_misses_total': ('counter', 'Cache lookups missing the cache.'),
+    'cache_hit_ratio': ('gauge', 'Share of cache lookups served from the cache.'),
+    'cache_entries': ('gauge', 'Entries held by the cache.'),
+    'mail_outbox_messages': ('gauge', 'Messages of the mail outbox by status.'),
+    'metrics_processes': ('gauge', 'Live processes reporting metrics.'),
+}
+
+_FILE_PREFIX = 'metrics-'
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms of this process, flushed to ``directory``.
+
+    Labels are tuples of (name, value) pairs.
+    """
+
+    def __init__(self, directory, flush_interval=5):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self._counters = {}
+        self._histograms = {}
+        self._flushed_at = time.monotonic()
+
+    def _check_process(self):
+        # A worker forked after create_app starts with the counts of its parent
+        if os.getpid() != self.pid:
+            self._reset()
+
+    @property
+    def path(self):
+        """
+        Returns the file of this process.
+        """
+        return os.path.join(self.directory, f'{_FILE_PREFIX}{os.getpid()}.json')
+
+    def inc(self, name, labels=(), amount=1):
+        """
+        Adds ``amount`` to a counter.
+        """
+        key = (name, labels)
+        with self._lock:
+            self._check_process()
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        """
+        Records ``value`` in a latency histogram.
+        """
+        key = (name, labels)
+        with self._lock:
+            self._check_process()
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # One count per bucket, then +Inf, then the sum
+                histogram = self._histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+            histogram[bisect_left(LATENCY_BUCKETS, value)] += 1
+            histogram[-1] += value
+
+    def flush_due(self):
+        """
+        Returns True when the last flush is older than ``flush_interval``.
+        """
+        return time.monotonic() - self._flushed_at >= self.flush_interval
+
+    def flush(self, counters=(), gauges=()):
+        """
+        Atomically writes this process's metrics, with the absolute ``counters``
+        and ``gauges`` sampled from the process, as (name, labels, value).
+        """
+        with self._lock:
+            self._check_process()
+            self._flushed_at = time.monotonic()
+            payload = json.dumps({
+                'pid': self.pid,
+                'counters': [[name, labels, value] for (name, labels), value
+                             in self._counters.items()] + [list(sample) for sample in counters],
+                'histograms': [[name, labels, values] for (name, labels), values
+                               in self._histograms.items()],
+                'gauges': [list(sample) for sample in gauges],
+            })
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+                    tmp_file.write(payload)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def process_samples(engine):
+    """
+    Returns the (counters, gauges) read from the pool of ``engine`` and the
+    named caches of this process.
+    """
+    counters, gauges = [], []
+    pool = engine.pool
+    for name, method in (('db_pool_size', 'size'), ('db_pool_checked_out', 'checkedout'),
+                         ('db_pool_overflow', 'overflow')):
+        # Pools without a size limit, such as SQLite's, lack some of these
+        getter = getattr(pool, method, None)
+        if getter is not None:
+            gauges.append((name, (), max(getter(), 0)))
+    for cache_name, cache in named_caches().items():
+        labels = (('cache', cache_name),)
+        counters.append(('cache_hits_total', labels, cache.hits))
+        counters.append(('cache_misses_total', labels, cache.misses))
+        gauges.append(('cache_entries', labels, len(cache)))
+    return counters, gauges
+
+
+def flush_metrics(app):
+    """
+    Writes the metrics of this process for ``app``.
+    """
+    registry = app.extensions['metrics']
+    registry.flush(*process_samples(app.extensions['metrics_engine']))
+
+
+def _outbox_gauges():
+    try:
+        counts = outbox_counts()
+    except Exception as e:  # pylint: disable=broad-except
+        current_app.logger.warning(f"Mail outbox depth unavailable: {e}")
+        return []
+    return [('mail_outbox_messages', (('status', status.name.lower()),), counts.get(status, 0))
+            for status in OutboxMessageStatus]
+
+
+def collect_metrics():
+    """
+    Merges the metrics files of every process of the current app.
+
+    Returns {name: [(labels, value)]}, histogram values being the
+    non-cumulative bucket counts followed by the sum.
+    """
+    flush_metrics(current_app._get_current_object())  # pylint: disable=W0212
+    registry = current_app.extensions['metrics']
+    merged = {}
+    live = 0
+    for filename in os.listdir(registry.directory):
+        if not filename.startswith(_FILE_PREFIX) or not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(registry.directory, filename), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        alive = _process_alive(data['pid'])
+        live += alive
+        for name, labels, value in data['counters'] + (data['gauges'] if alive else []):
+            series = merged.setdefault(name, {})
+            key = tuple(map(tuple, labels))
+            series[key] = series.get(key, 0) + value
+        for name, labels, values in data['histograms']:
+            series = merged.setdefault(name, {})
+            key = tuple(map(tuple, labels))
+            total = series.get(key)
+            series[key] = values if total is None else [a + b for a, b in zip(total, values)]
+
+    hits, misses = merged.get('cache_hits_total', {}), merged.get('cache_misses_total', {})
+    merged['cache_hit_ratio'] = {
+        labels: count / (count + misses.get(labels, 0))
+        for labels, count in hits.items() if count + misses.get(labels, 0)}
+    merged['metrics_processes'] = {(): live}
+    merged['mail_outbox_messages'] = {labels: value for _, labels, value in _outbox_gauges()}
+    return {name: sorted(series.items()) for name, series in merged.items()}
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+               for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def render_metrics(metrics):
+    """
+    Formats collected metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for name, (metric_type, description) in METRICS.items():
+        series = metrics.get(name)
+        if not series:
+            continue
+        full_name = f'{METRIC_PREFIX}_{name}'
+        lines.append(f'# HELP {full_name} {description}')
+        lines.append(f'# TYPE {full_name} {metric_type}')
+        for labels, value in series:
+            if metric_type != 'histogram':
+                lines.append(f'{full_name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), value[:-1]):
+                cumulative += count
+                lines.append(f'{full_name}_bucket{_format_labels(labels + (("le", bound),))} '
+                             f'{cumulative}')
+            lines.append(f'{full_name}_sum{_format_labels(labels)} {_format_value(value[-1])}')
+            lines.append(f'{full_name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def _on_request_started(sender, **extra):  # pylint: disable=unused-argument
+    g._metrics_started = time.perf_counter()  # pylint: disable=protected-access
+
+
+def _on_request_finished(sender, response, **extra):  # pylint: disable=unused-argument
+    started = g.pop('_metrics_started', None)
+    if started is None or request.endpoint == 'static':
+        return
+    registry = sender.extensions['metrics']
+    route = (('blueprint', request.blueprint or ''), ('endpoint', request.endpoint or 'unmatched'))
+    registry.inc('http_requests_total',
+                 route + (('method', request.method), ('status', str(response.status_code))))
+    registry.observe('http_request_duration_seconds', route, time.perf_counter() - started)
+    if registry.flush_due():
+        flush_metrics(sender)
+
+
+def _flush_at_exit(app):
+    try:
+        flush_metrics(app)
+    except Exception:  # pylint: disable=broad-except
+        pass
+
+
+def init_metrics(app):
+    """
+    Starts collecting metrics for ``app`` unless METRICS_ENABLED is off.
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    registry = MetricsRegistry(
+        app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics'),
+        flush_interval=app.config.get('METRICS_FLUSH_INTERVAL') or 5)
+    with app.app_context():
+        engine = db.engine
+    app.extensions['metrics'] = registry
+    app.extensions['metrics_engine'] = engine
+    event.listen(engine, 'checkout', lambda *args: registry.inc('db_pool_checkouts_total'))
+    request_started.connect(_on_request_started, app)
+    request_finished.connect(_on_request_finished, app)
+    atexit.register(_flush_at_exit, app)
@@ -5,15 +5,41 @@ training-related entities. It also includes utility functions for role and
 permission initialization.
 """
 import enum
+import hashlib
+import hmac
 import secrets
 from datetime import datetime, timedelta, timezone
 
+from flask import current_app, has_app_context
 from flask_login import UserMixin
+from sqlalchemy import event, insert, update, inspect as sa_inspect
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Session, validates
 from werkzeug.security import generate_password_hash, check_password_hash
 from itsdangerous import URLSafeTimedSerializer as Serializer
 from flask_babel import lazy_gettext as _
 
 from app import db, login
+from app.cache import LRUCache, request_cache
+
+# Number of values bound per IN clause
+IN_CLAUSE_CHUNK_SIZE = 500
+
+def _as_utc(value):
+    """
+    Returns a timezone-aware datetime, assuming UTC for naive values (SQLite).
+    """
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+def chunked(values, size=IN_CLAUSE_CHUNK_SIZE):
+    """
+    Yields lists of at most ``size`` of ``values``, to bind in IN clauses.
+    """
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
 
 # Many-to-Many relationship tables
 role_permission_association = db.Table('role_permission_association',
@@ -175,6 +201,7 @@ class User(UserMixin, db.Model):
     is_approved = db.Column(db.Boolean, default=False)
     study_level = db.Column(db.String(64), nullable=True)
     api_key = db.Column(db.String(64), unique=True, nullable=True)
+    api_key_hash = db.Column(db.String(64), unique=True, index=True, nullable=True)
     new_email = db.Column(db.String(120), index=True, unique=True, nullable=True)
     email_confirmation_token = db.Column(db.String(128), unique=True, nullable=True)
 
@@ -387,10 +414,41 @@ class User(UserMixin, db.Model):
         """
         if self.is_admin: # Admins have all permissions
             return True
-        for role in self.roles:
-            if role.permissions.filter_by(name=permission_name).first() is not None:
-                return True
-        return False
+        return permission_name in self.permission_names
+
+    @property
+    def permission_names(self):
+        """
+        Returns the set of permission names granted to the user through their roles.
+
+        Resolved with a single join, then cached per request and per process;
+        cached sets are keyed by the permissions cache version so role and
+        permission edits never serve stale results.
+        """
+        if self.id is None:
+            return frozenset(permission.name for role in self.roles
+                             for permission in role.permissions)
+
+        per_request = request_cache(PERMISSIONS_CACHE)
+        if per_request is not None and self.id in per_request:
+            return per_request[self.id]
+
+        version = get_cache_version(PERMISSIONS_CACHE)
+        names = _permission_names_cache.get((self.id, version)) if version else None
+        if names is None:
+            names = frozenset(name for (name,) in db.session.query(Permission.name).join(
+                role_permission_association,
+                role_permission_association.c.permission_id == Permission.id
+            ).join(
+                user_role_association,
+                user_role_association.c.role_id == role_permission_association.c.role_id
+            ).filter(user_role_association.c.user_id == self.id).distinct())
+            if version:
+                _permission_names_cache.set((self.id, version), names)
+
+        if per_request is not None:
+            per_request[self.id] = names
+        return names
 
     def set_password(self, password):
         """
@@ -412,6 +470,43 @@ class User(UserMixin, db.Model):
         self.api_key = new_key
         return new_key
 
+    @validates('api_key')
+    def _sync_api_key_hash(self, key, value):  # pylint: disable=unused-argument
+        """
+        Keeps the indexed HMAC of the API key in sync with the key itself.
+        """
+        self.api_key_hash = User.hash_api_key(value) if value and has_app_context() else None
+        return value
+
+    @staticmethod
+    def hash_api_key(api_key):
+        """
+        Returns the keyed SHA-256 digest (HMAC) of an API key.
+
+        Keyed with API_KEY_HMAC_SECRET: changing it (or SECRET_KEY, which it
+        defaults to) requires `flask db-maintenance backfill-api-key-hashes --all`.
+        """
+        secret = current_app.config.get('API_KEY_HMAC_SECRET') or current_app.config['SECRET_KEY']
+        return hmac.new(secret.encode(), api_key.encode(), hashlib.sha256).hexdigest()
+
+    @classmethod
+    def find_by_api_key(cls, api_key):
+        """
+        Returns the user owning ``api_key``, or None.
+
+        The key is looked up through its indexed HMAC, a single indexed query,
+        and compared in constant time against the single candidate. Keys
+        without a hash are filled by the bootstrap (or `flask db-maintenance
+        backfill-api-key-hashes`) and are not found until then.
+        """
+        if not api_key:
+            return None
+        user = cls.query.filter_by(api_key_hash=cls.hash_api_key(api_key)).first()
+        if user is None or user.api_key is None or \
+                not secrets.compare_digest(user.api_key, api_key):
+            return None
+        return user
+
     def generate_email_confirmation_token(self):
         """
         Generates a token for email change confirmation.
@@ -454,9 +549,9 @@ class User(UserMixin, db.Model):
         return cls.query.filter_by(is_admin=True).first()
 
     @classmethod
-    def create_admin_user(cls, email, password, full_name="Admin User"):
+    def create_admin_user(cls, email, password, full_name="Admin User", commit=True):
         """
-        Creates a new admin user.
+        Creates a new admin user, committed unless ``commit`` is False.
         """
         # Admin users are approved by default
         admin_user = cls(full_name=full_name, email=email, is_admin=True, is_approved=True)
@@ -466,7 +561,8 @@ class User(UserMixin, db.Model):
         admin_role = Role.query.filter_by(name='Admin').first()
         if admin_role:
             admin_user.roles.append(admin_role)
-        db.session.commit()
+        if commit:
+            db.session.commit()
         return admin_user
 
     @property
@@ -482,142 +578,239 @@ class User(UserMixin, db.Model):
         """
         return f'<User {self.full_name}>'
 
-def init_roles_and_permissions():
-    """
-    Initializes default roles and permissions in the database.
-    """
-    # Define core permissions with categories
-    permissions_data = [
-        {'name': 'admin_access',
-         'description': 'Access to the admin dashboard and all admin functionalities.',
-         'category': 'Admin Management'},
-        {'name': 'user_manage', 'description': 'Create, edit, and delete users.',
-         'category': 'Admin Management'},
-        {'name': 'role_manage',
-         'description': 'Create, edit, and delete roles and assign permissions to them.',
-         'category': 'Admin Management'},
-        {'name': 'permission_manage', 'description': 'View and manage permissions.',
-         'category': 'Admin Management'},
-
-        {'name': 'team_manage', 'description': 'Create, edit, and delete teams.',
-         'category': 'Team Management'},
-        {'name': 'view_team_competencies', 'description': 'View competencies of team members.',
-         'category': 'Team Management'},
-
-        {'name': 'skill_manage', 'description': 'Create, edit, and delete skills.',
-         'category': 'Skill Management'},
-        {'name': 'species_manage', 'description': 'Create, edit, and delete species.',
-         'category': 'Skill Management'},
-        {'name': 'tutor_for_skill', 'description': 'Can be assigned as a tutor for skills.',
-         'category': 'Skill Management'},
-        {'name': 'competency_manage', 'description': 'Manage competencies.',
-         'category': 'Skill Management'},
-        {'name': 'skill_practice_manage', 'description': 'Manage skill practice events.',
-         'category': 'Skill Management'},
-
-        {'name': 'training_path_manage', 'description': 'Create, edit, and delete training paths.',
-         'category': 'Training Management'},
-        {'name': 'training_session_manage',
-         'description': 'Create, edit, and delete training sessions.',
-         'category': 'Training Management'},
-        {'name': 'training_request_manage', 'description': 'View and manage training requests.',
-         'category': 'Training Management'},
-        {'name': 'external_training_validate', 'description': 'Validate external trainings.',
-         'category': 'Training Management'},
-        {'name': 'training_session_validate',
-         'description': 'Validate competencies for training sessions.',
-         'category': 'Training Management'},
-        {'name': 'continuous_training_manage',
-         'description': 'Create, edit, and delete continuous training events.',
-         'category': 'Training Management'},
-        {'name': 'continuous_training_validate',
-         'description': 'Validate user attendance for continuous training events.',
-         'category': 'Training Management'},
-        {'name': 'initial_regulatory_training_manage',
-         'description': 'Manage initial regulatory training records for users.',
-         'category': 'Training Management'},
-
-        {'name': 'self_edit_profile', 'description': 'Edit own user dashboard.',
-         'category': 'User Self-Service'},
-        {'name': 'self_view_profile', 'description': 'View own user dashboard.',
-         'category': 'User Self-Service'},
-        {'name': 'self_declare_skill_practice', 'description': 'Declare own skill practice events.',
-         'category': 'User Self-Service'},
-        {'name': 'self_submit_training_request', 'description': 'Submit own training requests.',
-         'category': 'User Self-Service'},
-        {'name': 'self_submit_external_training', 'description': 'Submit own external training records.',
-         'category': 'User Self-Service'},
-        {'name': 'self_submit_continuous_training_attendance',
-         'description': 'Submit own continuous training attendance records.',
-         'category': 'User Self-Service'},
-        {'name': 'self_request_continuous_training_event',
-         'description': 'Request the creation of a new continuous training event.',
-         'category': 'User Self-Service'},
-
-        {'name': 'view_reports', 'description': 'View various application reports.',
-         'category': 'Reporting'},
-        {'name': 'view_any_certificate', 'description': "View any user's certificate.",
-         'category': 'Reporting'},
-        {'name': 'view_any_booklet', 'description': "View any user's booklet.",
-         'category': 'Reporting'},
+class CacheVersion(db.Model):
+    """
+    Version stamp shared by every worker process for a named in-process cache.
+
+    Writers bump the version in the same transaction as their change; readers
+    key their cached values by the current version. The ``bootstrap`` row holds
+    the fingerprint of the last applied bootstrap (see app.db_bootstrap).
+    """
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.String(32), nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True),
+                           default=lambda: datetime.now(timezone.utc),
+                           onupdate=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        """
+        Returns a string representation of the CacheVersion object.
+        """
+        return f'<CacheVersion {self.name}:{self.version}>'
+
+PERMISSIONS_CACHE = 'permissions'
+
+# Resolved permission names, keyed by (user_id, permissions cache version)
+_permission_names_cache = LRUCache(maxsize=4096, name='permission_names')
+
+def get_cache_version(name):
+    """
+    Returns the current version of a named cache (read once per request),
+    or None when the cache has never been versioned.
+    """
+    per_request = request_cache('cache_versions')
+    if per_request is not None and name in per_request:
+        return per_request[name]
+    with db.session.no_autoflush:
+        version = db.session.query(CacheVersion.version).filter_by(name=name).scalar()
+    if per_request is not None:
+        per_request[name] = version
+    return version
+
+def bump_cache_version(name, session=None):
+    """
+    Invalidates a named cache in every process by assigning it a new version.
+
+    The new version is written through ``session`` and becomes visible to other
+    processes when that session commits.
+    """
+    session = session or db.session
+    new_version = secrets.token_hex(16)
+    with session.no_autoflush:
+        cache_version = session.get(CacheVersion, name)
+    if cache_version is None:
+        session.add(CacheVersion(name=name, version=new_version))
+    else:
+        cache_version.version = new_version
+    per_request = request_cache('cache_versions')
+    if per_request is not None:
+        per_request[name] = new_version
+    per_request = request_cache(name)
+    if per_request is not None:
+        per_request.clear()
+    return new_version
+
+def bump_permissions_version(session=None):
+    """
+    Invalidates every cached permission set.
+    """
+    return bump_cache_version(PERMISSIONS_CACHE, session)
+
+# Default permissions, with their categories
+DEFAULT_PERMISSIONS = [
+    {'name': 'admin_access',
+     'description': 'Access to the admin dashboard and all admin functionalities.',
+     'category': 'Admin Management'},
+    {'name': 'user_manage', 'description': 'Create, edit, and delete users.',
+     'category': 'Admin Management'},
+    {'name': 'role_manage',
+     'description': 'Create, edit, and delete roles and assign permissions to them.',
+     'category': 'Admin Management'},
+    {'name': 'permission_manage', 'description': 'View and manage permissions.',
+     'category': 'Admin Management'},
+
+    {'name': 'team_manage', 'description': 'Create, edit, and delete teams.',
+     'category': 'Team Management'},
+    {'name': 'view_team_competencies', 'description': 'View competencies of team members.',
+     'category': 'Team Management'},
+
+    {'name': 'skill_manage', 'description': 'Create, edit, and delete skills.',
+     'category': 'Skill Management'},
+    {'name': 'species_manage', 'description': 'Create, edit, and delete species.',
+     'category': 'Skill Management'},
+    {'name': 'tutor_for_skill', 'description': 'Can be assigned as a tutor for skills.',
+     'category': 'Skill Management'},
+    {'name': 'competency_manage', 'description': 'Manage competencies.',
+     'category': 'Skill Management'},
+    {'name': 'skill_practice_manage', 'description': 'Manage skill practice events.',
+     'category': 'Skill Management'},
+
+    {'name': 'training_path_manage', 'description': 'Create, edit, and delete training paths.',
+     'category': 'Training Management'},
+    {'name': 'training_session_manage',
+     'description': 'Create, edit, and delete training sessions.',
+     'category': 'Training Management'},
+    {'name': 'training_request_manage', 'description': 'View and manage training requests.',
+     'category': 'Training Management'},
+    {'name': 'external_training_validate', 'description': 'Validate external trainings.',
+     'category': 'Training Management'},
+    {'name': 'training_session_validate',
+     'description': 'Validate competencies for training sessions.',
+     'category': 'Training Management'},
+    {'name': 'continuous_training_manage',
+     'description': 'Create, edit, and delete continuous training events.',
+     'category': 'Training Management'},
+    {'name': 'continuous_training_validate',
+     'description': 'Validate user attendance for continuous training events.',
+     'category': 'Training Management'},
+    {'name': 'initial_regulatory_training_manage',
+     'description': 'Manage initial regulatory training records for users.',
+     'category': 'Training Management'},
+
+    {'name': 'self_edit_profile', 'description': 'Edit own user dashboard.',
+     'category': 'User Self-Service'},
+    {'name': 'self_view_profile', 'description': 'View own user dashboard.',
+     'category': 'User Self-Service'},
+    {'name': 'self_declare_skill_practice', 'description': 'Declare own skill practice events.',
+     'category': 'User Self-Service'},
+    {'name': 'self_submit_training_request', 'description': 'Submit own training requests.',
+     'category': 'User Self-Service'},
+    {'name': 'self_submit_external_training', 'description': 'Submit own external training records.',
+     'category': 'User Self-Service'},
+    {'name': 'self_submit_continuous_training_attendance',
+     'description': 'Submit own continuous training attendance records.',
+     'category': 'User Self-Service'},
+    {'name': 'self_request_continuous_training_event',
+     'description': 'Request the creation of a new continuous training event.',
+     'category': 'User Self-Service'},
+
+    {'name': 'view_reports', 'description': 'View various application reports.',
+     'category': 'Reporting'},
+    {'name': 'view_any_certificate', 'description': "View any user's certificate.",
+     'category': 'Reporting'},
+    {'name': 'view_any_booklet', 'description': "View any user's booklet.",
+     'category': 'Reporting'},
+]
+
+# Default roles and their permissions (names missing from the permission table are skipped)
+DEFAULT_ROLES = {
+    'Admin': [p_data['name'] for p_data in DEFAULT_PERMISSIONS], # Assign all permissions to Admin
+    'Team Leader': [
+        'self_edit_profile', 'self_declare_skill_practice', 'self_submit_training_request',
+        'self_submit_external_training', 'view_team_competencies', 'training_request_manage',
+        'tutor_for_skill', 'tutor_for_session', 'self_submit_continuous_training_attendance',
+        'self_request_continuous_training_event'
+    ],
+    'Tutor': [
+        'self_edit_profile', 'self_declare_skill_practice', 'self_submit_training_request',
+        'self_submit_external_training', 'training_session_validate', 'tutor_for_skill',
+        'tutor_for_session', 'self_submit_continuous_training_attendance',
+        'self_request_continuous_training_event'
+    ],
+    'Validator': [
+        'self_edit_profile', 'continuous_training_validate', 'external_training_validate',
+        'training_session_validate', 'self_submit_continuous_training_attendance',
+        'self_request_continuous_training_event'
+    ],
+    'User': [
+        'self_edit_profile', 'self_declare_skill_practice', 'self_submit_training_request',
+        'self_submit_external_training', 'self_submit_continuous_training_attendance',
+        'self_request_continuous_training_event'
     ]
+}
 
-    for p_data in permissions_data:
-        permission = Permission.query.filter_by(name=p_data['name']).first()
-        if not permission:
-            permission = Permission(name=p_data['name'], description=p_data['description'],
-                                    category=p_data['category'])
-            db.session.add(permission)
-        else:
-            # Update existing permission's description and category if they changed
-            if permission.description != p_data['description']:
-                permission.description = p_data['description']
-            if permission.category != p_data['category']:
-                permission.category = p_data['category']
-            db.session.add(permission) # Re-add to ensure update is tracked
-    db.session.commit()
-
-    # Define roles and assign permissions
-    roles_data = {
-        'Admin': [p_data['name'] for p_data in permissions_data], # Assign all permissions to Admin
-        'Team Leader': [
-            'self_edit_profile', 'self_declare_skill_practice', 'self_submit_training_request',
-            'self_submit_external_training', 'view_team_competencies', 'training_request_manage',
-            'tutor_for_skill', 'tutor_for_session', 'self_submit_continuous_training_attendance',
-            'self_request_continuous_training_event'
-        ],
-        'Tutor': [
-            'self_edit_profile', 'self_declare_skill_practice', 'self_submit_training_request',
-            'self_submit_external_training', 'training_session_validate', 'tutor_for_skill',
-            'tutor_for_session', 'self_submit_continuous_training_attendance',
-            'self_request_continuous_training_event'
-        ],
-        'Validator': [
-            'self_edit_profile', 'continuous_training_validate', 'external_training_validate',
-            'training_session_validate', 'self_submit_continuous_training_attendance',
-            'self_request_continuous_training_event'
-        ],
-        'User': [
-            'self_edit_profile', 'self_declare_skill_practice', 'self_submit_training_request',
-            'self_submit_external_training', 'self_submit_continuous_training_attendance',
-            'self_request_continuous_training_event'
-        ]
-    }
-
-    for r_name, p_names in roles_data.items():
-        role = Role.query.filter_by(name=r_name).first()
-        if not role:
-            role = Role(name=r_name, description=f'{r_name} role')
-            db.session.add(role)
-            db.session.flush() # Assign an ID to the new role
-
-        # Clear existing permissions and re-add to ensure consistency
-        role.permissions = []
-        for p_name in p_names:
-            permission = Permission.query.filter_by(name=p_name).first()
-            if permission and permission not in role.permissions:
-                role.permissions.append(permission)
-    db.session.commit()
+def init_roles_and_permissions(commit=True):
+    """
+    Reconciles the default roles and permissions with the database.
+
+    Missing permissions and roles are inserted, changed permission descriptions
+    and categories updated, and the permissions of the default roles brought
+    back to ``DEFAULT_ROLES``, with a few set-based statements instead of one
+    per row. Roles and permissions created by admins are left alone. Bumps the
+    permissions cache version when anything changed.
+
+    Returns the number of rows inserted, updated or deleted.
+    """
+    changes = 0
+    existing = {name: (permission_id, description, category)
+                for permission_id, name, description, category in db.session.query(
+                    Permission.id, Permission.name, Permission.description, Permission.category)}
+    missing = [p_data for p_data in DEFAULT_PERMISSIONS if p_data['name'] not in existing]
+    changed = [{'id': existing[p_data['name']][0], 'description': p_data['description'],
+                'category': p_data['category']}
+               for p_data in DEFAULT_PERMISSIONS if p_data['name'] in existing and
+               existing[p_data['name']][1:] != (p_data['description'], p_data['category'])]
+    if missing:
+        db.session.execute(insert(Permission), missing)
+    if changed:
+        db.session.execute(update(Permission), changed)
+    changes += len(missing) + len(changed)
+    permission_ids = dict(db.session.query(Permission.name, Permission.id)) if missing else \
+        {name: values[0] for name, values in existing.items()}
+
+    role_ids = dict(db.session.query(Role.name, Role.id))
+    missing = [{'name': r_name, 'description': f'{r_name} role'}
+               for r_name in DEFAULT_ROLES if r_name not in role_ids]
+    if missing:
+        db.session.execute(insert(Role), missing)
+        role_ids = dict(db.session.query(Role.name, Role.id))
+        changes += len(missing)
+
+    wanted = {(role_ids[r_name], permission_ids[p_name])
+              for r_name, p_names in DEFAULT_ROLES.items()
+              for p_name in p_names if p_name in permission_ids}
+    default_role_ids = [role_ids[r_name] for r_name in DEFAULT_ROLES]
+    current = set(db.session.query(
+        role_permission_association.c.role_id, role_permission_association.c.permission_id
+    ).filter(role_permission_association.c.role_id.in_(default_role_ids)))
+    stale = {}
+    for role_id, permission_id in current - wanted:
+        stale.setdefault(role_id, []).append(permission_id)
+    for role_id, stale_ids in stale.items():
+        db.session.execute(role_permission_association.delete().where(
+            role_permission_association.c.role_id == role_id,
+            role_permission_association.c.permission_id.in_(stale_ids)))
+    added = [{'role_id': role_id, 'permission_id': permission_id}
+             for role_id, permission_id in sorted(wanted - current)]
+    if added:
+        db.session.execute(role_permission_association.insert(), added)
+    changes += len(current - wanted) + len(added)
+
+    if changes:
+        bump_permissions_version()
+    if commit:
+        db.session.commit()
+    return changes
 
 
 class Permission(db.Model):
@@ -834,6 +1027,16 @@ class Competency(db.Model):
                                                    name='fk_competency_external_training_id'),
                                      nullable=True)
     certificate_path = db.Column(db.String(256)) # Path to generated certificate
+    # Materialized recycling dates, kept up to date by _refresh_recycling_on_flush
+    last_validated_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    recycling_due_at = db.Column(db.DateTime(timezone=True), nullable=True, index=True)
+    recycling_warning_at = db.Column(db.DateTime(timezone=True), nullable=True, index=True)
+
+    __table_args__ = (
+        # Per-user and per-skill recycling lookups (dashboard counters, skill listing)
+        db.Index('ix_competency_user_recycling_due', 'user_id', 'recycling_due_at'),
+        db.Index('ix_competency_skill_recycling_due', 'skill_id', 'recycling_due_at'),
+    )
 
     user = db.relationship('User', back_populates='competencies',
                             foreign_keys=lambda: [Competency.user_id])
@@ -850,7 +1053,10 @@ class Competency(db.Model):
         """
         Returns the latest practice date for this competency (either evaluation or practice event).
         """
-        # Find the most recent practice event for this skill and user
+        if self.last_validated_at is not None:
+            return _as_utc(self.last_validated_at)
+
+        # Not materialized yet: find the most recent practice event for this skill and user
         practice_event = SkillPracticeEvent.query.filter(
             SkillPracticeEvent.user_id == self.user_id,
             SkillPracticeEvent.skills.any(id=self.skill_id)
@@ -870,18 +1076,34 @@ class Competency(db.Model):
 
         return evaluation_date
 
-    @property
+    @hybrid_property
     def recycling_due_date(self):
         """
         Calculates the recycling due date for the competency.
         """
         if self.skill.validity_period_months:
+            if self.recycling_due_at is not None:
+                return _as_utc(self.recycling_due_at)
             # Using 30.44 days as average for a month
             return self.latest_practice_date + \
                 timedelta(days=self.skill.validity_period_months * 30.44)
         return None
 
-    @property
+    @recycling_due_date.inplace.expression
+    @classmethod
+    def _recycling_due_date_expression(cls):
+        """
+        SQL counterpart of ``recycling_due_date``.
+
+        Reads the materialized column, which already accounts for practice
+        events and is NULL for skills without a validity period, so the
+        expression is plain column access on every backend. Rows written
+        before the column existed are filled by the database bootstrap (see
+        app.db_bootstrap) once migrated.
+        """
+        return cls.recycling_due_at
+
+    @hybrid_property
     def needs_recycling(self):
         """
         Checks if the competency needs recycling.
@@ -890,17 +1112,61 @@ class Competency(db.Model):
             return datetime.now(timezone.utc) > self.recycling_due_date
         return False
 
-    @property
+    @needs_recycling.inplace.expression
+    @classmethod
+    def _needs_recycling_expression(cls):
+        """
+        SQL counterpart of ``needs_recycling``, never NULL so it can be negated.
+
+        Relies on the materialized columns: the flush listener fills them for
+        new and changed rows, bulk writers call
+        ``refresh_competency_recycling_dates`` and the database bootstrap fills
+        rows written before the columns existed, so no row is left with
+        ``last_validated_at`` NULL for the two sides to disagree on.
+        """
+        return db.and_(cls.recycling_due_at.isnot(None),
+                       cls.recycling_due_at < datetime.now(timezone.utc))
+
+    @hybrid_property
     def warning_date(self):
         """
         Calculates the warning date before recycling is due.
         """
+        if self.recycling_warning_at is not None and self.skill.validity_period_months:
+            return _as_utc(self.recycling_warning_at)
         if self.recycling_due_date and self.skill.validity_period_months:
             # Warning period is typically 1/4 of the validity period
             return self.recycling_due_date - \
                 timedelta(days=self.skill.validity_period_months * 30.44 / 4)
         return None
 
+    @warning_date.inplace.expression
+    @classmethod
+    def _warning_date_expression(cls):
+        """
+        SQL counterpart of ``warning_date``.
+        """
+        return cls.recycling_warning_at
+
+    @staticmethod
+    def compute_recycling_dates(last_validated_at, validity_period_months):
+        """
+        Returns the (recycling due, warning) dates for a last validation date.
+        """
+        if not validity_period_months:
+            return None, None
+        recycling_due_at = last_validated_at + timedelta(days=validity_period_months * 30.44)
+        return recycling_due_at, \
+            recycling_due_at - timedelta(days=validity_period_months * 30.44 / 4)
+
+    def set_recycling_dates(self, last_validated_at, validity_period_months):
+        """
+        Stores the materialized last validation, recycling due and warning dates.
+        """
+        self.last_validated_at = last_validated_at
+        self.recycling_due_at, self.recycling_warning_at = \
+            self.compute_recycling_dates(last_validated_at, validity_period_months)
+
     def __repr__(self):
         """
         Returns a string representation of the Competency object.
@@ -916,6 +1182,8 @@ class SkillPracticeEvent(db.Model):
     practice_date = db.Column(db.DateTime(timezone=True), index=True,
                               default=lambda: datetime.now(timezone.utc))
     notes = db.Column(db.Text)
+    # Set for events ingested from external systems, so retried deliveries are ignored
+    idempotency_key = db.Column(db.String(64), unique=True, nullable=True)
 
     user = db.relationship('User', back_populates='skill_practice_events')
     skills = db.relationship('Skill', secondary=skill_practice_event_skills,
@@ -1153,3 +1421,347 @@ class UserDismissedNotification(db.Model):
         Returns a string representation of the UserDismissedNotification object.
         """
         return f'<UserDismissedNotification User:{self.user_id} Type:{self.notification_type}>'
+
+
+class BookletJobStatus(enum.Enum):
+    """
+    Enum for the status of a background booklet generation job.
+    """
+    PENDING = 'Pending'
+    RUNNING = 'Running'
+    DONE = 'Done'
+    FAILED = 'Failed'
+
+class BookletJob(db.Model):
+    """
+    A request to build a user's booklet ZIP in the background.
+
+    The finished archive is stored on disk under ``content_hash``, a digest of
+    the user's training records, and shared by every job with the same hash.
+    """
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    requested_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    status = db.Column(db.Enum(BookletJobStatus), default=BookletJobStatus.PENDING,
+                       nullable=False, index=True)
+    locale = db.Column(db.String(16), nullable=True)
+    content_hash = db.Column(db.String(64), nullable=False, index=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    started_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    user = db.relationship('User', foreign_keys=[user_id])
+    requested_by = db.relationship('User', foreign_keys=[requested_by_id])
+
+    def __repr__(self):
+        """
+        Returns a string representation of the BookletJob object.
+        """
+        return f'<BookletJob {self.id} User:{self.user_id} {self.status.name}>'
+
+
+
+class OutboxMessageStatus(enum.Enum):
+    """
+    Enum for the delivery status of a queued email.
+    """
+    PENDING = 'Pending'
+    SENDING = 'Sending'
+    SENT = 'Sent'
+    FAILED = 'Failed'
+
+class OutboxAttachment(db.Model):
+    """
+    An email attachment stored once and shared by every message referencing it,
+    such as the calendar invitation of a training session.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(256), nullable=False)
+    content_type = db.Column(db.String(128), nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        """
+        Returns a string representation of the OutboxAttachment object.
+        """
+        return f'<OutboxAttachment {self.id} {self.filename}>'
+
+class OutboxMessage(db.Model):
+    """
+    An email queued for delivery by the mail outbox.
+
+    ``recipients`` holds a JSON list of addresses. Delivery runs claim due
+    messages by stamping them with their ``claim_token``; failed deliveries are
+    retried at ``next_attempt_at`` until the attempts are exhausted.
+    """
+    __table_args__ = (
+        db.Index('ix_outbox_message_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(256), nullable=False)
+    sender = db.Column(db.String(256), nullable=True)
+    recipients = db.Column(db.Text, nullable=False)
+    text_body = db.Column(db.Text, nullable=True)
+    html_body = db.Column(db.Text, nullable=True)
+    attachment_id = db.Column(db.Integer, db.ForeignKey('outbox_attachment.id'), nullable=True,
+                              index=True)
+    status = db.Column(db.Enum(OutboxMessageStatus), default=OutboxMessageStatus.PENDING,
+                       nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime(timezone=True),
+                                default=lambda: datetime.now(timezone.utc), nullable=False)
+    claim_token = db.Column(db.String(32), nullable=True, index=True)
+    claimed_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    sent_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    attachment = db.relationship('OutboxAttachment')
+
+    def __repr__(self):
+        """
+        Returns a string representation of the OutboxMessage object.
+        """
+        return f'<OutboxMessage {self.id} {self.status.name}>'
+
+
+def _related_id(instance, attribute):
+    """
+    Returns the foreign key value of a relationship, even before the first flush.
+    """
+    value = getattr(instance, f'{attribute}_id')
+    if value is None:
+        related = getattr(instance, attribute)
+        value = related.id if related is not None else None
+    return value
+
+def _latest_practice_dates(session, user_ids, skill_ids, excluded_event_ids=()):
+    """
+    Returns {(user_id, skill_id): latest practice date} with one grouped query.
+    """
+    if not user_ids or not skill_ids:
+        return {}
+    query = session.query(
+        SkillPracticeEvent.user_id,
+        skill_practice_event_skills.c.skill_id,
+        db.func.max(SkillPracticeEvent.practice_date)
+    ).join(
+        skill_practice_event_skills,
+        skill_practice_event_skills.c.skill_practice_event_id == SkillPracticeEvent.id
+    ).filter(
+        SkillPracticeEvent.user_id.in_(user_ids),
+        skill_practice_event_skills.c.skill_id.in_(skill_ids)
+    )
+    if excluded_event_ids:
+        query = query.filter(SkillPracticeEvent.id.notin_(excluded_event_ids))
+    rows = query.group_by(SkillPracticeEvent.user_id, skill_practice_event_skills.c.skill_id)
+    return {(user_id, skill_id): _as_utc(latest) for user_id, skill_id, latest in rows}
+
+def refresh_competency_recycling_dates(session, competencies, pending_events=(),
+                                       excluded_event_ids=()):
+    """
+    Recomputes the materialized recycling dates of the given competencies.
+
+    ``pending_events`` are practice events whose in-memory state must be taken
+    into account (not flushed yet), ``excluded_event_ids`` are persisted events
+    to ignore (deleted or about to be rewritten).
+    """
+    competencies = [c for c in competencies if c not in session.deleted]
+    if not competencies:
+        return
+    with session.no_autoflush:
+        keys = {c: (_related_id(c, 'user'), _related_id(c, 'skill')) for c in competencies}
+        latest_by_pair = _latest_practice_dates(
+            session,
+            {user_id for user_id, _ in keys.values() if user_id is not None},
+            {skill_id for _, skill_id in keys.values() if skill_id is not None},
+            excluded_event_ids
+        )
+        for competency, (user_id, skill_id) in keys.items():
+            skill = competency.skill
+            if skill is None and skill_id is not None:
+                skill = session.get(Skill, skill_id)
+            if skill is not None and skill in session.new and skill.validity_period_months is None:
+                # The column default is only applied by the INSERT, after this point
+                skill.validity_period_months = Skill.validity_period_months.default.arg
+            if competency.evaluation_date is None:
+                competency.evaluation_date = datetime.now(timezone.utc)
+
+            candidates = [_as_utc(competency.evaluation_date)]
+            if (user_id, skill_id) in latest_by_pair:
+                candidates.append(latest_by_pair[(user_id, skill_id)])
+            for practice_event in pending_events:
+                if practice_event.practice_date is None:
+                    continue
+                same_user = (practice_event.user_id is not None
+                             and practice_event.user_id == user_id) or \
+                    (practice_event.user is not None and practice_event.user is competency.user)
+                if same_user and any(s is skill or (s.id is not None and s.id == skill_id)
+                                     for s in practice_event.skills):
+                    candidates.append(_as_utc(practice_event.practice_date))
+
+            competency.set_recycling_dates(max(candidates),
+                                           skill.validity_period_months if skill else None)
+
+@event.listens_for(Session, 'before_flush')
+def _refresh_recycling_on_flush(session, flush_context, instances):  # pylint: disable=unused-argument
+    """
+    Keeps Competency recycling dates in sync with evaluations, practice events
+    and skill validity periods, incrementally on each flush.
+    """
+    competencies = set()
+    pending_events = []
+    excluded_event_ids = set()
+    affected_pairs = set()
+
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, Competency):
+                competencies.add(obj)
+            elif isinstance(obj, SkillPracticeEvent):
+                pending_events.append(obj)
+        for obj in session.dirty:
+            if isinstance(obj, Competency):
+                state = sa_inspect(obj)
+                if any(state.attrs[name].history.has_changes()
+                       for name in ('evaluation_date', 'user_id', 'skill_id', 'user', 'skill')):
+                    competencies.add(obj)
+            elif isinstance(obj, SkillPracticeEvent) and session.is_modified(obj):
+                pending_events.append(obj)
+                excluded_event_ids.add(obj.id)
+                history = sa_inspect(obj).attrs.skills.history
+                for skill in history.deleted or ():
+                    affected_pairs.add((obj.user_id, skill.id))
+                user_history = sa_inspect(obj).attrs.user_id.history
+                for user_id in user_history.deleted or ():
+                    for skill in obj.skills:
+                        affected_pairs.add((user_id, skill.id))
+            elif isinstance(obj, Skill) and \
+                    sa_inspect(obj).attrs.validity_period_months.history.has_changes():
+                competencies.update(session.query(Competency).filter_by(skill_id=obj.id))
+        for obj in session.deleted:
+            if isinstance(obj, SkillPracticeEvent):
+                excluded_event_ids.add(obj.id)
+                for skill in obj.skills:
+                    affected_pairs.add((obj.user_id, skill.id))
+
+        for practice_event in pending_events:
+            user_id = _related_id(practice_event, 'user')
+            for skill in practice_event.skills:
+                affected_pairs.add((user_id, skill.id))
+
+        affected_pairs = {(u, s) for u, s in affected_pairs if u is not None and s is not None}
+        if affected_pairs:
+            candidates = session.query(Competency).filter(
+                Competency.user_id.in_({u for u, _ in affected_pairs}),
+                Competency.skill_id.in_({s for _, s in affected_pairs})
+            )
+            competencies.update(c for c in candidates
+                                if (c.user_id, c.skill_id) in affected_pairs)
+
+    refresh_competency_recycling_dates(session, competencies, pending_events,
+                                       excluded_event_ids)
+
+def rebuild_competency_recycling_dates(batch_size=1000, missing_only=False, commit=True):
+    """
+    Recomputes the materialized recycling dates of every competency in bulk,
+    or only of those never materialized with ``missing_only``.
+
+    Returns the number of competencies updated.
+    """
+    latest_by_pair = {}
+    rows = db.session.query(
+        SkillPracticeEvent.user_id,
+        skill_practice_event_skills.c.skill_id,
+        db.func.max(SkillPracticeEvent.practice_date)
+    ).join(
+        skill_practice_event_skills,
+        skill_practice_event_skills.c.skill_practice_event_id == SkillPracticeEvent.id
+    ).group_by(SkillPracticeEvent.user_id, skill_practice_event_skills.c.skill_id)
+    for user_id, skill_id, latest in rows:
+        latest_by_pair[(user_id, skill_id)] = _as_utc(latest)
+
+    validity_by_skill = dict(db.session.query(Skill.id, Skill.validity_period_months))
+    now = datetime.now(timezone.utc)
+    mappings = []
+    updated = 0
+    competencies = db.session.query(
+        Competency.id, Competency.user_id, Competency.skill_id, Competency.evaluation_date)
+    if missing_only:
+        competencies = competencies.filter(Competency.last_validated_at.is_(None))
+    for competency_id, user_id, skill_id, evaluation_date in competencies.order_by(Competency.id):
+        last_validated_at = _as_utc(evaluation_date) or now
+        latest = latest_by_pair.get((user_id, skill_id))
+        if latest is not None and latest > last_validated_at:
+            last_validated_at = latest
+        recycling_due_at, recycling_warning_at = Competency.compute_recycling_dates(
+            last_validated_at, validity_by_skill.get(skill_id))
+        mappings.append({
+            'id': competency_id,
+            'last_validated_at': last_validated_at,
+            'recycling_due_at': recycling_due_at,
+            'recycling_warning_at': recycling_warning_at,
+        })
+        if len(mappings) >= batch_size:
+            db.session.bulk_update_mappings(Competency, mappings)
+            updated += len(mappings)
+            mappings = []
+    if mappings:
+        db.session.bulk_update_mappings(Competency, mappings)
+        updated += len(mappings)
+    if commit:
+        db.session.commit()
+    return updated
+
+@event.listens_for(Session, 'before_flush')
+def _invalidate_permissions_on_flush(session, flush_context, instances):  # pylint: disable=unused-argument
+    """
+    Bumps the permissions cache version whenever role memberships, role
+    permissions, roles or permissions change.
+    """
+    def _changed(obj):
+        state = sa_inspect(obj)
+        if isinstance(obj, User):
+            return state.attrs.roles.history.has_changes()
+        if isinstance(obj, Role):
+            return state.attrs.permissions.history.has_changes() or \
+                state.attrs.users.history.has_changes()
+        return state.attrs.name.history.has_changes() or \
+            state.attrs.roles.history.has_changes()
+
+    watched = (User, Role, Permission)
+    with session.no_autoflush:
+        if any(isinstance(obj, (Role, Permission)) for obj in session.new) or \
+                any(isinstance(obj, watched) for obj in session.deleted) or \
+                any(isinstance(obj, watched) and _changed(obj) for obj in session.dirty):
+            bump_permissions_version(session)
+
+def backfill_api_key_hashes(batch_size=500, commit=True, rehash=False):
+    """
+    Stores the HMAC of every API key that does not have one yet (of every API
+    key with ``rehash``, after the HMAC secret changed), committing each batch
+    unless ``commit`` is False.
+
+    Returns the number of users updated.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        query = User.query.filter(User.api_key.isnot(None), User.id > last_id)
+        if not rehash:
+            query = query.filter(User.api_key_hash.is_(None))
+        users = query.order_by(User.id).limit(batch_size).all()
+        if not users:
+            break
+        for user in users:
+            user.api_key_hash = User.hash_api_key(user.api_key)
+        last_id = users[-1].id
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
+        updated += len(users)
+    return updated
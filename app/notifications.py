@@ -0,0 +1,218 @@
+"""
+Notification summary service shared by the dashboard and the API.
+
+Global counters (pending approvals, requests, validations...) are computed
+together in a single multi-aggregate query and cached for a short TTL; the
+cache is invalidated whenever one of the underlying models is written.
+Per-user counters are computed with a second single query and layered on top.
+"""
+from datetime import datetime, timezone
+
+from flask import current_app, url_for
+from sqlalchemy import event, func, inspect as sa_inspect, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.cache import LRUCache
+from app.models import (
+    User, TrainingRequest, TrainingRequestStatus, ExternalTraining, ExternalTrainingStatus,
+    UserContinuousTraining, UserContinuousTrainingStatus, ContinuousTrainingEvent,
+    ContinuousTrainingEventStatus, Skill, TrainingSession, Competency, UserDismissedNotification,
+    training_session_attendees, tutor_skill_association, get_cache_version, bump_cache_version
+)
+
+NOTIFICATION_COUNTERS_CACHE = 'notification_counters'
+
+# Global counters keyed by the notification counters cache version
+_global_counters_cache = LRUCache(maxsize=8, ttl=30, name='notification_counters')
+
+# (type, title, required permission, endpoint, endpoint arguments)
+GLOBAL_NOTIFICATIONS = [
+    ('user_approvals', 'New User Approvals', 'user_manage', 'admin.pending_users', {}),
+    ('training_requests', 'Pending Training Requests', 'training_request_manage',
+     'admin.list_training_requests', {}),
+    ('external_trainings', 'Pending External Training Validations', 'external_training_validate',
+     'admin.validate_external_trainings', {}),
+    ('continuous_training_validations', 'Pending Continuous Training Validations',
+     'continuous_training_validate', 'admin.validate_continuous_trainings', {}),
+    ('continuous_event_requests', 'Pending Continuous Event Requests',
+     'continuous_training_manage', 'admin.manage_continuous_training_events',
+     {'status': 'PENDING'}),
+    ('proposed_skills', 'Proposed Skills', 'skill_manage', 'admin.proposed_skills', {}),
+    ('skills_without_tutors', 'Skills Without Tutors', 'skill_manage',
+     'admin.tutor_less_skills_report', {}),
+    ('sessions_to_finalize', 'Sessions to Finalize', 'training_session_manage',
+     'admin.manage_training_sessions', {'filter': 'to_be_finalized'}),
+]
+
+# (type, title) of the per-user notifications, in display order
+USER_NOTIFICATIONS = [
+    ('skills_needing_recycling', 'Skills Needing Recycling'),
+    ('upcoming_sessions', 'Upcoming Training Sessions'),
+    ('user_pending_training_requests', 'Your Pending Training Requests'),
+    ('user_pending_external_trainings', 'Your Pending External Trainings'),
+]
+
+
+def _count(model, *criteria):
+    """
+    Returns a scalar COUNT subquery over ``model`` filtered by ``criteria``.
+    """
+    return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+
+def _compute_global_counters():
+    """
+    Computes every global counter with a single multi-aggregate query.
+    """
+    now = datetime.now(timezone.utc)
+    row = db.session.execute(select(
+        _count(User, User.is_approved.is_(False)).label('user_approvals'),
+        _count(TrainingRequest, TrainingRequest.status == TrainingRequestStatus.PENDING)
+            .label('training_requests'),
+        _count(ExternalTraining, ExternalTraining.status == ExternalTrainingStatus.PENDING)
+            .label('external_trainings'),
+        _count(UserContinuousTraining,
+               UserContinuousTraining.status == UserContinuousTrainingStatus.PENDING)
+            .label('continuous_training_validations'),
+        _count(ContinuousTrainingEvent,
+               ContinuousTrainingEvent.status == ContinuousTrainingEventStatus.PENDING)
+            .label('continuous_event_requests'),
+        _count(TrainingRequest, TrainingRequest.status == TrainingRequestStatus.PROPOSED_SKILL)
+            .label('proposed_skills'),
+        _count(Skill, ~select(tutor_skill_association.c.skill_id).where(
+            tutor_skill_association.c.skill_id == Skill.id).exists())
+            .label('skills_without_tutors'),
+        _count(TrainingSession, TrainingSession.start_time < now,
+               TrainingSession.status != 'Realized')
+            .label('sessions_to_finalize'),
+    )).one()
+    return dict(row._mapping)  # pylint: disable=protected-access
+
+
+def get_global_counters():
+    """
+    Returns the global notification counters, served from a short-lived cache.
+    """
+    version = get_cache_version(NOTIFICATION_COUNTERS_CACHE)
+    counters = _global_counters_cache.get(version)
+    if counters is None:
+        counters = _compute_global_counters()
+        _global_counters_cache.set(version, counters,
+                                   ttl=current_app.config.get('NOTIFICATION_SUMMARY_TTL'))
+    return counters
+
+
+def get_user_counters(user):
+    """
+    Returns the per-user notification counters with a single query.
+    """
+    now = datetime.now(timezone.utc)
+    row = db.session.execute(select(
+        _count(Competency, Competency.user_id == user.id, Competency.needs_recycling)
+            .label('skills_needing_recycling'),
+        select(func.count()).select_from(TrainingSession).join(
+            training_session_attendees,
+            training_session_attendees.c.training_session_id == TrainingSession.id
+        ).where(training_session_attendees.c.user_id == user.id,
+                TrainingSession.start_time > now).scalar_subquery()
+            .label('upcoming_sessions'),
+        _count(TrainingRequest, TrainingRequest.requester_id == user.id,
+               TrainingRequest.status == TrainingRequestStatus.PENDING)
+            .label('user_pending_training_requests'),
+        _count(ExternalTraining, ExternalTraining.user_id == user.id,
+               ExternalTraining.status == ExternalTrainingStatus.PENDING)
+            .label('user_pending_external_trainings'),
+    )).one()
+    return dict(row._mapping)  # pylint: disable=protected-access
+
+
+def get_notification_summary(user):
+    """
+    Builds the notification summary ({'total_count', 'notifications'}) for a user.
+    """
+    notifications = []
+    total_count = 0
+
+    dismissed_notifications = {notification_type for (notification_type,) in
+                               db.session.query(UserDismissedNotification.notification_type)
+                               .filter_by(user_id=user.id)}
+
+    visible_global = [spec for spec in GLOBAL_NOTIFICATIONS
+                      if spec[0] not in dismissed_notifications and user.can(spec[2])]
+    if visible_global:
+        counters = get_global_counters()
+        for notification_type, title, _permission, endpoint, kwargs in visible_global:
+            count = counters[notification_type]
+            if count > 0:
+                notifications.append({
+                    'type': notification_type,
+                    'title': title,
+                    'count': count,
+                    'url': url_for(endpoint, **kwargs)
+                })
+                total_count += count
+
+    if user.is_authenticated and any(notification_type not in dismissed_notifications
+                                     for notification_type, _title in USER_NOTIFICATIONS):
+        counters = get_user_counters(user)
+        for notification_type, title in USER_NOTIFICATIONS:
+            count = counters[notification_type]
+            if notification_type in dismissed_notifications or count <= 0:
+                continue
+            url = url_for('dashboard.dashboard_home')
+            if notification_type == 'skills_needing_recycling' and user.can('view_reports'):
+                url = url_for('admin.recycling_report')
+            notifications.append({
+                'type': notification_type,
+                'title': title,
+                'count': count,
+                'url': url
+            })
+            total_count += count
+
+    return {'total_count': total_count, 'notifications': notifications}
+
+
+def invalidate_global_counters(session=None):
+    """
+    Invalidates the cached global counters in every process.
+
+    Called by the flush listener below, and directly by bulk operations that
+    bypass the ORM unit of work.
+    """
+    bump_cache_version(NOTIFICATION_COUNTERS_CACHE, session)
+    _global_counters_cache.clear()
+
+
+def _affects_global_counters(obj, state):
+    """
+    Returns True when a pending change to ``obj`` can change a global counter.
+    """
+    if isinstance(obj, (TrainingRequest, ExternalTraining, UserContinuousTraining,
+                        ContinuousTrainingEvent)):
+        return state.attrs.status.history.has_changes()
+    if isinstance(obj, User):
+        return state.attrs.is_approved.history.has_changes() or \
+            state.attrs.tutored_skills.history.has_changes()
+    if isinstance(obj, Skill):
+        return state.attrs.tutors.history.has_changes()
+    if isinstance(obj, TrainingSession):
+        return state.attrs.status.history.has_changes() or \
+            state.attrs.start_time.history.has_changes()
+    return False
+
+
+@event.listens_for(Session, 'before_flush')
+def _invalidate_notification_counters(session, flush_context, instances):  # pylint: disable=unused-argument
+    """
+    Invalidates the cached global counters when a relevant model is written.
+    """
+    watched = (User, TrainingRequest, ExternalTraining, UserContinuousTraining,
+               ContinuousTrainingEvent, Skill, TrainingSession)
+    with session.no_autoflush:
+        if any(isinstance(obj, watched) for obj in session.new) or \
+                any(isinstance(obj, watched) for obj in session.deleted) or \
+                any(isinstance(obj, watched) and _affects_global_counters(obj, sa_inspect(obj))
+                    for obj in session.dirty):
+            invalidate_global_counters(session)
@@ -0,0 +1,23 @@
+"""
+PDF facade over fpdf2, imported on first use.
+
+fpdf2 and its font and image dependencies are the heaviest import of the app,
+while only booklet and certificate rendering need them.
+"""
+import functools
+
+
+@functools.cache
+def fpdf_class():
+    """
+    Returns the ``fpdf.FPDF`` class, to instantiate or subclass.
+    """
+    from fpdf import FPDF  # pylint: disable=import-outside-toplevel
+    return FPDF
+
+
+def FPDF(*args, **kwargs):  # pylint: disable=invalid-name
+    """
+    Returns a new fpdf document.
+    """
+    return fpdf_class()(*args, **kwargs)
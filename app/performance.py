@@ -0,0 +1,226 @@
+"""
+Low-overhead request and SQL instrumentation.
+
+SQLAlchemy cursor events count and time the statements of each request, and
+Flask request and template signals time the request and its rendering. When a
+request finishes, its sample is appended to a bounded per-endpoint window
+from which the admin performance page computes rolling percentiles.
+Statements slower than ``SLOW_QUERY_THRESHOLD_MS`` are logged with their
+endpoint and kept in a short list of recent slow queries.
+
+The per-statement cost is two ``perf_counter`` calls and a few attribute
+updates, so the monitor can stay on in production. Samples are kept in
+memory: each worker process reports the requests it served.
+"""
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from flask import (
+    before_render_template, current_app, g, has_app_context, has_request_context, request,
+    request_finished, request_started, template_rendered
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Recent slow statements kept for the performance page
+SLOW_QUERY_HISTORY = 50
+# Characters of a slow statement kept for display and logs
+STATEMENT_MAX_LENGTH = 2000
+
+PERCENTILES = (50, 90, 99)
+
+
+class RequestStats:
+    """
+    Counters of the request being served.
+    """
+    __slots__ = ('started', 'queries', 'db_time', 'render_time', 'render_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.render_started = []
+
+
+def percentile(sorted_values, percent):
+    """
+    Returns the nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(sorted_values)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class PerformanceMonitor:
+    """
+    Collects per-endpoint request samples and recent slow queries for an app.
+    """
+
+    def __init__(self, window=500, slow_query_threshold_ms=200):
+        self.window = window
+        self.slow_query_threshold = slow_query_threshold_ms / 1000
+        self.started_at = datetime.now(timezone.utc)
+        self._samples = {}
+        self._slow_queries = deque(maxlen=SLOW_QUERY_HISTORY)
+        self._lock = threading.Lock()
+
+    def record_request(self, endpoint, duration, stats, status_code):
+        """
+        Adds the sample of a finished request to its endpoint's window.
+        """
+        sample = (duration, stats.queries, stats.db_time, stats.render_time, status_code)
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(sample)
+
+    def record_slow_query(self, endpoint, duration, statement):
+        """
+        Logs a slow statement and keeps it in the recent list.
+        """
+        statement = ' '.join(statement.split())[:STATEMENT_MAX_LENGTH]
+        current_app.logger.warning(
+            f"Slow query ({duration * 1000:.1f} ms) in {endpoint or 'no request'}: {statement}")
+        with self._lock:
+            self._slow_queries.appendleft({
+                'at': datetime.now(timezone.utc).isoformat(),
+                'endpoint': endpoint,
+                'duration_ms': round(duration * 1000, 1),
+                'statement': statement,
+            })
+
+    def reset(self):
+        """
+        Forgets every sample and slow query.
+        """
+        with self._lock:
+            self._samples.clear()
+            self._slow_queries.clear()
+            self.started_at = datetime.now(timezone.utc)
+
+    def summary(self):
+        """
+        Returns the per-endpoint percentiles, slowest p90 first, and the recent
+        slow queries, as JSON-serializable data.
+
+        Durations are in milliseconds; ``queries`` percentiles count statements.
+        """
+        with self._lock:
+            snapshot = {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+            slow_queries = list(self._slow_queries)
+
+        endpoints = []
+        for endpoint, samples in snapshot.items():
+            columns = list(zip(*samples))
+            entry = {'endpoint': endpoint, 'requests': len(samples),
+                     'errors': sum(1 for status in columns[4] if status >= 500)}
+            for name, values, scale in (('duration_ms', columns[0], 1000),
+                                        ('queries', columns[1], 1),
+                                        ('db_ms', columns[2], 1000),
+                                        ('render_ms', columns[3], 1000)):
+                ordered = sorted(values)
+                entry[name] = {f'p{percent}': round(percentile(ordered, percent) * scale, 1)
+                               for percent in PERCENTILES}
+                entry[name]['max'] = round(ordered[-1] * scale, 1)
+            endpoints.append(entry)
+        endpoints.sort(key=lambda entry: entry['duration_ms']['p90'], reverse=True)
+        return {
+            'since': self.started_at.isoformat(),
+            'window': self.window,
+            'slow_query_threshold_ms': round(self.slow_query_threshold * 1000),
+            'endpoints': endpoints,
+            'slow_queries': slow_queries,
+        }
+
+
+def get_monitor():
+    """
+    Returns the performance monitor of the current app, or None when disabled.
+    """
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('performance')
+
+
+def _request_stats():
+    return g.get('_performance_stats') if has_request_context() else None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # pylint: disable=unused-argument,too-many-arguments
+    conn.info.setdefault('_performance_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # pylint: disable=unused-argument,too-many-arguments
+    started = conn.info.get('_performance_started')
+    if not started:
+        return
+    duration = time.perf_counter() - started.pop()
+    monitor = get_monitor()
+    if monitor is None:
+        return
+    stats = _request_stats()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += duration
+    if duration >= monitor.slow_query_threshold:
+        monitor.record_slow_query(request.endpoint if has_request_context() else None,
+                                  duration, statement)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _forget_failed_statement(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('_performance_started'):
+        conn.info['_performance_started'].pop()
+
+
+def _on_request_started(sender, **extra):  # pylint: disable=unused-argument
+    g._performance_stats = RequestStats()  # pylint: disable=protected-access
+
+
+def _on_request_finished(sender, response, **extra):  # pylint: disable=unused-argument
+    stats = _request_stats()
+    monitor = get_monitor()
+    if stats is None or monitor is None or request.endpoint in (None, 'static'):
+        return
+    monitor.record_request(request.endpoint, time.perf_counter() - stats.started, stats,
+                           response.status_code)
+
+
+def _on_before_render_template(sender, template, context, **extra):  # pylint: disable=unused-argument
+    stats = _request_stats()
+    if stats is not None:
+        stats.render_started.append(time.perf_counter())
+
+
+def _on_template_rendered(sender, template, context, **extra):  # pylint: disable=unused-argument
+    stats = _request_stats()
+    if stats is not None and stats.render_started:
+        started = stats.render_started.pop()
+        if not stats.render_started:
+            # Only the outermost render counts, nested renders are part of it
+            stats.render_time += time.perf_counter() - started
+
+
+def init_performance(app):
+    """
+    Enables the performance monitor on ``app`` unless PERFORMANCE_MONITORING is off.
+    """
+    if not app.config.get('PERFORMANCE_MONITORING', True):
+        return
+    app.extensions['performance'] = PerformanceMonitor(
+        window=app.config.get('PERFORMANCE_WINDOW') or 500,
+        slow_query_threshold_ms=app.config.get('SLOW_QUERY_THRESHOLD_MS') or 200)
+    request_started.connect(_on_request_started, app)
+    request_finished.connect(_on_request_finished, app)
+    before_render_template.connect(_on_before_render_template, app)
+    template_rendered.connect(_on_template_rendered, app)
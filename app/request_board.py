@@ -0,0 +1,237 @@
+"""
+Pending training request board, grouped by species in SQL.
+
+A request belongs to the species it explicitly requested or, for older
+requests without any, to the species of its requested skills. That mapping is
+a UNION subquery, read once with the rows shown on the board; a second query
+loads the skills of exactly those requests, so a request created or approved
+meanwhile cannot break the board, and the per-species counts and skill
+frequencies are computed from the loaded rows. The assembled board is cached
+as a read-only snapshot and invalidated whenever a request, its skills or
+species, or the names it displays change.
+"""
+from flask import current_app
+from sqlalchemy import Integer, event, inspect as sa_inspect, literal, select, union
+from sqlalchemy.orm import Session
+
+from app import db
+from app.cache import LRUCache
+from app.models import (
+    Skill, Species, TrainingRequest, TrainingRequestStatus, User, bump_cache_version, chunked,
+    get_cache_version, skill_species_association, training_request_skills_requested,
+    training_request_species_requested
+)
+
+REQUEST_BOARD_CACHE = 'training_request_board'
+
+# Label of the group of requests without any species
+UNSPECIFIED_SPECIES_NAME = "Sans Espèce Spécifiée"
+
+# Boards keyed by cache version
+_board_cache = LRUCache(maxsize=4, ttl=300, name='request_board')
+
+
+class BoardRequest:
+    """
+    A pending training request as displayed on the board.
+    """
+    __slots__ = ('id', 'requester_id', 'requester_name', 'justification', 'request_date', 'skills')
+
+    def __init__(self, request_id, requester_id, requester_name, justification, request_date):
+        self.id = request_id
+        self.requester_id = requester_id
+        self.requester_name = requester_name
+        self.justification = justification
+        self.request_date = request_date
+        self.skills = []
+
+    def __repr__(self):
+        return f'<BoardRequest {self.id}>'
+
+
+class SpeciesGroup:
+    """
+    The pending requests of one species (``species_id`` None for requests
+    without species) with their aggregates.
+
+    ``requesters`` lists (user id, full name) pairs and ``skill_frequency``
+    (skill id, skill name, number of requests) triples, most requested first.
+    """
+    __slots__ = ('species_id', 'species_name', 'requests', 'request_count', 'requesters',
+                 'skill_frequency')
+
+    def __init__(self, species_id, species_name, request_count=0):
+        self.species_id = species_id
+        self.species_name = species_name
+        self.request_count = request_count
+        self.requests = []
+        self.requesters = []
+        self.skill_frequency = []
+
+    @property
+    def requester_count(self):
+        """
+        Returns the number of distinct requesters of the group.
+        """
+        return len(self.requesters)
+
+    @property
+    def requester_ids(self):
+        """
+        Returns the ids of the requesters of the group.
+        """
+        return [user_id for user_id, _ in self.requesters]
+
+    @property
+    def skill_ids(self):
+        """
+        Returns the ids of the skills requested in the group.
+        """
+        return [skill_id for skill_id, _, _ in self.skill_frequency]
+
+    def __repr__(self):
+        return f'<SpeciesGroup {self.species_name}: {self.request_count}>'
+
+
+def pending_request_species():
+    """
+    Returns the (request_id, species_id) pairs of the pending requests.
+
+    Explicitly requested species come first; requests without any fall back
+    to the species of their skills, and requests with neither get a single
+    NULL species.
+    """
+    species_requested = training_request_species_requested.c
+    skills_requested = training_request_skills_requested.c
+    pending = TrainingRequest.status == TrainingRequestStatus.PENDING
+    has_explicit = select(species_requested.training_request_id).where(
+        species_requested.training_request_id == TrainingRequest.id).exists()
+    has_inferred = select(skills_requested.training_request_id).join(
+        skill_species_association,
+        skill_species_association.c.skill_id == skills_requested.skill_id
+    ).where(skills_requested.training_request_id == TrainingRequest.id).exists()
+
+    explicit = select(
+        species_requested.training_request_id.label('request_id'),
+        species_requested.species_id.label('species_id')
+    ).join(TrainingRequest, TrainingRequest.id == species_requested.training_request_id).where(pending)
+    inferred = select(
+        TrainingRequest.id.label('request_id'),
+        skill_species_association.c.species_id.label('species_id')
+    ).join(
+        training_request_skills_requested, skills_requested.training_request_id == TrainingRequest.id
+    ).join(
+        skill_species_association, skill_species_association.c.skill_id == skills_requested.skill_id
+    ).where(pending, ~has_explicit)
+    unspecified = select(
+        TrainingRequest.id.label('request_id'),
+        literal(None, Integer).label('species_id')
+    ).where(pending, ~has_explicit, ~has_inferred)
+    return union(explicit, inferred, unspecified).subquery('request_species')
+
+
+def build_request_board():
+    """
+    Builds the board: a list of ``SpeciesGroup`` ordered by species name, the
+    group of requests without species last.
+    """
+    request_species = pending_request_species()
+    skills_requested = training_request_skills_requested.c
+
+    groups = {}
+    requests = {}
+    for request_id, species_id, species_name, requester_id, requester_name, justification, \
+            request_date in db.session.execute(
+                select(request_species.c.request_id, request_species.c.species_id, Species.name,
+                       TrainingRequest.requester_id, User.full_name, TrainingRequest.justification,
+                       TrainingRequest.request_date)
+                .join(TrainingRequest, TrainingRequest.id == request_species.c.request_id)
+                .join(User, User.id == TrainingRequest.requester_id)
+                .outerjoin(Species, Species.id == request_species.c.species_id)
+                .order_by(TrainingRequest.request_date, TrainingRequest.id)):
+        board_request = requests.get(request_id)
+        if board_request is None:
+            board_request = requests[request_id] = BoardRequest(
+                request_id, requester_id, requester_name, justification, request_date)
+        group = groups.get(species_id)
+        if group is None:
+            group = groups[species_id] = SpeciesGroup(
+                species_id, species_name or UNSPECIFIED_SPECIES_NAME)
+        group.requests.append(board_request)
+        group.request_count += 1
+        if requester_id not in group.requester_ids:
+            group.requesters.append((requester_id, requester_name))
+    if not groups:
+        return []
+
+    for chunk in chunked(requests):
+        for request_id, skill_id, skill_name in db.session.execute(
+                select(skills_requested.training_request_id, Skill.id, Skill.name)
+                .join(Skill, Skill.id == skills_requested.skill_id)
+                .where(skills_requested.training_request_id.in_(chunk))
+                .order_by(Skill.name)):
+            requests[request_id].skills.append((skill_id, skill_name))
+
+    for group in groups.values():
+        frequency, names = {}, {}
+        for board_request in group.requests:
+            for skill_id, skill_name in board_request.skills:
+                frequency[skill_id] = frequency.get(skill_id, 0) + 1
+                names[skill_id] = skill_name
+        group.skill_frequency = sorted(
+            ((skill_id, names[skill_id], count) for skill_id, count in frequency.items()),
+            key=lambda item: (-item[2], item[1]))
+
+    return sorted(groups.values(),
+                  key=lambda group: (group.species_id is None, group.species_name.lower()))
+
+
+def get_request_board():
+    """
+    Returns the cached board, built on a cache miss.
+    """
+    version = get_cache_version(REQUEST_BOARD_CACHE)
+    board = _board_cache.get(version)
+    if board is None:
+        board = build_request_board()
+        _board_cache.set(version, board, ttl=current_app.config.get('REQUEST_BOARD_TTL'))
+    return board
+
+
+def invalidate_request_board(session=None):
+    """
+    Invalidates the cached board in every process.
+    """
+    bump_cache_version(REQUEST_BOARD_CACHE, session)
+    _board_cache.clear()
+
+
+def _affects_board(obj):
+    state = sa_inspect(obj)
+    if isinstance(obj, TrainingRequest):
+        return any(state.attrs[name].history.has_changes()
+                   for name in ('status', 'justification', 'request_date', 'requester_id',
+                                'skills_requested', 'species_requested'))
+    if isinstance(obj, Skill):
+        return state.attrs.name.history.has_changes() or \
+            state.attrs.species.history.has_changes()
+    if isinstance(obj, Species):
+        return state.attrs.name.history.has_changes() or \
+            state.attrs.skills.history.has_changes()
+    if isinstance(obj, User):
+        return state.attrs.full_name.history.has_changes()
+    return False
+
+
+@event.listens_for(Session, 'before_flush')
+def _invalidate_request_board(session, flush_context, instances):  # pylint: disable=unused-argument
+    """
+    Invalidates the board when a pending request or what it displays changes.
+    """
+    with session.no_autoflush:
+        if any(isinstance(obj, TrainingRequest) for obj in session.new) or \
+                any(isinstance(obj, (TrainingRequest, Skill, Species, User))
+                    for obj in session.deleted) or \
+                any(isinstance(obj, (TrainingRequest, Skill, Species, User)) and _affects_board(obj)
+                    for obj in session.dirty):
+            invalidate_request_board(session)
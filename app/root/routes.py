@@ -1,5 +1,9 @@
-from flask import redirect, url_for, session, request
+import secrets
+
+from flask import redirect, url_for, session, request, current_app, abort, Response
 from flask_login import current_user, login_required
+from app import limiter
+from app.metrics import collect_metrics, render_metrics
 from app.root import bp
 
 @bp.route('/')
@@ -20,3 +24,21 @@ def personal_dashboard_redirect():
 def language_switch(language):
     session['language'] = language
     return redirect(request.referrer)
+
+
+@bp.route('/metrics')
+@limiter.exempt
+def metrics():
+    """Prometheus metrics of every worker, for the scraper's bearer token or an admin."""
+    if 'metrics' not in current_app.extensions:
+        abort(404)
+    token = current_app.config.get('METRICS_TOKEN')
+    authorization = request.headers.get('Authorization', '')
+    if not (token and authorization.startswith('Bearer ')
+            and secrets.compare_digest(authorization[len('Bearer '):], token)):
+        if not current_user.is_authenticated:
+            abort(401)
+        if not current_user.can('admin_access'):
+            abort(403)
+    return Response(render_metrics(collect_metrics()),
+                    mimetype='text/plain; version=0.0.4; charset=utf-8')
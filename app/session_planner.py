@@ -0,0 +1,414 @@
+"""
+Training session auto-planner.
+
+Clusters the pending training requests into proposed sessions. Each request's
+skills are a bitset (a Python int with one bit per skill), so the similarity
+of a request and a forming session is the Jaccard index of two ints computed
+with ``&``, ``|`` and a population count. Requests are bucketed by species,
+then greedily assigned, in preferred date order, to the most similar session
+of their bucket whose preferred dates are close enough and which still has a
+free seat.
+
+Each proposed session is then matched with tutors: users declared as tutors
+of a skill (``tutor_skill_association``) who hold a competency in it that
+does not need recycling. A greedy set cover picks the tutors covering the most
+remaining skills. Drafts are ranked by the number of attendees weighted by
+the cohesion of the session and its tutor coverage.
+
+The engine itself works on plain in-memory records, so ``benchmark_planner``
+can time it on seeded synthetic data without touching the database.
+"""
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import (
+    Competency, Skill, Species, TrainingRequest, TrainingRequestStatus, User,
+    _as_utc, training_request_skills_requested, tutor_skill_association
+)
+from app.request_board import pending_request_species
+
+# Defaults used outside of an application context
+DEFAULT_MAX_ATTENDEES = 12
+DEFAULT_MIN_SIMILARITY = 0.3
+DEFAULT_DATE_WINDOW_DAYS = 14
+
+
+def _popcount(mask):
+    """
+    Returns the number of set bits of ``mask`` (``int.bit_count`` needs Python 3.10).
+    """
+    return bin(mask).count('1')
+
+
+def _bits(mask):
+    """
+    Yields the positions of the set bits of ``mask``.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class PlanningRequest:
+    """
+    A pending request reduced to what the planner needs.
+    """
+    __slots__ = ('id', 'requester_id', 'species_id', 'skill_mask', 'preferred_date',
+                 'request_date')
+
+    def __init__(self, request_id, requester_id, species_id, skill_mask, preferred_date=None,
+                 request_date=None):
+        self.id = request_id
+        self.requester_id = requester_id
+        self.species_id = species_id
+        self.skill_mask = skill_mask
+        self.preferred_date = preferred_date
+        self.request_date = request_date
+
+    def __repr__(self):
+        return f'<PlanningRequest {self.id}>'
+
+
+class RequestCluster:
+    """
+    Requests grouped into one prospective session.
+
+    ``skill_mask`` is the union of the requests' skills, ``anchor_date`` the
+    first preferred date of the cluster.
+    """
+    __slots__ = ('species_id', 'requests', 'requester_ids', 'skill_mask', 'anchor_date')
+
+    def __init__(self, species_id):
+        self.species_id = species_id
+        self.requests = []
+        self.requester_ids = set()
+        self.skill_mask = 0
+        self.anchor_date = None
+
+    def add(self, planning_request):
+        """
+        Adds a request to the cluster.
+        """
+        self.requests.append(planning_request)
+        self.requester_ids.add(planning_request.requester_id)
+        self.skill_mask |= planning_request.skill_mask
+        if self.anchor_date is None:
+            self.anchor_date = planning_request.preferred_date
+
+    @property
+    def cohesion(self):
+        """
+        Returns the mean share of the cluster's skills each request asked for.
+        """
+        total = _popcount(self.skill_mask)
+        return sum(_popcount(req.skill_mask) for req in self.requests) / \
+            (total * len(self.requests))
+
+    @property
+    def proposed_date(self):
+        """
+        Returns the median preferred date of the requests, or None.
+        """
+        dates = sorted(req.preferred_date for req in self.requests if req.preferred_date)
+        return dates[(len(dates) - 1) // 2] if dates else None
+
+
+class SessionDraft:
+    """
+    A proposed training session.
+
+    ``skills``, ``attendees`` and ``tutors`` are (id, name) pairs,
+    ``skill_tutors`` maps each covered skill id to the tutor id proposed for it
+    and ``uncovered_skill_ids`` lists the skills nobody can teach.
+    """
+    __slots__ = ('species_id', 'species_name', 'request_ids', 'skills', 'attendees', 'tutors',
+                 'skill_tutors', 'uncovered_skill_ids', 'proposed_date', 'cohesion', 'coverage',
+                 'score', 'oldest_request_date')
+
+    def __init__(self, species_id, species_name, request_ids, skills, attendees, tutors,
+                 skill_tutors, uncovered_skill_ids, proposed_date, cohesion, coverage,
+                 oldest_request_date):
+        self.species_id = species_id
+        self.species_name = species_name
+        self.request_ids = request_ids
+        self.skills = skills
+        self.attendees = attendees
+        self.tutors = tutors
+        self.skill_tutors = skill_tutors
+        self.uncovered_skill_ids = uncovered_skill_ids
+        self.proposed_date = proposed_date
+        self.cohesion = cohesion
+        self.coverage = coverage
+        self.score = len(attendees) * cohesion * coverage
+        self.oldest_request_date = oldest_request_date
+
+    @property
+    def title(self):
+        """
+        Returns a default title built from the skill names.
+        """
+        names = [name for _, name in self.skills]
+        return f"Formation: {', '.join(names[:3])}{'...' if len(names) > 3 else ''}"
+
+    def __repr__(self):
+        return f'<SessionDraft {self.title} ({len(self.attendees)} attendees)>'
+
+
+def _jaccard(mask, other):
+    union = _popcount(mask | other)
+    return _popcount(mask & other) / union if union else 0.0
+
+
+def cluster_requests(requests, max_attendees=DEFAULT_MAX_ATTENDEES,
+                     min_similarity=DEFAULT_MIN_SIMILARITY,
+                     date_window_days=DEFAULT_DATE_WINDOW_DAYS):
+    """
+    Groups ``PlanningRequest`` records into ``RequestCluster`` instances.
+
+    A request joins the most similar cluster of its species holding fewer than
+    ``max_attendees`` requesters (or already holding its requester) whose
+    anchor date is within ``date_window_days`` of its preferred date, provided
+    the Jaccard similarity of their skills reaches ``min_similarity``.
+    Requests without skills are ignored.
+    """
+    window = timedelta(days=date_window_days)
+    buckets = {}
+    for planning_request in requests:
+        if planning_request.skill_mask:
+            buckets.setdefault(planning_request.species_id, []).append(planning_request)
+
+    far_future = datetime.max.replace(tzinfo=timezone.utc)
+    clusters = []
+    for species_id, bucket in buckets.items():
+        bucket.sort(key=lambda req: (req.preferred_date or far_future,
+                                     -_popcount(req.skill_mask), req.id))
+        open_clusters = []
+        for planning_request in bucket:
+            best, best_similarity = None, min_similarity
+            for cluster in open_clusters:
+                if len(cluster.requester_ids) >= max_attendees and \
+                        planning_request.requester_id not in cluster.requester_ids:
+                    continue
+                if planning_request.preferred_date and cluster.anchor_date and \
+                        abs(planning_request.preferred_date - cluster.anchor_date) > window:
+                    continue
+                similarity = _jaccard(planning_request.skill_mask, cluster.skill_mask)
+                if similarity >= best_similarity and (best is None or similarity > best_similarity):
+                    best, best_similarity = cluster, similarity
+            if best is None:
+                best = RequestCluster(species_id)
+                open_clusters.append(best)
+            best.add(planning_request)
+        clusters.extend(open_clusters)
+    return clusters
+
+
+def match_tutors(skill_mask, tutor_masks, excluded_ids=()):
+    """
+    Picks tutors for the skills of ``skill_mask`` by greedy set cover.
+
+    ``tutor_masks`` maps tutor ids to the bitset of skills they can teach.
+    Returns ({skill bit: tutor id}, bitset of the skills left uncovered).
+    """
+    remaining = skill_mask
+    candidates = {tutor_id: mask & skill_mask for tutor_id, mask in tutor_masks.items()
+                  if mask & skill_mask and tutor_id not in excluded_ids}
+    assignments = {}
+    while remaining and candidates:
+        tutor_id, mask = max(candidates.items(),
+                             key=lambda item: (_popcount(item[1] & remaining), -item[0]))
+        covered = mask & remaining
+        if not covered:
+            break
+        for bit in _bits(covered):
+            assignments[bit] = tutor_id
+        remaining &= ~covered
+        del candidates[tutor_id]
+    return assignments, remaining
+
+
+def _planner_settings(max_attendees, min_similarity, date_window_days):
+    config = current_app.config
+    return (max_attendees or config.get('PLANNER_MAX_ATTENDEES') or DEFAULT_MAX_ATTENDEES,
+            min_similarity if min_similarity is not None else
+            config.get('PLANNER_MIN_SIMILARITY', DEFAULT_MIN_SIMILARITY),
+            date_window_days or config.get('PLANNER_DATE_WINDOW_DAYS') or DEFAULT_DATE_WINDOW_DAYS)
+
+
+def _species_choice(species_by_request):
+    """
+    Returns {request_id: species_id}, sending each request tied to several
+    species to the one with the most pending requests.
+    """
+    popularity = {}
+    for species_ids in species_by_request.values():
+        for species_id in species_ids:
+            popularity[species_id] = popularity.get(species_id, 0) + 1
+    return {request_id: max(species_ids, key=lambda species_id: (
+                popularity[species_id], species_id is not None, -(species_id or 0)))
+            for request_id, species_ids in species_by_request.items()}
+
+
+def load_planning_inputs():
+    """
+    Loads the pending requests and the eligible tutors.
+
+    Returns (planning requests, tutor masks, skill ids by bit) with four
+    queries whatever the number of requests.
+    """
+    species_by_request = {}
+    mapping = pending_request_species()
+    for request_id, species_id in db.session.execute(select(mapping.c.request_id,
+                                                            mapping.c.species_id)):
+        species_by_request.setdefault(request_id, []).append(species_id)
+    species_of = _species_choice(species_by_request)
+
+    skill_bits = {}
+    skill_masks = {}
+    for request_id, skill_id in db.session.execute(
+            select(training_request_skills_requested.c.training_request_id,
+                   training_request_skills_requested.c.skill_id)
+            .join(TrainingRequest,
+                  TrainingRequest.id == training_request_skills_requested.c.training_request_id)
+            .where(TrainingRequest.status == TrainingRequestStatus.PENDING)
+            .order_by(training_request_skills_requested.c.skill_id)):
+        bit = skill_bits.setdefault(skill_id, len(skill_bits))
+        skill_masks[request_id] = skill_masks.get(request_id, 0) | (1 << bit)
+
+    requests = [
+        PlanningRequest(request_id, requester_id, species_of.get(request_id),
+                        skill_masks.get(request_id, 0), _as_utc(preferred_date),
+                        _as_utc(request_date))
+        for request_id, requester_id, preferred_date, request_date in db.session.execute(
+            select(TrainingRequest.id, TrainingRequest.requester_id,
+                   TrainingRequest.preferred_date, TrainingRequest.request_date)
+            .where(TrainingRequest.status == TrainingRequestStatus.PENDING))
+    ]
+
+    tutor_masks = {}
+    if skill_bits:
+        for tutor_id, skill_id in db.session.execute(
+                select(tutor_skill_association.c.user_id, tutor_skill_association.c.skill_id)
+                .join(Competency, (Competency.user_id == tutor_skill_association.c.user_id)
+                      & (Competency.skill_id == tutor_skill_association.c.skill_id))
+                .where(tutor_skill_association.c.skill_id.in_(list(skill_bits)),
+                       ~Competency.needs_recycling)
+                .distinct()):
+            tutor_masks[tutor_id] = tutor_masks.get(tutor_id, 0) | (1 << skill_bits[skill_id])
+
+    skill_ids_by_bit = {bit: skill_id for skill_id, bit in skill_bits.items()}
+    return requests, tutor_masks, skill_ids_by_bit
+
+
+def plan_sessions(max_attendees=None, min_similarity=None, date_window_days=None):
+    """
+    Returns the ranked ``SessionDraft`` list proposed for the pending requests.
+
+    The settings default to the PLANNER_* configuration keys.
+    """
+    max_attendees, min_similarity, date_window_days = _planner_settings(
+        max_attendees, min_similarity, date_window_days)
+    requests, tutor_masks, skill_ids_by_bit = load_planning_inputs()
+    clusters = cluster_requests(requests, max_attendees, min_similarity, date_window_days)
+    if not clusters:
+        return []
+
+    matches = [match_tutors(cluster.skill_mask, tutor_masks, cluster.requester_ids)
+               for cluster in clusters]
+    user_ids = {user_id for cluster in clusters for user_id in cluster.requester_ids}
+    user_ids.update(tutor_id for assignments, _ in matches for tutor_id in assignments.values())
+    user_names = dict(db.session.query(User.id, User.full_name).filter(User.id.in_(user_ids)))
+    skill_names = dict(db.session.query(Skill.id, Skill.name)
+                       .filter(Skill.id.in_(list(skill_ids_by_bit.values()))))
+    species_ids = {cluster.species_id for cluster in clusters} - {None}
+    species_names = dict(db.session.query(Species.id, Species.name)
+                         .filter(Species.id.in_(species_ids))) if species_ids else {}
+
+    drafts = []
+    for cluster, (assignments, uncovered) in zip(clusters, matches):
+        skills = sorted(((skill_ids_by_bit[bit], skill_names[skill_ids_by_bit[bit]])
+                         for bit in _bits(cluster.skill_mask)), key=lambda skill: skill[1])
+        tutor_ids = sorted(set(assignments.values()), key=lambda user_id: user_names[user_id])
+        drafts.append(SessionDraft(
+            cluster.species_id, species_names.get(cluster.species_id),
+            [req.id for req in cluster.requests], skills,
+            sorted(((user_id, user_names[user_id]) for user_id in cluster.requester_ids),
+                   key=lambda user: user[1]),
+            [(tutor_id, user_names[tutor_id]) for tutor_id in tutor_ids],
+            {skill_ids_by_bit[bit]: tutor_id for bit, tutor_id in assignments.items()},
+            [skill_ids_by_bit[bit] for bit in _bits(uncovered)],
+            cluster.proposed_date, cluster.cohesion,
+            1 - _popcount(uncovered) / _popcount(cluster.skill_mask),
+            min((req.request_date for req in cluster.requests if req.request_date), default=None)
+        ))
+    far_future = datetime.max.replace(tzinfo=timezone.utc)
+    drafts.sort(key=lambda draft: (-draft.score, draft.oldest_request_date or far_future))
+    return drafts
+
+
+def synthetic_planning_inputs(request_count, skill_count=200, species_count=12,
+                              tutor_count=100, seed=0):
+    """
+    Generates seeded synthetic (planning requests, tutor masks) for benchmarks.
+
+    Requests pick 1 to 4 skills from a species-specific pool, so that
+    realistic clusters exist, and half of them carry a preferred date.
+    """
+    rng = random.Random(seed)
+    pools = [rng.sample(range(skill_count), min(skill_count, 15)) for _ in range(species_count)]
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    requests = []
+    for request_id in range(1, request_count + 1):
+        species_id = rng.randrange(species_count)
+        mask = 0
+        for bit in rng.sample(pools[species_id], rng.randint(1, 4)):
+            mask |= 1 << bit
+        preferred_date = start + timedelta(days=rng.randrange(120)) if rng.random() < 0.5 else None
+        requests.append(PlanningRequest(request_id, rng.randrange(request_count // 2 + 1),
+                                        species_id, mask, preferred_date, start))
+    tutor_masks = {}
+    for tutor_id in range(request_count + 1, request_count + tutor_count + 1):
+        pool = pools[rng.randrange(species_count)]
+        for bit in rng.sample(pool, rng.randint(1, 6)):
+            tutor_masks[tutor_id] = tutor_masks.get(tutor_id, 0) | (1 << bit)
+    return requests, tutor_masks
+
+
+def benchmark_planner(request_count=5000, skill_count=200, species_count=12, tutor_count=100,
+                      seed=0, repeat=3, max_attendees=DEFAULT_MAX_ATTENDEES,
+                      min_similarity=DEFAULT_MIN_SIMILARITY,
+                      date_window_days=DEFAULT_DATE_WINDOW_DAYS):
+    """
+    Times clustering and tutor matching on seeded synthetic data.
+
+    Returns a dict with the input sizes, the number of drafts and the median
+    clustering and matching times in seconds over ``repeat`` runs.
+    """
+    requests, tutor_masks = synthetic_planning_inputs(request_count, skill_count, species_count,
+                                                      tutor_count, seed)
+    cluster_times, match_times = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        clusters = cluster_requests(requests, max_attendees, min_similarity, date_window_days)
+        clustered = time.perf_counter()
+        for cluster in clusters:
+            match_tutors(cluster.skill_mask, tutor_masks, cluster.requester_ids)
+        cluster_times.append(clustered - started)
+        match_times.append(time.perf_counter() - clustered)
+    return {
+        'requests': request_count,
+        'skills': skill_count,
+        'species': species_count,
+        'tutors': tutor_count,
+        'seed': seed,
+        'drafts': len(clusters),
+        'clustering_seconds': statistics.median(cluster_times),
+        'matching_seconds': statistics.median(match_times),
+    }
@@ -0,0 +1,53 @@
+"""
+Spreadsheet facade over openpyxl, imported on first use.
+
+openpyxl takes a sizeable share of a worker's start-up time while only the
+admin imports and exports need it, so modules build workbooks through these
+functions rather than importing openpyxl themselves.
+"""
+import functools
+
+
+@functools.cache
+def _openpyxl():
+    # pylint: disable=import-outside-toplevel
+    import openpyxl
+    import openpyxl.cell
+    import openpyxl.comments
+    import openpyxl.worksheet.datavalidation
+    return openpyxl
+
+
+def Workbook(*args, **kwargs):  # pylint: disable=invalid-name
+    """
+    Returns a new openpyxl workbook.
+    """
+    return _openpyxl().Workbook(*args, **kwargs)
+
+
+def load_workbook(*args, **kwargs):
+    """
+    Opens a workbook with openpyxl.
+    """
+    return _openpyxl().load_workbook(*args, **kwargs)
+
+
+def WriteOnlyCell(*args, **kwargs):  # pylint: disable=invalid-name
+    """
+    Returns a styled cell for a write-only worksheet.
+    """
+    return _openpyxl().cell.WriteOnlyCell(*args, **kwargs)
+
+
+def Comment(*args, **kwargs):  # pylint: disable=invalid-name
+    """
+    Returns a cell comment.
+    """
+    return _openpyxl().comments.Comment(*args, **kwargs)
+
+
+def DataValidation(*args, **kwargs):  # pylint: disable=invalid-name
+    """
+    Returns a cell data validation rule.
+    """
+    return _openpyxl().worksheet.datavalidation.DataValidation(*args, **kwargs)
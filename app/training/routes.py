@@ -2,13 +2,12 @@ import os
 from flask import render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
-from app import db, mail
+from app import db
 from app.training import bp
 from app.training.forms import TrainingSessionForm
 from app.models import TrainingRequest, TrainingRequestStatus, TrainingSession, Competency, ContinuousTrainingEvent, ContinuousTrainingEventStatus
 from app.decorators import permission_required
-from flask_mail import Message
-from ics import Calendar, Event
+from app.email import send_session_reminders
 from datetime import datetime, timedelta, timezone
 
 @bp.route('/requests')
@@ -102,31 +101,8 @@ def _create_session_competencies(session):
                 db.session.add(competency)
 
 def _send_session_reminders(session):
-    """Helper to send email reminders and ICS files for a TrainingSession."""
-    c = Calendar()
-    e = Event()
-    e.name = session.title
-    e.begin = session.start_time
-    e.end = session.end_time
-    e.location = session.location
-    e.description = f"Training Session for {', '.join([s.name for s in session.skills_covered])}"
-    c.add_event(e)
-
-    ics_filename = secure_filename(f"{session.title}_{session.start_time.strftime('%Y%m%d%H%M')}.ics")
-    ics_path = os.path.join(current_app.root_path, 'static', 'ics', ics_filename)
-    os.makedirs(os.path.dirname(ics_path), exist_ok=True)
-    with open(ics_path, 'w') as f:
-        f.writelines(c)
-
-    for attendee in session.attendees:
-        msg = Message(f"Training Session Reminder: {session.title}",
-                      sender=current_app.config['ADMINS'][0],
-                      recipients=[attendee.email])
-        msg.body = render_template('email/training_session_reminder.txt', user=attendee, session=session)
-        msg.html = render_template('email/training_session_reminder.html', user=attendee, session=session)
-        with current_app.open_resource(ics_path) as fp:
-            msg.attach(ics_filename, "text/calendar", fp.read())
-        mail.send(msg)
+    """Helper to queue email reminders and ICS files for a TrainingSession."""
+    send_session_reminders(session)
     flash('Email reminders sent!', 'info')
 
 @bp.route('/requests/<int:request_id>/create_session', methods=['GET', 'POST'])
@@ -286,31 +262,7 @@ def create_session_from_requests():
             db.session.commit()
 
             if form.send_email_reminders.data:
-                c = Calendar()
-                e = Event()
-                e.name = session.title
-                e.begin = session.start_time
-                e.end = session.end_time
-                e.location = session.location
-                e.description = f"Training Session for {', '.join([s.name for s in session.skills_covered])}"
-                c.add_event(e)
-
-                ics_filename = secure_filename(f"{session.title}_{session.start_time.strftime('%Y%m%d%H%M')}.ics")
-                ics_path = os.path.join(current_app.root_path, 'static', 'ics', ics_filename)
-                os.makedirs(os.path.dirname(ics_path), exist_ok=True)
-                with open(ics_path, 'w') as f:
-                    f.writelines(c)
-                
-                for attendee in session.attendees:
-                    msg = Message(f"Training Session Reminder: {session.title}",
-                                  sender=current_app.config['ADMINS'][0],
-                                  recipients=[attendee.email])
-                    msg.body = render_template('email/training_session_reminder.txt', user=attendee, session=session)
-                    msg.html = render_template('email/training_session_reminder.html', user=attendee, session=session)
-                    with current_app.open_resource(ics_path) as fp:
-                        msg.attach(ics_filename, "text/calendar", fp.read())
-                    mail.send(msg)
-                flash('Email reminders sent!', 'info')
+                _send_session_reminders(session)
 
             flash('Training session created successfully!', 'success')
             return redirect(url_for('training.list_training_requests'))
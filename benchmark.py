@@ -0,0 +1,256 @@
+"""
+Benchmarks the hot endpoints on a synthetic data set.
+
+    python benchmark.py                         # benchmark scale, compared with the baseline
+    python benchmark.py --update-baseline       # records a new baseline
+    python benchmark.py --scale institute --database-url mysql+pymysql://... --reset
+
+Seeds a fresh database with the generator of seed.py (a temporary SQLite file
+by default), then requests each endpoint through the Flask test client as an
+admin, a team leader, a regular user or the Precliniverse service. Every
+endpoint is requested once to warm the caches, then ``--repeat`` times while
+its latency and SQL statements are recorded.
+
+Results are compared with the baseline recorded for the same scale and seed:
+an endpoint issuing more queries than its baseline, or whose median latency
+exceeds the baseline by more than ``--tolerance`` (plus a few milliseconds of
+noise), fails the run with exit status 1. Latencies depend on the machine, so
+record the baseline on the machine running the comparison.
+"""
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event, func
+
+from app import create_app, db
+from app.models import Competency, SkillPracticeEvent, User, user_team_leadership, user_team_membership
+from config import Config
+from seed import scale_argument_parser, seed_database, sizes_from_arguments
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+# Milliseconds of latency noise always tolerated over the baseline
+LATENCY_SLACK_MS = 5
+
+class BenchmarkConfig(Config):
+    """
+    Production settings, minus what needs a browser or another process.
+    """
+    WTF_CSRF_ENABLED = False
+    RATELIMIT_ENABLED = False
+    MAIL_SUPPRESS_SEND = True
+    MAIL_OUTBOX_WORKERS = 0
+    CERTIFICATE_WORKERS = 0
+    SERVICE_API_KEY = 'benchmark-service-key'
+
+
+def benchmark_actors():
+    """
+    Returns the ids of the users the endpoints are requested as: the first
+    admin, the leader of the largest team and the user with the most
+    competencies and practice events.
+    """
+    admin_id = db.session.query(func.min(User.id)).filter(User.is_admin.is_(True)).scalar()
+    team_size = func.count(user_team_membership.c.user_id)
+    leader_id = db.session.query(user_team_leadership.c.user_id).join(
+        user_team_membership, user_team_membership.c.team_id == user_team_leadership.c.team_id
+    ).group_by(user_team_leadership.c.user_id).order_by(
+        team_size.desc(), user_team_leadership.c.user_id).limit(1).scalar()
+    practice_count = db.session.query(func.count(SkillPracticeEvent.id)).filter(
+        SkillPracticeEvent.user_id == User.id).scalar_subquery()
+    user_id = db.session.query(User.id).join(Competency, Competency.user_id == User.id).filter(
+        User.is_admin.is_(False)
+    ).group_by(User.id).order_by(
+        func.count(Competency.id).desc(), practice_count.desc(), User.id).limit(1).scalar()
+    return {'admin': admin_id, 'team_leader': leader_id, 'user': user_id}
+
+
+def benchmark_requests(actors):
+    """
+    Returns the benchmarked requests as (name, actor, method, path, json body).
+    """
+    user = db.session.get(User, actors['user'])
+    skill_ids = sorted(competency.skill_id for competency in user.competencies)[:20]
+    emails = [email for email, in db.session.query(User.email).order_by(User.id).limit(50)]
+    return [
+        ('admin.index', 'admin', 'GET', '/admin/', None),
+        ('admin.recycling_report', 'admin', 'GET', '/admin/recycling_report', None),
+        ('admin.continuous_training_compliance_report', 'admin', 'GET',
+         '/admin/continuous_training_compliance_report', None),
+        ('team.team_competencies', 'team_leader', 'GET', '/team/competencies', None),
+        ('dashboard.dashboard_home', 'user', 'GET', '/dashboard/', None),
+        ('api.notifications_summary', 'user', 'GET', '/api/notifications/summary', None),
+        ('api.public_check_competency', 'service', 'POST', '/api/public/check_competency',
+         {'emails': emails, 'skill_ids': skill_ids}),
+    ]
+
+
+@contextmanager
+def counting_queries(engine):
+    """
+    Yields a list collecting the SQL statements ``engine`` executes inside the block.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):  # pylint: disable=unused-argument
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _clients(app, actors):
+    """
+    Returns a logged in test client and the headers of every actor.
+    """
+    clients, headers = {}, {}
+    for actor, user_id in actors.items():
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        clients[actor] = client
+        headers[actor] = {}
+    user = db.session.get(User, actors['user'])
+    if user.api_key is None:
+        user.generate_api_key()
+        db.session.commit()
+    headers['user'] = {'X-API-Key': user.api_key}
+    clients['service'] = app.test_client()
+    headers['service'] = {'X-Service-Key': app.config['SERVICE_API_KEY']}
+    return clients, headers
+
+
+def run_benchmarks(app, repeat=5):
+    """
+    Requests every benchmarked endpoint and returns
+    {name: {'median_ms', 'p90_ms', 'queries'}}.
+
+    Raises RuntimeError when an endpoint does not answer 200.
+    """
+    with app.app_context():
+        actors = benchmark_actors()
+        requests = benchmark_requests(actors)
+        clients, headers = _clients(app, actors)
+        engine = db.engine
+    results = {}
+    for name, actor, method, path, body in requests:
+        client = clients[actor]
+        durations, query_counts = [], []
+        for attempt in range(repeat + 1):
+            # A fresh app context per request, so ``g`` (and the logged in user)
+            # and the database session are not shared between requests
+            with app.app_context(), counting_queries(engine) as statements:
+                started = time.perf_counter()
+                response = client.open(path, method=method, json=body, headers=headers[actor])
+                duration = time.perf_counter() - started
+            if response.status_code != 200:
+                raise RuntimeError(f'{name}: {method} {path} answered {response.status_code}')
+            if attempt:  # the first request warms the caches
+                durations.append(duration * 1000)
+                query_counts.append(len(statements))
+        durations.sort()
+        results[name] = {
+            'median_ms': round(statistics.median(durations), 2),
+            'p90_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.9))], 2),
+            'queries': max(query_counts),
+        }
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance=0.5):
+    """
+    Returns the regressions of ``results`` over ``baseline``, as messages.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline['endpoints'].get(name)
+        if expected is None:
+            continue
+        if result['queries'] > expected['queries']:
+            regressions.append(f"{name}: {result['queries']} queries, "
+                               f"baseline {expected['queries']}")
+        limit = expected['median_ms'] * (1 + tolerance) + LATENCY_SLACK_MS
+        if result['median_ms'] > limit:
+            regressions.append(f"{name}: median {result['median_ms']} ms, "
+                               f"baseline {expected['median_ms']} ms (limit {limit:.1f} ms)")
+    return regressions
+
+
+def main():
+    """
+    Seeds a database, runs the benchmarks and compares or records the baseline.
+    """
+    parser = scale_argument_parser(__doc__.strip().splitlines()[0])
+    parser.set_defaults(scale='benchmark')
+    parser.add_argument('--database-url', help='Database to seed, a temporary SQLite file by default.')
+    parser.add_argument('--reset', action='store_true',
+                        help='Drop every table of --database-url first (destroys existing data).')
+    parser.add_argument('--repeat', type=int, default=5, help='Measured requests per endpoint.')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline JSON file.')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Record the results as the new baseline instead of comparing.')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='Accepted median latency increase over the baseline (0.5 = 50%%).')
+    parser.add_argument('--output', help='Also write the results to this JSON file.')
+    args = parser.parse_args()
+    sizes = sizes_from_arguments(args)
+
+    with tempfile.TemporaryDirectory(prefix='benchmark-') as folder:
+        BenchmarkConfig.SQLALCHEMY_DATABASE_URI = args.database_url or \
+            'sqlite:///' + os.path.join(folder, 'benchmark.db')
+        BenchmarkConfig.METRICS_DIR = os.path.join(folder, 'metrics')
+        app = create_app(BenchmarkConfig)
+        with app.app_context():
+            print(f"Seeding the {args.scale} data set (seed {args.seed})...")
+            started = time.perf_counter()
+            seed_database(sizes, seed=args.seed, reference_date=args.reference_date,
+                          reset=args.reset)
+            print(f"Seeded in {time.perf_counter() - started:.1f}s.")
+        results = run_benchmarks(app, repeat=args.repeat)
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+    report = {'scale': args.scale, 'sizes': sizes, 'seed': args.seed, 'endpoints': results}
+    print(f"{'Endpoint':<48} {'median ms':>10} {'p90 ms':>10} {'queries':>8}")
+    for name, result in results.items():
+        print(f"{name:<48} {result['median_ms']:>10} {result['p90_ms']:>10} {result['queries']:>8}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}.")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --update-baseline to record one.")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if (baseline['sizes'], baseline['seed']) != (sizes, args.seed):
+        print(f"The baseline was recorded for another data set ({baseline['scale']} scale, "
+              f"seed {baseline['seed']}).")
+        return 2
+    regressions = compare_with_baseline(results, baseline, tolerance=args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        return 1
+    print("No regression over the baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
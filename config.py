@@ -38,6 +38,14 @@ class Config:
     MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS') is not None
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME') or None # Keep None if not set
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD') or None # Keep None if not set
+    # Mail outbox: delivery threads (0 delivers inline), messages sent per SMTP
+    # connection, attempts before a message is given up, first retry delay and
+    # seconds before a claimed batch that was not delivered can be claimed again
+    MAIL_OUTBOX_WORKERS = int(os.environ.get('MAIL_OUTBOX_WORKERS') or 2)
+    MAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('MAIL_OUTBOX_BATCH_SIZE') or 100)
+    MAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('MAIL_OUTBOX_MAX_ATTEMPTS') or 5)
+    MAIL_OUTBOX_RETRY_DELAY = int(os.environ.get('MAIL_OUTBOX_RETRY_DELAY') or 60)
+    MAIL_OUTBOX_LEASE = int(os.environ.get('MAIL_OUTBOX_LEASE') or 600)
     
     # ADMINS should be a list of email addresses
     ADMINS = [email.strip() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()]
@@ -46,6 +54,11 @@ class Config:
 
     ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL')
     ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD')
+    # Database bootstrap (tables of an empty database, default roles and
+    # permissions, first admin): checked by every worker at start (turn off to
+    # leave it to `flask bootstrap run`) and seconds waited for the bootstrap lock
+    BOOTSTRAP_ON_START = os.environ.get('BOOTSTRAP_ON_START', 'True').lower() == 'true'
+    BOOTSTRAP_LOCK_TIMEOUT = int(os.environ.get('BOOTSTRAP_LOCK_TIMEOUT') or 60)
 
     # Session Cookie Settings for Security
     SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', 'False').lower() == 'true'
@@ -60,6 +73,69 @@ class Config:
     # Service API Key for inter-app communication
     SERVICE_API_KEY = os.environ.get('SERVICE_API_KEY')
 
+    # Secret used to HMAC user API keys for indexed lookups. Set it in production:
+    # it defaults to SECRET_KEY, so rotating SECRET_KEY would invalidate every
+    # stored hash (see `flask db-maintenance backfill-api-key-hashes --all`)
+    API_KEY_HMAC_SECRET = os.environ.get('API_KEY_HMAC_SECRET') or SECRET_KEY
+    # Seconds the global notification counters are cached
+    NOTIFICATION_SUMMARY_TTL = int(os.environ.get('NOTIFICATION_SUMMARY_TTL') or 30)
+    # Seconds a team competency matrix snapshot is reused
+    COMPETENCY_MATRIX_TTL = int(os.environ.get('COMPETENCY_MATRIX_TTL') or 300)
+    # Seconds the pending training request board is reused
+    REQUEST_BOARD_TTL = int(os.environ.get('REQUEST_BOARD_TTL') or 300)
+    # Largest number of attendees of a session proposed by the planner
+    PLANNER_MAX_ATTENDEES = int(os.environ.get('PLANNER_MAX_ATTENDEES') or 12)
+    # Smallest skill similarity (Jaccard index) for a request to join a proposed session
+    PLANNER_MIN_SIMILARITY = float(os.environ.get('PLANNER_MIN_SIMILARITY') or 0.3)
+    # Days between preferred dates of requests grouped in one proposed session
+    PLANNER_DATE_WINDOW_DAYS = int(os.environ.get('PLANNER_DATE_WINDOW_DAYS') or 14)
+    # Rows fetched per query when streaming admin exports
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE') or 500)
+    # Bytes an XLSX export is kept in memory before spooling to disk
+    EXPORT_SPOOL_THRESHOLD = int(os.environ.get('EXPORT_SPOOL_THRESHOLD') or 8 * 1024 * 1024)
+    # Rows written and committed per bulk statement when importing spreadsheets
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE') or 500)
+    # Worker processes used to hash imported passwords (defaults to the CPU count)
+    IMPORT_HASH_WORKERS = int(os.environ.get('IMPORT_HASH_WORKERS') or 0) or None
+    # Where per-row import result workbooks are kept (defaults to instance/import_reports)
+    IMPORT_REPORT_FOLDER = os.environ.get('IMPORT_REPORT_FOLDER')
+    # Largest number of practice records accepted by one batch declaration request
+    PRACTICE_BATCH_MAX_RECORDS = int(os.environ.get('PRACTICE_BATCH_MAX_RECORDS') or 10000)
+    # API list endpoints: page size when a cursor is given without a limit, largest page
+    API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE') or 100)
+    API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE') or 1000)
+    # Background booklet generation: worker threads (0 builds inline), cache folder
+    # (defaults to instance/booklets) and seconds before an unfinished job is failed
+    BOOKLET_WORKERS = int(os.environ.get('BOOKLET_WORKERS') or 2)
+    BOOKLET_CACHE_FOLDER = os.environ.get('BOOKLET_CACHE_FOLDER')
+    BOOKLET_JOB_TIMEOUT = int(os.environ.get('BOOKLET_JOB_TIMEOUT') or 600)
+    # Bulk booklet exports: rendering processes (defaults to the CPU count) and
+    # users prefetched per batch
+    BOOKLET_EXPORT_WORKERS = int(os.environ.get('BOOKLET_EXPORT_WORKERS') or 0) or None
+    BOOKLET_EXPORT_BATCH_SIZE = int(os.environ.get('BOOKLET_EXPORT_BATCH_SIZE') or 50)
+    # Most booklets a web download of a team or species renders within the request;
+    # larger and institute-wide exports go through `flask booklets export`
+    BOOKLET_WEB_EXPORT_MAX_USERS = int(os.environ.get('BOOKLET_WEB_EXPORT_MAX_USERS') or 50)
+    # Competency certificates: store folder (defaults to instance/certificates),
+    # background threads rendering changed certificates (0 renders on first
+    # download) and processes used by `flask certificates render` (defaults to the CPU count)
+    CERTIFICATE_FOLDER = os.environ.get('CERTIFICATE_FOLDER')
+    CERTIFICATE_WORKERS = int(os.environ.get('CERTIFICATE_WORKERS') or 2)
+    CERTIFICATE_RENDER_WORKERS = int(os.environ.get('CERTIFICATE_RENDER_WORKERS') or 0) or None
+    # Request instrumentation: on/off, requests kept per endpoint for the
+    # percentiles and duration (ms) from which a statement is logged as slow
+    PERFORMANCE_MONITORING = os.environ.get('PERFORMANCE_MONITORING', 'True').lower() == 'true'
+    PERFORMANCE_WINDOW = int(os.environ.get('PERFORMANCE_WINDOW') or 500)
+    SLOW_QUERY_THRESHOLD_MS = int(os.environ.get('SLOW_QUERY_THRESHOLD_MS') or 200)
+    # Prometheus metrics: on/off, folder shared by the worker processes (defaults
+    # to instance/metrics, empty it before starting the server), seconds between
+    # two writes of a worker's metrics and bearer token of the scraper (admins
+    # can always read them)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_DIR = os.environ.get('METRICS_DIR') or os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL') or 5)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
     # SSO Secret Key for seamless login
     SSO_SECRET_KEY = os.environ.get('SSO_SECRET_KEY')
 
@@ -12,7 +12,17 @@ fi
 
 # Run database migrations
 echo "Running database migrations..."
-flask db upgrade
+BOOTSTRAP_ON_START=False flask db upgrade
+
+# Create the default roles, permissions and first admin and fill the columns
+# added empty by the migrations, once, before the workers start
+echo "Bootstrapping the database..."
+flask bootstrap run
+
+# Forget the metrics of the previous run, including those written by the
+# commands above: restarted workers get the same pids again
+METRICS_PATH="${METRICS_DIR:-${PROMETHEUS_MULTIPROC_DIR:-instance/metrics}}"
+rm -f "$METRICS_PATH"/metrics-*.json "$METRICS_PATH"/*.tmp
 
 # Execute the main command
 exec "$@"
@@ -1,446 +1,629 @@
+"""
+Seeds the database with deterministic synthetic data.
+
+    python seed.py                          # small demo data set (20 users)
+    python seed.py --scale institute        # 10k users, 1k skills, 500k practice events
+    python seed.py --scale benchmark --users 2000 --seed 7 --reset
+
+Every row comes from a random generator seeded with ``--seed``, with dates
+relative to ``--reference-date`` (today by default), so the same seed, sizes
+and reference date always produce the same data set. Rows are written with
+multi-row INSERTs, a batch at a time, and the materialized recycling dates of
+the competencies are computed once at the end. Generated users log in with
+the password ``password``.
+"""
+import argparse
 import os
+import random
+import re
+from datetime import date, datetime, time, timedelta, timezone
+
 from dotenv import load_dotenv
+from faker import Faker
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
 from app import create_app, db
 from app.models import (
-    User, Team, Species, Skill, TrainingPath, TrainingSession, Competency, SkillPracticeEvent,
-    TrainingRequest, ExternalTraining, Role, Permission, InitialRegulatoryTrainingLevel,
-    InitialRegulatoryTraining, ContinuousTrainingType, ContinuousTrainingEvent,
-    ContinuousTrainingEventStatus, UserContinuousTrainingStatus, UserContinuousTraining,
-    Complexity, TrainingRequestStatus, ExternalTrainingStatus, init_roles_and_permissions
+    User, Team, Species, Skill, TrainingPath, TrainingPathSkill, TrainingSession, Competency,
+    SkillPracticeEvent, TrainingRequest, ExternalTraining, ExternalTrainingSkillClaim, Role,
+    InitialRegulatoryTrainingLevel, InitialRegulatoryTraining, ContinuousTrainingType,
+    ContinuousTrainingEvent, ContinuousTrainingEventStatus, UserContinuousTrainingStatus,
+    UserContinuousTraining, Complexity, TrainingRequestStatus, ExternalTrainingStatus,
+    competency_species_association, external_training_skill_claim_species_association,
+    init_roles_and_permissions, rebuild_competency_recycling_dates, skill_practice_event_skills,
+    skill_species_association, training_path_assigned_users, training_request_skills_requested,
+    training_request_species_requested, training_session_attendees,
+    training_session_skills_covered, training_session_tutors, tutor_skill_association,
+    user_role_association, user_team_leadership, user_team_membership
 )
-from werkzeug.security import generate_password_hash
-from faker import Faker
-import random
-from datetime import datetime, timedelta
 
-load_dotenv()
-fake = Faker()
+# Number of rows of each kind per scale
+SCALES = {
+    'demo': {
+        'teams': 5, 'users': 20, 'species': 5, 'skills': 30, 'training_paths': 10,
+        'training_sessions': 15, 'competencies': 50, 'practice_events': 40,
+        'training_requests': 20, 'external_trainings': 10, 'continuous_training_events': 20,
+        'attendances': 30,
+    },
+    'benchmark': {
+        'teams': 40, 'users': 1000, 'species': 8, 'skills': 200, 'training_paths': 40,
+        'training_sessions': 300, 'competencies': 8000, 'practice_events': 50000,
+        'training_requests': 1000, 'external_trainings': 300, 'continuous_training_events': 300,
+        'attendances': 10000,
+    },
+    'institute': {
+        'teams': 300, 'users': 10000, 'species': 12, 'skills': 1000, 'training_paths': 150,
+        'training_sessions': 3000, 'competencies': 80000, 'practice_events': 500000,
+        'training_requests': 8000, 'external_trainings': 3000,
+        'continuous_training_events': 2000, 'attendances': 100000,
+    },
+}
+
+# Rows sent per INSERT statement
+BATCH_SIZE = 5000
+
+SPECIES_NAMES = ['Mouse', 'Rat', 'Rabbit', 'Zebrafish', 'Guinea pig', 'Hamster', 'Xenopus',
+                 'Pig', 'Sheep', 'Chicken', 'Macaque', 'Dog']
+LEVELS = ['Novice', 'Intermediate', 'Expert']
+STUDY_LEVELS = ['pre-BAC'] + [str(i) for i in range(9)] + ['8+']
+DEFAULT_PASSWORD = 'password'
+
+
+def bulk_insert(target, rows):
+    """
+    Inserts ``rows`` (dictionaries) into a model or table, a batch at a time.
+    """
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(insert(target), rows[start:start + BATCH_SIZE])
+
+
+def reset_database():
+    """
+    Drops and recreates every table, then the default roles and permissions.
+    """
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    init_roles_and_permissions()
+
+
+def _next_id(model):
+    return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+
+class SyntheticDataGenerator:
+    """
+    Generates and inserts a data set of ``sizes`` (see ``SCALES``) from ``seed``.
+    """
+
+    def __init__(self, sizes, seed=42, reference_date=None):
+        self.sizes = sizes
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.fake = Faker()
+        self.fake.seed_instance(seed)
+        reference_date = reference_date or date.today()
+        self.now = datetime.combine(reference_date, time(), tzinfo=timezone.utc)
+        self.counts = {}
+        self.user_ids = []
+        self.team_members = {}
+        self.skill_species = {}
+        self.user_skills = {}
+        self.tutor_skills = {}
+        self.session_ids = []
+        self.event_durations = {}
+        self._sentences = [self.fake.sentence() for _ in range(200)]
+
+    def _date_between(self, start_days, end_days):
+        """
+        Returns a datetime between ``start_days`` and ``end_days`` from the reference date.
+        """
+        return self.now + timedelta(seconds=self.rng.randint(start_days * 86400, end_days * 86400))
+
+    def _unique_names(self, count, make, max_length):
+        names, seen = [], set()
+        for _ in range(count):
+            name = make()[:max_length]
+            suffix = 2
+            while name.lower() in seen:
+                name = f'{make()[:max_length - 6]} {suffix}'
+                suffix += 1
+            seen.add(name.lower())
+            names.append(name)
+        return names
+
+    def _record(self, name, rows):
+        self.counts[name] = self.counts.get(name, 0) + len(rows)
+
+    def generate(self):
+        """
+        Inserts the whole data set and returns {table: rows inserted}.
+        """
+        self.create_teams_and_users()
+        self.create_species_and_skills()
+        self.create_competencies()
+        self.create_training_paths()
+        self.create_training_sessions()
+        self.create_practice_events()
+        self.create_training_requests()
+        self.create_external_trainings()
+        self.create_initial_regulatory_trainings()
+        self.create_continuous_trainings()
+        db.session.commit()
+        rebuild_competency_recycling_dates()
+        db.session.commit()
+        return self.counts
+
+    def create_teams_and_users(self):
+        """
+        Creates the teams and the users, their memberships, leads and roles.
+        """
+        sizes = self.sizes
+        first_team_id = _next_id(Team)
+        team_names = self._unique_names(sizes['teams'], lambda: f'{self.fake.company()} Team', 64)
+        teams = [{'id': first_team_id + i, 'name': name} for i, name in enumerate(team_names)]
+        team_ids = [team['id'] for team in teams]
+        bulk_insert(Team, teams)
+        self._record('team', teams)
+
+        first_user_id = _next_id(User)
+        password_hash = generate_password_hash(DEFAULT_PASSWORD)
+        users, memberships = [], []
+        for index in range(sizes['users']):
+            user_id = first_user_id + index
+            first_name, last_name = self.fake.first_name(), self.fake.last_name()
+            local_part = re.sub(r'[^a-z0-9.]', '', f'{first_name}.{last_name}'.lower())
+            users.append({
+                'id': user_id,
+                'full_name': f'{first_name} {last_name}',
+                'email': f'{local_part}.{user_id}@example.org',
+                'password_hash': password_hash,
+                'is_admin': index == 0 or self.rng.random() < 0.01,
+                'is_approved': True,
+                'study_level': self.rng.choice(STUDY_LEVELS),
+            })
+            if team_ids and self.rng.random() < 0.9:
+                for team_id in self.rng.sample(team_ids, 2 if self.rng.random() < 0.1 else 1):
+                    memberships.append({'user_id': user_id, 'team_id': team_id})
+                    self.team_members.setdefault(team_id, []).append(user_id)
+        self.user_ids = [user['id'] for user in users]
+        bulk_insert(User, users)
+        bulk_insert(user_team_membership, memberships)
+        self._record('user', users)
+        self._record('user_team_membership', memberships)
+
+        leads = []
+        for team_id in team_ids:
+            members = self.team_members.get(team_id, [])
+            for user_id in self.rng.sample(members, min(len(members), self.rng.randint(1, 2))):
+                leads.append({'user_id': user_id, 'team_id': team_id})
+        bulk_insert(user_team_leadership, leads)
+        self._record('user_team_leadership', leads)
+
+        role_ids = dict(db.session.query(Role.name, Role.id))
+        lead_ids = {lead['user_id'] for lead in leads}
+        roles = []
+        for user in users:
+            names = ['User']
+            if user['is_admin']:
+                names.append('Admin')
+            if user['id'] in lead_ids:
+                names.append('Team Leader')
+            roles.extend({'user_id': user['id'], 'role_id': role_ids[name]}
+                         for name in names if name in role_ids)
+        bulk_insert(user_role_association, roles)
+        self._record('user_role_association', roles)
+
+    def create_species_and_skills(self):
+        """
+        Creates the species and the skills, each practiced on one or two species.
+        """
+        sizes = self.sizes
+        first_species_id = _next_id(Species)
+        existing = {name.lower() for name, in db.session.query(Species.name)}
+        names = [name for name in SPECIES_NAMES if name.lower() not in existing]
+        names += [f'Species {i}' for i in range(1, sizes['species'] + 1)]
+        species = [{'id': first_species_id + i, 'name': name}
+                   for i, name in enumerate(names[:sizes['species']])]
+        species_ids = [row['id'] for row in species]
+        bulk_insert(Species, species)
+        self._record('species', species)
+
+        first_skill_id = _next_id(Skill)
+        skill_names = self._unique_names(sizes['skills'], self.fake.catch_phrase, 128)
+        skills, skill_species = [], []
+        for index, name in enumerate(skill_names):
+            skill_id = first_skill_id + index
+            skills.append({
+                'id': skill_id,
+                'name': name,
+                'description': self.fake.paragraph(),
+                'validity_period_months': self.rng.choice([6, 12, 12, 24, 36]),
+                'complexity': self.rng.choice(list(Complexity)),
+                'reference_urls_text': self.fake.url() if self.rng.random() < 0.3 else '',
+                'training_videos_urls_text': '',
+                'potential_external_tutors_text': '',
+            })
+            chosen = self.rng.sample(species_ids, min(len(species_ids),
+                                                      2 if self.rng.random() < 0.2 else 1))
+            self.skill_species[skill_id] = chosen
+            skill_species.extend({'skill_id': skill_id, 'species_id': species_id}
+                                 for species_id in chosen)
+        bulk_insert(Skill, skills)
+        bulk_insert(skill_species_association, skill_species)
+        self._record('skill', skills)
+        self._record('skill_species_association', skill_species)
+
+    def create_competencies(self):
+        """
+        Creates competencies on distinct (user, skill) pairs; experts often tutor.
+        """
+        skill_ids = list(self.skill_species)
+        target = min(self.sizes['competencies'], len(self.user_ids) * len(skill_ids))
+        first_id = _next_id(Competency)
+        competencies, competency_species, tutors = [], [], []
+        pairs = set()
+        while len(competencies) < target:
+            user_id = self.rng.choice(self.user_ids)
+            skill_id = self.rng.choice(skill_ids)
+            if (user_id, skill_id) in pairs:
+                continue
+            pairs.add((user_id, skill_id))
+            competency_id = first_id + len(competencies)
+            level = self.rng.choice(LEVELS)
+            competencies.append({
+                'id': competency_id,
+                'user_id': user_id,
+                'skill_id': skill_id,
+                'level': level,
+                'evaluation_date': self._date_between(-3 * 365, 0),
+                'evaluator_id': self.rng.choice(self.user_ids) if self.rng.random() < 0.7 else None,
+            })
+            competency_species.append({'competency_id': competency_id,
+                                       'species_id': self.rng.choice(self.skill_species[skill_id])})
+            self.user_skills.setdefault(user_id, []).append(skill_id)
+            if level == 'Expert' and self.rng.random() < 0.5:
+                tutors.append({'user_id': user_id, 'skill_id': skill_id})
+                self.tutor_skills.setdefault(skill_id, []).append(user_id)
+        bulk_insert(Competency, competencies)
+        bulk_insert(competency_species_association, competency_species)
+        bulk_insert(tutor_skill_association, tutors)
+        self._record('competency', competencies)
+        self._record('competency_species_association', competency_species)
+        self._record('tutor_skill_association', tutors)
+
+    def create_training_paths(self):
+        """
+        Creates training paths of up to five skills of one species and assigns them.
+        """
+        skills_by_species = {}
+        for skill_id, species_ids in self.skill_species.items():
+            for species_id in species_ids:
+                skills_by_species.setdefault(species_id, []).append(skill_id)
+        species_ids = sorted(skills_by_species)
+        first_id = _next_id(TrainingPath)
+        names = self._unique_names(self.sizes['training_paths'],
+                                   lambda: f'{self.fake.bs().capitalize()} Training Path', 128)
+        paths, path_skills, assigned = [], [], []
+        for index, name in enumerate(names):
+            path_id = first_id + index
+            species_id = self.rng.choice(species_ids)
+            candidates = skills_by_species[species_id]
+            paths.append({'id': path_id, 'name': name, 'description': self.fake.paragraph(),
+                          'species_id': species_id})
+            path_skills.extend(
+                {'training_path_id': path_id, 'skill_id': skill_id, 'order': order}
+                for order, skill_id in enumerate(
+                    self.rng.sample(candidates, min(len(candidates), self.rng.randint(1, 5)))))
+            assigned.extend({'training_path_id': path_id, 'user_id': user_id}
+                            for user_id in self.rng.sample(
+                                self.user_ids, min(len(self.user_ids), self.rng.randint(0, 10))))
+        bulk_insert(TrainingPath, paths)
+        bulk_insert(TrainingPathSkill, path_skills)
+        bulk_insert(training_path_assigned_users, assigned)
+        self._record('training_path', paths)
+        self._record('training_path_skill', path_skills)
+        self._record('training_path_assigned_users', assigned)
+
+    def create_training_sessions(self):
+        """
+        Creates past (realized) and upcoming sessions with tutors and attendees.
+        """
+        skill_ids = list(self.skill_species)
+        first_id = _next_id(TrainingSession)
+        sessions, tutors, attendees, covered = [], [], [], []
+        for index in range(self.sizes['training_sessions']):
+            session_id = first_id + index
+            start_time = self._date_between(-2 * 365, 90)
+            session_skills = self.rng.sample(skill_ids, min(len(skill_ids), self.rng.randint(1, 3)))
+            sessions.append({
+                'id': session_id,
+                'title': self.fake.sentence(nb_words=5)[:128],
+                'location': self.fake.city(),
+                'start_time': start_time,
+                'end_time': start_time + timedelta(hours=self.rng.randint(1, 4)),
+                'main_species_id': self.skill_species[session_skills[0]][0],
+                'animal_count': self.rng.randint(1, 10) if self.rng.random() < 0.5 else None,
+                'status': 'Realized' if start_time < self.now else 'Pending',
+            })
+            covered.extend({'training_session_id': session_id, 'skill_id': skill_id}
+                           for skill_id in session_skills)
+            session_tutors = sorted({tutor for skill_id in session_skills
+                                     for tutor in self.tutor_skills.get(skill_id, [])[:2]})
+            tutors.extend({'training_session_id': session_id, 'user_id': user_id}
+                          for user_id in session_tutors)
+            attendees.extend({'training_session_id': session_id, 'user_id': user_id}
+                             for user_id in self.rng.sample(
+                                 self.user_ids, min(len(self.user_ids), self.rng.randint(2, 10)))
+                             if user_id not in session_tutors)
+            self.session_ids.append(session_id)
+        bulk_insert(TrainingSession, sessions)
+        bulk_insert(training_session_skills_covered, covered)
+        bulk_insert(training_session_tutors, tutors)
+        bulk_insert(training_session_attendees, attendees)
+        self._record('training_session', sessions)
+        self._record('training_session_skills_covered', covered)
+        self._record('training_session_tutors', tutors)
+        self._record('training_session_attendees', attendees)
+
+    def create_practice_events(self):
+        """
+        Creates practice events, mostly on skills the user is competent in,
+        streaming them to the database a batch at a time.
+        """
+        skill_ids = list(self.skill_species)
+        practitioners = sorted(self.user_skills)
+        first_id = _next_id(SkillPracticeEvent)
+        total = self.sizes['practice_events']
+        for start in range(0, total, BATCH_SIZE):
+            events, event_skills = [], []
+            for event_id in range(first_id + start, first_id + min(start + BATCH_SIZE, total)):
+                if practitioners and self.rng.random() < 0.9:
+                    user_id = self.rng.choice(practitioners)
+                    candidates = self.user_skills[user_id]
+                else:
+                    user_id, candidates = self.rng.choice(self.user_ids), skill_ids
+                events.append({
+                    'id': event_id,
+                    'user_id': user_id,
+                    'practice_date': self._date_between(-2 * 365, 0),
+                    'notes': self.rng.choice(self._sentences) if self.rng.random() < 0.3 else None,
+                })
+                event_skills.extend(
+                    {'skill_practice_event_id': event_id, 'skill_id': skill_id}
+                    for skill_id in self.rng.sample(candidates, min(len(candidates),
+                                                                    self.rng.choice((1, 1, 1, 2)))))
+            bulk_insert(SkillPracticeEvent, events)
+            bulk_insert(skill_practice_event_skills, event_skills)
+            self._record('skill_practice_event', events)
+            self._record('skill_practice_event_skills', event_skills)
+
+    def create_training_requests(self):
+        """
+        Creates training requests, most of them still pending.
+        """
+        skill_ids = list(self.skill_species)
+        first_id = _next_id(TrainingRequest)
+        requests, requested_skills, requested_species = [], [], []
+        statuses = [TrainingRequestStatus.PENDING] * 6 + [TrainingRequestStatus.APPROVED] * 3 + \
+            [TrainingRequestStatus.REJECTED]
+        for index in range(self.sizes['training_requests']):
+            request_id = first_id + index
+            request_skills = self.rng.sample(skill_ids, min(len(skill_ids), self.rng.randint(1, 3)))
+            requests.append({
+                'id': request_id,
+                'requester_id': self.rng.choice(self.user_ids),
+                'request_date': self._date_between(-180, 0),
+                'status': self.rng.choice(statuses),
+                'justification': self.rng.choice(self._sentences),
+                'preferred_date': self._date_between(7, 120) if self.rng.random() < 0.5 else None,
+            })
+            requested_skills.extend({'training_request_id': request_id, 'skill_id': skill_id}
+                                    for skill_id in request_skills)
+            if self.rng.random() < 0.5:
+                requested_species.append({'training_request_id': request_id,
+                                          'species_id': self.skill_species[request_skills[0]][0]})
+        bulk_insert(TrainingRequest, requests)
+        bulk_insert(training_request_skills_requested, requested_skills)
+        bulk_insert(training_request_species_requested, requested_species)
+        self._record('training_request', requests)
+        self._record('training_request_skills_requested', requested_skills)
+        self._record('training_request_species_requested', requested_species)
+
+    def create_external_trainings(self):
+        """
+        Creates external trainings claiming one to three skills.
+        """
+        skill_ids = list(self.skill_species)
+        first_id = _next_id(ExternalTraining)
+        trainings, claims, claim_species = [], [], []
+        for index in range(self.sizes['external_trainings']):
+            training_id = first_id + index
+            status = self.rng.choice(list(ExternalTrainingStatus))
+            training_date = self._date_between(-365, 0)
+            trainings.append({
+                'id': training_id,
+                'user_id': self.rng.choice(self.user_ids),
+                'external_trainer_name': self.fake.company()[:128],
+                'date': training_date,
+                'duration_hours': float(self.rng.randint(2, 16)),
+                'status': status,
+                'validator_id': self.rng.choice(self.user_ids)
+                if status != ExternalTrainingStatus.PENDING else None,
+            })
+            for skill_id in self.rng.sample(skill_ids, min(len(skill_ids), self.rng.randint(1, 3))):
+                claims.append({
+                    'external_training_id': training_id,
+                    'skill_id': skill_id,
+                    'level': self.rng.choice(LEVELS),
+                    'wants_to_be_tutor': self.rng.random() < 0.3,
+                    'practice_date': training_date if self.rng.random() < 0.5 else None,
+                })
+                claim_species.extend({
+                    'external_training_skill_claim_external_training_id': training_id,
+                    'external_training_skill_claim_skill_id': skill_id,
+                    'species_id': species_id,
+                } for species_id in self.skill_species[skill_id])
+        bulk_insert(ExternalTraining, trainings)
+        bulk_insert(ExternalTrainingSkillClaim, claims)
+        bulk_insert(external_training_skill_claim_species_association, claim_species)
+        self._record('external_training', trainings)
+        self._record('external_training_skill_claim', claims)
+        self._record('external_training_skill_claim_species_association', claim_species)
+
+    def create_initial_regulatory_trainings(self):
+        """
+        Gives most users an initial regulatory training.
+        """
+        first_id = _next_id(InitialRegulatoryTraining)
+        trainings = [{
+            'id': first_id + index,
+            'user_id': user_id,
+            'training_type': 'General',
+            'level': self.rng.choice(list(InitialRegulatoryTrainingLevel)),
+            'training_date': self._date_between(-10 * 365, -30),
+        } for index, user_id in enumerate(
+            user_id for user_id in self.user_ids if self.rng.random() < 0.7)]
+        bulk_insert(InitialRegulatoryTraining, trainings)
+        self._record('initial_regulatory_training', trainings)
+
+    def create_continuous_trainings(self):
+        """
+        Creates continuous training events and attendances on distinct
+        (user, event) pairs, mostly approved.
+        """
+        first_event_id = _next_id(ContinuousTrainingEvent)
+        events = []
+        for index in range(self.sizes['continuous_training_events']):
+            training_type = self.rng.choice(list(ContinuousTrainingType))
+            event_date = self._date_between(-6 * 365, 180)
+            duration = float(self.rng.choice([1, 2, 3, 4, 7, 14]))
+            events.append({
+                'id': first_event_id + index,
+                'title': self.fake.sentence(nb_words=5)[:128],
+                'description': self.rng.choice(self._sentences),
+                'training_type': training_type,
+                'location': self.fake.city()
+                if training_type == ContinuousTrainingType.PRESENTIAL else None,
+                'event_date': event_date,
+                'duration_hours': duration,
+                'creator_id': self.rng.choice(self.user_ids),
+                'status': ContinuousTrainingEventStatus.APPROVED,
+            })
+            self.event_durations[first_event_id + index] = (event_date, duration)
+        bulk_insert(ContinuousTrainingEvent, events)
+        self._record('continuous_training_event', events)
+
+        event_ids = list(self.event_durations)
+        target = min(self.sizes['attendances'], len(self.user_ids) * len(event_ids))
+        first_id = _next_id(UserContinuousTraining)
+        statuses = [UserContinuousTrainingStatus.APPROVED] * 8 + \
+            [UserContinuousTrainingStatus.PENDING, UserContinuousTrainingStatus.REJECTED]
+        attendances, pairs = [], set()
+        while len(attendances) < target:
+            user_id = self.rng.choice(self.user_ids)
+            event_id = self.rng.choice(event_ids)
+            if (user_id, event_id) in pairs:
+                continue
+            pairs.add((user_id, event_id))
+            status = self.rng.choice(statuses)
+            event_date, duration = self.event_durations[event_id]
+            approved = status == UserContinuousTrainingStatus.APPROVED
+            attendances.append({
+                'id': first_id + len(attendances),
+                'user_id': user_id,
+                'event_id': event_id,
+                'status': status,
+                'validated_by_id': self.rng.choice(self.user_ids) if approved else None,
+                'validation_date': event_date + timedelta(days=7) if approved else None,
+                'validated_hours': duration if approved else None,
+            })
+        bulk_insert(UserContinuousTraining, attendances)
+        self._record('user_continuous_training', attendances)
+
+
+def seed_database(sizes, seed=42, reference_date=None, reset=False):
+    """
+    Generates a data set of ``sizes`` into the database of the current app.
+
+    The database must not hold skills yet unless ``reset`` drops every table
+    first. Returns {table: rows inserted}.
+    """
+    if reset:
+        reset_database()
+    elif db.session.query(Skill.id).first() is not None:
+        raise ValueError('The database already holds data, reset it to seed it again.')
+    return SyntheticDataGenerator(sizes, seed=seed, reference_date=reference_date).generate()
 
-app = create_app()
 
 def create_admin_user():
+    """
+    Creates the admin user from ADMIN_EMAIL and ADMIN_PASSWORD, if set.
+    """
     admin_email = os.environ.get('ADMIN_EMAIL')
     admin_password = os.environ.get('ADMIN_PASSWORD')
-
     if not admin_email or not admin_password:
         print("ADMIN_EMAIL or ADMIN_PASSWORD not set in .env. Skipping admin user creation.")
         return None
+    admin_user = User.query.filter_by(email=admin_email).first()
+    if admin_user is None:
+        admin_user = User.create_admin_user(email=admin_email, password=admin_password)
+        print(f"Admin user '{admin_email}' created.")
     else:
-        admin_user = User.query.filter_by(email=admin_email).first()
-        if admin_user is None:
-            admin_user = User.create_admin_user(email=admin_email, password=admin_password)
-            print(f"Admin user '{admin_email}' created.")
-            return admin_user
-        else:
-            print(f"Admin user '{admin_email}' already exists.")
-            return admin_user
-
-def create_teams(count=5):
-    teams = []
-    for _ in range(count):
-        team_name = fake.unique.company() + " Team"
-        team = Team.query.filter_by(name=team_name).first()
-        if team is None:
-            team = Team(name=team_name)
-            db.session.add(team)
-            teams.append(team)
-    db.session.commit()
-    print(f"Created {len(teams)} teams.")
-    return Team.query.all()
-
-def create_users(teams, count=20):
-    users = []
-    study_levels = ['pre-BAC'] + [str(i) for i in range(9)] + ['8+']
-    for _ in range(count):
-        full_name = fake.name()
-        email = fake.unique.email()
-        password = "password" # Default password for generated users
-        is_admin = fake.boolean(chance_of_getting_true=10) # 10% chance of being admin
-        study_level = random.choice(study_levels)
-
-        user = User(full_name=full_name, email=email, is_admin=is_admin, study_level=study_level)
-        user.set_password(password)
-        db.session.add(user)
-        users.append(user)
-    db.session.commit()
-
-    # Assign users to teams and potentially as team leads after they are committed
-    for user in users:
-        if teams and fake.boolean(chance_of_getting_true=70): # 70% chance to be in a team
-            chosen_team = random.choice(teams)
-            user.teams.append(chosen_team)
-            if fake.boolean(chance_of_getting_true=20): # 20% chance of being team lead for that team
-                user.teams_as_lead.append(chosen_team)
-        db.session.add(user)
-    db.session.commit()
-    print(f"Created {len(users)} users and assigned them to teams.")
-    return User.query.all()
-
-def create_species(count=5):
-    species_list = []
-    for _ in range(count):
-        species_name = fake.unique.word().capitalize() + " Species"
-        species = Species.query.filter_by(name=species_name).first()
-        if species is None:
-            species = Species(name=species_name)
-            db.session.add(species)
-            species_list.append(species)
-    db.session.commit()
-    print(f"Created {len(species_list)} species.")
-    return Species.query.all()
-
-def create_skills(species_list, count=30):
-    skills = []
-    for _ in range(count):
-        skill_name = fake.unique.catch_phrase()
-        description = fake.paragraph()
-        validity_period_months = random.randint(6, 24)
-        complexity = random.choice(list(Complexity))
-        reference_urls_text = ", ".join([fake.url() for _ in range(random.randint(0, 2))])
-        training_videos_urls_text = ", ".join([fake.url() for _ in range(random.randint(0, 2))])
-        potential_external_tutors_text = fake.name() if fake.boolean(chance_of_getting_true=30) else ""
-
-        skill = Skill(
-            name=skill_name,
-            description=description,
-            validity_period_months=validity_period_months,
-            complexity=complexity,
-            reference_urls_text=reference_urls_text,
-            training_videos_urls_text=training_videos_urls_text,
-            potential_external_tutors_text=potential_external_tutors_text
-        )
-        if species_list and fake.boolean(chance_of_getting_true=70):
-            skill.species.append(random.choice(species_list))
-        db.session.add(skill)
-        skills.append(skill)
-    db.session.commit()
-    print(f"Created {len(skills)} skills.")
-    return Skill.query.all()
-
-def create_training_paths(skills, species_list, count=10):
-    training_paths = []
-    for _ in range(count):
-        path_name = fake.unique.bs() + " Training Path"
-        description = fake.paragraph()
-        
-        if not species_list:
-            print("Warning: No species available to assign to TrainingPath. Skipping creation.")
-            continue
-
-        chosen_species = random.choice(species_list)
-        training_path = TrainingPath(name=path_name, description=description, species_id=chosen_species.id)
-        
-        if skills:
-            num_skills = random.randint(1, min(5, len(skills)))
-            training_path.skills.extend(random.sample(skills, num_skills))
-        
-        db.session.add(training_path)
-        training_paths.append(training_path)
-    db.session.commit()
-    print(f"Created {len(training_paths)} training paths.")
-    return TrainingPath.query.all()
-
-def create_training_sessions(users, skills, count=15):
-    training_sessions = []
-    tutors = [u for u in users if u.tutored_skills] # Users who can tutor
-    
-    for _ in range(count):
-        title = fake.sentence(nb_words=6)
-        location = fake.address()
-        start_time = fake.date_time_between(start_date='-1y', end_date='now')
-        end_time = start_time + timedelta(hours=random.randint(1, 4))
-        animal_count = random.randint(1, 10) if fake.boolean(chance_of_getting_true=50) else None
-        ethical_authorization_id = fake.bothify(text='????-########') if fake.boolean(chance_of_getting_true=30) else None
-
-        tutor = random.choice(tutors) if tutors else None
-        
-        training_session = TrainingSession(
-            title=title,
-            location=location,
-            start_time=start_time,
-            end_time=end_time,
-            animal_count=animal_count,
-            ethical_authorization_id=ethical_authorization_id
-        )
-        
-        if tutor:
-            training_session.tutors.append(tutor)
-        
-        if skills:
-            num_skills = random.randint(1, min(3, len(skills)))
-            training_session.skills_covered.extend(random.sample(skills, num_skills))
-            
-        db.session.add(training_session)
-        training_sessions.append(training_session)
-    db.session.commit()
-    print(f"Created {len(training_sessions)} training sessions.")
-    return TrainingSession.query.all()
-
-def create_competencies(users, skills, training_sessions, count=50):
-    competencies = []
-    for _ in range(count):
-        user = random.choice(users)
-        skill = random.choice(skills)
-        
-        # Ensure unique competency for user-skill pair
-        existing_competency = Competency.query.filter_by(user=user, skill=skill).first()
-        if existing_competency:
-            continue
-
-        level = random.choice(['Novice', 'Intermediate', 'Expert'])
-        evaluation_date = fake.date_time_between(start_date='-2y', end_date='now')
-        evaluator = random.choice(users) if fake.boolean(chance_of_getting_true=70) else None
-        session = random.choice(training_sessions) if training_sessions and fake.boolean(chance_of_getting_true=50) else None
-
-        competency = Competency(
-            user=user,
-            skill=skill,
-            level=level,
-            evaluation_date=evaluation_date,
-            evaluator=evaluator,
-            training_session=session
-        )
-        db.session.add(competency)
-        competencies.append(competency)
-    db.session.commit()
-    print(f"Created {len(competencies)} competencies.")
-    return Competency.query.all()
-
-def create_skill_practice_events(users, skills, count=40):
-    practice_events = []
-    for _ in range(count):
-        user = random.choice(users)
-        skill = random.choice(skills)
-        practice_date = fake.date_time_between(start_date='-1y', end_date='now')
-        notes = fake.sentence() if fake.boolean(chance_of_getting_true=50) else None
-
-        event = SkillPracticeEvent(
-            user=user,
-            practice_date=practice_date,
-            notes=notes
-        )
-        event.skills.append(skill)
-        db.session.add(event)
-        practice_events.append(event)
-    db.session.commit()
-    print(f"Created {len(practice_events)} skill practice events.")
-    return practice_events
-
-def create_training_requests(users, skills, count=20):
-    training_requests = []
-    for _ in range(count):
-        requester = random.choice(users)
-        request_date = fake.date_time_between(start_date='-6m', end_date='now')
-        status = random.choice(list(TrainingRequestStatus))
-
-        request = TrainingRequest(
-            requester=requester,
-            request_date=request_date,
-            status=status
-        )
-        
-        if skills:
-            num_skills = random.randint(1, min(3, len(skills)))
-            request.skills_requested.extend(random.sample(skills, num_skills))
-            
-        db.session.add(request)
-        training_requests.append(request)
-    db.session.commit()
-    print(f"Created {len(training_requests)} training requests.")
-    return training_requests
-
-def create_external_trainings(users, skills, count=10):
-    external_trainings = []
-    for _ in range(count):
-        user = random.choice(users)
-        external_trainer_name = fake.company()
-        date = fake.date_time_between(start_date='-1y', end_date='now')
-        status = random.choice(list(ExternalTrainingStatus))
-        validator = random.choice(users) if fake.boolean(chance_of_getting_true=50) else None
-
-        external_training = ExternalTraining(
-            user=user,
-            external_trainer_name=external_trainer_name,
-            date=date,
-            status=status,
-            validator=validator
-        )
-        db.session.add(external_training) # Add external_training to session immediately
-        db.session.flush() # Flush to assign an ID to external_training
-        
-        if skills:
-            num_skills = random.randint(1, min(3, len(skills)))
-            # For each skill, create an ExternalTrainingSkillClaim object
-            for skill_obj in random.sample(skills, num_skills):
-                skill_claim = ExternalTrainingSkillClaim(
-                    level=random.choice(['Novice', 'Intermediate', 'Expert']),
-                    wants_to_be_tutor=fake.boolean(chance_of_getting_true=30),
-                    practice_date=fake.date_time_between(start_date=date, end_date='now') if fake.boolean(chance_of_getting_true=50) else None
-                )
-                skill_claim.skill = skill_obj # Assign skill object to the relationship
-                skill_claim.external_training = external_training # Explicitly link to parent external_training
-                db.session.add(skill_claim) # Add skill_claim to session
-                # Assign species associated with the skill to the skill claim
-                if skill_obj.species:
-                    skill_claim.species_claimed.extend(skill_obj.species)
-                # No need to append to external_training.skill_claims here, as it's handled by the relationship backref
-            
-        external_trainings.append(external_training)
-    db.session.commit()
-    print(f"Created {len(external_trainings)} external trainings.")
-    return external_trainings
-
-def create_initial_regulatory_trainings(users):
-    initial_trainings = []
-    for user in users:
-        if fake.boolean(chance_of_getting_true=50): # 50% of users have initial training
-            level = random.choice(list(InitialRegulatoryTrainingLevel))
-            training_date = fake.date_time_between(start_date='-5y', end_date='-1y')
-            initial_training = InitialRegulatoryTraining(
-                user=user,
-                level=level,
-                training_date=training_date,
-                attachment_path=None # For simplicity, no attachments in seed
-            )
-            db.session.add(initial_training)
-            initial_trainings.append(initial_training)
-    db.session.commit()
-    print(f"Created {len(initial_trainings)} initial regulatory trainings.")
-    return initial_trainings
-
-def create_continuous_training_events(users, count=20):
-    events = []
-    for _ in range(count):
-        title = fake.sentence(nb_words=5)
-        description = fake.paragraph()
-        training_type = random.choice(list(ContinuousTrainingType))
-        location = fake.city() if training_type == ContinuousTrainingType.PRESENTIAL else None
-        event_date = fake.date_time_between(start_date='-3y', end_date='+1y')
-        duration_hours = random.randint(1, 8)
-        creator = random.choice(users)
-
-        event = ContinuousTrainingEvent(
-            title=title,
-            description=description,
-            training_type=training_type,
-            location=location,
-            event_date=event_date,
-            duration_hours=duration_hours,
-            attachment_path=None, # For simplicity, no attachments in seed
-            creator=creator,
-            status=ContinuousTrainingEventStatus.APPROVED # Seeded events are approved by default
-        )
-        db.session.add(event)
-        events.append(event)
-    db.session.commit()
-    print(f"Created {len(events)} continuous training events.")
-    return events
-
-def create_user_continuous_trainings(users, continuous_training_events, count_per_user=3):
-    user_cts = []
-    for user in users:
-        if continuous_training_events:
-            num_trainings = random.randint(0, count_per_user)
-            chosen_events = random.sample(continuous_training_events, min(num_trainings, len(continuous_training_events)))
-            for event in chosen_events:
-                status = random.choice(list(UserContinuousTrainingStatus))
-                validated_by = random.choice(users) if status == UserContinuousTrainingStatus.APPROVED else None
-                validated_hours = event.duration_hours if status == UserContinuousTrainingStatus.APPROVED else None
-                validation_date = fake.date_time_between(start_date=event.event_date, end_date='now') if status == UserContinuousTrainingStatus.APPROVED else None
-
-                user_ct = UserContinuousTraining(
-                    user=user,
-                    event=event,
-                    attendance_attachment_path=None, # For simplicity, no attachments in seed
-                    status=status,
-                    validated_by=validated_by,
-                    validated_hours=validated_hours,
-                    validation_date=validation_date
-                )
-                db.session.add(user_ct)
-                user_cts.append(user_ct)
-    db.session.commit()
-    print(f"Created {len(user_cts)} user continuous trainings.")
-    return user_cts
-
-
-with app.app_context():
-    db.create_all() # Ensure tables exist
-    init_roles_and_permissions()
-
-    print("Seeding database...")
-
-    admin_user = create_admin_user()
-    
-    teams = create_teams()
-    users = create_users(teams)
-    
-    # Refresh objects from DB to ensure all relationships are correctly loaded after initial commit
-    teams = Team.query.all()
-    users = User.query.all()
-
-    # Assign team leads by setting lead_id directly
-    for team in teams:
-        # Find users who are leads for this specific team
-        potential_leads = [u for u in users if team in u.teams_as_lead]
-        if potential_leads:
-            # This part needs to be re-evaluated. The Team model does not have a lead_id attribute.
-            # Team leads are associated via the many-to-many relationship team_leads.
-            # The current logic here is trying to set a single lead_id on the team, which is incorrect.
-            # If the goal is to ensure each team has at least one lead, this logic needs to be different.
-            # For now, I will comment out this section as it's trying to set a non-existent attribute.
-            pass # No direct lead_id on Team model
-
-    species_list = create_species()
-    skills = create_skills(species_list)
-
-    # Assign some skills to tutors
-    for user in users:
-        if user.teams_as_lead and skills and fake.boolean(chance_of_getting_true=50):
-            # Get skills not already tutored by the user
-            available_skills = [skill for skill in skills if skill not in user.tutored_skills]
-            if available_skills:
-                num_tutored_skills = random.randint(1, min(3, len(available_skills)))
-                user.tutored_skills.extend(random.sample(available_skills, num_tutored_skills))
-                db.session.add(user)
-    db.session.commit()
-    print("Assigned tutored skills to some team leads.")
-
-    training_paths = create_training_paths(skills, species_list)
-
-    # Assign some training paths to users
-    for user in users:
-        if training_paths and fake.boolean(chance_of_getting_true=40):
-            # Get paths not already assigned to the user
-            available_paths = [path for path in training_paths if path not in user.assigned_training_paths]
-            if available_paths:
-                num_assigned_paths = random.randint(1, min(2, len(available_paths)))
-                user.assigned_training_paths.extend(random.sample(available_paths, num_assigned_paths))
-                db.session.add(user)
-    db.session.commit()
-    print("Assigned training paths to some users.")
-
-    training_sessions = create_training_sessions(users, skills)
-
-    # Assign attendees to training sessions
-    for session in training_sessions:
-        if users and fake.boolean(chance_of_getting_true=70):
-            # Get users not already assigned to the session
-            available_users = [user for user in users if user not in session.attendees]
-            if available_users:
-                num_attendees = random.randint(1, min(5, len(available_users)))
-                session.attendees.extend(random.sample(available_users, num_attendees))
-                db.session.add(session)
-    db.session.commit()
-    print("Assigned attendees to training sessions.")
-
-    competencies = create_competencies(users, skills, training_sessions)
-    skill_practice_events = create_skill_practice_events(users, skills)
-    training_requests = create_training_requests(users, skills)
-    external_trainings = create_external_trainings(users, skills)
-
-    initial_regulatory_trainings = create_initial_regulatory_trainings(users)
-    continuous_training_events = create_continuous_training_events(users)
-    user_continuous_trainings = create_user_continuous_trainings(users, continuous_training_events)
-
-    print("Database seeding complete!")
+        print(f"Admin user '{admin_email}' already exists.")
+    return admin_user
+
+
+def scale_argument_parser(description):
+    """
+    Returns an argument parser for a scale, per-table sizes and a seed.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='demo',
+                        help='Preset sizes of the data set.')
+    for name in SCALES['demo']:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name,
+                            help=f'Number of {name.replace("_", " ")} (overrides the scale).')
+    parser.add_argument('--seed', type=int, default=42, help='Random generator seed.')
+    parser.add_argument('--reference-date', type=date.fromisoformat, default=None,
+                        help='Date (YYYY-MM-DD) the generated dates are relative to, today by default.')
+    return parser
+
+
+def sizes_from_arguments(args):
+    """
+    Returns the sizes of the chosen scale with the per-table overrides applied.
+    """
+    sizes = dict(SCALES[args.scale])
+    sizes.update({name: getattr(args, name) for name in sizes
+                  if getattr(args, name) is not None})
+    return sizes
+
+
+def main():
+    """
+    Seeds the database configured in the environment.
+    """
+    load_dotenv()
+    parser = scale_argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--reset', action='store_true',
+                        help='Drop and recreate every table first (destroys existing data).')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        init_roles_and_permissions()
+        print(f"Seeding database ({args.scale} scale, seed {args.seed})...")
+        started = datetime.now()
+        counts = seed_database(sizes_from_arguments(args), seed=args.seed,
+                               reference_date=args.reference_date, reset=args.reset)
+        create_admin_user()
+        for table, count in counts.items():
+            print(f"  {table}: {count}")
+        print(f"Database seeding complete in {(datetime.now() - started).total_seconds():.1f}s!")
+
+
+if __name__ == '__main__':
+    main()
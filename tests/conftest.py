@@ -1,7 +1,10 @@
 import sys
 import os
+import tempfile
 import pytest
+from contextlib import contextmanager
 from faker import Faker
+from sqlalchemy import event
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -15,6 +18,9 @@ class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False # Disable CSRF for easier testing
+    MAIL_OUTBOX_WORKERS = 0 # Deliver inline: worker threads would share the in-memory database
+    CERTIFICATE_WORKERS = 0 # Render certificates on first download, for the same reason
+    METRICS_DIR = tempfile.mkdtemp(prefix='training-manager-metrics-') # Keep the working tree clean
 
 @pytest.fixture(scope='session')
 def app():
@@ -77,3 +83,43 @@ def user_factory(app, db):
 @pytest.fixture(scope='function')
 def runner(app):
     return app.test_cli_runner()
+
+@pytest.fixture(scope='function')
+def count_queries(app):
+    """
+    Returns a context manager collecting the SQL statements executed inside it.
+    """
+    @contextmanager
+    def _count_queries():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return _count_queries
+
+@pytest.fixture(scope='function')
+def assert_constant_queries(client, count_queries):
+    """
+    Returns a helper asserting that GET ``url`` runs as many queries before and
+    after ``add_rows()`` adds more rows to the listed tables.
+    """
+    def _assert_constant_queries(url, add_rows, headers=None):
+        assert client.get(url, headers=headers).status_code == 200  # warm up caches
+        with count_queries() as before:
+            assert client.get(url, headers=headers).status_code == 200
+        add_rows()
+        db.session.commit()
+        assert client.get(url, headers=headers).status_code == 200  # reload expired objects
+        with count_queries() as after:
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200
+        assert len(after) == len(before), \
+            f'{url}: {len(before)} queries grew to {len(after)}:\n' + '\n'.join(after)
+        return response
+    return _assert_constant_queries
@@ -428,4 +428,205 @@ def test_submit_training_request_update_species(client):
     # Check that a new request was created, as the logic creates a new one per species
     requests = TrainingRequest.query.filter_by(requester_id=user.id).all()
     assert len(requests) == 2
-    assert species2 in requests[1].species_requested
\ No newline at end of file
+    assert species2 in requests[1].species_requested
+
+
+def test_api_key_lookup_uses_hash_and_backfill(client, monkeypatch):
+    from app.models import backfill_api_key_hashes
+    user = User(full_name='Hash User', email='hash_user@example.com', is_approved=True)
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+    assert user.api_key_hash == User.hash_api_key(user.api_key)
+    assert User.find_by_api_key(user.api_key) == user
+    assert User.find_by_api_key('not-a-key') is None
+
+    old_key = user.api_key
+    user.generate_api_key()
+    db.session.commit()
+    assert User.find_by_api_key(old_key) is None
+    assert User.find_by_api_key(user.api_key) == user
+
+    User.query.filter_by(id=user.id).update({'api_key_hash': None})
+    db.session.commit()
+    assert User.find_by_api_key(user.api_key) is None
+    assert backfill_api_key_hashes() == 1
+    db.session.refresh(user)
+    assert user.api_key_hash == User.hash_api_key(user.api_key)
+
+    monkeypatch.setitem(client.application.config, 'API_KEY_HMAC_SECRET', 'rotated-secret')
+    assert User.find_by_api_key(user.api_key) is None
+    assert backfill_api_key_hashes(rehash=True) == 1
+    assert User.find_by_api_key(user.api_key) == user
+
+
+def test_public_check_competency_batch(client, monkeypatch):
+    monkeypatch.setitem(client.application.config, 'SERVICE_API_KEY', 'service-key')
+    headers = {'X-Service-Key': 'service-key'}
+    users = [User(full_name=f'Check User {i}', email=f'check{i}@example.com', is_approved=True)
+             for i in range(2)]
+    for user in users:
+        user.set_password('password')
+    recent = Skill(name='Check Recent Skill', validity_period_months=12)
+    stale = Skill(name='Check Stale Skill', validity_period_months=12)
+    db.session.add_all(users + [recent, stale])
+    db.session.add_all([
+        Competency(user=users[0], skill=recent, evaluation_date=datetime.now(timezone.utc) - timedelta(days=30)),
+        Competency(user=users[0], skill=stale, evaluation_date=datetime(2020, 1, 1, tzinfo=timezone.utc)),
+        SkillPracticeEvent(user=users[1], skills=[stale], practice_date=datetime.now(timezone.utc)),
+    ])
+    db.session.commit()
+    payload = {'emails': ['check0@example.com', 'check1@example.com', 'nobody@example.com'],
+               'skill_ids': [recent.id, stale.id, 999999]}
+
+    response = client.post('/api/public/check_competency', json=payload, headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    first = {entry['skill_id']: entry for entry in data['check0@example.com']['skills']}
+    assert first[recent.id]['valid'] and first[recent.id]['recycling_due_at']
+    assert first[stale.id]['reason'] == 'recycling_due'
+    assert first[999999]['reason'] == 'unknown_skill'
+    assert data['check0@example.com']['valid'] is False
+    assert 'Not competent in Check Stale Skill' in data['check0@example.com']['details']
+    # A practice event without competency does not make a user competent
+    second = {entry['skill_id']: entry for entry in data['check1@example.com']['skills']}
+    assert second[stale.id]['reason'] == 'not_competent'
+    assert data['nobody@example.com'] == {'valid': False, 'reason': 'user_not_found',
+                                          'details': ['User not found'], 'skills': []}
+
+    payload = {'emails': ['check0@example.com'], 'skill_ids': [recent.id, stale.id],
+               'as_of': '2020-06-01'}
+    data = client.post('/api/public/check_competency', json=payload, headers=headers).get_json()
+    skills = {entry['skill_id']: entry for entry in data['check0@example.com']['skills']}
+    assert skills[stale.id]['valid'] and skills[recent.id]['reason'] == 'not_competent'
+
+    payload['as_of'] = 'not-a-date'
+    response = client.post('/api/public/check_competency', json=payload, headers=headers)
+    assert response.status_code == 400
+
+
+def test_public_declare_practice_batch_is_idempotent(client, monkeypatch):
+    monkeypatch.setitem(client.application.config, 'SERVICE_API_KEY', 'service-key')
+    headers = {'X-Service-Key': 'service-key'}
+    user = User(full_name='Batch Practice User', email='batch_practice@example.com', is_approved=True)
+    user.set_password('password')
+    skills = [Skill(name=f'Batch Practice Skill {i}', validity_period_months=12) for i in range(2)]
+    competency = Competency(user=user, skill=skills[0], evaluation_date=datetime(2020, 1, 1, tzinfo=timezone.utc))
+    db.session.add_all([user, competency] + skills)
+    db.session.commit()
+    skill_ids = [skill.id for skill in skills]
+
+    records = [
+        {'email': 'batch_practice@example.com', 'skill_ids': skill_ids, 'date': '2026-01-15', 'source': 'lims'},
+        {'email': 'batch_practice@example.com', 'skill_ids': skill_ids[::-1], 'date': '2026-01-15', 'source': 'lims'},
+        {'email': 'batch_practice@example.com', 'skill_ids': [skill_ids[1], 999999], 'date': '2026-02-01',
+         'source': 'lims', 'idempotency_key': 'run-42'},
+        {'email': 'nobody@example.com', 'skill_ids': skill_ids, 'date': '2026-01-15', 'source': 'lims'},
+        {'email': 'batch_practice@example.com', 'skill_ids': skill_ids, 'date': '15/01/2026', 'source': 'lims'},
+    ]
+    response = client.post('/api/public/declare_practice/batch', json={'records': records}, headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [r['status'] for r in data['results']] == ['created', 'unchanged', 'created', 'error', 'error']
+    assert data['results'][1]['message'] == 'Duplicate of record 1.'
+    assert '999999' in data['results'][2]['message']
+    assert SkillPracticeEvent.query.filter_by(user_id=user.id).count() == 2
+    db.session.refresh(competency)
+    assert competency.last_validated_at.replace(tzinfo=None) == datetime(2026, 1, 15)
+
+    ndjson = '\n'.join(json.dumps(record) for record in records[:3])
+    response = client.post('/api/public/declare_practice/batch', data=ndjson,
+                           content_type='application/x-ndjson', headers=headers)
+    assert response.get_json()['summary']['unchanged'] == 3
+    assert SkillPracticeEvent.query.filter_by(user_id=user.id).count() == 2
+
+    single = dict(records[0], date='2026-03-01')
+    assert client.post('/api/public/declare_practice', json=single, headers=headers).status_code == 201
+    response = client.post('/api/public/declare_practice', json=single, headers=headers)
+    assert response.status_code == 200 and response.get_json()['status'] == 'unchanged'
+    assert SkillPracticeEvent.query.filter_by(user_id=user.id).count() == 3
+    response = client.post('/api/public/declare_practice', json=dict(single, email='nobody@example.com'),
+                           headers=headers)
+    assert response.status_code == 404
+
+
+def test_api_list_pagination_fields_and_etag(client):
+    user = create_api_user()
+    headers = {'X-API-Key': user.api_key}
+    species = Species(name='Listing Species')
+    for i in range(5):
+        skill = Skill(name=f'Listing Skill {i}')
+        skill.species.append(species)
+        skill.tutors.append(user)
+        db.session.add(skill)
+    db.session.commit()
+
+    response = client.get('/api/skills/?limit=2&fields=id,name,species_ids', headers=headers)
+    assert response.status_code == 200
+    page = response.get_json()
+    assert len(page) == 2 and set(page[0]) == {'id', 'name', 'species_ids'}
+    assert page[0]['species_ids'] == [species.id]
+    cursor = response.headers['X-Next-Cursor']
+    assert 'rel="next"' in response.headers['Link']
+
+    seen = [item['id'] for item in page]
+    while cursor:
+        response = client.get(f'/api/skills/?limit=2&fields=id&cursor={cursor}', headers=headers)
+        seen.extend(item['id'] for item in response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+    assert seen == sorted(seen) and len(seen) == Skill.query.count()
+
+    response = client.get('/api/skills/', headers=headers)
+    assert len(response.get_json()) == Skill.query.count()
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+    response = client.get('/api/skills/', headers=dict(headers, **{'If-None-Match': etag}))
+    assert response.status_code == 304
+    Skill.query.first().name = 'Listing Skill renamed'
+    db.session.commit()
+    response = client.get('/api/skills/', headers=dict(headers, **{'If-None-Match': etag}))
+    assert response.status_code == 200
+
+    assert client.get('/api/skills/?fields=nope', headers=headers).status_code == 400
+    assert client.get('/api/skills/?cursor=%%%', headers=headers).status_code == 400
+
+
+def _add_api_rows(tag):
+    species = Species(name=f'Load Plan Species {tag}')
+    tutor = User(full_name=f'Load Plan Tutor {tag}', email=f'load_plan_{tag}@example.com', is_approved=True)
+    tutor.set_password('password')
+    team = Team(name=f'Load Plan Team {tag}')
+    team.members.append(tutor)
+    team.team_leads.append(tutor)
+    skills = [Skill(name=f'Load Plan Skill {tag}-{i}') for i in range(2)]
+    for skill in skills:
+        skill.species.append(species)
+        skill.tutors.append(tutor)
+    path = TrainingPath(name=f'Load Plan Path {tag}', species=species)
+    path.assigned_users.append(tutor)
+    session = TrainingSession(title=f'Load Plan Session {tag}', attendees=[tutor], skills_covered=skills)
+    request = TrainingRequest(requester=tutor, skills_requested=skills)
+    external = ExternalTraining(user=tutor, external_trainer_name='Lab', date=datetime.now(timezone.utc))
+    db.session.add_all([species, tutor, team, path, session, request, external] + skills)
+    db.session.flush()
+    from app.models import TrainingPathSkill
+    db.session.add_all([TrainingPathSkill(training_path_id=path.id, skill_id=skill.id, order=i)
+                        for i, skill in enumerate(skills)])
+    db.session.add(ExternalTrainingSkillClaim(external_training_id=external.id, skill_id=skills[0].id))
+    return species
+
+
+def test_api_list_query_count_is_constant(client, assert_constant_queries):
+    user = create_api_user()
+    headers = {'X-API-Key': user.api_key}
+    species = _add_api_rows('a')
+    db.session.commit()
+    species_id = species.id
+
+    for url in ('/api/skills/', '/api/users/', '/api/users/search', '/api/teams/',
+                '/api/training_paths/', '/api/training_sessions/', '/api/training_requests/',
+                '/api/external_trainings/', f'/api/species/{species_id}/skills',
+                '/api/skills/?limit=3&fields=id,tutor_ids'):
+        counter = iter(range(10 ** 6))
+        assert_constant_queries(url, lambda: [_add_api_rows(f'{url}-{next(counter)}') for _ in range(3)],
+                                headers=headers)
@@ -0,0 +1,119 @@
+import io
+import os
+import zipfile
+from datetime import datetime, timezone
+
+from app import db
+from app.booklets import (
+    artifact_path, booklet_content_hash, booklet_export_user_ids, collect_booklet_data,
+    enqueue_booklet_job, refresh_job_status, stream_booklet_archive, write_booklet_archive
+)
+from app.models import BookletJob, BookletJobStatus, Competency, Skill, Species, Team, User
+
+
+def test_booklet_jobs_are_cached_by_content(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'BOOKLET_WORKERS', 0)
+    monkeypatch.setitem(app.config, 'BOOKLET_CACHE_FOLDER', str(tmp_path))
+    with app.test_request_context():
+        user = User(full_name='Booklet User', email='booklet_user@example.com')
+        user.set_password('password')
+        skill = Skill(name='Booklet Skill', validity_period_months=12)
+        skill.species.append(Species(name='Booklet Species'))
+        competency = Competency(user=user, skill=skill, level='Expert',
+                                evaluation_date=datetime(2024, 5, 1, tzinfo=timezone.utc))
+        db.session.add_all([user, skill, competency])
+        db.session.commit()
+
+        job = enqueue_booklet_job(user, user)
+        assert job.status == BookletJobStatus.DONE
+        path = artifact_path(job.content_hash)
+        with zipfile.ZipFile(path) as zf:
+            names = zf.namelist()
+        assert 'booklet_Booklet_User.pdf' in names
+        assert 'Skills_Certificates/certificate_Booklet_User_Booklet_Skill.pdf' in names
+
+        # Unchanged records: the cached archive and job are reused
+        assert enqueue_booklet_job(user, user).id == job.id
+        assert booklet_content_hash(collect_booklet_data(user.id)) == job.content_hash
+
+        # Any change to the records yields a new archive
+        competency.level = 'Novice'
+        db.session.commit()
+        new_job = enqueue_booklet_job(user, user)
+        assert new_job.id != job.id
+        assert new_job.content_hash != job.content_hash
+        assert os.path.exists(artifact_path(new_job.content_hash))
+
+        # A job whose archive appears meanwhile is settled as done
+        pending = BookletJob(
+            id='f' * 32, user_id=user.id, requested_by_id=user.id,
+            content_hash=new_job.content_hash)
+        db.session.add(pending)
+        db.session.commit()
+        assert refresh_job_status(pending) == BookletJobStatus.DONE
+
+
+def test_bulk_booklet_export(app, tmp_path):
+    with app.test_request_context():
+        team = Team(name='Booklet Export Team')
+        species = Species(name='Booklet Export Species')
+        skill = Skill(name='Booklet Export Skill', validity_period_months=12)
+        skill.species.append(species)
+        users = []
+        for i in range(3):
+            user = User(full_name=f'Export Booklet {i}', email=f'export_booklet_{i}@example.com',
+                        is_approved=True)
+            user.set_password('password')
+            users.append(user)
+        team.members.extend(users[:2])
+        competency = Competency(user=users[2], skill=skill, level='Expert',
+                                evaluation_date=datetime(2024, 5, 1, tzinfo=timezone.utc))
+        db.session.add_all(users + [team, skill, competency])
+        db.session.commit()
+
+        team_ids = booklet_export_user_ids(team_id=team.id)
+        assert team_ids == [users[0].id, users[1].id]
+        assert booklet_export_user_ids(species_id=species.id) == [users[2].id]
+        assert set(u.id for u in users) <= set(booklet_export_user_ids())
+
+        # Rendered in two worker processes, written to a file
+        path = tmp_path / 'team.zip'
+        with open(path, 'wb') as fileobj:
+            write_booklet_archive(team_ids + [users[2].id], fileobj, max_workers=2, batch_size=2)
+        with zipfile.ZipFile(path) as zf:
+            names = zf.namelist()
+        assert f'Export_Booklet_0_{users[0].id}/booklet_Export_Booklet_0.pdf' in names
+        assert (f'Export_Booklet_2_{users[2].id}/Skills_Certificates/'
+                'certificate_Export_Booklet_2_Booklet_Export_Skill.pdf') in names
+
+        # Streamed in-process
+        content = b''.join(stream_booklet_archive(team_ids, max_workers=1))
+        with zipfile.ZipFile(io.BytesIO(content)) as zf:
+            assert len(zf.namelist()) == 2
+            assert zf.testzip() is None
+
+
+def test_web_booklet_export_is_capped(client, monkeypatch):
+    admin = User(full_name='Booklet Web Admin', email='booklet_web_admin@example.com', is_admin=True,
+                 is_approved=True)
+    admin.set_password('password')
+    team = Team(name='Booklet Web Team')
+    members = [User(full_name=f'Booklet Web {i}', email=f'booklet_web_{i}@example.com',
+                    is_approved=True) for i in range(2)]
+    for member in members:
+        member.set_password('password')
+    team.members.extend(members)
+    db.session.add_all([admin, team] + members)
+    db.session.commit()
+    client.post('/auth/login', data={'email': admin.email, 'password': 'password'})
+
+    assert client.get('/admin/export_booklets').status_code == 400
+
+    response = client.get(f'/admin/export_booklets?team_id={team.id}')
+    assert response.status_code == 200 and response.mimetype == 'application/zip'
+    with zipfile.ZipFile(io.BytesIO(response.data)) as zf:
+        assert len(zf.namelist()) == 2
+
+    monkeypatch.setitem(client.application.config, 'BOOKLET_WEB_EXPORT_MAX_USERS', 1)
+    response = client.get(f'/admin/export_booklets?team_id={team.id}')
+    assert response.status_code == 302
@@ -0,0 +1,112 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app import db
+from app.db_bootstrap import (
+    BOOTSTRAP_VERSION, applied_fingerprint, bootstrap_fingerprint, run_bootstrap
+)
+from app.models import (
+    CacheVersion, Competency, DEFAULT_ROLES, PERMISSIONS_CACHE, Permission, Role, Skill, User,
+    init_roles_and_permissions
+)
+
+
+def _role_permissions(name):
+    return {permission.name for permission in Role.query.filter_by(name=name).one().permissions}
+
+
+def test_bootstrap_is_skipped_once_applied(client, count_queries):
+    result = run_bootstrap(force=True)
+    assert result.applied
+    assert applied_fingerprint() == bootstrap_fingerprint()
+
+    with count_queries() as statements:
+        result = run_bootstrap()
+    assert not result.applied
+    assert len(statements) == 1
+
+
+def test_bootstrap_reapplies_on_fingerprint_change(client):
+    run_bootstrap()
+    db.session.get(CacheVersion, BOOTSTRAP_VERSION).version = 'outdated'
+    db.session.commit()
+
+    result = run_bootstrap()
+
+    assert result.applied and not result.tables_created
+    assert applied_fingerprint() == bootstrap_fingerprint()
+
+
+def test_bootstrap_fills_columns_of_migrated_rows(client):
+    user = User(full_name='Legacy User', email='legacy@example.com', is_approved=True)
+    user.set_password('password')
+    skill = Skill(name='Legacy Skill', validity_period_months=12)
+    db.session.add_all([user, skill])
+    db.session.commit()
+    user_id = user.id
+    # Rows written before the migrations added the materialized columns
+    db.session.execute(insert(Competency), [{'user_id': user_id, 'skill_id': skill.id,
+                                             'level': 'Novice',
+                                             'evaluation_date': datetime(2019, 1, 1)}])
+    User.query.filter_by(id=user_id).update({'api_key': 'legacy-key', 'api_key_hash': None})
+    db.session.commit()
+    assert Competency.query.filter(Competency.needs_recycling).count() == 0
+
+    result = run_bootstrap(force=True)
+
+    assert (result.recycling_dates, result.api_key_hashes) == (1, 1)
+    competency = Competency.query.one()
+    assert competency.last_validated_at is not None and competency.needs_recycling
+    assert Competency.query.filter(Competency.needs_recycling).count() == 1
+    assert User.find_by_api_key('legacy-key').id == user_id
+    assert run_bootstrap(force=True).recycling_dates == 0
+
+
+def test_init_roles_and_permissions_reconciles_defaults(client):
+    init_roles_and_permissions()
+    user_role = Role.query.filter_by(name='User').one()
+    custom = Permission(name='custom_permission', description='Custom.')
+    db.session.add(custom)
+    user_role.permissions.append(custom)
+    user_role.permissions.remove(Permission.query.filter_by(name='self_edit_profile').one())
+    Permission.query.filter_by(name='view_reports').one().description = 'Changed.'
+    db.session.commit()
+
+    assert init_roles_and_permissions() == 3
+
+    assert _role_permissions('User') == set(DEFAULT_ROLES['User'])
+    assert Permission.query.filter_by(name='view_reports').one().description == \
+        'View various application reports.'
+    assert db.session.get(Permission, custom.id) is not None
+
+
+def test_init_roles_and_permissions_without_changes_keeps_cache_version(client, count_queries):
+    init_roles_and_permissions()
+    version = db.session.get(CacheVersion, PERMISSIONS_CACHE).version
+
+    with count_queries() as statements:
+        assert init_roles_and_permissions() == 0
+    assert len(statements) == 3
+    db.session.expire_all()
+    assert db.session.get(CacheVersion, PERMISSIONS_CACHE).version == version
+
+
+def test_bootstrap_creates_first_admin(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'ADMIN_EMAIL', 'first.admin@example.com')
+    monkeypatch.setitem(app.config, 'ADMIN_PASSWORD', 'admin_password')
+
+    result = run_bootstrap(force=True)
+
+    assert result.admin_created
+    admin = User.query.filter_by(email='first.admin@example.com').one()
+    assert admin.is_admin and [role.name for role in admin.roles] == ['Admin']
+    assert not run_bootstrap(force=True).admin_created
+
+
+def test_bootstrap_cli(client, runner):
+    result = runner.invoke(args=['bootstrap', 'run'])
+    assert 'Database bootstrapped' in result.output
+
+    assert 'Up to date' in runner.invoke(args=['bootstrap', 'status']).output
+    assert 'already bootstrapped' in runner.invoke(args=['bootstrap', 'run']).output
@@ -0,0 +1,46 @@
+import os
+from datetime import datetime, timezone
+
+from app import db
+from app.certificates import certificate_file, prerender_certificates
+from app.models import Competency, Skill, Species, User
+
+
+def test_certificates_are_stored_by_content_and_served_conditionally(client, tmp_path,
+                                                                     monkeypatch):
+    monkeypatch.setitem(client.application.config, 'CERTIFICATE_FOLDER', str(tmp_path))
+    user = User(full_name='Certificate User', email='certificate@example.com', is_approved=True)
+    user.set_password('password')
+    skill = Skill(name='Certificate Skill', validity_period_months=12,
+                  species=[Species(name='Certificate Species')])
+    competencies = [Competency(user=user, skill=skill, level='Expert',
+                               evaluation_date=datetime(2024, 5, 1, tzinfo=timezone.utc)),
+                    Competency(user=user, skill=Skill(name='Other Certificate Skill'),
+                               level='Novice', evaluation_date=datetime(2024, 6, 1,
+                                                                        tzinfo=timezone.utc))]
+    db.session.add_all([user] + competencies)
+    db.session.commit()
+    competency_id = competencies[0].id
+
+    processed, rendered = prerender_certificates(max_workers=1)
+    assert processed >= 2 and rendered >= 2
+    name = db.session.get(Competency, competency_id).certificate_path
+    assert os.path.exists(certificate_file(name))
+    assert prerender_certificates(max_workers=1) == (0, 0)
+
+    client.post('/auth/login', data={'email': user.email, 'password': 'password'})
+    url = f'/dashboard/competency/{competency_id}/certificate.pdf'
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data.startswith(b'%PDF')
+    etag = response.headers['ETag']
+    assert name.startswith(etag.strip('"'))
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    # A renamed user changes the certificate: it is rendered again on download
+    db.session.get(User, user.id).full_name = 'Renamed Certificate User'
+    db.session.commit()
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    assert db.session.get(Competency, competency_id).certificate_path != name
+    assert certificate_file('../../etc/passwd') is None
@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+
+from app import db
+from app.competency_matrix import build_competency_matrix, get_competency_matrix
+from app.models import (
+    User, Skill, Competency, SkillPracticeEvent, ExternalTraining, ExternalTrainingSkillClaim,
+    ExternalTrainingStatus
+)
+
+
+def test_competency_matrix_is_sparse_and_query_bounded(client):
+    members = [User(full_name=f'Matrix Member {i}', email=f'matrix{i}@example.com',
+                    is_approved=True, password_hash='x') for i in range(3)]
+    skills = [Skill(name=f'Matrix Skill {i}', validity_period_months=12) for i in range(5)]
+    db.session.add_all(members + skills)
+    db.session.flush()
+
+    evaluated = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    practiced = datetime(2021, 6, 1, tzinfo=timezone.utc)
+    db.session.add(Competency(user=members[0], skill=skills[0], level='Expert',
+                              evaluation_date=evaluated))
+    db.session.add(SkillPracticeEvent(user=members[0], skills=[skills[0]], practice_date=practiced))
+    training = ExternalTraining(user_id=members[1].id, external_trainer_name='Lab',
+                                date=evaluated, status=ExternalTrainingStatus.APPROVED)
+    db.session.add(training)
+    db.session.flush()
+    db.session.add(ExternalTrainingSkillClaim(external_training_id=training.id,
+                                              skill_id=skills[1].id, practice_date=practiced))
+    db.session.commit()
+    member_ids = [member.id for member in members]
+    skill_ids = [skill.id for skill in skills]
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        matrix = build_competency_matrix(member_ids)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert len(statements) <= 4
+
+    assert [name for _, name in matrix.skills] == ['Matrix Skill 0', 'Matrix Skill 1']
+    cell = matrix.cell(members[0].id, skills[0].id)
+    assert cell.is_competency and cell.level == 'Expert'
+    assert cell.latest_practice_date == practiced
+    assert cell.needs_recycling
+    claim = matrix.cell(members[1].id, skills[1].id)
+    assert not claim.is_competency and claim.latest_practice_date == practiced
+    assert matrix.cell(members[2].id, skills[0].id) is None
+    assert matrix.skills_for([members[1].id]) == [(skill_ids[1], 'Matrix Skill 1')]
+
+    with client.application.test_request_context():
+        snapshot = get_competency_matrix(member_ids)
+        assert get_competency_matrix(member_ids) is snapshot
+        db.session.add(Competency(user=members[2], skill=skills[4], level='Novice'))
+        db.session.commit()
+    with client.application.test_request_context():
+        refreshed = get_competency_matrix(member_ids)
+        assert refreshed is not snapshot
+        assert refreshed.cell(members[2].id, skills[4].id).level == 'Novice'
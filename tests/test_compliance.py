@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+
+from app import db
+from app.compliance import compute_continuous_training_compliance, get_continuous_training_compliance
+from app.models import (
+    User, ContinuousTrainingEvent, ContinuousTrainingEventStatus, ContinuousTrainingType,
+    UserContinuousTraining, UserContinuousTrainingStatus
+)
+
+
+def _attend(user, event, hours, status=UserContinuousTrainingStatus.APPROVED):
+    db.session.add(UserContinuousTraining(user=user, event=event, status=status,
+                                          validated_hours=hours))
+
+
+def test_compliance_engine_matches_user_properties(app):
+    with app.app_context():
+        creator = User(full_name='CT Creator', email='ct_creator@example.com')
+        compliant = User(full_name='CT Compliant', email='ct_compliant@example.com')
+        lagging = User(full_name='CT Lagging', email='ct_lagging@example.com')
+        idle = User(full_name='CT Idle', email='ct_idle@example.com')
+        for u in (creator, compliant, lagging, idle):
+            u.set_password('password')
+            db.session.add(u)
+        db.session.flush()
+
+        now = datetime.now(timezone.utc)
+        events = {}
+        for key, days_ago, training_type in [
+            ('recent_live', 30, ContinuousTrainingType.PRESENTIAL),
+            ('recent_online', 400, ContinuousTrainingType.ONLINE),
+            ('old_live', 5 * 365, ContinuousTrainingType.PRESENTIAL),
+            ('too_old', 7 * 365, ContinuousTrainingType.ONLINE),
+        ]:
+            events[key] = ContinuousTrainingEvent(
+                title=key, training_type=training_type, event_date=now - timedelta(days=days_ago),
+                duration_hours=7, creator=creator, status=ContinuousTrainingEventStatus.APPROVED)
+            db.session.add(events[key])
+
+        _attend(compliant, events['recent_live'], 7)
+        _attend(compliant, events['recent_online'], 10)
+        _attend(compliant, events['old_live'], 7)
+        _attend(compliant, events['too_old'], 21)
+        _attend(lagging, events['recent_online'], 3.5)
+        _attend(lagging, events['recent_live'], 7, status=UserContinuousTrainingStatus.PENDING)
+        db.session.commit()
+
+        results = compute_continuous_training_compliance([compliant.id, lagging.id, idle.id])
+        for user in (compliant, lagging, idle):
+            result = results[user.id]
+            assert result.total_hours == user.total_continuous_training_hours_6_years
+            assert result.live_hours == user.live_continuous_training_hours_6_years
+            assert result.online_hours == user.online_continuous_training_hours_6_years
+            assert result.is_compliant == user.is_continuous_training_compliant
+            assert result.is_live_compliant == user.is_live_training_compliant
+            assert result.is_at_risk_next_year == user.is_at_risk_next_year
+            assert result.hours_by_year == user.continuous_training_summary_by_year
+            assert result.calendar_hours == user.get_total_continuous_training_hours_last_six_years()
+
+        assert results[compliant.id].total_hours == 24.0
+        assert results[compliant.id].status_label == "OK"
+        assert results[lagging.id].status_label == "WARNING"
+        assert results[idle.id].total_hours == 0.0
+        assert get_continuous_training_compliance(lagging).online_hours == 3.5
+
+        all_results = compute_continuous_training_compliance()
+        assert set(all_results) == {u.id for u in User.query.all()}
@@ -0,0 +1,45 @@
+import csv
+import io
+
+import openpyxl
+
+from app import db
+from app.exports import csv_response, iter_batches, xlsx_response
+from app.models import User
+
+
+def test_iter_batches_pages_through_every_row(app):
+    with app.app_context():
+        for i in range(7):
+            user = User(full_name=f'Export User {i}', email=f'export_batch_{i}@example.com')
+            user.set_password('password')
+            db.session.add(user)
+        db.session.commit()
+
+        query = User.query.filter(User.email.like('export_batch_%'))
+        batches = list(iter_batches(query, User.id, batch_size=3))
+        assert [len(batch) for batch in batches] == [3, 3, 1]
+        ids = [user.id for batch in batches for user in batch]
+        assert ids == sorted(ids)
+        assert len(set(ids)) == 7
+
+
+def test_streamed_xlsx_and_csv_responses(app):
+    headers = ['name', 'hours']
+    rows = [[f'row {i}', i * 1.5] for i in range(1200)]
+    with app.test_request_context():
+        response = xlsx_response('report.xlsx', 'Report', headers, iter(rows))
+        response.direct_passthrough = False
+        workbook = openpyxl.load_workbook(io.BytesIO(response.get_data()))
+        sheet = workbook['Report']
+        assert [cell.value for cell in sheet[1]] == headers
+        assert sheet.max_row == len(rows) + 1
+        assert sheet.cell(row=1201, column=2).value == 1798.5
+        assert 'report.xlsx' in response.headers['Content-Disposition']
+
+        response = csv_response('report.csv', headers, iter(rows))
+        content = response.get_data(as_text=True)
+        parsed = list(csv.reader(io.StringIO(content.lstrip('﻿'))))
+        assert parsed[0] == headers
+        assert len(parsed) == len(rows) + 1
+        assert parsed[-1] == ['row 1199', '1798.5']
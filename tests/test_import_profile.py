@@ -0,0 +1,29 @@
+from app.import_profile import parse_importtime, profile_imports, summarize_imports
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _weakref
+import time:       300 |        420 | app.cache
+[2026-01-01 00:00:00,000] WARNING in app: unrelated log line
+import time:       500 |        500 |     openpyxl.cell
+import time:      1000 |       1500 |   openpyxl
+import time:       200 |       2120 | app
+"""
+
+
+def test_parse_and_summarize_importtime():
+    timings = parse_importtime(IMPORTTIME_OUTPUT.splitlines())
+
+    assert [(t.module, t.self_us, t.cumulative_us, t.depth) for t in timings][:2] == [
+        ('_weakref', 120, 120, 1), ('app.cache', 300, 420, 0)]
+    summary = summarize_imports(timings, limit=2)
+    assert summary['modules'] == 5
+    assert summary['total_ms'] == 2.1
+    assert summary['packages'] == [('openpyxl', 1.5), ('app', 0.5)]
+    assert summary['slowest'] == [('app', 2.1), ('openpyxl', 1.5)]
+
+
+def test_create_app_does_not_import_heavy_libraries():
+    modules = {timing.module.split('.')[0] for timing in profile_imports()}
+
+    assert 'flask' in modules
+    assert not modules & {'openpyxl', 'fpdf', 'ics'}
@@ -0,0 +1,182 @@
+from datetime import datetime, timezone
+
+import openpyxl
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import check_password_hash
+
+from app import db
+from app.imports import (
+    ImportRowResult, _write_in_chunks, _write_practice_chunk, _write_skill_chunk, hash_passwords,
+    import_practice_records, import_report_path, import_skills, import_users, save_import_report,
+    summarize, USER_IMPORT_COLUMNS
+)
+from app.models import Competency, Complexity, Skill, SkillPracticeEvent, Species, Team, User
+
+
+def test_import_users_reports_every_row(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'IMPORT_REPORT_FOLDER', str(tmp_path))
+    with app.app_context():
+        existing = User(full_name='Import Existing', email='import_existing@example.com')
+        existing.set_password('old_password')
+        db.session.add(existing)
+        db.session.commit()
+
+        rows = [
+            (2, ('Import New', 'import_new@example.com', 'secret', 'TRUE', 'TRUE', 'Import Team')),
+            (3, ('Import Updated', 'import_existing@example.com', 'new_password', 'FALSE', 'FALSE',
+                 'Import Team')),
+            (4, ('No Password', 'import_nopass@example.com', None, None, None, None)),
+            (5, ('Bad Email', 'not-an-email', 'secret', None, None, None)),
+            (6, ('Duplicate', 'import_new@example.com', 'secret', None, None, None)),
+            (7, ('Import Other', 'import_other@example.com', 'secret', None, None, None)),
+        ]
+        results = import_users(rows, update_existing=True, chunk_size=2)
+        assert [r.status for r in results] == [
+            ImportRowResult.CREATED, ImportRowResult.UPDATED, ImportRowResult.ERROR,
+            ImportRowResult.ERROR, ImportRowResult.ERROR, ImportRowResult.CREATED]
+        assert summarize(results)['error'] == 3
+
+        db.session.expire_all()
+        new_user = User.query.filter_by(email='import_new@example.com').one()
+        assert new_user.is_admin and new_user.check_password('secret')
+        assert new_user.api_key and new_user.api_key_hash == User.hash_api_key(new_user.api_key)
+        assert [t.name for t in new_user.teams_as_lead] == ['Import Team']
+        updated = User.query.filter_by(email='import_existing@example.com').one()
+        assert updated.full_name == 'Import Updated' and updated.check_password('new_password')
+        assert [t.name for t in updated.teams] == ['Import Team']
+        assert Team.query.filter_by(name='Import Team').count() == 1
+
+        results = import_users(rows[:1], update_existing=False)
+        assert results[0].status == ImportRowResult.SKIPPED
+
+        report_id = save_import_report(results, USER_IMPORT_COLUMNS, hidden_columns=(2,))
+        sheet = openpyxl.load_workbook(import_report_path(report_id)).active
+        assert [c.value for c in sheet[1]][-3:] == ['row', 'status', 'message']
+        assert sheet.cell(row=2, column=3).value is None  # password blanked out
+        assert sheet.cell(row=2, column=8).value == ImportRowResult.SKIPPED
+        assert import_report_path('../etc/passwd') is None
+
+
+def test_failed_chunk_keeps_good_rows(app):
+    with app.app_context():
+        items = [{'result': ImportRowResult(i, ()), 'email': f'chunk_{i}@example.com'}
+                 for i in range(5)]
+
+        def write_chunk(chunk):
+            for item in chunk:
+                if item['email'] == 'chunk_3@example.com':
+                    raise IntegrityError('INSERT', {}, Exception('boom'))
+                user = User(full_name='Chunk User', email=item['email'])
+                user.set_password('password')
+                db.session.add(user)
+            db.session.flush()
+
+        written = _write_in_chunks(items, write_chunk, chunk_size=2)
+        assert [item['email'] for item in written] == [
+            'chunk_0@example.com', 'chunk_1@example.com', 'chunk_2@example.com', 'chunk_4@example.com']
+        assert items[3]['result'].status == ImportRowResult.ERROR
+        assert User.query.filter(User.email.like('chunk_%')).count() == 4
+
+
+def test_failed_user_chunk_leaves_no_team(app, monkeypatch):
+    def fail(*args):
+        raise IntegrityError('INSERT', {}, Exception('boom'))
+
+    monkeypatch.setattr('app.imports._new_api_key_columns', fail)
+    with app.app_context():
+        rows = [(2, ('Orphan Team User', 'orphan_team@example.com', 'secret', None, None,
+                     'Orphan Import Team'))]
+        results = import_users(rows)
+        assert results[0].status == ImportRowResult.ERROR
+        assert Team.query.filter_by(name='Orphan Import Team').count() == 0
+
+
+def test_failed_skill_chunk_leaves_no_species(app, monkeypatch):
+    def fail(items):
+        _write_skill_chunk(items)
+        raise IntegrityError('INSERT', {}, Exception('boom'))
+
+    monkeypatch.setattr('app.imports._write_skill_chunk', fail)
+    with app.app_context():
+        rows = [(2, ('Orphan Species Skill', None, None, None, None, None, None,
+                     'Orphan Import Species'))]
+        results, new_species = import_skills(rows)
+        assert results[0].status == ImportRowResult.ERROR and new_species == []
+        assert Species.query.filter_by(name='Orphan Import Species').count() == 0
+
+
+def test_concurrent_practice_delivery_is_unchanged(app, monkeypatch):
+    def write_after_concurrent_delivery(items):
+        if not SkillPracticeEvent.query.filter_by(idempotency_key=items[0]['key']).count():
+            # The same record committed by another request after the duplicate check
+            db.session.add(SkillPracticeEvent(user_id=items[0]['user_id'],
+                                              practice_date=items[0]['practice_date'],
+                                              idempotency_key=items[0]['key']))
+            db.session.commit()
+        _write_practice_chunk(items)
+
+    monkeypatch.setattr('app.imports._write_practice_chunk', write_after_concurrent_delivery)
+    with app.app_context():
+        user = User(full_name='Race Practitioner', email='race_practitioner@example.com')
+        user.set_password('password')
+        skill = Skill(name='Race Practice Skill', validity_period_months=12)
+        db.session.add_all([user, skill])
+        db.session.commit()
+
+        results = import_practice_records([{'email': user.email, 'skill_ids': [skill.id],
+                                            'date': '2026-01-15', 'source': 'lims',
+                                            'idempotency_key': 'race-1'}])
+        assert (results[0].status, results[0].message) == \
+            (ImportRowResult.UNCHANGED, "Already ingested.")
+        assert SkillPracticeEvent.query.filter_by(user_id=user.id).count() == 1
+
+
+def test_hash_passwords_in_parallel(app):
+    with app.app_context():
+        passwords = [f'password-{i}' for i in range(40)]
+        hashes = hash_passwords(passwords, max_workers=2)
+        assert len(hashes) == 40
+        assert check_password_hash(hashes[17], 'password-17')
+        assert not check_password_hash(hashes[17], 'password-18')
+
+
+def test_import_skills_dry_run_then_sync(app):
+    with app.app_context():
+        mouse = Species(name='Import Mouse')
+        skill = Skill(name='Import Gavage', description='Old', validity_period_months=12,
+                      complexity=Complexity.SIMPLE)
+        skill.species.append(mouse)
+        user = User(full_name='Import Practitioner', email='import_practitioner@example.com')
+        user.set_password('password')
+        competency = Competency(user=user, skill=skill,
+                                evaluation_date=datetime(2024, 1, 1, tzinfo=timezone.utc))
+        db.session.add_all([mouse, skill, user, competency])
+        db.session.commit()
+
+        rows = [
+            (2, ('Import Gavage', 'Old', 24, 'SIMPLE', None, None, None, 'Import Mouse, Import Zebrafish')),
+            (3, ('Import Injection', 'New skill', '6', 'Complexe', None, None, None, 'Import Zebrafish')),
+            (4, ('Import Broken', None, None, 'Impossible', None, None, None, None)),
+        ]
+        results, new_species = import_skills(rows, update_existing=True, dry_run=True)
+        assert [r.status for r in results] == [
+            ImportRowResult.UPDATED, ImportRowResult.CREATED, ImportRowResult.ERROR]
+        assert 'validity_period_months' in results[0].message and 'species' in results[0].message
+        assert new_species == ['Import Zebrafish']
+        assert Skill.query.filter_by(name='Import Injection').first() is None
+        assert Species.query.filter_by(name='Import Zebrafish').first() is None
+
+        results, new_species = import_skills(rows, update_existing=True)
+        assert summarize(results)['error'] == 1
+        db.session.expire_all()
+        injection = Skill.query.filter_by(name='Import Injection').one()
+        assert injection.complexity == Complexity.COMPLEX and injection.validity_period_months == 6
+        assert [s.name for s in injection.species] == ['Import Zebrafish']
+        gavage = Skill.query.filter_by(name='Import Gavage').one()
+        assert gavage.validity_period_months == 24
+        assert sorted(s.name for s in gavage.species) == ['Import Mouse', 'Import Zebrafish']
+        assert db.session.get(Competency, competency.id).recycling_due_at > datetime(2025, 12, 1)
+
+        results, new_species = import_skills(rows[:2], update_existing=True)
+        assert [r.status for r in results] == [ImportRowResult.UNCHANGED, ImportRowResult.UNCHANGED]
+        assert new_species == []
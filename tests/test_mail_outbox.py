@@ -0,0 +1,65 @@
+import socket
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import db
+from app.email import send_email, send_session_reminders
+from app.mail_outbox import DebuggingSMTPServer, deliver_pending
+from app.models import OutboxAttachment, OutboxMessage, OutboxMessageStatus, Skill, TrainingSession, User
+
+
+@pytest.fixture
+def smtp_server(app, monkeypatch):
+    state = app.extensions['mail']
+    with DebuggingSMTPServer() as server:
+        monkeypatch.setattr(state, 'server', '127.0.0.1')
+        monkeypatch.setattr(state, 'port', server.port)
+        monkeypatch.setattr(state, 'suppress', False)
+        monkeypatch.setattr(state, 'default_sender', 'noreply@example.com')
+        yield server
+
+
+def test_session_reminders_share_one_attachment_and_connection(client, smtp_server):
+    attendees = [User(full_name=f'Outbox <User> {i}', email=f'outbox{i}@example.com',
+                      is_approved=True, password_hash='x') for i in range(3)]
+    tutor = User(full_name='Outbox Tutor', email='tutor@example.com', password_hash='x')
+    start = datetime(2030, 1, 1, 9, tzinfo=timezone.utc)
+    session = TrainingSession(title='Outbox Session', location='Lab', start_time=start,
+                              end_time=start + timedelta(hours=2), attendees=attendees,
+                              tutors=[tutor], skills_covered=[Skill(name='Outbox Skill')])
+    db.session.add(session)
+    db.session.commit()
+
+    assert send_session_reminders(session) == 3
+    assert OutboxAttachment.query.count() == 1
+    assert {message.status for message in OutboxMessage.query} == {OutboxMessageStatus.SENT}
+    assert smtp_server.connections == 1
+    assert sorted(message['To'] for message in smtp_server.messages) == \
+        [user.email for user in attendees]
+    message = smtp_server.messages[0]
+    parts = {part.get_content_type(): part for part in message.walk()}
+    assert 'Outbox Tutor' in parts['text/plain'].get_payload(decode=True).decode()
+    assert 'Outbox &lt;User&gt;' in parts['text/html'].get_payload(decode=True).decode()
+    assert b'SUMMARY:Outbox Session' in parts['text/calendar'].get_payload(decode=True)
+
+
+def test_failed_delivery_is_retried_with_backoff(client, smtp_server, monkeypatch):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        closed_port = sock.getsockname()[1]
+    monkeypatch.setattr(client.application.extensions['mail'], 'port', closed_port)
+
+    send_email('Outbox retry', sender='noreply@example.com', recipients=['retry@example.com'],
+               text_body='Body', html_body='<p>Body</p>')
+    message = OutboxMessage.query.one()
+    assert message.status == OutboxMessageStatus.PENDING and message.attempts == 1
+    assert message.last_error
+    assert deliver_pending() == (0, 0)
+
+    monkeypatch.setattr(client.application.extensions['mail'], 'port', smtp_server.port)
+    message.next_attempt_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.session.commit()
+    assert deliver_pending() == (1, 1)
+    assert OutboxMessage.query.one().status == OutboxMessageStatus.SENT
+    assert [message['Subject'] for message in smtp_server.messages] == ['Outbox retry']
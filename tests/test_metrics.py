@@ -0,0 +1,65 @@
+import json
+import subprocess
+import sys
+
+from app import db
+from app.models import User
+
+
+def _exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_metrics_merge_worker_files(client, tmp_path):
+    app = client.application
+    registry = app.extensions['metrics']
+    directory = registry.directory
+    registry.directory = str(tmp_path)
+    app.config['METRICS_TOKEN'] = 'scraper-token'
+    route = [['blueprint', 'api'], ['endpoint', 'api.public_public_skills']]
+    # An exited worker: its counters still count, its gauges no longer do
+    (tmp_path / 'metrics-1.json').write_text(json.dumps({
+        'pid': _exited_pid(),
+        'counters': [['http_requests_total', route + [['method', 'GET'], ['status', '401']], 4],
+                     ['cache_hits_total', [['cache', 'permission_names']], 3],
+                     ['cache_misses_total', [['cache', 'permission_names']], 1]],
+        'histograms': [['http_request_duration_seconds', route, [4] + [0] * 11 + [0.01]]],
+        'gauges': [['db_pool_checked_out', [], 7]],
+    }))
+    try:
+        assert client.get('/metrics').status_code == 401
+        headers = {'Authorization': 'Bearer wrong'}
+        assert client.get('/metrics', headers=headers).status_code == 401
+        client.get('/api/public/skills', headers={'X-Service-Key': 'wrong'})
+
+        response = client.get('/metrics', headers={'Authorization': 'Bearer scraper-token'})
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        lines = response.get_data(as_text=True).splitlines()
+        assert '# TYPE training_manager_http_request_duration_seconds histogram' in lines
+        assert 'training_manager_http_requests_total{blueprint="api",endpoint="api.public_public_skills",' \
+               'method="GET",status="401"} 5' in lines
+        assert 'training_manager_http_request_duration_seconds_count{blueprint="api",' \
+               'endpoint="api.public_public_skills"} 5' in lines
+        assert 'training_manager_http_request_duration_seconds_bucket{blueprint="api",' \
+               'endpoint="api.public_public_skills",le="+Inf"} 5' in lines
+        assert 'training_manager_metrics_processes 1' in lines
+        assert 'training_manager_mail_outbox_messages{status="pending"} 0' in lines
+        assert not any(line.startswith('training_manager_db_pool_checked_out') and
+                       line.endswith(' 7') for line in lines)
+        assert any(line.startswith('training_manager_cache_hit_ratio{cache="permission_names"}')
+                   for line in lines)
+        assert any(line.startswith('training_manager_db_pool_checkouts_total') for line in lines)
+
+        admin = User(full_name='Metrics Admin', email='metrics@example.com', is_admin=True,
+                     is_approved=True)
+        admin.set_password('password')
+        db.session.add(admin)
+        db.session.commit()
+        client.post('/auth/login', data={'email': admin.email, 'password': 'password'})
+        assert client.get('/metrics').status_code == 200
+    finally:
+        registry.directory = directory
+        app.config['METRICS_TOKEN'] = None
@@ -53,4 +53,123 @@ def test_training_request_status_enum(app):
         db.session.add(tr)
         db.session.commit()
         retrieved_tr = TrainingRequest.query.first()
-        assert retrieved_tr.status == TrainingRequestStatus.APPROVED
\ No newline at end of file
+        assert retrieved_tr.status == TrainingRequestStatus.APPROVED
+
+
+def test_competency_recycling_dates_are_materialized(app):
+    with app.app_context():
+        from app.models import rebuild_competency_recycling_dates
+        u = User(full_name='Recycling User', email='recycling@example.com')
+        u.set_password('password')
+        s = Skill(name='Recycling Skill', validity_period_months=12)
+        evaluated = datetime(2020, 1, 1)
+        c = Competency(user=u, skill=s, evaluation_date=evaluated)
+        db.session.add_all([u, s, c])
+        db.session.commit()
+        assert c.last_validated_at.replace(tzinfo=None) == evaluated
+        assert c.recycling_due_at.replace(tzinfo=None) == evaluated + timedelta(days=12 * 30.44)
+        assert c.needs_recycling
+        assert Competency.query.filter(Competency.recycling_due_at < datetime.now()).count() >= 1
+
+        practiced = datetime.now() - timedelta(days=10)
+        event = SkillPracticeEvent(user=u, practice_date=practiced)
+        event.skills.append(s)
+        db.session.add(event)
+        db.session.commit()
+        assert c.last_validated_at.replace(tzinfo=None) == practiced
+        assert not c.needs_recycling
+
+        s.validity_period_months = 24
+        db.session.commit()
+        assert c.recycling_due_at.replace(tzinfo=None) == practiced + timedelta(days=24 * 30.44)
+
+        db.session.delete(event)
+        db.session.commit()
+        assert c.last_validated_at.replace(tzinfo=None) == evaluated
+
+        Competency.query.filter_by(id=c.id).update({'last_validated_at': None, 'recycling_due_at': None})
+        db.session.commit()
+        assert rebuild_competency_recycling_dates() >= 1
+        db.session.refresh(c)
+        assert c.recycling_due_at.replace(tzinfo=None) == evaluated + timedelta(days=24 * 30.44)
+
+
+def test_competency_recycling_hybrids_filter_in_sql(app):
+    with app.app_context():
+        u = User(full_name='Hybrid User', email='hybrid@example.com')
+        u.set_password('password')
+        expiring = Skill(name='Hybrid Expiring Skill', validity_period_months=6)
+        permanent = Skill(name='Hybrid Permanent Skill')
+        practiced = Skill(name='Hybrid Practiced Skill', validity_period_months=6)
+        evaluated = datetime(2020, 1, 1)
+        db.session.add_all([u, expiring, permanent, practiced,
+                            Competency(user=u, skill=expiring, evaluation_date=evaluated),
+                            Competency(user=u, skill=permanent, evaluation_date=evaluated),
+                            Competency(user=u, skill=practiced, evaluation_date=evaluated)])
+        event = SkillPracticeEvent(user=u, practice_date=datetime.now() - timedelta(days=5))
+        event.skills.append(practiced)
+        db.session.add(event)
+        db.session.commit()
+        permanent.validity_period_months = None
+        db.session.commit()
+
+        query = Competency.query.filter(Competency.user_id == u.id)
+        assert [c.skill.name for c in query.filter(Competency.needs_recycling)] == \
+            ['Hybrid Expiring Skill']
+        assert {c.skill.name for c in query.filter(~Competency.needs_recycling)} == \
+            {'Hybrid Permanent Skill', 'Hybrid Practiced Skill'}
+        for competency in query:
+            assert competency.needs_recycling == (competency.skill is expiring)
+        assert query.filter(Competency.warning_date.isnot(None),
+                            Competency.recycling_due_date.isnot(None)).count() == 2
+
+
+def test_user_can_uses_cached_permissions_and_invalidates(app):
+    with app.app_context():
+        from app.models import Role, Permission, get_cache_version, PERMISSIONS_CACHE
+        role = Role(name='Cache Role')
+        view_reports = Permission(name='cache_view_reports')
+        user_manage = Permission(name='cache_user_manage')
+        role.permissions.append(view_reports)
+        u = User(full_name='Cache User', email='cache_user@example.com')
+        u.set_password('password')
+        u.roles.append(role)
+        db.session.add_all([role, u, view_reports, user_manage])
+        db.session.commit()
+
+        assert u.can('cache_view_reports')
+        assert not u.can('cache_user_manage')
+
+        version = get_cache_version(PERMISSIONS_CACHE)
+        role.permissions.append(user_manage)
+        db.session.commit()
+        assert get_cache_version(PERMISSIONS_CACHE) != version
+        assert u.can('cache_user_manage')
+
+        u.roles.remove(role)
+        db.session.commit()
+        assert not u.can('cache_view_reports')
+
+
+def test_competency_recycling_hybrid_agrees_in_sql_after_migration(client):
+    from sqlalchemy import insert
+    from app.db_bootstrap import run_bootstrap
+    u = User(full_name='Migrated User', email='migrated@example.com')
+    u.set_password('password')
+    s = Skill(name='Migrated Skill', validity_period_months=12)
+    db.session.add_all([u, s])
+    db.session.commit()
+    db.session.execute(insert(Competency), [
+        {'user_id': u.id, 'skill_id': s.id, 'evaluation_date': evaluated}
+        for evaluated in (datetime(2019, 1, 1), datetime.now() - timedelta(days=2))])
+    db.session.commit()
+
+    run_bootstrap(force=True)
+
+    assert Competency.query.filter(Competency.last_validated_at.is_(None)).count() == 0
+    query = Competency.query.filter(Competency.user_id == u.id)
+    expired = {c.id for c in query.filter(Competency.needs_recycling)}
+    valid = {c.id for c in query.filter(~Competency.needs_recycling)}
+    assert len(expired) == len(valid) == 1
+    for competency in query:
+        assert competency.needs_recycling == (competency.id in expired)
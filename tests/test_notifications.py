@@ -0,0 +1,34 @@
+from app import db
+from app.models import User, TrainingRequest, TrainingRequestStatus
+from app.notifications import get_global_counters, get_notification_summary
+
+
+def test_notification_summary_counts_and_invalidation(client):
+    admin = User(full_name='Notif Admin', email='notif_admin@example.com', is_admin=True, is_approved=True)
+    admin.set_password('password')
+    db.session.add(admin)
+    db.session.commit()
+
+    with client.application.test_request_context():
+        before = get_global_counters()
+
+        pending = User(full_name='Notif Pending', email='notif_pending@example.com', is_approved=False)
+        pending.set_password('password')
+        db.session.add(pending)
+        db.session.add(TrainingRequest(requester=pending, status=TrainingRequestStatus.PENDING))
+        db.session.commit()
+
+        after = get_global_counters()
+        assert after['user_approvals'] == before['user_approvals'] + 1
+        assert after['training_requests'] == before['training_requests'] + 1
+
+        summary = get_notification_summary(admin)
+        by_type = {n['type']: n['count'] for n in summary['notifications']}
+        assert by_type['user_approvals'] == after['user_approvals']
+        assert 'user_pending_training_requests' not in by_type
+
+        summary = get_notification_summary(pending)
+        by_type = {n['type']: n['count'] for n in summary['notifications']}
+        assert 'user_approvals' not in by_type
+        assert by_type['user_pending_training_requests'] == 1
+        assert summary['total_count'] == 1
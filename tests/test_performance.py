@@ -0,0 +1,49 @@
+from app import db
+from app.models import User
+from app.performance import get_monitor, percentile
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 11))
+    assert percentile(values, 50) == 5
+    assert percentile(values, 90) == 9
+    assert percentile(values, 99) == 10
+    assert percentile([7], 50) == 7
+    assert percentile([], 50) is None
+
+
+def test_requests_are_timed_per_endpoint(client, count_queries):
+    admin = User(full_name='Performance Admin', email='perf@example.com', is_admin=True,
+                 is_approved=True)
+    admin.set_password('password')
+    db.session.add(admin)
+    db.session.commit()
+    client.post('/auth/login', data={'email': admin.email, 'password': 'password'})
+
+    monitor = get_monitor()
+    monitor.reset()
+    for _ in range(3):
+        with count_queries() as statements:
+            assert client.get('/admin/training_requests/plan').status_code == 200
+
+    summary = client.get('/admin/performance.json').get_json()
+    entry = next(entry for entry in summary['endpoints']
+                 if entry['endpoint'] == 'admin.plan_training_sessions')
+    assert entry['requests'] == 3 and entry['errors'] == 0
+    assert entry['queries']['p50'] == len(statements)
+    assert entry['duration_ms']['p50'] >= entry['render_ms']['p50'] > 0
+    assert summary['slow_queries'] == []
+
+    threshold = monitor.slow_query_threshold
+    monitor.slow_query_threshold = 0
+    try:
+        client.get('/admin/training_requests/plan')
+    finally:
+        monitor.slow_query_threshold = threshold
+    slow_queries = monitor.summary()['slow_queries']
+    assert len(slow_queries) == len(statements)
+    assert {query['endpoint'] for query in slow_queries} == {'admin.plan_training_sessions'}
+
+    response = client.get('/admin/performance')
+    assert response.status_code == 200
+    assert b'admin.plan_training_sessions' in response.data
@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+
+from app import db
+from app.imports import import_skills
+from app.models import Skill, Species, TrainingRequest, TrainingRequestStatus, User
+from app.request_board import UNSPECIFIED_SPECIES_NAME, build_request_board, get_request_board
+
+
+def test_request_board_groups_pending_requests_by_species(client):
+    mouse = Species(name='Board Mouse')
+    rat = Species(name='Board Rat')
+    handling = Skill(name='Board Handling', species=[mouse, rat])
+    injection = Skill(name='Board Injection', species=[mouse])
+    orphan = Skill(name='Board Orphan')
+    users = [User(full_name=f'Board User {i}', email=f'board{i}@example.com',
+                  is_approved=True, password_hash='x') for i in range(3)]
+    date = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    db.session.add_all([
+        # Explicit species win over the species of the skills
+        TrainingRequest(requester=users[0], skills_requested=[handling], species_requested=[rat],
+                        request_date=date),
+        # Species inferred from the skills
+        TrainingRequest(requester=users[1], skills_requested=[handling, injection],
+                        request_date=date),
+        TrainingRequest(requester=users[1], skills_requested=[injection], request_date=date),
+        TrainingRequest(requester=users[2], skills_requested=[orphan], request_date=date),
+        TrainingRequest(requester=users[2], skills_requested=[handling], request_date=date,
+                        status=TrainingRequestStatus.REJECTED),
+    ])
+    db.session.commit()
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        board = build_request_board()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert len(statements) == 2
+
+    assert [group.species_name for group in board] == \
+        ['Board Mouse', 'Board Rat', UNSPECIFIED_SPECIES_NAME]
+    mouse_group, rat_group, unspecified = board
+    assert mouse_group.request_count == 2 and mouse_group.requester_count == 1
+    assert [(name, count) for _, name, count in mouse_group.skill_frequency] == \
+        [('Board Injection', 2), ('Board Handling', 1)]
+    assert rat_group.request_count == 2 and rat_group.requester_count == 2
+    assert [req.skills for req in rat_group.requests][1] == \
+        [(handling.id, 'Board Handling'), (injection.id, 'Board Injection')]
+    assert unspecified.species_id is None
+    assert [req.requester_name for req in unspecified.requests] == ['Board User 2']
+
+    with client.application.test_request_context():
+        snapshot = get_request_board()
+        assert get_request_board() is snapshot
+        request = TrainingRequest.query.filter_by(requester=users[2],
+                                                  status=TrainingRequestStatus.PENDING).one()
+        request.status = TrainingRequestStatus.APPROVED
+        db.session.commit()
+    with client.application.test_request_context():
+        refreshed = get_request_board()
+        assert refreshed is not snapshot
+        assert [group.species_name for group in refreshed] == ['Board Mouse', 'Board Rat']
+
+
+def test_skill_import_refreshes_request_board(client):
+    mouse = Species(name='Board Import Mouse')
+    skill = Skill(name='Board Import Skill', species=[mouse])
+    user = User(full_name='Board Import User', email='board_import@example.com',
+                is_approved=True, password_hash='x')
+    db.session.add(TrainingRequest(requester=user, skills_requested=[skill],
+                                   request_date=datetime(2024, 1, 1, tzinfo=timezone.utc)))
+    db.session.commit()
+
+    with client.application.test_request_context():
+        assert [group.species_name for group in get_request_board()] == ['Board Import Mouse']
+        import_skills([(2, ('Board Import Skill', None, None, None, None, None, None,
+                            'Board Import Rat'))], update_existing=True)
+    with client.application.test_request_context():
+        assert [group.species_name for group in get_request_board()] == ['Board Import Rat']
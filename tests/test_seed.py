@@ -0,0 +1,59 @@
+from datetime import date
+
+import pytest
+
+from app import db
+from app.models import Competency, User, skill_practice_event_skills
+from benchmark import compare_with_baseline, run_benchmarks
+from seed import SCALES, seed_database
+
+REFERENCE_DATE = date(2024, 1, 1)
+
+
+def _snapshot():
+    return (
+        db.session.query(User.full_name, User.email, User.is_admin).order_by(User.id).all(),
+        db.session.query(Competency.user_id, Competency.skill_id, Competency.level,
+                         Competency.evaluation_date).order_by(Competency.id).all(),
+        db.session.query(skill_practice_event_skills).order_by(
+            skill_practice_event_skills.c.skill_practice_event_id,
+            skill_practice_event_skills.c.skill_id).all(),
+    )
+
+
+def test_seed_is_deterministic(client):
+    counts = seed_database(SCALES['demo'], seed=7, reference_date=REFERENCE_DATE, reset=True)
+    assert counts['user'] == 20 and counts['skill'] == 30 and counts['competency'] == 50
+    assert counts['skill_practice_event'] == 40 and counts['user_continuous_training'] == 30
+    # Recycling dates are materialized once the rows are inserted
+    assert Competency.query.filter(Competency.recycling_due_at.is_(None)).count() == 0
+    first = _snapshot()
+
+    with pytest.raises(ValueError):
+        seed_database(SCALES['demo'], seed=7, reference_date=REFERENCE_DATE)
+
+    seed_database(SCALES['demo'], seed=7, reference_date=REFERENCE_DATE, reset=True)
+    assert _snapshot() == first
+    seed_database(SCALES['demo'], seed=8, reference_date=REFERENCE_DATE, reset=True)
+    assert _snapshot() != first
+
+
+def test_benchmarks_request_every_endpoint(client, monkeypatch):
+    monkeypatch.setitem(client.application.config, 'SERVICE_API_KEY', 'benchmark-key')
+    seed_database(SCALES['demo'], seed=3, reset=True)
+    results = run_benchmarks(client.application, repeat=1)
+    assert set(results) == {
+        'admin.index', 'admin.recycling_report', 'admin.continuous_training_compliance_report',
+        'team.team_competencies', 'dashboard.dashboard_home', 'api.notifications_summary',
+        'api.public_check_competency'}
+    assert all(result['queries'] > 0 for result in results.values())
+
+    baseline = {'endpoints': {name: dict(result) for name, result in results.items()}}
+    assert compare_with_baseline(results, baseline) == []
+    baseline['endpoints']['admin.index']['queries'] -= 1
+    baseline['endpoints']['team.team_competencies']['median_ms'] /= 100
+    baseline['endpoints']['team.team_competencies']['median_ms'] -= 10
+    regressions = compare_with_baseline(results, baseline)
+    assert len(regressions) == 2
+    assert regressions[0].startswith('admin.index:') and 'queries' in regressions[0]
+    assert regressions[1].startswith('team.team_competencies: median')
@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+
+from app import db
+from app.models import Competency, Skill, Species, TrainingRequest, User
+from app.session_planner import (
+    PlanningRequest, benchmark_planner, cluster_requests, match_tutors, plan_sessions
+)
+
+
+def test_cluster_requests_by_species_similarity_and_date():
+    june, december = (datetime(2025, month, 1, tzinfo=timezone.utc) for month in (6, 12))
+    requests = [
+        PlanningRequest(1, 10, 1, 0b011, june),
+        PlanningRequest(2, 11, 1, 0b001, june),
+        PlanningRequest(3, 12, 1, 0b011, december),
+        PlanningRequest(4, 13, 2, 0b011, june),
+        PlanningRequest(5, 14, 1, 0b100),
+        PlanningRequest(6, 15, 1, 0),
+    ]
+    clusters = cluster_requests(requests, max_attendees=5, min_similarity=0.5,
+                                date_window_days=30)
+    assert sorted(sorted(req.id for req in cluster.requests) for cluster in clusters) == \
+        [[1, 2], [3], [4], [5]]
+
+    assignments, uncovered = match_tutors(0b111, {20: 0b011, 21: 0b001, 22: 0b100, 10: 0b111},
+                                          excluded_ids={10})
+    assert assignments == {0: 20, 1: 20, 2: 22} and uncovered == 0
+    assert match_tutors(0b1000, {20: 0b011}) == ({}, 0b1000)
+
+
+def test_plan_sessions_ranks_drafts_with_eligible_tutors(client):
+    mouse = Species(name='Planner Mouse')
+    handling = Skill(name='Planner Handling', validity_period_months=12, species=[mouse])
+    surgery = Skill(name='Planner Surgery', validity_period_months=12, species=[mouse])
+    users = [User(full_name=f'Planner User {i}', email=f'planner{i}@example.com',
+                  is_approved=True, password_hash='x') for i in range(5)]
+    tutor, expired_tutor = users[3], users[4]
+    tutor.tutored_skills = [handling, surgery]
+    expired_tutor.tutored_skills = [surgery]
+    db.session.add_all(users + [
+        Competency(user=tutor, skill=handling, level='Expert',
+                   evaluation_date=datetime.now(timezone.utc)),
+        Competency(user=expired_tutor, skill=surgery, level='Expert',
+                   evaluation_date=datetime(2000, 1, 1, tzinfo=timezone.utc)),
+        TrainingRequest(requester=users[0], skills_requested=[handling]),
+        TrainingRequest(requester=users[1], skills_requested=[handling]),
+        TrainingRequest(requester=users[2], skills_requested=[surgery]),
+    ])
+    db.session.commit()
+
+    with client.application.test_request_context():
+        drafts = plan_sessions(min_similarity=0.5)
+    assert [len(draft.attendees) for draft in drafts] == [2, 1]
+    best = drafts[0]
+    assert best.species_name == 'Planner Mouse'
+    assert [name for _, name in best.attendees] == ['Planner User 0', 'Planner User 1']
+    assert best.tutors == [(tutor.id, 'Planner User 3')]
+    assert best.skill_tutors == {handling.id: tutor.id}
+    assert best.skills == [(handling.id, 'Planner Handling')] and best.coverage == 1
+    # The surgery tutors are either not competent or need recycling
+    assert drafts[1].tutors == [] and drafts[1].uncovered_skill_ids == [surgery.id]
+
+
+def test_benchmark_planner_is_deterministic():
+    first = benchmark_planner(request_count=300, seed=7, repeat=1)
+    second = benchmark_planner(request_count=300, seed=7, repeat=1)
+    assert first['drafts'] == second['drafts'] > 0